@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Almacén de características del modelo de aprobación del Sistema de Reservas UFRO
+Las mismas características para entrenar y para servir, precalculadas en tablas por clave
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from datos_graficos import resolver_columna
+from esquemas_datos import COLUMNA_MINUTOS, convertir_fechas, minutos_del_dia, minuto_de_hora
+from indice_salas import mascara_equipamiento
+from sistema_ia_reservas import calcular_prioridad
+
+# Las cinco primeras conservan el orden del modelo original; las categóricas van al inicio
+CARACTERISTICAS = [
+    'dia_semana', 'mes', 'hora', 'rol_encoded', 'sala_encoded',
+    'capacidad', 'equipamiento', 'solicitudes_bloque', 'tasa_aprobacion_solicitante',
+    'dias_hasta_receso', 'prioridad'
+]
+COLUMNAS_CATEGORICAS = [0, 2, 3, 4]
+
+VENTANA_SEMANAS = 4     # solicitudes por sala y bloque en las semanas previas a la requerida
+PESO_PREVIO = 5         # solicitudes "virtuales" con la tasa global para suavizar solicitantes nuevos
+DIAS_SIN_RECESO = 365   # tope de días hasta el próximo receso
+DESCONOCIDO = -1        # sala o rol no vistos al entrenar
+
+ORDINAL_EPOCH = date(1970, 1, 1).toordinal()
+
+def _semana(dias):
+    """Semana (lunes a domingo) de un número de días desde 1970-01-01, que fue jueves"""
+    return (dias + 3) // 7
+
+def _columna_texto(df, candidatos, por_defecto=''):
+    columna = resolver_columna(df, candidatos)
+    if columna is None:
+        return pd.Series(por_defecto, index=df.index)
+    return df[columna].astype(object).fillna(por_defecto).astype(str)
+
+class AlmacenCaracteristicas:
+    """
+    Tablas por clave, calculadas una vez con cargar() y actualizadas con registrar():
+    - salas: sala -> (capacidad, máscara de equipamiento)
+    - conteos: (sala, día, hora, semana) -> solicitudes
+    - solicitantes: solicitante -> [aprobadas, total]
+    - dias_receso: arreglo por día con los días hasta el próximo receso
+    vector() arma la fila de una solicitud con búsquedas O(1) en esas tablas.
+    """
+
+    def __init__(self, salas=None, recesos=None):
+        self._candado = threading.Lock()
+        self._salas = {}
+        self._codigos_rol = {}
+        self._codigos_sala = {}
+        self._conteos = {}
+        self._solicitantes = {}
+        self._prioridades = {}
+        self.tasa_global = 0.5
+        self._huella = None
+        self._entrenamiento = None
+        self.cargar_salas(salas)
+        self.cargar_recesos(recesos)
+
+    def cargar_salas(self, salas):
+        """Capacidad y equipamiento desde la tabla salas, indicadores o datos sintéticos"""
+        self._salas = {}
+        if salas is None or salas.empty:
+            return
+        codigos = _columna_texto(salas, ['codigo', 'Sala', 'Sala_Asignada'])
+        columna_capacidad = resolver_columna(salas, ['capacidad', 'Capacidad'])
+        capacidades = (pd.to_numeric(salas[columna_capacidad], errors='coerce').fillna(DESCONOCIDO).astype(int)
+                       if columna_capacidad else pd.Series(DESCONOCIDO, index=salas.index))
+        equipamientos = _columna_texto(salas, ['equipamiento', 'Equipamiento']).map(mascara_equipamiento)
+        self._salas = {codigo: (int(capacidad), int(equipo))
+                       for codigo, capacidad, equipo in zip(codigos, capacidades, equipamientos) if codigo}
+
+    def cargar_recesos(self, recesos):
+        """Precalcula los días hasta el próximo receso para cada día del rango cubierto"""
+        self._origen_recesos = 0
+        self._dias_receso = np.empty(0, dtype=np.int16)
+        columna_inicio = resolver_columna(recesos, ['Fecha Inicio', 'Fecha_Inicio'])
+        columna_fin = resolver_columna(recesos, ['Fecha Término', 'Fecha_Fin', 'Fecha_Término'])
+        if recesos is None or recesos.empty or columna_inicio is None:
+            return
+        inicios = convertir_fechas(recesos[columna_inicio])
+        fines = convertir_fechas(recesos[columna_fin]) if columna_fin else inicios
+        validos = inicios.notna() & fines.notna()
+        if not validos.any():
+            return
+        inicios = np.asarray(inicios[validos], dtype='datetime64[D]').astype(np.int64)
+        fines = np.asarray(fines[validos], dtype='datetime64[D]').astype(np.int64)
+        orden = np.argsort(inicios)
+        inicios, fines = inicios[orden], np.maximum.accumulate(fines[orden])
+
+        # Un año antes del primer receso hasta el último; fuera del rango se usa el tope
+        self._origen_recesos = int(inicios[0]) - DIAS_SIN_RECESO
+        dias = np.arange(self._origen_recesos, int(fines[-1]) + 1)
+        siguiente = np.searchsorted(inicios, dias)
+        anterior = siguiente - 1
+        dentro = (anterior >= 0) & (fines[np.maximum(anterior, 0)] >= dias)
+        hasta_inicio = np.where(siguiente < len(inicios), inicios[np.minimum(siguiente, len(inicios) - 1)] - dias, DIAS_SIN_RECESO)
+        self._dias_receso = np.where(dentro, 0, np.minimum(hasta_inicio, DIAS_SIN_RECESO)).astype(np.int16)
+
+    def dias_hasta_receso(self, dias):
+        """Días hasta el próximo receso (0 durante un receso) de días desde 1970-01-01"""
+        indices = np.asarray(dias) - self._origen_recesos
+        if len(self._dias_receso) == 0:
+            return np.full(np.shape(indices), DIAS_SIN_RECESO, dtype=np.int16)
+        dentro = (indices >= 0) & (indices < len(self._dias_receso))
+        return np.where(dentro, self._dias_receso[np.clip(indices, 0, len(self._dias_receso) - 1)], DIAS_SIN_RECESO)
+
+    def _prioridad(self, rol, motivo):
+        clave = (rol, motivo)
+        prioridad = self._prioridades.get(clave)
+        if prioridad is None:
+            prioridad = self._prioridades[clave] = calcular_prioridad(rol, motivo)
+        return prioridad
+
+    def cargar(self, solicitudes):
+        """
+        Características de entrenamiento del historial (formato de solicitudes_diarias), en orden
+        de fecha de solicitud, y tablas por clave al final del historial. Retorna (X, y) o None.
+        La tasa del solicitante usa solo sus solicitudes anteriores, como estaría al servir.
+        """
+        huella = (len(solicitudes), int(pd.util.hash_pandas_object(solicitudes, index=False).sum()))
+        if huella == self._huella:
+            return self._entrenamiento
+
+        fechas_solicitud = convertir_fechas(solicitudes[resolver_columna(solicitudes, ['Fecha Solicitud', 'Fecha_Solicitud'])])
+        fechas = convertir_fechas(solicitudes[resolver_columna(solicitudes, ['Fecha Requerida', 'Fecha_Uso'])])
+        if COLUMNA_MINUTOS in solicitudes.columns:
+            minutos = solicitudes[COLUMNA_MINUTOS].to_numpy()
+        else:
+            minutos = minutos_del_dia(solicitudes[resolver_columna(solicitudes, ['Bloque Horario', 'Hora_Inicio'])]).to_numpy()
+        salas = _columna_texto(solicitudes, ['Sala Solicitada', 'Sala_Solicitada'])
+        roles = _columna_texto(solicitudes, ['Rol'])
+        validos = (fechas_solicitud.notna() & fechas.notna()).to_numpy() & (minutos >= 0) & (salas != '').to_numpy()
+        if not validos.any():
+            return None
+
+        orden = np.flatnonzero(validos)[np.argsort(fechas_solicitud[validos].to_numpy(), kind='stable')]
+        df = pd.DataFrame({
+            'dias': np.asarray(fechas.iloc[orden], dtype='datetime64[D]').astype(np.int64),
+            'hora': minutos[orden] // 60,
+            'rol': roles.iloc[orden].to_numpy(),
+            'sala': salas.iloc[orden].to_numpy(),
+            'solicitante': _columna_texto(solicitudes, ['Solicitante', 'Correo']).iloc[orden].to_numpy(),
+            'motivo': _columna_texto(solicitudes, ['Motivo']).iloc[orden].to_numpy(),
+            'aprobada': (_columna_texto(solicitudes, ['Estado Solicitud', 'Estado']).iloc[orden] == 'Aprobada').to_numpy()
+        })
+        df['dia_semana'] = (df['dias'] + 3) % 7
+        df['semana'] = _semana(df['dias'])
+        fechas_ordenadas = fechas.iloc[orden]
+
+        codigos_rol, valores_rol = pd.factorize(df['rol'].str.lower(), sort=True)
+        codigos_sala, valores_sala = pd.factorize(df['sala'], sort=True)
+
+        # Conteos por (sala, día, hora, semana) y su suma en las semanas previas
+        bloque = (codigos_sala.astype(np.int64) * 7 + df['dia_semana'].to_numpy()) * 24 + df['hora'].to_numpy()
+        claves = bloque << 20 | df['semana'].to_numpy()
+        conteos = pd.Series(claves).value_counts()
+        solicitudes_bloque = np.zeros(len(df), dtype=np.int64)
+        for atraso in range(1, VENTANA_SEMANAS + 1):
+            solicitudes_bloque += conteos.reindex(claves - atraso, fill_value=0).to_numpy()
+
+        # Tasa de aprobación del solicitante con sus solicitudes previas
+        self.tasa_global = float(df['aprobada'].mean())
+        previas = df.groupby('solicitante').cumcount().to_numpy()
+        aprobadas_previas = (df.groupby('solicitante')['aprobada'].cumsum() - df['aprobada']).to_numpy()
+        tasa = (aprobadas_previas + PESO_PREVIO * self.tasa_global) / (previas + PESO_PREVIO)
+
+        pares = pd.Series(list(zip(df['rol'], df['motivo'])))
+        prioridades = pares.map({par: self._prioridad(*par) for par in pares.unique()}).to_numpy()
+
+        info_salas = np.array([self._salas.get(sala, (DESCONOCIDO, 0)) for sala in valores_sala], dtype=np.int64).reshape(-1, 2)
+        X = np.column_stack([
+            df['dia_semana'], fechas_ordenadas.dt.month, df['hora'], codigos_rol, codigos_sala,
+            info_salas[codigos_sala, 0], info_salas[codigos_sala, 1], solicitudes_bloque, tasa,
+            self.dias_hasta_receso(df['dias'].to_numpy()), prioridades
+        ]).astype(np.float64)
+        y = df['aprobada'].to_numpy().astype(int)
+
+        # Estado al final del historial para servir
+        with self._candado:
+            self._codigos_rol = {valor: i for i, valor in enumerate(valores_rol)}
+            self._codigos_sala = {valor: i for i, valor in enumerate(valores_sala)}
+            claves_conteo = conteos.index.to_numpy()
+            bloques = claves_conteo >> 20
+            self._conteos = dict(zip(
+                zip(np.asarray(valores_sala)[bloques // (7 * 24)].tolist(), (bloques // 24 % 7).tolist(),
+                    (bloques % 24).tolist(), (claves_conteo & 0xFFFFF).tolist()),
+                conteos.to_numpy().tolist()
+            ))
+            totales = df.groupby('solicitante')['aprobada'].agg(['sum', 'count'])
+            self._solicitantes = {solicitante: [int(fila['sum']), int(fila['count'])]
+                                  for solicitante, fila in totales.iterrows()}
+            self._huella = huella
+            self._entrenamiento = (X, y)
+        return self._entrenamiento
+
+    def _fila(self, solicitud):
+        dia = date.fromisoformat(str(solicitud['fecha_requerida'])[:10])
+        dias = dia.toordinal() - ORDINAL_EPOCH
+        hora = minuto_de_hora(solicitud['hora_inicio']) // 60
+        sala = str(solicitud['sala_solicitada'])
+        rol = str(solicitud.get('tipo_usuario', ''))
+        semana = _semana(dias)
+        dia_semana = dia.weekday()
+
+        capacidad, equipamiento = self._salas.get(sala, (DESCONOCIDO, 0))
+        solicitudes_bloque = sum(self._conteos.get((sala, dia_semana, hora, semana - atraso), 0)
+                                 for atraso in range(1, VENTANA_SEMANAS + 1))
+        aprobadas, total = self._solicitantes.get(solicitud.get('solicitante', ''), (0, 0))
+        tasa = (aprobadas + PESO_PREVIO * self.tasa_global) / (total + PESO_PREVIO)
+        indice_receso = dias - self._origen_recesos
+        dias_receso = (int(self._dias_receso[indice_receso]) if 0 <= indice_receso < len(self._dias_receso)
+                       else DIAS_SIN_RECESO)
+
+        return [
+            dia_semana, dia.month, hora,
+            self._codigos_rol.get(rol.lower(), DESCONOCIDO), self._codigos_sala.get(sala, DESCONOCIDO),
+            capacidad, equipamiento, solicitudes_bloque, tasa, dias_receso,
+            self._prioridad(rol, solicitud.get('motivo', ''))
+        ]
+
+    def vector(self, solicitud):
+        """Fila (1, n) de características de una solicitud de la API"""
+        return np.array([self._fila(solicitud)], dtype=np.float64)
+
+    def matriz(self, solicitudes):
+        """
+        Filas de varias solicitudes; retorna (matriz, índices válidos). Las que no se pueden
+        interpretar (fecha u hora inválidas) quedan fuera.
+        """
+        filas = []
+        validas = []
+        for i, solicitud in enumerate(solicitudes):
+            try:
+                filas.append(self._fila(solicitud))
+                validas.append(i)
+            except (KeyError, TypeError, ValueError):
+                continue
+        return np.array(filas, dtype=np.float64).reshape(-1, len(CARACTERISTICAS)), validas
+
+    def registrar(self, solicitud, aprobada):
+        """Actualización incremental con una solicitud procesada"""
+        try:
+            dia = date.fromisoformat(str(solicitud['fecha_requerida'])[:10])
+        except (KeyError, ValueError):
+            return
+        dias = dia.toordinal() - ORDINAL_EPOCH
+        clave = (str(solicitud['sala_solicitada']), dia.weekday(),
+                 minuto_de_hora(solicitud['hora_inicio']) // 60, _semana(dias))
+        with self._candado:
+            self._conteos[clave] = self._conteos.get(clave, 0) + 1
+            estadisticas = self._solicitantes.setdefault(solicitud.get('solicitante', ''), [0, 0])
+            estadisticas[0] += int(bool(aprobada))
+            estadisticas[1] += 1
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Almacén de datos compartido del Sistema de Reservas UFRO
+Instantáneas inmutables con conteo de referencias, compartidas por todas las sesiones del proceso
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+import time
+import weakref
+from types import MappingProxyType
+
+from bitacora import obtener_logger
+
+logger = obtener_logger('almacen_compartido')
+
+class Instantanea:
+    """
+    Resultado de una carga de datos. No se modifica después de creada: las tablas se
+    exponen en un mapeo de solo lectura y los consumidores no deben alterar los DataFrames.
+    Los objetos calculados a partir de ella (derivado()) viven y se liberan con ella.
+    """
+
+    def __init__(self, datos, version, firma, metadatos=None):
+        self.datos = MappingProxyType(dict(datos))
+        self.version = version
+        self.firma = firma
+        self.metadatos = MappingProxyType(dict(metadatos or {}))
+        self.referencias = 0
+        self.creada = time.time()
+        self._derivados = {}
+        self._candado_derivados = threading.Lock()
+
+    def derivado(self, nombre, construir):
+        """construir(datos), calculado una sola vez para esta instantánea (agregados, índices, motores)"""
+        with self._candado_derivados:
+            if nombre not in self._derivados:
+                self._derivados[nombre] = construir(self.datos)
+            return self._derivados[nombre]
+
+class Vista:
+    """
+    Referencia liviana de una sesión a la instantánea vigente. Los atributos que no
+    define la vista se leen de los metadatos de la instantánea (p. ej. modo_datos).
+    """
+
+    def __init__(self, almacen):
+        self._almacen = almacen
+        self._instantanea = None
+        self._finalizador = None
+        self.actualizar()
+
+    def actualizar(self):
+        """Pasa a la instantánea vigente si hubo recarga; retorna True si cambió"""
+        vigente = self._almacen.instantanea()
+        if vigente is self._instantanea:
+            return False
+
+        self._almacen._retener(vigente)
+        anterior = self._instantanea
+        self._instantanea = vigente
+        if self._finalizador is not None:
+            self._finalizador.detach()
+        # Al descartarse la sesión (y su vista), la instantánea queda liberada
+        self._finalizador = weakref.finalize(self, self._almacen._liberar, vigente)
+        if anterior is not None:
+            self._almacen._liberar(anterior)
+        return True
+
+    @property
+    def datos(self):
+        return self._instantanea.datos
+
+    @property
+    def version_datos(self):
+        return self._instantanea.version
+
+    def derivado(self, nombre, construir):
+        """Objeto derivado de la instantánea de la vista; las sesiones con la misma versión lo comparten"""
+        return self._instantanea.derivado(nombre, construir)
+
+    def __getattr__(self, nombre):
+        instantanea = self.__dict__.get('_instantanea')
+        if instantanea is not None and nombre in instantanea.metadatos:
+            return instantanea.metadatos[nombre]
+        raise AttributeError(nombre)
+
+class AlmacenCompartido:
+    """
+    Mantiene una sola copia de los datos por proceso.
+    - cargar(): retorna (datos, version, metadatos); se llama solo cuando la firma cambia.
+    - firmar(): firma barata de las fuentes (rutas, mtime, tamaño) para detectar cambios.
+    La recarga construye la nueva instantánea fuera del candado y la publica con un
+    intercambio atómico; las sesiones que aún usan la anterior la conservan hasta soltarla.
+    """
+
+    def __init__(self, cargar, firmar, intervalo_verificacion=5.0):
+        self.cargar = cargar
+        self.firmar = firmar
+        self.intervalo_verificacion = intervalo_verificacion
+        self._candado = threading.Lock()
+        self._candado_recarga = threading.Lock()
+        self._actual = None
+        self._retenidas = {}  # id(instantánea) -> instantánea con referencias o vigente
+        self._ultima_verificacion = 0.0
+        self.recargas = 0
+        self.recargar(forzar=True)
+
+    def instantanea(self):
+        """Instantánea vigente (verifica cambios en las fuentes a lo sumo cada intervalo)"""
+        if time.monotonic() - self._ultima_verificacion >= self.intervalo_verificacion:
+            self.recargar()
+        return self._actual
+
+    def adquirir(self):
+        """Nueva vista para una sesión"""
+        return Vista(self)
+
+    def recargar(self, forzar=False):
+        """Recarga si la firma de las fuentes cambió; retorna True si publicó una instantánea nueva"""
+        self._ultima_verificacion = time.monotonic()
+        firma = self.firmar()
+        if not forzar and self._actual is not None and firma == self._actual.firma:
+            return False
+
+        # Una sola recarga a la vez; el resto de las sesiones sigue con la instantánea vigente
+        if not self._candado_recarga.acquire(blocking=self._actual is None):
+            return False
+        try:
+            if not forzar and self._actual is not None and firma == self._actual.firma:
+                return False
+            inicio = time.perf_counter()
+            datos, version, metadatos = self.cargar()
+            nueva = Instantanea(datos, version, firma, metadatos)
+
+            with self._candado:
+                anterior = self._actual
+                self._actual = nueva
+                self._retenidas[id(nueva)] = nueva
+                if anterior is not None and anterior.referencias == 0:
+                    self._retenidas.pop(id(anterior), None)
+                self.recargas += 1
+
+            logger.info("Datos recargados (versión %s)", version,
+                        extra={'evento': 'datos_recargados', 'version': version,
+                               'duracion_ms': round((time.perf_counter() - inicio) * 1000, 1)})
+            return True
+        finally:
+            self._candado_recarga.release()
+
+    def _retener(self, instantanea):
+        with self._candado:
+            instantanea.referencias += 1
+            self._retenidas[id(instantanea)] = instantanea
+
+    def _liberar(self, instantanea):
+        with self._candado:
+            instantanea.referencias -= 1
+            if instantanea.referencias <= 0 and instantanea is not self._actual:
+                self._retenidas.pop(id(instantanea), None)
+
+    def estado(self):
+        """Versiones en memoria y cuántas sesiones usan cada una"""
+        with self._candado:
+            return [{
+                'version': instantanea.version,
+                'vigente': instantanea is self._actual,
+                'sesiones': instantanea.referencias,
+                'tablas': len(instantanea.datos),
+                'creada': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(instantanea.creada))
+            } for instantanea in self._retenidas.values()]
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+API HTTP JSON del Sistema de Reservas UFRO
+Expone SistemaIAReservas al portal institucional (solicitudes, series, disponibilidad y alternativas)
+Desarrollado por: MiniMax Agent
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, as_completed
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from werkzeug.serving import WSGIRequestHandler
+
+from bitacora import configurar_logging, nuevo_id_correlacion
+from idempotencia import TTL_RECHAZO_SEGUNDOS, TTL_SEGUNDOS, CacheIdempotencia, ConflictoIdempotencia
+from metricas_sistema import REGISTRO, iniciar_exportacion_periodica
+
+CAMPOS_OBLIGATORIOS = ['tipo_usuario', 'sala_solicitada', 'fecha_requerida', 'hora_inicio', 'hora_fin']
+CABECERA_CORRELACION = 'X-Correlation-ID'
+CABECERA_IDEMPOTENCIA = 'Idempotency-Key'
+CABECERA_REPETIDA = 'Idempotent-Replayed'
+FORMATO_HORA = r'([01]\d|2[0-3]):[0-5]\d'
+
+class AgrupadorSolicitudes:
+    """
+    Agrupa las solicitudes que llegan en ráfaga y las procesa en lote en un hilo dedicado
+    """
+
+    def __init__(self, sistema, tamano_maximo=64, espera_maxima=0.005):
+        self.sistema = sistema
+        self.tamano_maximo = tamano_maximo
+        self.espera_maxima = espera_maxima  # segundos que se espera para completar un lote
+        self.cola = queue.Queue()
+        self.hilo = threading.Thread(target=self._procesar_cola, daemon=True)
+        self.hilo.start()
+
+    def enviar(self, solicitud):
+        """Encola una solicitud y retorna un Future con su resultado"""
+        futuro = Future()
+        self.cola.put((solicitud, futuro))
+        return futuro
+
+    def _procesar_cola(self):
+        """Bucle del hilo: toma la primera solicitud y espera brevemente por más para armar el lote"""
+        while True:
+            lote = [self.cola.get()]
+            limite = time.monotonic() + self.espera_maxima
+
+            while len(lote) < self.tamano_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self.cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            try:
+                # Cada solicitud recibe su propio resultado o error: una inválida no arrastra al lote
+                resultados = self.sistema.procesar_lote([solicitud for solicitud, _ in lote], capturar_errores=True)
+                for (_, futuro), resultado in zip(lote, resultados):
+                    if isinstance(resultado, Exception):
+                        futuro.set_exception(resultado)
+                    else:
+                        futuro.set_result(resultado)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+def validar_solicitud(datos):
+    """Retorna la lista de campos obligatorios ausentes en una solicitud"""
+    if not isinstance(datos, dict):
+        return CAMPOS_OBLIGATORIOS
+    return [campo for campo in CAMPOS_OBLIGATORIOS if not datos.get(campo)]
+
+def validar_horario(datos):
+    """Campos con valor inválido: fecha 'YYYY-MM-DD', horas 'HH:MM' y hora_fin posterior a hora_inicio"""
+    from calendario_academico import fecha_iso
+
+    invalidos = []
+    try:
+        fecha_iso(datos['fecha'])
+    except ValueError:
+        invalidos.append('fecha')
+    for campo in ('hora_inicio', 'hora_fin'):
+        if not isinstance(datos[campo], str) or not re.fullmatch(FORMATO_HORA, datos[campo]):
+            invalidos.append(campo)
+    if not invalidos and datos['hora_fin'] <= datos['hora_inicio']:
+        invalidos.append('hora_fin')
+    return invalidos
+
+def error_solicitud(datos):
+    """Cuerpo del error 400 de una solicitud (campos faltantes o con formato inválido), o None si es válida"""
+    faltantes = validar_solicitud(datos)
+    if faltantes:
+        return {'error': 'Campos obligatorios faltantes', 'campos': faltantes}
+    invalidos = validar_horario({'fecha': datos['fecha_requerida'], 'hora_inicio': datos['hora_inicio'],
+                                 'hora_fin': datos['hora_fin']})
+    if invalidos:
+        return {'error': 'Campos inválidos', 'campos': ['fecha_requerida' if campo == 'fecha' else campo
+                                                         for campo in invalidos]}
+    return None
+
+def bases_eventos(sistema):
+    """Bases con bitácora de eventos del sistema servido: una por fragmento con fragmentación"""
+    fragmentos = getattr(sistema, 'fragmentos', None)
+    return [fragmento.db_path for fragmento in fragmentos.values()] if fragmentos else [sistema.db_path]
+
+def serializar_resultado(resultado):
+    """Convierte el resultado del motor a tipos compatibles con JSON"""
+    return json.loads(json.dumps(resultado, default=str))
+
+def crear_app(sistema=None, tamano_lote=64, espera_lote=0.005, timeout_respuesta=30, intervalo_notificaciones=None):
+    """
+    Crea la aplicación Flask. El motor de IA se inicializa de forma diferida para que
+    el endpoint de salud responda de inmediato. Con intervalo_notificaciones (segundos), las
+    notificaciones se envían desde la bitácora de eventos en un hilo de fondo.
+    """
+    app = Flask(__name__)
+    estado = {'sistema': sistema, 'agrupador': None, 'idempotencia': None}
+    candado = threading.Lock()
+
+    def obtener_agrupador():
+        if estado['agrupador'] is None:
+            with candado:
+                if estado['agrupador'] is None:
+                    if estado['sistema'] is None and os.environ.get('UFRO_FRAGMENTACION'):
+                        # Una base por facultad (o por hash de sala); la tabla salas de UFRO_DB_PATH define el reparto
+                        from fragmentacion import SistemaFragmentado
+                        sistema_nuevo = SistemaFragmentado.desde_base_datos(
+                            os.environ.get('UFRO_DB_PATH', 'sistema_reservas.db'),
+                            os.environ.get('UFRO_FRAGMENTOS_DIR', 'fragmentos'),
+                            os.environ['UFRO_FRAGMENTACION']
+                        )
+                        estado['sistema'] = sistema_nuevo.inicializar(sistema_nuevo.catalogo.cargar_datos_historicos())
+                    elif estado['sistema'] is None:
+                        from sistema_ia_reservas import SistemaIAReservas
+                        sistema_nuevo = SistemaIAReservas(os.environ.get('UFRO_DB_PATH', 'sistema_reservas.db'))
+                        datos_historicos = sistema_nuevo.cargar_datos_historicos()
+                        if datos_historicos:
+                            sistema_nuevo.entrenar_modelo_prediccion_demanda(datos_historicos)
+                        sistema_nuevo.inicializar_motor_riesgo(datos_historicos)
+                        sistema_nuevo.inicializar_indice_salas(datos_historicos)
+                        estado['sistema'] = sistema_nuevo
+                    if intervalo_notificaciones:
+                        from sistema_notificaciones import SistemaNotificaciones
+                        for ruta in bases_eventos(estado['sistema']):
+                            SistemaNotificaciones(ruta).iniciar_despacho_periodico(intervalo_notificaciones)
+                    estado['agrupador'] = AgrupadorSolicitudes(estado['sistema'], tamano_lote, espera_lote)
+        return estado['agrupador']
+
+    def obtener_idempotencia():
+        """Resultados ya decididos por huella de la solicitud: los reintentos del portal no se reprocesan"""
+        if estado['idempotencia'] is None:
+            # En la base del sistema servido (la inyectada en crear_app o la de UFRO_DB_PATH)
+            sistema_actual = obtener_agrupador().sistema
+            with candado:
+                if estado['idempotencia'] is None:
+                    estado['idempotencia'] = CacheIdempotencia(
+                        sistema_actual.db_path,
+                        float(os.environ.get('UFRO_IDEMPOTENCIA_TTL', TTL_SEGUNDOS)),
+                        vigente=sistema_actual.reserva_vigente,
+                        ttl_rechazo=float(os.environ.get('UFRO_IDEMPOTENCIA_TTL_RECHAZO', TTL_RECHAZO_SEGUNDOS))
+                    )
+        return estado['idempotencia']
+
+    def responder(resultado, repetida, id_correlacion):
+        respuesta = jsonify(serializar_resultado(resultado))
+        # Una respuesta repetida conserva el ID de correlación de la solicitud original
+        respuesta.headers[CABECERA_CORRELACION] = resultado.get('id_correlacion') or id_correlacion
+        respuesta.headers[CABECERA_REPETIDA] = 'true' if repetida else 'false'
+        return respuesta
+
+    def parametros_horario():
+        """(datos, error) de los parámetros de la consulta; error es la respuesta 400 o None"""
+        datos = {campo: request.args.get(campo) for campo in ['sala', 'fecha', 'hora_inicio', 'hora_fin']}
+        faltantes = [campo for campo, valor in datos.items() if not valor]
+        if faltantes:
+            return datos, (jsonify({'error': 'Parámetros faltantes', 'campos': faltantes}), 400)
+        invalidos = validar_horario(datos)
+        if invalidos:
+            return datos, (jsonify({'error': 'Parámetros inválidos', 'campos': invalidos}), 400)
+        return datos, None
+
+    @app.get('/salud')
+    def salud():
+        return jsonify({'estado': 'ok', 'motor_listo': estado['agrupador'] is not None})
+
+    @app.get('/metrics')
+    def metricas():
+        return Response(REGISTRO.exportar_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    @app.post('/api/solicitudes')
+    def crear_solicitud():
+        datos = request.get_json(silent=True)
+        error = error_solicitud(datos)
+        if error:
+            return jsonify(error), 400
+
+        # El ID viaja dentro de la solicitud: el lote se procesa en otro hilo
+        datos['id_correlacion'] = request.headers.get(CABECERA_CORRELACION) or nuevo_id_correlacion()
+        try:
+            futuro, repetida = obtener_idempotencia().enviar(
+                datos, lambda: obtener_agrupador().enviar(datos), request.headers.get(CABECERA_IDEMPOTENCIA))
+        except ConflictoIdempotencia as e:
+            return jsonify({'error': str(e)}), 409
+        return responder(futuro.result(timeout=timeout_respuesta), repetida, datos['id_correlacion'])
+
+    @app.delete('/api/solicitudes/<int:solicitud_id>')
+    def cancelar_solicitud(solicitud_id):
+        obtener_agrupador()
+        # Con fragmentación los id son por fragmento: el resultado de la solicitud indica cuál
+        argumentos = {'fragmento': request.args['fragmento']} if request.args.get('fragmento') else {}
+        if argumentos and not hasattr(estado['sistema'], 'fragmentos'):
+            return jsonify({'error': 'El sistema no está fragmentado', 'campos': ['fragmento']}), 400
+        if not estado['sistema'].cancelar_reserva(solicitud_id, request.args.get('motivo', ''), **argumentos):
+            return jsonify({'error': 'La solicitud no existe o no está aprobada'}), 404
+        # Reenviar la misma solicitud vuelve a procesarla en lugar de repetir la aprobación cancelada
+        obtener_idempotencia().olvidar_reserva(solicitud_id, argumentos.get('fragmento'))
+        return jsonify({'solicitud_id': solicitud_id, 'estado': 'cancelada'})
+
+    @app.post('/api/solicitudes/lote')
+    def crear_solicitudes_lote():
+        datos = request.get_json(silent=True)
+        if not isinstance(datos, list):
+            return jsonify({'error': 'Se esperaba una lista de solicitudes'}), 400
+
+        agrupador = obtener_agrupador()
+        idempotencia = obtener_idempotencia()
+
+        def generar():
+            futuros = {}  # Future -> [(indice, repetida)]: elementos idénticos comparten el resultado en curso
+            for indice, solicitud in enumerate(datos):
+                error = error_solicitud(solicitud)
+                if error:
+                    yield json.dumps(dict({'indice': indice}, **error), ensure_ascii=False) + '\n'
+                    continue
+                solicitud.setdefault('id_correlacion', nuevo_id_correlacion())
+                try:
+                    # Cada elemento puede traer su propia clave; si no, cuenta la huella
+                    futuro, repetida = idempotencia.enviar(solicitud, lambda solicitud=solicitud: agrupador.enviar(solicitud),
+                                                           solicitud.get('clave_idempotencia'))
+                except ConflictoIdempotencia as e:
+                    yield json.dumps({'indice': indice, 'error': str(e)}, ensure_ascii=False) + '\n'
+                    continue
+                futuros.setdefault(futuro, []).append((indice, repetida))
+
+            # Los resultados se emiten a medida que cada lote termina, una línea por elemento
+            for futuro in as_completed(futuros, timeout=timeout_respuesta):
+                try:
+                    salida = {'resultado': serializar_resultado(futuro.result())}
+                except Exception as e:
+                    salida = {'error': str(e)}
+                for indice, repetida in futuros[futuro]:
+                    yield json.dumps(dict({'indice': indice, 'repetida': repetida}, **salida), ensure_ascii=False) + '\n'
+
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+    @app.post('/api/series')
+    def crear_serie():
+        datos = request.get_json(silent=True)
+        error = error_solicitud(datos)
+        if not error and not datos.get('regla'):
+            error = {'error': 'Campos obligatorios faltantes', 'campos': ['regla']}
+        if error:
+            return jsonify(error), 400
+
+        # Una serie ya agrupa sus ocurrencias: se procesa directamente, fuera del agrupador
+        obtener_agrupador()
+        datos['id_correlacion'] = request.headers.get(CABECERA_CORRELACION) or nuevo_id_correlacion()
+
+        def procesar():
+            resultado = estado['sistema'].procesar_serie(datos, datos['regla'], datos.get('aprobacion_parcial', True))
+            resultado['notificaciones'] = estado['sistema'].generar_notificacion_serie(resultado)
+            return resultado
+
+        try:
+            resultado, repetida = obtener_idempotencia().ejecutar(
+                datos, procesar, request.headers.get(CABECERA_IDEMPOTENCIA), timeout_respuesta)
+        except ConflictoIdempotencia as e:
+            return jsonify({'error': str(e)}), 409
+        return responder(resultado, repetida, datos['id_correlacion'])
+
+    @app.get('/api/disponibilidad')
+    def disponibilidad():
+        datos, error = parametros_horario()
+        if error:
+            return error
+
+        obtener_agrupador()
+        conflictos = estado['sistema'].detectar_conflictos_horario(
+            datos['sala'], datos['fecha'], datos['hora_inicio'], datos['hora_fin']
+        )
+        return jsonify({'sala': datos['sala'], 'disponible': not conflictos['hay_conflicto'],
+                        'conflictos': serializar_resultado(conflictos)})
+
+    @app.get('/api/alternativas')
+    def alternativas():
+        datos, error = parametros_horario()
+        if error:
+            return error
+
+        obtener_agrupador()
+        solicitud = {
+            'sala_solicitada': datos['sala'],
+            'fecha_requerida': datos['fecha'],
+            'hora_inicio': datos['hora_inicio'],
+            'hora_fin': datos['hora_fin'],
+            # Opcionales: asientos mínimos y equipamiento separado por comas ('proyector,sonido')
+            'estudiantes': request.args.get('estudiantes'),
+            'equipamiento': request.args.get('equipamiento')
+        }
+        return jsonify({'alternativas': estado['sistema'].sugerir_alternativas(solicitud)})
+
+    return app
+
+if __name__ == "__main__":
+    # HTTP/1.1 habilita keep-alive: el portal reutiliza la conexión entre peticiones
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    configurar_logging()
+    if os.environ.get('UFRO_METRICAS_ARCHIVO'):
+        iniciar_exportacion_periodica(os.environ['UFRO_METRICAS_ARCHIVO'])
+    # Las notificaciones siguen la bitácora de eventos (UFRO_NOTIFICACIONES_INTERVALO=0 las desactiva)
+    app = crear_app(intervalo_notificaciones=float(os.environ.get('UFRO_NOTIFICACIONES_INTERVALO', 2)))
+    app.run(host='0.0.0.0', port=int(os.environ.get('API_PORT', 8000)), threaded=True)
@@ -6,15 +6,19 @@ Desarrollado por: MiniMax Agent
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
+import hashlib
 import os
+from metricas_sistema import REGISTRO
+from bitacora import configurar_logging
+from almacen_compartido import AlmacenCompartido
 import warnings
 warnings.filterwarnings('ignore')
 
+# pandas, plotly, numpy y los módulos que dependen de ellos (esquemas_datos, datos_graficos,
+# navegador_datos) se importan en la página o función que los usa para no retrasar el
+# arranque en frío de la aplicación.
+
 # Configuración de la página
 st.set_page_config(
     page_title="🚀 UFRO Reservas IA - ROBUSTO",
@@ -58,42 +62,67 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Planillas Excel que se buscan, por carpeta
+CARPETAS_DATOS = {
+    'user_input_files': [
+        'solicitudes_diarias.xlsx',
+        'indicadores_uso_salas.xlsx', 
+        'asignaciones_semestrales.xlsx',
+        'recesos_institucionales.xlsx',
+        'reasignaciones_activas.xlsx',
+        'notificaciones_enviadas.xlsx'
+    ],
+    'planillas_optimizadas': [
+        'solicitudes_diarias_optimizada.xlsx',
+        'indicadores_uso_optimizada.xlsx',
+        'asignaciones_semestrales_optimizada.xlsx'
+    ]
+}
+
 class SistemaRobusto:
     """
     Sistema súper robusto que funciona siempre
     """
     
     def __init__(self):
+        from esquemas_datos import compactar_tablas
+        
         self.datos = {}
         self.modo_datos = "Inicializando..."
         self.archivos_detectados = []
+        self.firmas_archivos = []
+        self.informes_memoria = []
         self.cargar_datos_inteligente()
+        self.datos, self.informes_memoria = compactar_tablas(self.datos)
+        self.version_datos = self.calcular_version_datos()
+    
+    def calcular_version_datos(self):
+        """
+        Identificador de la versión de los datos cargados: para archivos reales depende
+        de ruta, fecha de modificación y tamaño; para datos generados, del contenido.
+        """
+        import pandas as pd
+        
+        huella = hashlib.sha1()
+        if self.firmas_archivos:
+            huella.update(repr(sorted(self.firmas_archivos)).encode())
+        else:
+            for nombre, df in sorted(self.datos.items()):
+                huella.update(nombre.encode())
+                huella.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return huella.hexdigest()[:16]
     
     def cargar_datos_inteligente(self):
         """Carga datos de forma inteligente y robusta"""
+        import pandas as pd
+        
         datos_reales_cargados = 0
         
         try:
             # OPCIÓN 1: Intentar cargar datos reales
             self.modo_datos = "Buscando datos reales..."
             
-            carpetas_a_buscar = {
-                'user_input_files': [
-                    'solicitudes_diarias.xlsx',
-                    'indicadores_uso_salas.xlsx', 
-                    'asignaciones_semestrales.xlsx',
-                    'recesos_institucionales.xlsx',
-                    'reasignaciones_activas.xlsx',
-                    'notificaciones_enviadas.xlsx'
-                ],
-                'planillas_optimizadas': [
-                    'solicitudes_diarias_optimizada.xlsx',
-                    'indicadores_uso_optimizada.xlsx',
-                    'asignaciones_semestrales_optimizada.xlsx'
-                ]
-            }
-            
-            for carpeta, archivos in carpetas_a_buscar.items():
+            for carpeta, archivos in CARPETAS_DATOS.items():
                 if os.path.exists(carpeta) and os.path.isdir(carpeta):
                     for archivo in archivos:
                         ruta_completa = os.path.join(carpeta, archivo)
@@ -102,6 +131,8 @@ class SistemaRobusto:
                                 nombre_tabla = archivo.replace('.xlsx', '').replace('_optimizada', '')
                                 df = pd.read_excel(ruta_completa)
                                 self.datos[nombre_tabla] = df
+                                estado_archivo = os.stat(ruta_completa)
+                                self.firmas_archivos.append((ruta_completa, estado_archivo.st_mtime_ns, estado_archivo.st_size))
                                 self.archivos_detectados.append(f"✅ {archivo} ({len(df)} registros)")
                                 datos_reales_cargados += 1
                             except Exception as e:
@@ -131,6 +162,11 @@ class SistemaRobusto:
     
     def crear_datos_integrados(self):
         """Crear datos mínimos integrados en el código"""
+        import numpy as np
+        import pandas as pd
+        
+        # Semilla fija: todas las sesiones y recargas ven los mismos datos
+        rng = np.random.default_rng(42)
         
         # Datos de solicitudes
         fechas = pd.date_range('2024-10-01', periods=30)
@@ -139,22 +175,22 @@ class SistemaRobusto:
         estados = ['Aprobada', 'Pendiente', 'Rechazada', 'En Revisión']
         
         self.datos['solicitudes_diarias'] = pd.DataFrame({
-            'Fecha': np.random.choice(fechas, 100),
-            'Sala': np.random.choice(salas, 100),
-            'Solicitante': np.random.choice(profesores, 100),
-            'Hora_Inicio': np.random.choice(['08:00', '10:00', '12:00', '14:00', '16:00', '18:00'], 100),
-            'Duracion': np.random.choice([1, 2, 3, 4], 100),
-            'Estado': np.random.choice(estados, 100, p=[0.6, 0.2, 0.1, 0.1]),
-            'Asignatura': np.random.choice(['Matemáticas', 'Física', 'Química', 'Programación', 'Historia'], 100),
-            'Estudiantes': np.random.randint(15, 60, 100)
+            'Fecha': rng.choice(fechas, 100),
+            'Sala': rng.choice(salas, 100),
+            'Solicitante': rng.choice(profesores, 100),
+            'Hora_Inicio': rng.choice(['08:00', '10:00', '12:00', '14:00', '16:00', '18:00'], 100),
+            'Duracion': rng.choice([1, 2, 3, 4], 100),
+            'Estado': rng.choice(estados, 100, p=[0.6, 0.2, 0.1, 0.1]),
+            'Asignatura': rng.choice(['Matemáticas', 'Física', 'Química', 'Programación', 'Historia'], 100),
+            'Estudiantes': rng.integers(15, 60, 100)
         })
         
         # Datos de indicadores de uso
         self.datos['indicadores_uso_salas'] = pd.DataFrame({
             'Sala': salas,
             'Capacidad': [35, 40, 30, 50, 45, 35, 55, 40],
-            'Ocupacion_Promedio': np.random.randint(60, 95, len(salas)),
-            'Horas_Uso_Semana': np.random.randint(25, 45, len(salas)),
+            'Ocupacion_Promedio': rng.integers(60, 95, len(salas)),
+            'Horas_Uso_Semana': rng.integers(25, 45, len(salas)),
             'Facultad': ['Ingeniería', 'Ingeniería', 'Ciencias', 'Medicina', 'Medicina', 'Educación', 'Derecho', 'Derecho'],
             'Equipamiento': ['Básico', 'Completo', 'Proyector', 'Laboratorio', 'Básico', 'Completo', 'Audiovisual', 'Básico'],
             'Estado': ['Activa'] * len(salas)
@@ -181,21 +217,160 @@ class SistemaRobusto:
         
         self.datos['reasignaciones_activas'] = pd.DataFrame({
             'Fecha_Reasignacion': pd.date_range('2024-10-01', periods=10),
-            'Sala_Original': np.random.choice(salas[:4], 10),
-            'Sala_Nueva': np.random.choice(salas[4:], 10),
-            'Motivo': np.random.choice(['Mantenimiento', 'Conflicto horario', 'Mayor capacidad'], 10),
+            'Sala_Original': rng.choice(salas[:4], 10),
+            'Sala_Nueva': rng.choice(salas[4:], 10),
+            'Motivo': rng.choice(['Mantenimiento', 'Conflicto horario', 'Mayor capacidad'], 10),
             'Estado': ['Completada'] * 10
         })
         
         self.datos['notificaciones_enviadas'] = pd.DataFrame({
             'Fecha_Envio': pd.date_range('2024-10-01', periods=15),
-            'Destinatario': np.random.choice(profesores, 15),
-            'Tipo': np.random.choice(['Confirmación', 'Recordatorio', 'Cambio'], 15),
+            'Destinatario': rng.choice(profesores, 15),
+            'Tipo': rng.choice(['Confirmación', 'Recordatorio', 'Cambio'], 15),
             'Mensaje': ['Notificación automática del sistema'] * 15,
             'Estado': ['Enviada'] * 15
         })
 
+def firma_archivos_datos():
+    """Rutas, fecha de modificación y tamaño de las planillas buscadas (detecta altas, bajas y cambios)"""
+    firma = []
+    for carpeta, archivos in CARPETAS_DATOS.items():
+        for archivo in archivos:
+            ruta = os.path.join(carpeta, archivo)
+            try:
+                estado_archivo = os.stat(ruta)
+                firma.append((ruta, estado_archivo.st_mtime_ns, estado_archivo.st_size))
+            except OSError:
+                firma.append((ruta, None, None))
+    return tuple(firma)
+
+def cargar_instantanea_datos():
+    """Carga completa con SistemaRobusto, en el formato que espera el almacén compartido"""
+    sistema = SistemaRobusto()
+    metadatos = {
+        'modo_datos': sistema.modo_datos,
+        'archivos_detectados': tuple(sistema.archivos_detectados),
+        'informes_memoria': tuple(sistema.informes_memoria)
+    }
+    return sistema.datos, sistema.version_datos, metadatos
+
+@st.cache_resource
+def obtener_almacen():
+    """Una sola copia de los datos por proceso, compartida por todas las sesiones"""
+    return AlmacenCompartido(cargar_instantanea_datos, firma_archivos_datos)
+
+def obtener_vista_datos():
+    """Vista de la sesión sobre el almacén; pasa a la versión nueva cuando los datos se recargan"""
+    vista = st.session_state.get('vista_datos')
+    if vista is None:
+        vista = obtener_almacen().adquirir()
+        st.session_state['vista_datos'] = vista
+    else:
+        vista.actualizar()
+    return vista
+
+def obtener_datos_graficos(vista):
+    """
+    Series agregadas del dashboard, compartidas por todas las sesiones con la misma versión.
+    Pertenecen a la instantánea (no a st.cache_resource): se liberan con ella al recargar.
+    """
+    from datos_graficos import DatosGraficos
+    return vista.derivado('graficos', lambda datos: DatosGraficos(datos, vista.version_datos))
+
+@st.cache_data(max_entries=64)
+def figura_dashboard(version, grafico, periodo='dia', _graficos=None):
+    """JSON de la figura pedida (o None si faltan datos), calculado una vez por versión"""
+    import pandas as pd
+    import plotly.express as px
+    
+    if grafico == 'ocupacion':
+        df = _graficos.ocupacion_salas()
+        if df.empty:
+            return None
+        fig = px.bar(df, x='Sala', y='Ocupacion', title="Ocupación por Sala",
+                     color='Ocupacion', color_continuous_scale="Viridis")
+    elif grafico == 'estados':
+        df = _graficos.estados_solicitudes()
+        if df.empty:
+            return None
+        fig = px.pie(df, values='Cantidad', names='Categoria', title="Distribución de Estados")
+    elif grafico == 'pronostico_dias':
+        pronostico = _graficos.pronostico()
+        if pronostico is None:
+            return None
+        df = pd.DataFrame({
+            'Dia': pronostico.por_dia_semana().index.tolist() * 2,
+            'Solicitudes por semana': list(pronostico.recientes_por_dia_semana().values) + list(pronostico.por_dia_semana().values),
+            'Serie': ['Reciente'] * 7 + ['Pronóstico'] * 7
+        })
+        fig = px.bar(df, x='Dia', y='Solicitudes por semana', color='Serie', barmode='group',
+                     title=f"Demanda por Día (próximas {len(pronostico.semanas)} semanas)")
+    elif grafico == 'pronostico_salas':
+        pronostico = _graficos.pronostico()
+        if pronostico is None:
+            return None
+        demanda = pronostico.por_sala().head(15)
+        fig = px.bar(x=demanda.index, y=demanda.values, labels={'x': 'Sala', 'y': 'Solicitudes pronosticadas'},
+                     title="Salas con Mayor Demanda Pronosticada")
+    else:
+        df = _graficos.solicitudes_por_periodo(periodo, por_estado=True)
+        if df.empty:
+            return None
+        columna_color = df.columns[1] if len(df.columns) == 3 else None
+        fig = px.line(df, x='Periodo', y='Cantidad', color=columna_color,
+                      title=f"Solicitudes por {periodo}")
+    return fig.to_json()
+
+def obtener_sistema_reservas(vista):
+    """Motor de reservas compartido por las sesiones; el índice de salas se rehace con cada versión de los datos"""
+    from sistema_ia_reservas import SistemaIAReservas
+    
+    def construir(datos):
+        sistema_reservas = SistemaIAReservas('sistema_reservas.db')
+        sistema_reservas.inicializar_indice_salas({'indicadores': datos.get('indicadores_uso_salas')})
+        return sistema_reservas
+    
+    return vista.derivado('sistema_reservas', construir)
+
+@st.cache_resource
+def obtener_gestor_exportaciones():
+    """Exportaciones en segundo plano compartidas por el proceso (sobreviven a los reruns)"""
+    from exportador import GestorExportaciones
+    return GestorExportaciones('sistema_reservas.db')
+
+def listar_exportaciones(trabajo_ids):
+    """Descarga, error o avance de cada exportación de la sesión; retorna si queda alguna en curso"""
+    gestor = obtener_gestor_exportaciones()
+    en_curso = False
+    for trabajo in [gestor.trabajo(trabajo_id) for trabajo_id in reversed(trabajo_ids)]:
+        if trabajo is None:
+            continue
+        if trabajo.estado == 'terminado':
+            with open(trabajo.ruta, 'rb') as archivo:
+                st.download_button(f"⬇️ {trabajo.nombre_archivo} ({trabajo.filas:,} filas)", archivo,
+                                   file_name=trabajo.nombre_archivo, key=f"descarga_{trabajo.id}")
+        elif trabajo.estado == 'error':
+            st.error(f"❌ {trabajo.nombre_archivo}: {trabajo.error}")
+        else:
+            en_curso = True
+            st.progress(trabajo.avance, text=f"📤 {trabajo.nombre_archivo}: {trabajo.filas:,}/{trabajo.total:,} filas")
+    return en_curso
+
+@st.fragment(run_every=1)
+def seguir_exportaciones(trabajo_ids):
+    """Mientras haya exportaciones en curso se refresca solo este bloque; al terminar, la página completa"""
+    if not listar_exportaciones(trabajo_ids):
+        st.rerun()
+
+@st.cache_resource
+def obtener_navegador():
+    """Navegador de datos compartido por todas las sesiones del proceso"""
+    from navegador_datos import NavegadorDatos
+    return NavegadorDatos('sistema_reservas.db')
+
 def main():
+    configurar_logging()
+    
     # Título principal
     st.markdown("""
     <div class="main-header">
@@ -205,8 +380,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Inicializar sistema robusto
-    sistema = SistemaRobusto()
+    # Vista de la sesión sobre los datos compartidos del proceso
+    sistema = obtener_vista_datos()
     
     # Estado del sistema - PROMINENTE
     if "DATOS REALES" in sistema.modo_datos:
@@ -249,110 +424,141 @@ def main():
     # PÁGINA: Dashboard Principal
     if opcion == "🏠 Dashboard Principal":
         st.header("📊 Dashboard Principal")
+        import plotly.io as pio
+        
+        graficos = obtener_datos_graficos(sistema)
+        metricas = graficos.metricas()
         
         # Métricas principales
         col1, col2, col3, col4 = st.columns(4)
         
-        df_solicitudes = sistema.datos.get('solicitudes_diarias', pd.DataFrame())
-        df_indicadores = sistema.datos.get('indicadores_uso_salas', pd.DataFrame())
-        
         with col1:
-            total_solicitudes = len(df_solicitudes) if not df_solicitudes.empty else 0
-            st.metric("📅 Solicitudes", total_solicitudes, "Total")
+            st.metric("📅 Solicitudes", metricas['solicitudes'], "Total")
         
         with col2:
-            total_salas = len(df_indicadores) if not df_indicadores.empty else 0
-            st.metric("🏛️ Salas", total_salas, "Registradas")
+            st.metric("🏛️ Salas", metricas['salas'], "Registradas")
         
+        # Sin el dato se muestra N/D, no una cifra de referencia
         with col3:
-            if not df_indicadores.empty and 'Ocupacion_Promedio' in df_indicadores.columns:
-                ocupacion_promedio = round(df_indicadores['Ocupacion_Promedio'].mean(), 1)
+            if metricas['ocupacion_promedio'] is not None:
+                st.metric("📈 Ocupación", f"{metricas['ocupacion_promedio']}%", "Promedio")
             else:
-                ocupacion_promedio = 78.5
-            st.metric("📈 Ocupación", f"{ocupacion_promedio}%", "Promedio")
+                st.metric("📈 Ocupación", "N/D")
         
         with col4:
-            if not df_solicitudes.empty and 'Estado' in df_solicitudes.columns:
-                aprobadas = len(df_solicitudes[df_solicitudes['Estado'] == 'Aprobada'])
-                tasa = round((aprobadas / len(df_solicitudes)) * 100, 1) if len(df_solicitudes) > 0 else 85
+            if metricas['tasa_aprobacion'] is not None:
+                st.metric("✅ Aprobación", f"{metricas['tasa_aprobacion']}%", "Tasa")
             else:
-                tasa = 85
-            st.metric("✅ Aprobación", f"{tasa}%", "Tasa")
+                st.metric("✅ Aprobación", "N/D")
         
-        # Gráficos
+        # Gráficos (el JSON de cada figura se comparte entre sesiones por versión de datos)
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("📊 Ocupación por Sala")
-            if not df_indicadores.empty and 'Sala' in df_indicadores.columns and 'Ocupacion_Promedio' in df_indicadores.columns:
-                fig = px.bar(
-                    df_indicadores, 
-                    x='Sala', 
-                    y='Ocupacion_Promedio',
-                    title="Ocupación por Sala",
-                    color='Ocupacion_Promedio',
-                    color_continuous_scale="Viridis"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            figura = figura_dashboard(sistema.version_datos, 'ocupacion', _graficos=graficos)
+            if figura:
+                st.plotly_chart(pio.from_json(figura), use_container_width=True)
             else:
                 st.info("📊 Datos de ocupación cargándose...")
         
         with col2:
             st.subheader("📅 Estado de Solicitudes")
-            if not df_solicitudes.empty and 'Estado' in df_solicitudes.columns:
-                estado_counts = df_solicitudes['Estado'].value_counts()
-                fig = px.pie(
-                    values=estado_counts.values,
-                    names=estado_counts.index,
-                    title="Distribución de Estados"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            figura = figura_dashboard(sistema.version_datos, 'estados', _graficos=graficos)
+            if figura:
+                st.plotly_chart(pio.from_json(figura), use_container_width=True)
             else:
                 st.info("📊 Datos de solicitudes cargándose...")
+        
+        st.subheader("📈 Solicitudes en el Tiempo")
+        periodo = st.radio("Agrupar por:", ['hora', 'dia', 'semana', 'mes'], index=1, horizontal=True)
+        figura = figura_dashboard(sistema.version_datos, 'tendencia', periodo, _graficos=graficos)
+        if figura:
+            st.plotly_chart(pio.from_json(figura), use_container_width=True)
+        else:
+            st.info("📊 Sin fechas de solicitudes para graficar")
+        
+        st.subheader("🔮 Pronóstico de Demanda")
+        pronostico = graficos.pronostico()
+        if pronostico is not None:
+            variacion = pronostico.variacion_pct()
+            st.metric("📅 Solicitudes esperadas por semana", f"{pronostico.por_semana().mean():.0f}",
+                      f"{variacion:+.1f}%" if variacion is not None else None)
+            col1, col2 = st.columns(2)
+            for columna, grafico in ((col1, 'pronostico_dias'), (col2, 'pronostico_salas')):
+                with columna:
+                    st.plotly_chart(pio.from_json(figura_dashboard(sistema.version_datos, grafico, _graficos=graficos)),
+                                    use_container_width=True)
+        else:
+            st.info("🔮 Historial de solicitudes insuficiente para pronosticar")
     
     # PÁGINA: Análisis de Datos
     elif opcion == "📊 Análisis de Datos":
         st.header("📊 Análisis Avanzado")
         
-        # Mostrar tabla seleccionada
-        if sistema.datos:
-            tabla_seleccionada = st.selectbox(
-                "Seleccionar tabla:",
-                list(sistema.datos.keys())
-            )
-            
-            if tabla_seleccionada and tabla_seleccionada in sistema.datos:
-                df = sistema.datos[tabla_seleccionada]
-                
-                st.subheader(f"📋 {tabla_seleccionada}")
-                st.write(f"**Registros:** {len(df)} | **Columnas:** {len(df.columns)}")
-                
-                # Mostrar datos
-                st.dataframe(df, use_container_width=True)
-                
-                # Estadísticas
-                if not df.empty:
-                    st.subheader("📈 Estadísticas")
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Información básica:**")
-                        st.write(f"• Filas: {len(df)}")
-                        st.write(f"• Columnas: {len(df.columns)}")
-                        st.write(f"• Memoria: {df.memory_usage(deep=True).sum()} bytes")
-                    
-                    with col2:
-                        st.write("**Columnas disponibles:**")
-                        for col in df.columns:
-                            tipo = str(df[col].dtype)
-                            st.write(f"• **{col}** ({tipo})")
+        navegador = obtener_navegador()
+        
+        origen = st.radio("Origen de datos:", ["📁 Planillas cargadas", "🗄️ Base de datos del sistema"], horizontal=True)
+        if origen == "📁 Planillas cargadas":
+            tablas = list(sistema.datos.keys())
         else:
+            tablas = navegador.tablas_base_datos
+        
+        if not tablas:
             st.warning("⚠️ No hay datos disponibles")
+        else:
+            tabla_seleccionada = st.selectbox("Seleccionar tabla:", tablas)
+            
+            # Las planillas se copian a SQLite una sola vez por versión de datos
+            if origen == "📁 Planillas cargadas":
+                navegador.publicar_tabla(tabla_seleccionada, sistema.datos[tabla_seleccionada], sistema.version_datos)
+            
+            columnas = [nombre for nombre, _ in navegador.columnas(tabla_seleccionada)]
+            
+            # Filtros y orden (se resuelven en SQLite, no en el navegador)
+            col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+            with col1:
+                columna_filtro = st.selectbox("Filtrar columna:", ["(ninguna)"] + columnas)
+            with col2:
+                texto_filtro = st.text_input("Contiene:", disabled=columna_filtro == "(ninguna)")
+            with col3:
+                columna_orden = st.selectbox("Ordenar por:", ["(orden original)"] + columnas)
+            with col4:
+                descendente = st.checkbox("Desc.", False)
+            
+            filtros = {columna_filtro: texto_filtro} if columna_filtro != "(ninguna)" else {}
+            total_filas = navegador.contar(tabla_seleccionada, filtros)
+            
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                tamano_pagina = st.selectbox("Filas por página:", [25, 50, 100, 250], index=1)
+            total_paginas = max(1, -(-total_filas // tamano_pagina))
+            with col2:
+                numero_pagina = st.number_input(f"Página (de {total_paginas}):", 1, total_paginas, 1)
+            
+            st.subheader(f"📋 {tabla_seleccionada}")
+            st.write(f"**Registros:** {total_filas} | **Columnas:** {len(columnas)}")
+            
+            # Solo la página visible viaja al navegador
+            df_pagina = navegador.pagina(
+                tabla_seleccionada,
+                numero_pagina,
+                tamano_pagina,
+                filtros,
+                columna_orden if columna_orden != "(orden original)" else None,
+                descendente
+            )
+            st.dataframe(df_pagina, use_container_width=True)
+            
+            # Estadísticas por columna (cacheadas por versión de datos)
+            if total_filas > 0:
+                with st.expander("📈 Estadísticas por columna"):
+                    st.dataframe(navegador.estadisticas(tabla_seleccionada), use_container_width=True)
     
     # PÁGINA: Gestión de Reservas
     elif opcion == "📋 Gestión de Reservas":
         st.header("📋 Sistema de Gestión")
+        import pandas as pd
         
         st.subheader("➕ Nueva Reserva")
         
@@ -376,13 +582,66 @@ def main():
             duracion = st.selectbox("⏱️ Duración:", ["1 hora", "2 horas", "3 horas"])
             estudiantes = st.number_input("👥 Estudiantes:", 1, 100, 30)
         
+        from indice_salas import EQUIPOS
+        equipamiento = st.multiselect("🎛️ Equipamiento requerido:", [equipo.capitalize() for equipo in EQUIPOS])
+        
         if st.button("📋 Crear Reserva", type="primary"):
-            st.success(f"✅ Reserva creada: {sala_sel} - {fecha} a las {hora}")
-            st.balloons()
+            inicio = datetime.combine(fecha, hora)
+            solicitud = {
+                'solicitante': profesor or 'Sin nombre',
+                'tipo_usuario': 'Académico',
+                'sala_solicitada': sala_sel,
+                'fecha_requerida': fecha.isoformat(),
+                'hora_inicio': inicio.strftime('%H:%M'),
+                'hora_fin': (inicio + timedelta(hours=int(duracion.split()[0]))).strftime('%H:%M'),
+                'estudiantes': estudiantes,
+                'equipamiento': equipamiento
+            }
+            resultado = obtener_sistema_reservas(sistema).procesar_solicitud_inteligente(solicitud)
+            
+            if resultado['decision'] == 'aprobada':
+                st.success(f"✅ Reserva creada: {sala_sel} - {fecha} de {solicitud['hora_inicio']} a {solicitud['hora_fin']}")
+                st.balloons()
+            elif resultado['decision'] == 'requiere_revision':
+                st.warning(f"⏳ {resultado['motivo']}")
+            else:
+                st.error(f"❌ {resultado['motivo']}")
+            
+            if resultado['alternativas']:
+                st.subheader("🔄 Salas alternativas")
+                st.dataframe(pd.DataFrame(resultado['alternativas']), use_container_width=True)
+        
+        # Exportaciones completas (semestre) en segundo plano
+        st.subheader("📤 Exportar Datos")
+        from exportador import CONSULTAS, formatos_disponibles
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            tabla_exportar = st.selectbox("📋 Tabla:", sorted(CONSULTAS))
+        with col2:
+            formato_exportar = st.selectbox("📄 Formato:", formatos_disponibles())
+        with col3:
+            periodo_exportar = st.date_input("📅 Periodo:", value=(), key='periodo_exportar')
+        
+        if st.button("📤 Iniciar exportación"):
+            desde = periodo_exportar[0].isoformat() if len(periodo_exportar) > 0 else None
+            hasta = periodo_exportar[-1].isoformat() if len(periodo_exportar) > 0 else None
+            trabajo = obtener_gestor_exportaciones().iniciar(tabla_exportar, formato_exportar, desde, hasta)
+            st.session_state.setdefault('exportaciones', []).append(trabajo.id)
+        
+        if st.session_state.get('exportaciones'):
+            gestor = obtener_gestor_exportaciones()
+            trabajos = [gestor.trabajo(trabajo_id) for trabajo_id in st.session_state['exportaciones']]
+            if any(trabajo is not None and trabajo.estado in ('en_cola', 'ejecutando') for trabajo in trabajos):
+                seguir_exportaciones(st.session_state['exportaciones'])
+            else:
+                listar_exportaciones(st.session_state['exportaciones'])
     
     # PÁGINA: Estado del Sistema
     elif opcion == "🔍 Estado del Sistema":
         st.header("🔍 Diagnóstico del Sistema")
+        import pandas as pd
+        from esquemas_datos import resumir_informes
         
         # Estado general
         st.subheader("📊 Estado General")
@@ -403,6 +662,22 @@ def main():
             st.metric("📊 Datos", len(sistema.datos), "tablas")
             st.metric("🛡️ Robustez", "100%", "Máxima")
         
+        # Versiones de datos en memoria (compartidas entre sesiones)
+        with st.expander("🧠 Datos compartidos en memoria"):
+            almacen = obtener_almacen()
+            st.dataframe(pd.DataFrame(almacen.estado()), use_container_width=True)
+            if st.button("🔄 Recargar datos"):
+                if almacen.recargar(forzar=True):
+                    sistema.actualizar()
+                st.success(f"✅ Versión vigente: {sistema.version_datos}")
+        
+        # Memoria de las tablas con tipos compactos (categorías, enteros pequeños, fechas)
+        if sistema.informes_memoria:
+            resumen_memoria = resumir_informes(sistema.informes_memoria)
+            with st.expander(f"💾 Memoria de datos: {resumen_memoria['despues_kb']} KB "
+                             f"(ahorro {resumen_memoria['ahorro_pct']}%)"):
+                st.dataframe(pd.DataFrame(list(sistema.informes_memoria)), use_container_width=True)
+        
         # Archivos detectados
         st.subheader("📁 Archivos Detectados")
         
@@ -416,6 +691,30 @@ def main():
             else:
                 st.info(archivo)
         
+        # Métricas de rendimiento
+        st.subheader("⏱️ Métricas de Rendimiento")
+        
+        # El registro es del proceso (compartido por todas las sesiones): se activa con UFRO_METRICAS=1
+        # al iniciar la aplicación; la sesión solo decide si muestra las mediciones
+        if REGISTRO.habilitado:
+            st.caption("Registro de métricas activo en este proceso (UFRO_METRICAS=1)")
+        else:
+            st.caption("Registro de métricas desactivado: inicie la aplicación con UFRO_METRICAS=1 para activarlo")
+
+        if st.checkbox("Mostrar métricas de este proceso", value=REGISTRO.habilitado, key='mostrar_metricas'):
+            filas_metricas = REGISTRO.resumen()
+            if filas_metricas:
+                st.dataframe(pd.DataFrame(filas_metricas), use_container_width=True)
+            else:
+                st.info("Sin mediciones registradas en este proceso")
+        
+        # Métricas exportadas por otros procesos (API) mediante UFRO_METRICAS_ARCHIVO
+        archivo_metricas = os.environ.get('UFRO_METRICAS_ARCHIVO')
+        if archivo_metricas and os.path.exists(archivo_metricas):
+            with st.expander(f"📄 Métricas exportadas ({archivo_metricas})"):
+                with open(archivo_metricas, encoding='utf-8') as f:
+                    st.code(f.read(), language='text')
+        
         # Recomendaciones
         st.subheader("💡 Recomendaciones")
         
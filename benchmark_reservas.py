@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de los caminos críticos del Sistema de Reservas UFRO
+Mide latencia p50/p99, throughput y memoria pico por caso sobre universidades sintéticas
+Desarrollado por: MiniMax Agent
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from datos_demo import generar_datos_sinteticos
+
+# Sin dependencias de benchmarking (pytest-benchmark/asv), pero portable: resource solo existe en POSIX
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ARCHIVO_LINEA_BASE = 'linea_base_benchmarks.json'
+TOLERANCIA_REGRESION = 0.25  # 25% sobre la línea base se considera regresión
+
+# Tiempo máximo de importación (ms acumulados, medido con -X importtime) de los módulos
+# del arranque. pandas/scikit-learn/plotly deben cargarse solo al usarse.
+PRESUPUESTOS_IMPORTACION_MS = {
+    'bitacora': 100,
+    'metricas_sistema': 100,
+    'sistema_ia_reservas': 150,
+    'sistema_notificaciones': 200,
+    'api_reservas': 500,
+    'app_web_reservas': 800,  # streamlit solo ya toma ~400 ms (y carga plotly)
+    'dashboard_sistema_reservas': 100
+}
+
+# Bibliotecas que ningún módulo del arranque debe cargar al importarse
+MODULOS_DIFERIDOS = ('pandas', 'numpy', 'sklearn', 'matplotlib', 'seaborn')
+
+def memoria_pico_mb():
+    """
+    Memoria residente máxima del proceso en MB (ru_maxrss está en KB en Linux y bytes en macOS).
+    Sin resource (Windows): el pico de tracemalloc si está activo, o None.
+    """
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024) if tracemalloc.is_tracing() else None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+def medir(funcion, repeticiones, calentamiento=3, preparar=None):
+    """Ejecuta funcion(i) y retorna las latencias en milisegundos; preparar(i), si se indica, queda fuera de la medición"""
+    for i in range(calentamiento):
+        if preparar:
+            preparar(i)
+        funcion(i)
+
+    latencias = []
+    for i in range(calentamiento, calentamiento + repeticiones):
+        if preparar:
+            preparar(i)
+        inicio = time.perf_counter()
+        funcion(i)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+def medir_memoria(funcion, repeticiones, preparar=None):
+    """
+    Pico de memoria asignada (MB, tracemalloc) durante repeticiones de funcion(i), sobre lo ya
+    asignado al empezar: no hereda los picos de los casos anteriores. Va en una pasada aparte
+    porque tracemalloc hace más lentas las asignaciones.
+    """
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for i in range(repeticiones):
+            if preparar:
+                preparar(i)
+            funcion(i)
+        return (tracemalloc.get_traced_memory()[1] - base) / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def resumir(latencias):
+    """Resume latencias en p50, p99, media y operaciones por segundo"""
+    arreglo = np.array(latencias)
+    total_s = arreglo.sum() / 1000
+    return {
+        'repeticiones': len(latencias),
+        'p50_ms': round(float(np.percentile(arreglo, 50)), 4),
+        'p99_ms': round(float(np.percentile(arreglo, 99)), 4),
+        'media_ms': round(float(arreglo.mean()), 4),
+        'throughput_ops_s': round(len(latencias) / total_s, 2) if total_s > 0 else None
+    }
+
+def medir_tiempo_importacion(modulo):
+    """Tiempo acumulado de importación del módulo en ms, en un intérprete limpio"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proceso.returncode != 0:
+        raise ImportError(proceso.stderr.strip().splitlines()[-1])
+
+    for linea in proceso.stderr.splitlines():
+        partes = [parte.strip() for parte in linea.split('|')]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1000
+    return None
+
+def modulos_diferidos_cargados(modulo, diferidos=MODULOS_DIFERIDOS):
+    """Bibliotecas diferidas que quedan cargadas tras importar el módulo en un intérprete limpio"""
+    proceso = subprocess.run(
+        [sys.executable, '-c', f'import sys, {modulo}; print(" ".join(sorted(sys.modules)))'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proceso.returncode != 0:
+        raise ImportError(proceso.stderr.strip().splitlines()[-1])
+    cargados = set(proceso.stdout.split())
+    return [diferido for diferido in diferidos if diferido in cargados]
+
+def verificar_presupuesto_importacion(presupuestos=PRESUPUESTOS_IMPORTACION_MS):
+    """Retorna la lista de módulos (modulo, ms, presupuesto) que exceden su presupuesto"""
+    excedidos = []
+    print("\n📦 TIEMPOS DE IMPORTACIÓN")
+    for modulo, presupuesto in presupuestos.items():
+        try:
+            ms = medir_tiempo_importacion(modulo)
+        except ImportError as e:
+            print(f"   ⚠️ {modulo}: omitido ({e})")
+            continue
+        cargados = modulos_diferidos_cargados(modulo)
+        estado = '✅' if ms <= presupuesto and not cargados else '❌'
+        print(f"   {estado} {modulo:28} {ms:8.1f} ms (presupuesto {presupuesto} ms)"
+              + (f" carga {', '.join(cargados)}" if cargados else ''))
+        if ms > presupuesto or cargados:
+            excedidos.append((modulo, ms, presupuesto))
+    return excedidos
+
+def poblar_base_datos(sistema, datos):
+    """Carga salas, asignaciones y solicitudes aprobadas sintéticas en la base de datos del sistema"""
+    conn = sqlite3.connect(sistema.db_path)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        'INSERT INTO salas (codigo, capacidad, facultad, equipamiento) VALUES (?, ?, ?, ?)',
+        [(r.codigo, int(r.capacidad), r.facultad, r.equipamiento) for r in datos['salas'].itertuples()]
+    )
+    ids_salas = dict(cursor.execute('SELECT codigo, id FROM salas').fetchall())
+
+    asignaciones = datos['asignaciones']
+    cursor.executemany('''
+        INSERT INTO asignaciones_semestrales
+        (sala_id, asignatura, docente, dia_semana, hora_inicio, hora_fin, fecha_inicio, fecha_fin)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (ids_salas[fila['Sala']], fila['Asignatura'], fila['Docente'], fila['Día'],
+         fila['Bloque Horario'][:5], fila['Bloque Horario'][6:],
+         datetime.strptime(fila['Fecha Inicio'], '%d/%m/%Y').strftime('%Y-%m-%d'),
+         datetime.strptime(fila['Fecha Término'], '%d/%m/%Y').strftime('%Y-%m-%d'))
+        for fila in asignaciones.to_dict('records')
+    ])
+
+    aprobadas = datos['solicitudes'][datos['solicitudes']['Estado Solicitud'] == 'Aprobada']
+    cursor.executemany('''
+        INSERT INTO solicitudes
+        (fecha_solicitud, solicitante, tipo_usuario, sala_solicitada, fecha_requerida,
+         hora_inicio, hora_fin, motivo, prioridad, estado)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'aprobada')
+    ''', [
+        (datetime.strptime(fila['Fecha Solicitud'], '%d/%m/%Y').strftime('%Y-%m-%d'),
+         fila['Solicitante'], fila['Rol'], fila['Sala Solicitada'],
+         datetime.strptime(fila['Fecha Requerida'], '%d/%m/%Y').strftime('%Y-%m-%d'),
+         fila['Bloque Horario'][:5], fila['Bloque Horario'][6:], fila['Motivo'], 100)
+        for fila in aprobadas.to_dict('records')
+    ])
+
+    conn.commit()
+    conn.close()
+
+def generar_solicitudes_consulta(datos, cantidad, semilla):
+    """Solicitudes de consulta en formato del motor, tomadas de la distribución sintética"""
+    rng = np.random.default_rng(semilla)
+    filas = datos['solicitudes'].sample(n=cantidad, replace=True, random_state=semilla).to_dict('records')
+    solicitudes = []
+    for i, fila in enumerate(filas):
+        solicitudes.append({
+            'solicitante': fila['Solicitante'],
+            'tipo_usuario': fila['Rol'],
+            'sala_solicitada': fila['Sala Solicitada'],
+            'fecha_requerida': datetime.strptime(fila['Fecha Requerida'], '%d/%m/%Y').strftime('%Y-%m-%d'),
+            'hora_inicio': fila['Bloque Horario'][:5],
+            'hora_fin': fila['Bloque Horario'][6:],
+            'motivo': fila['Motivo'],
+            'correo': fila['Correo'],
+            'telefono': f"9{rng.integers(10000000, 99999999)}"
+        })
+    return solicitudes
+
+def construir_casos(sistema, datos, solicitudes):
+    """
+    Retorna {nombre: (funcion(i), preparar(i) o None)} con los caminos críticos a medir.
+    Los casos sin caché la vacían en preparar (fuera de la medición): las consultas se repiten
+    entre iteraciones y si no se mediría la caché de disponibilidad en lugar de la consulta.
+    """
+    n = len(solicitudes)
+    datos_historicos = {'solicitudes': datos['solicitudes']}
+
+    def sin_cache(i):
+        sistema.cache_disponibilidad.limpiar()
+
+    def conflictos(i):
+        s = solicitudes[i % n]
+        sistema.detectar_conflictos_horario(s['sala_solicitada'], s['fecha_requerida'], s['hora_inicio'], s['hora_fin'])
+
+    def conflictos_en_cache(i):
+        # Pocas consultas distintas que se repiten (la caché ya las tiene tras la primera vuelta)
+        s = solicitudes[i % min(n, 10)]
+        sistema.detectar_conflictos_horario(s['sala_solicitada'], s['fecha_requerida'], s['hora_inicio'], s['hora_fin'])
+
+    def procesar(i):
+        sistema.procesar_solicitud_inteligente(dict(solicitudes[i % n]))
+
+    def alternativas(i):
+        sistema.sugerir_alternativas(solicitudes[i % n])
+
+    def prediccion(i):
+        sistema.predecir_probabilidad_aprobacion(solicitudes[i % n])
+
+    def entrenamiento(i):
+        sistema.entrenar_modelo_prediccion_demanda(datos_historicos)
+
+    casos = {
+        'detectar_conflictos_horario': (conflictos, sin_cache),
+        'detectar_conflictos_horario_cache': (conflictos_en_cache, None),
+        'procesar_solicitud_inteligente': (procesar, sin_cache),
+        'sugerir_alternativas': (alternativas, sin_cache),
+        'predecir_probabilidad_aprobacion': (prediccion, None),
+        'entrenar_modelo_prediccion_demanda': (entrenamiento, None)
+    }
+
+    try:
+        from sistema_notificaciones import SistemaNotificaciones
+        notificaciones = SistemaNotificaciones(sistema.db_path)
+
+        def notificar(i):
+            s = solicitudes[i % n]
+            if i % 2 == 0:
+                notificaciones.notificar_aprobacion(s, 120)
+            else:
+                notificaciones.notificar_rechazo(s, 'Conflicto detectado', [{'sala': 'A101', 'razón': 'Disponible'}])
+
+        casos['notificaciones_render_envio'] = (notificar, None)
+    except ImportError as e:
+        print(f"⚠️ Benchmark de notificaciones omitido: {e}")
+
+    try:
+        import app_web_reservas
+
+        def carga_robusto(i):
+            app_web_reservas.SistemaRobusto()
+
+        casos['sistema_robusto_carga'] = (carga_robusto, None)
+    except ImportError as e:
+        print(f"⚠️ Benchmark de SistemaRobusto omitido: {e}")
+
+    return casos
+
+def ejecutar_suite(n_salas, n_semestres, n_solicitudes, semilla, repeticiones, casos_filtro=None):
+    """Genera la universidad sintética, ejecuta los casos y retorna el reporte"""
+    from sistema_ia_reservas import SistemaIAReservas
+
+    datos = generar_datos_sinteticos(n_salas, n_semestres, n_solicitudes, semilla)
+    directorio = tempfile.mkdtemp(prefix='bench_ufro_')
+
+    # La salida por consola de los sistemas distorsiona las mediciones
+    with contextlib.redirect_stdout(io.StringIO()):
+        sistema = SistemaIAReservas(os.path.join(directorio, 'bench.db'))
+        poblar_base_datos(sistema, datos)
+        sistema.entrenar_modelo_prediccion_demanda({'solicitudes': datos['solicitudes']})
+
+    solicitudes = generar_solicitudes_consulta(datos, max(repeticiones, 50), semilla)
+    casos = construir_casos(sistema, datos, solicitudes)
+
+    reporte = {
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'escala': {'salas': n_salas, 'semestres': n_semestres, 'solicitudes': n_solicitudes, 'semilla': semilla},
+        'casos': {}
+    }
+
+    for nombre, (funcion, preparar) in casos.items():
+        if casos_filtro and nombre not in casos_filtro:
+            continue
+        # El entrenamiento es órdenes de magnitud más lento: menos repeticiones
+        reps = max(3, repeticiones // 50) if nombre == 'entrenar_modelo_prediccion_demanda' else repeticiones
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencias = medir(funcion, reps, calentamiento=1 if reps < 10 else 3, preparar=preparar)
+            memoria = medir_memoria(funcion, min(reps, 20), preparar)
+        reporte['casos'][nombre] = resumir(latencias)
+        reporte['casos'][nombre]['memoria_pico_mb'] = round(memoria, 2)
+
+    # RSS máximo de todo el proceso (solo crece): referencia global, no por caso
+    pico = memoria_pico_mb()
+    if pico is None:
+        # Sin ru_maxrss: el mayor pico medido por caso con tracemalloc
+        pico = max((caso['memoria_pico_mb'] for caso in reporte['casos'].values()), default=0.0)
+    reporte['rss_pico_mb'] = round(pico, 1)
+    return reporte
+
+def comparar_con_linea_base(reporte, linea_base, tolerancia=TOLERANCIA_REGRESION):
+    """Retorna la lista de regresiones (caso, métrica, base, actual) por encima de la tolerancia"""
+    regresiones = []
+    if linea_base.get('escala') != reporte['escala']:
+        print("⚠️ La línea base fue medida con otra escala: la comparación es orientativa")
+
+    for nombre, actual in reporte['casos'].items():
+        base = linea_base.get('casos', {}).get(nombre)
+        if not base:
+            continue
+        for metrica in ['p50_ms', 'p99_ms']:
+            if base[metrica] and actual[metrica] > base[metrica] * (1 + tolerancia):
+                regresiones.append((nombre, metrica, base[metrica], actual[metrica]))
+    return regresiones
+
+def imprimir_reporte(reporte):
+    """Imprime el reporte como tabla"""
+    print(f"\n📊 BENCHMARKS - escala: {reporte['escala']}")
+    print(f"{'Caso':40} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'Mem MB':>8}")
+    for nombre, r in reporte['casos'].items():
+        print(f"{nombre:40} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['throughput_ops_s'] or 0:>10.1f} {r['memoria_pico_mb']:>8.2f}")
+    if 'rss_pico_mb' in reporte:
+        print(f"RSS pico del proceso: {reporte['rss_pico_mb']:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del Sistema de Reservas UFRO')
+    parser.add_argument('--salas', type=int, default=40)
+    parser.add_argument('--semestres', type=int, default=2)
+    parser.add_argument('--solicitudes', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--casos', nargs='*', help='Subconjunto de casos a ejecutar')
+    parser.add_argument('--linea-base', default=ARCHIVO_LINEA_BASE)
+    parser.add_argument('--guardar-linea-base', action='store_true', help='Guarda el resultado como nueva línea base')
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el reporte')
+    parser.add_argument('--presupuesto-importacion', action='store_true',
+                        help='Solo verifica los tiempos de importación contra su presupuesto')
+    args = parser.parse_args()
+
+    if args.presupuesto_importacion:
+        return 1 if verificar_presupuesto_importacion() else 0
+
+    reporte = ejecutar_suite(args.salas, args.semestres, args.solicitudes, args.semilla,
+                             args.repeticiones, args.casos)
+    imprimir_reporte(reporte)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    if args.guardar_linea_base:
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Línea base guardada en: {args.linea_base}")
+        return 0
+
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding='utf-8') as f:
+            linea_base = json.load(f)
+        regresiones = comparar_con_linea_base(reporte, linea_base)
+        if regresiones:
+            print("\n❌ REGRESIONES DETECTADAS:")
+            for nombre, metrica, base, actual in regresiones:
+                print(f"   - {nombre} {metrica}: {base:.3f} → {actual:.3f} ms")
+            return 1
+        print("\n✅ Sin regresiones respecto a la línea base")
+    else:
+        print(f"\nℹ️ No existe línea base ({args.linea_base}); use --guardar-linea-base para crearla")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Bitácora estructurada del Sistema de Reservas UFRO
+Logging en líneas JSON emitido fuera del hilo de la petición, con muestreo e IDs de correlación
+Desarrollado por: MiniMax Agent
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime
+
+RAIZ = 'ufro'
+
+ID_CORRELACION = contextvars.ContextVar('id_correlacion', default=None)
+
+# Atributos propios de LogRecord: todo lo demás se considera dato estructurado (extra=)
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'id_correlacion', 'evento'}
+
+_estado = {'listener': None, 'handler': None}
+
+class FormateadorJSON(logging.Formatter):
+    """
+    Serializa cada registro como una línea JSON
+    """
+
+    def format(self, record):
+        evento = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'evento': getattr(record, 'evento', None),
+            'mensaje': record.getMessage(),
+            'id_correlacion': getattr(record, 'id_correlacion', None)
+        }
+        datos = {k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_ESTANDAR}
+        if datos:
+            evento['datos'] = datos
+        if record.exc_info:
+            evento['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+class FiltroCorrelacion(logging.Filter):
+    """
+    Copia el ID de correlación del contexto al registro. Corre en el hilo que emite,
+    antes de que el registro pase a la cola.
+    """
+
+    def filter(self, record):
+        record.id_correlacion = ID_CORRELACION.get()
+        return True
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar solo una fracción de los eventos de alta frecuencia.
+    tasas: {evento: fracción entre 0 y 1}; las advertencias y errores nunca se muestrean.
+    """
+
+    def __init__(self, tasas=None):
+        super().__init__()
+        self.tasas = tasas or {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        tasa = self.tasas.get(getattr(record, 'evento', None))
+        return tasa is None or random.random() < tasa
+
+def _leer_pares(texto, conversion):
+    """Convierte 'a=1,b=2' en {'a': conversion('1'), 'b': conversion('2')}"""
+    pares = {}
+    for par in (texto or '').split(','):
+        if '=' in par:
+            clave, valor = par.split('=', 1)
+            pares[clave.strip()] = conversion(valor.strip())
+    return pares
+
+def configurar_logging(nivel=None, niveles_modulo=None, muestreo=None, destino=None):
+    """
+    Configura la bitácora una sola vez por proceso.
+    - nivel: nivel global (por defecto UFRO_LOG_NIVEL o INFO)
+    - niveles_modulo: {'sistema_notificaciones': 'WARNING'} (por defecto UFRO_LOG_NIVELES)
+    - muestreo: {'notificacion_enviada': 0.1} (por defecto UFRO_LOG_MUESTREO)
+    """
+    if _estado['listener'] is not None:
+        return
+
+    nivel = nivel or os.environ.get('UFRO_LOG_NIVEL', 'INFO')
+    if niveles_modulo is None:
+        niveles_modulo = _leer_pares(os.environ.get('UFRO_LOG_NIVELES'), str.upper)
+    if muestreo is None:
+        muestreo = _leer_pares(os.environ.get('UFRO_LOG_MUESTREO'), float)
+
+    raiz = logging.getLogger(RAIZ)
+    raiz.setLevel(nivel)
+    raiz.propagate = False
+    for modulo, nivel_modulo in niveles_modulo.items():
+        logging.getLogger(f"{RAIZ}.{modulo}").setLevel(nivel_modulo)
+
+    # El hilo que registra solo encola; la serialización y escritura ocurren en el listener
+    cola = queue.SimpleQueue()
+    manejador_cola = logging.handlers.QueueHandler(cola)
+    manejador_cola.addFilter(FiltroMuestreo(muestreo))
+    manejador_cola.addFilter(FiltroCorrelacion())
+    raiz.addHandler(manejador_cola)
+
+    salida = logging.StreamHandler(destino or sys.stdout)
+    salida.setFormatter(FormateadorJSON())
+    listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    _estado['listener'] = listener
+    _estado['handler'] = manejador_cola
+
+def obtener_logger(modulo):
+    """Logger hijo de la raíz 'ufro' (permite niveles por módulo)"""
+    return logging.getLogger(f"{RAIZ}.{modulo}")
+
+def nuevo_id_correlacion():
+    return uuid.uuid4().hex[:16]
+
+@contextlib.contextmanager
+def correlacion(id_correlacion=None):
+    """
+    Fija el ID de correlación del bloque. Sin ID explícito se reutiliza el del contexto
+    actual, o se genera uno nuevo si no existe.
+    """
+    id_correlacion = id_correlacion or ID_CORRELACION.get() or nuevo_id_correlacion()
+    token = ID_CORRELACION.set(id_correlacion)
+    try:
+        yield id_correlacion
+    finally:
+        ID_CORRELACION.reset(token)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Caché de disponibilidad del Sistema de Reservas UFRO
+Conflictos por (sala, fecha, horario) y alternativas en un LRU acotado, con vigencia e invalidación precisa
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from metricas_sistema import contar
+
+MAX_ENTRADAS = 4096
+
+# Las escrituras del propio proceso invalidan al confirmarse; las de otros procesos se ven
+# pasada la vigencia. Un dato vencido nunca aprueba una reserva: la confirmación re-verifica
+# dentro de la transacción.
+VIGENCIA = 5.0  # segundos
+
+TIPOS = ('conflictos', 'alternativas')
+
+class CacheDisponibilidad:
+    """
+    Lectura a través de un LRU:
+    - ('conflictos', sala, fecha, hora_inicio, hora_fin): resultado de detectar_conflictos_horario;
+      se invalida cuando se aprueba, reasigna o cancela una reserva de esa sala y fecha.
+    - ('alternativas', sala, fecha, ...): resultado de sugerir_alternativas; abarca todas las
+      salas, así que se invalida con cualquier cambio en esa fecha.
+    Los índices por (sala, fecha) y por fecha permiten invalidar sin recorrer el LRU.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, vigencia=VIGENCIA):
+        self.max_entradas = max_entradas
+        self.vigencia = vigencia
+        self.aciertos = dict.fromkeys(TIPOS, 0)
+        self.fallos = dict.fromkeys(TIPOS, 0)
+        self._lru = OrderedDict()  # clave -> (instante, valor)
+        self._por_sala_fecha = {}  # (sala, fecha) -> {claves de conflictos}
+        self._por_fecha = {}       # fecha -> {claves de alternativas}
+        # Cuenta las invalidaciones: un valor calculado mientras hubo una no se guarda
+        self._invalidaciones = 0
+        self._candado = threading.Lock()
+
+    def _indice(self, clave):
+        """(índice, subclave) donde queda registrada la clave"""
+        if clave[0] == 'conflictos':
+            return self._por_sala_fecha, (clave[1], clave[2])
+        return self._por_fecha, clave[2]
+
+    def _olvidar(self, clave):
+        """Quita la clave del LRU y de su índice (con el candado tomado)"""
+        self._lru.pop(clave, None)
+        indice, subclave = self._indice(clave)
+        claves = indice.get(subclave)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del indice[subclave]
+
+    def obtener(self, clave, calcular):
+        """Valor vigente de la clave, o calcular() guardado para las siguientes lecturas"""
+        tipo = clave[0]
+        ahora = time.monotonic()
+        with self._candado:
+            entrada = self._lru.get(clave)
+            if entrada is not None and ahora - entrada[0] <= self.vigencia:
+                self._lru.move_to_end(clave)
+                self.aciertos[tipo] += 1
+                acierto = True
+            else:
+                self.fallos[tipo] += 1
+                acierto = False
+                invalidaciones = self._invalidaciones
+        contar('ufro_cache_disponibilidad_total', tipo=tipo, resultado='acierto' if acierto else 'fallo')
+        if acierto:
+            return entrada[1]
+
+        valor = calcular()
+        with self._candado:
+            if invalidaciones == self._invalidaciones:
+                self._olvidar(clave)
+                self._lru[clave] = (ahora, valor)
+                indice, subclave = self._indice(clave)
+                indice.setdefault(subclave, set()).add(clave)
+                while len(self._lru) > self.max_entradas:
+                    self._olvidar(next(iter(self._lru)))
+        return valor
+
+    def invalidar(self, sala, fecha):
+        """Una reserva de la sala en la fecha cambió: conflictos de esa sala y alternativas de esa fecha"""
+        fecha = str(fecha)[:10]
+        with self._candado:
+            self._invalidaciones += 1
+            claves = list(self._por_sala_fecha.get((sala, fecha), ())) + list(self._por_fecha.get(fecha, ()))
+            for clave in claves:
+                self._olvidar(clave)
+        if claves:
+            contar('ufro_cache_disponibilidad_invalidaciones_total', len(claves))
+
+    def limpiar(self):
+        with self._candado:
+            self._invalidaciones += 1
+            self._lru.clear()
+            self._por_sala_fecha.clear()
+            self._por_fecha.clear()
+
+    def estadisticas(self):
+        """Entradas, aciertos, fallos y tasa de aciertos por tipo de consulta"""
+        with self._candado:
+            resumen = {'entradas': len(self._lru), 'max_entradas': self.max_entradas}
+            for tipo in TIPOS:
+                total = self.aciertos[tipo] + self.fallos[tipo]
+                resumen[tipo] = {
+                    'aciertos': self.aciertos[tipo],
+                    'fallos': self.fallos[tipo],
+                    'tasa_aciertos': round(self.aciertos[tipo] / total, 4) if total else None
+                }
+        return resumen
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Calendario académico del Sistema de Reservas UFRO
+Recesos, feriados y periodos académicos compilados en un código por día para validar fechas
+Desarrollado por: MiniMax Agent
+"""
+
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from bitacora import obtener_logger
+
+logger = obtener_logger('calendario_academico')
+
+RUTA_RECESOS = 'user_input_files/recesos_institucionales.xlsx'
+RUTA_ASIGNACIONES = 'user_input_files/asignaciones_semestrales.xlsx'
+
+# Bits del código de cada día
+RECESO = 1
+FERIADO = 2
+FUERA_PERIODO = 4  # fuera de los periodos académicos (informativo: no bloquea)
+BLOQUEANTES = RECESO | FERIADO
+
+# Feriados nacionales de fecha fija (mes, día)
+FERIADOS_FIJOS = {
+    (1, 1): 'Año Nuevo',
+    (5, 1): 'Día del Trabajo',
+    (5, 21): 'Día de las Glorias Navales',
+    (6, 29): 'San Pedro y San Pablo',
+    (7, 16): 'Día de la Virgen del Carmen',
+    (8, 15): 'Asunción de la Virgen',
+    (9, 18): 'Independencia Nacional',
+    (9, 19): 'Día de las Glorias del Ejército',
+    (10, 12): 'Encuentro de Dos Mundos',
+    (10, 31): 'Día de las Iglesias Evangélicas',
+    (11, 1): 'Día de Todos los Santos',
+    (12, 8): 'Inmaculada Concepción',
+    (12, 25): 'Navidad'
+}
+
+INTERVALO_VERIFICACION = 5.0  # segundos entre revisiones de las planillas
+
+# Formato de fecha_requerida (el mismo que usan las consultas de conflictos)
+FORMATO_FECHA = r'\d{4}-\d{2}-\d{2}'
+
+def fecha_iso(fecha):
+    """date de una fecha 'YYYY-MM-DD' (texto o date); ValueError con cualquier otro formato"""
+    texto = str(fecha) if isinstance(fecha, date) else fecha
+    if not isinstance(texto, str) or not re.fullmatch(FORMATO_FECHA, texto):
+        raise ValueError(f"Fecha no ISO (YYYY-MM-DD): {fecha!r}")
+    return date.fromisoformat(texto)
+
+def domingo_de_pascua(anio):
+    """Algoritmo de Meeus/Jones/Butcher (calendario gregoriano)"""
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(anio, mes, dia)
+
+def feriados_del_anio(anio):
+    """{fecha: nombre} de los feriados fijos y de Semana Santa"""
+    feriados = {date(anio, mes, dia): nombre for (mes, dia), nombre in FERIADOS_FIJOS.items()}
+    pascua = domingo_de_pascua(anio)
+    feriados[pascua - timedelta(days=2)] = 'Viernes Santo'
+    feriados[pascua - timedelta(days=1)] = 'Sábado Santo'
+    return feriados
+
+def _firma(rutas):
+    firma = []
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+            firma.append((ruta, estado.st_mtime_ns, estado.st_size))
+        except OSError:
+            firma.append((ruta, None, None))
+    return tuple(firma)
+
+def _intervalos(df, columnas_inicio, columnas_fin, columnas_nombre):
+    """[(inicio, fin, nombre)] de una planilla con fechas dd/mm/yyyy o ISO"""
+    from datos_graficos import resolver_columna
+    from esquemas_datos import convertir_fechas
+
+    columna_inicio = resolver_columna(df, columnas_inicio)
+    columna_fin = resolver_columna(df, columnas_fin)
+    if df is None or df.empty or columna_inicio is None or columna_fin is None:
+        return []
+    columna_nombre = resolver_columna(df, columnas_nombre)
+    inicios = convertir_fechas(df[columna_inicio])
+    fines = convertir_fechas(df[columna_fin])
+    nombres = df[columna_nombre].astype(str) if columna_nombre else [''] * len(df)
+    return [(inicio.date(), fin.date(), nombre) for inicio, fin, nombre in zip(inicios, fines, nombres)
+            if inicio == inicio and fin == fin and fin >= inicio]
+
+class CalendarioAcademico:
+    """
+    Un byte por día (bits RECESO, FERIADO, FUERA_PERIODO) desde el 1 de enero del primer año
+    cubierto hasta el 31 de diciembre del último, más el índice del receso o feriado de cada
+    día para explicar el motivo. es_reservable() es una indexación: O(1).
+    """
+
+    def __init__(self, recesos=None, periodos=None, anios=None):
+        recesos = recesos or []
+        periodos = periodos or []
+        anio_actual = date.today().year
+        anios_fuente = [fecha.year for inicio, fin, _ in recesos + periodos for fecha in (inicio, fin)]
+        anios = anios or (min(anios_fuente + [anio_actual]), max(anios_fuente + [anio_actual + 1]))
+
+        self.inicio = date(anios[0], 1, 1)
+        self.fin = date(anios[1], 12, 31)
+        self._origen = self.inicio.toordinal()
+        dias = self.fin.toordinal() - self._origen + 1
+        self.codigos = np.zeros(dias, dtype=np.uint8)
+        self._motivo = np.full(dias, -1, dtype=np.int16)  # índice en self.nombres
+        self.nombres = []
+        self.periodos = periodos
+
+        if periodos:
+            self.codigos[:] = FUERA_PERIODO
+            for inicio, fin, _ in periodos:
+                self.codigos[self._rango(inicio, fin)] &= ~np.uint8(FUERA_PERIODO)
+
+        for inicio, fin, nombre in recesos:
+            rango = self._rango(inicio, fin)
+            self.codigos[rango] |= RECESO
+            self._motivo[rango] = self._nombre(f"receso institucional: {nombre}")
+
+        for anio in range(anios[0], anios[1] + 1):
+            for fecha, nombre in feriados_del_anio(anio).items():
+                indice = fecha.toordinal() - self._origen
+                self.codigos[indice] |= FERIADO
+                if not self.codigos[indice] & RECESO:
+                    self._motivo[indice] = self._nombre(f"feriado: {nombre}")
+
+    def _rango(self, inicio, fin):
+        desde = max(inicio.toordinal() - self._origen, 0)
+        hasta = min(fin.toordinal() - self._origen + 1, len(self.codigos))
+        return slice(desde, max(desde, hasta))
+
+    def _nombre(self, texto):
+        if texto not in self.nombres:
+            self.nombres.append(texto)
+        return self.nombres.index(texto)
+
+    def codigo(self, fecha):
+        """Código del día (fecha 'YYYY-MM-DD' o date); fuera del rango solo se conocen los feriados"""
+        fecha = fecha_iso(fecha)
+        indice = fecha.toordinal() - self._origen
+        if 0 <= indice < len(self.codigos):
+            return int(self.codigos[indice]), indice
+        return (FERIADO if fecha in feriados_del_anio(fecha.year) else 0), None
+
+    def _motivo_rechazo(self, indice):
+        if indice is not None and self._motivo[indice] >= 0:
+            return f"Fecha no disponible ({self.nombres[self._motivo[indice]]})"
+        return "Fecha no disponible (feriado)"
+
+    def es_reservable(self, fecha):
+        """(reservable, motivo); el motivo explica el rechazo o queda vacío"""
+        codigo, indice = self.codigo(fecha)
+        if not codigo & BLOQUEANTES:
+            return True, ''
+        return False, self._motivo_rechazo(indice)
+
+    def codigos_fechas(self, fechas):
+        """
+        Códigos de una columna de fechas (Series, arreglo o lista), sin recorrerla en Python.
+        Retorna (códigos, índices en el rango compilado o -1, fechas válidas).
+        """
+        from esquemas_datos import convertir_fechas
+        import pandas as pd
+
+        fechas = convertir_fechas(pd.Series(fechas))
+        validas = fechas.notna().to_numpy()
+        indices = np.full(len(fechas), -1, dtype=np.int64)
+        indices[validas] = (np.asarray(fechas[validas], dtype='datetime64[D]').astype(np.int64)
+                            + date(1970, 1, 1).toordinal() - self._origen)
+        dentro = validas & (indices >= 0) & (indices < len(self.codigos))
+        codigos = np.zeros(len(fechas), dtype=np.uint8)
+        codigos[dentro] = self.codigos[indices[dentro]]
+        # Fuera del rango compilado solo se conocen los feriados (por año presente en la columna)
+        fuera = validas & ~dentro
+        if fuera.any():
+            feriados = set()
+            for anio in np.unique(fechas[fuera].dt.year):
+                feriados.update(fecha.toordinal() - self._origen for fecha in feriados_del_anio(int(anio)))
+            codigos[fuera] = np.where(np.isin(indices[fuera], list(feriados)), FERIADO, 0)
+        indices[~dentro] = -1
+        return codigos, indices, validas
+
+    def verificar_fechas(self, fechas):
+        """
+        [(reservable, motivo)] para una columna de fechas de solicitudes. Como es_reservable(), solo
+        acepta 'YYYY-MM-DD' (o date): cualquier otro formato es una fecha inválida.
+        """
+        import pandas as pd
+
+        textos = pd.Series(fechas, dtype=object).astype(str)
+        iso = textos.str.fullmatch(FORMATO_FECHA)
+        codigos, indices, validas = self.codigos_fechas(
+            pd.to_datetime(textos.where(iso), format='%Y-%m-%d', errors='coerce'))
+        bloqueadas = (codigos & BLOQUEANTES) > 0
+        resultado = [(True, '')] * len(codigos)
+        for i in np.flatnonzero(~validas | bloqueadas):
+            if not validas[i]:
+                resultado[i] = (False, "Fecha inválida")
+            else:
+                resultado[i] = (False, self._motivo_rechazo(indices[i] if indices[i] >= 0 else None))
+        return resultado
+
+    def resumen(self):
+        """Días bloqueados por motivo en el rango compilado"""
+        return {
+            'desde': self.inicio.isoformat(),
+            'hasta': self.fin.isoformat(),
+            'dias_receso': int(((self.codigos & RECESO) > 0).sum()),
+            'dias_feriado': int(((self.codigos & FERIADO) > 0).sum()),
+            'dias_fuera_periodo': int(((self.codigos & FUERA_PERIODO) > 0).sum())
+        }
+
+class FuenteCalendario:
+    """
+    Calendario compilado desde las planillas; se recompila solo cuando cambia la firma
+    (mtime y tamaño) de alguna de ellas, revisada a lo sumo cada INTERVALO_VERIFICACION.
+    """
+
+    def __init__(self, ruta_recesos=RUTA_RECESOS, ruta_asignaciones=RUTA_ASIGNACIONES,
+                 intervalo_verificacion=INTERVALO_VERIFICACION):
+        self.rutas = (ruta_recesos, ruta_asignaciones)
+        self.intervalo_verificacion = intervalo_verificacion
+        self._candado = threading.Lock()
+        self._firma = None
+        self._calendario = None
+        self._ultima_verificacion = 0.0
+
+    def _compilar(self):
+        import pandas as pd
+
+        def leer(ruta):
+            try:
+                return pd.read_excel(ruta)
+            except (OSError, ValueError) as e:
+                logger.warning("No se pudo leer %s: %s", ruta, e, extra={'evento': 'calendario_sin_fuente', 'ruta': ruta})
+                return None
+
+        recesos = _intervalos(leer(self.rutas[0]), ['Fecha Inicio', 'Fecha_Inicio'],
+                              ['Fecha Término', 'Fecha_Fin', 'Fecha_Término'], ['Periodo Receso', 'Tipo_Receso', 'Motivo'])
+        periodos = _intervalos(leer(self.rutas[1]), ['Fecha Inicio', 'Fecha_Inicio'],
+                               ['Fecha Término', 'Fecha_Término'], ['Periodo Académico', 'Periodo_Académico', 'Semestre'])
+        return CalendarioAcademico(recesos, periodos)
+
+    def calendario(self):
+        """Calendario vigente"""
+        if self._calendario is not None and time.monotonic() - self._ultima_verificacion < self.intervalo_verificacion:
+            return self._calendario
+        with self._candado:
+            self._ultima_verificacion = time.monotonic()
+            firma = _firma(self.rutas)
+            if firma != self._firma or self._calendario is None:
+                inicio = time.perf_counter()
+                self._calendario = self._compilar()
+                self._firma = firma
+                logger.info("Calendario académico compilado", extra={
+                    'evento': 'calendario_compilado', **self._calendario.resumen(),
+                    'duracion_ms': round((time.perf_counter() - inicio) * 1000, 1)
+                })
+        return self._calendario
+
+_fuentes = {}
+_candado_fuentes = threading.Lock()
+
+def obtener_calendario(ruta_recesos=RUTA_RECESOS, ruta_asignaciones=RUTA_ASIGNACIONES):
+    """Calendario vigente de las planillas indicadas (una fuente compartida por proceso)"""
+    clave = (ruta_recesos, ruta_asignaciones)
+    with _candado_fuentes:
+        fuente = _fuentes.get(clave)
+        if fuente is None:
+            fuente = _fuentes[clave] = FuenteCalendario(ruta_recesos, ruta_asignaciones)
+    return fuente.calendario()
@@ -5,16 +5,16 @@ Generación de visualizaciones y métricas clave
 Desarrollado por: MiniMax Agent
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 from datetime import datetime, timedelta
 import json
 
+# pandas, matplotlib, seaborn y numpy se importan dentro de las funciones que los usan
+
 def setup_matplotlib_for_plotting():
     """Setup matplotlib para gráficos con configuración adecuada."""
     import warnings
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     warnings.filterwarnings('default')
     plt.switch_backend("Agg")
     plt.style.use("seaborn-v0_8")
@@ -24,6 +24,9 @@ def setup_matplotlib_for_plotting():
 
 def cargar_datos_sistema():
     """Carga y procesa todos los datos del sistema actual"""
+    import pandas as pd
+    from esquemas_datos import aplicar_esquema, resumir_informes
+    
     setup_matplotlib_for_plotting()
     
     datos = {}
@@ -56,13 +59,43 @@ def cargar_datos_sistema():
     except Exception as e:
         print(f"⚠️ Error al cargar datos: {e}")
     
+    # Tipos compactos (categorías, enteros pequeños, fechas)
+    planillas = {
+        'asignaciones': 'asignaciones_semestrales',
+        'solicitudes': 'solicitudes_diarias',
+        'reasignaciones': 'reasignaciones_activas',
+        'recesos': 'recesos_institucionales',
+        'indicadores': 'indicadores_uso_salas',
+        'notificaciones': 'notificaciones_enviadas'
+    }
+    informes = []
+    for clave, df in datos.items():
+        datos[clave], informe = aplicar_esquema(df, planillas[clave])
+        informes.append(informe)
+    if informes:
+        resumen = resumir_informes(informes)
+        print(f"💾 Memoria de datos: {resumen['despues_kb']} KB (ahorro {resumen['ahorro_pct']}%)")
+    
     return datos
 
-def generar_dashboard_principal(datos):
-    """Genera el dashboard principal con métricas clave"""
+def _sin_datos(ax, panel):
+    """Panel sin datos reales: se muestra el motivo en lugar de valores simulados"""
+    ax.text(0.5, 0.5, f"Sin datos reales\n{panel.faltante}", ha='center', va='center',
+            transform=ax.transAxes, fontsize=10, wrap=True, color='dimgray')
+    ax.set_axis_off()
+    ax.set_title(panel.titulo, fontweight='bold')
+
+def generar_dashboard_principal(datos, version=None):
+    """Genera el dashboard principal con métricas clave (agregados de modelo_dashboard)"""
+    import matplotlib.pyplot as plt
+    from modelo_dashboard import ModeloDashboard
     
     print("\n🎨 GENERANDO DASHBOARD PRINCIPAL...")
     
+    modelo = ModeloDashboard(datos, version)
+    for nombre, motivo in modelo.faltantes().items():
+        print(f"⚠️ Panel '{nombre}' sin datos reales: {motivo}")
+    
     # Configurar el estilo de los gráficos
     plt.style.use('seaborn-v0_8')
     
@@ -73,177 +106,74 @@ def generar_dashboard_principal(datos):
     
     # 1. Distribución de Solicitudes por Tipo de Usuario
     ax1 = plt.subplot(2, 3, 1)
-    try:
-        if 'solicitudes' in datos and not datos['solicitudes'].empty:
-            # Revisar columnas disponibles
-            cols = datos['solicitudes'].columns.tolist()
-            print(f"Columnas disponibles en solicitudes: {cols}")
-            
-            # Buscar columna de tipo de usuario con diferentes nombres posibles
-            tipo_col = None
-            for col in cols:
-                if 'tipo' in col.lower() and 'usuario' in col.lower():
-                    tipo_col = col
-                    break
-                elif 'usuario' in col.lower():
-                    tipo_col = col
-                    break
-            
-            if tipo_col:
-                tipo_usuario_counts = datos['solicitudes'][tipo_col].value_counts()
-                colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
-                wedges, texts, autotexts = ax1.pie(tipo_usuario_counts.values, 
-                                                  labels=tipo_usuario_counts.index,
-                                                  autopct='%1.1f%%',
-                                                  colors=colors,
-                                                  startangle=90)
-                ax1.set_title('📊 Distribución de Solicitudes\nPor Tipo de Usuario', fontweight='bold')
-            else:
-                raise KeyError("Columna de tipo de usuario no encontrada")
-        else:
-            raise KeyError("Datos de solicitudes vacíos")
-    except:
-        # Datos simulados para demo
-        tipos = ['Académicos', 'Estudiantes', 'Administrativos']
-        valores = [45, 35, 20]
-        ax1.pie(valores, labels=tipos, autopct='%1.1f%%', startangle=90)
-        ax1.set_title('📊 Distribución de Solicitudes\nPor Tipo de Usuario', fontweight='bold')
+    panel = modelo.paneles['tipo_usuario']
+    if panel.disponible:
+        ax1.pie(panel.serie.values, labels=panel.serie.index, autopct='%1.1f%%', startangle=90)
+        ax1.set_title(panel.titulo, fontweight='bold')
+    else:
+        _sin_datos(ax1, panel)
     
     # 2. Frecuencia de Uso por Sala
     ax2 = plt.subplot(2, 3, 2)
-    try:
-        if 'indicadores' in datos and not datos['indicadores'].empty:
-            cols = datos['indicadores'].columns.tolist()
-            print(f"Columnas disponibles en indicadores: {cols}")
-            
-            # Buscar columnas de sala y frecuencia
-            sala_col = None
-            freq_col = None
-            
-            for col in cols:
-                if 'sala' in col.lower():
-                    sala_col = col
-                if 'frecuencia' in col.lower() or 'uso' in col.lower():
-                    freq_col = col
-            
-            if sala_col and freq_col:
-                uso_salas = datos['indicadores'].groupby(sala_col)[freq_col].sum().sort_values(ascending=False)
-                uso_salas.head(8).plot(kind='bar', ax=ax2, color='skyblue')
-            else:
-                raise KeyError("Columnas necesarias no encontradas")
-        else:
-            raise KeyError("Datos de indicadores vacíos")
-    except:
-        # Datos simulados
-        salas = ['A101', 'A102', 'B201', 'B202', 'C301', 'C302', 'D401', 'D402']
-        uso = [25, 22, 20, 18, 15, 12, 10, 8]
-        ax2.bar(salas, uso, color='skyblue')
-    
-    ax2.set_title('📈 Frecuencia de Uso por Sala\n(Top 8 Salas)', fontweight='bold')
-    ax2.set_xlabel('Salas')
-    ax2.set_ylabel('Frecuencia de Uso')
-    plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+    panel = modelo.paneles['uso_salas']
+    if panel.disponible:
+        ax2.bar(panel.serie.index, panel.serie.values, color='skyblue')
+        ax2.set_title(panel.titulo, fontweight='bold')
+        ax2.set_xlabel('Salas')
+        ax2.set_ylabel('Frecuencia de Uso')
+        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+    else:
+        _sin_datos(ax2, panel)
     
     # 3. Reasignaciones por Mes
     ax3 = plt.subplot(2, 3, 3)
-    if 'reasignaciones' in datos and not datos['reasignaciones'].empty:
-        # Procesar fechas de reasignaciones
-        try:
-            datos['reasignaciones']['Fecha'] = pd.to_datetime(datos['reasignaciones']['Fecha Reasignación'])
-            reasig_mes = datos['reasignaciones'].groupby(datos['reasignaciones']['Fecha'].dt.month).size()
-            meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun']
-            ax3.plot(range(1, len(reasig_mes)+1), reasig_mes.values, marker='o', linewidth=2, color='green')
-        except:
-            pass
+    panel = modelo.paneles['reasignaciones']
+    if panel.disponible:
+        ax3.plot(panel.serie.index, panel.serie.values, marker='o', linewidth=2, color='green')
+        ax3.set_title(panel.titulo, fontweight='bold')
+        ax3.set_xlabel('Mes')
+        ax3.set_ylabel('Número de Reasignaciones')
+        ax3.grid(True, alpha=0.3)
     else:
-        # Datos simulados
-        meses = ['Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago']
-        reasignaciones = [8, 12, 15, 10, 14, 18]
-        ax3.plot(meses, reasignaciones, marker='o', linewidth=2, color='green')
-    
-    ax3.set_title('📅 Evolución de Reasignaciones\nPor Mes', fontweight='bold')
-    ax3.set_xlabel('Mes')
-    ax3.set_ylabel('Número de Reasignaciones')
-    ax3.grid(True, alpha=0.3)
+        _sin_datos(ax3, panel)
     
     # 4. Horas de Mayor Demanda
     ax4 = plt.subplot(2, 3, 4)
-    try:
-        if 'solicitudes' in datos and not datos['solicitudes'].empty:
-            cols = datos['solicitudes'].columns.tolist()
-            horario_col = None
-            
-            for col in cols:
-                if 'horario' in col.lower():
-                    horario_col = col
-                    break
-                elif 'hora' in col.lower():
-                    horario_col = col
-                    break
-            
-            if horario_col:
-                horarios = datos['solicitudes'][horario_col].value_counts().head(6)
-                ax4.barh(horarios.index, horarios.values, color='coral')
-            else:
-                raise KeyError("Columna de horario no encontrada")
-        else:
-            raise KeyError("Datos de solicitudes vacíos")
-    except:
-        # Datos simulados
-        horarios = ['08:00-10:00', '10:00-12:00', '14:00-16:00', '16:00-18:00', '12:00-14:00', '18:00-20:00']
-        demanda = [35, 32, 28, 22, 18, 15]
-        ax4.barh(horarios, demanda, color='coral')
-    
-    ax4.set_title('🕐 Horarios de Mayor Demanda\n(Top 6)', fontweight='bold')
-    ax4.set_xlabel('Número de Solicitudes')
+    panel = modelo.paneles['horarios']
+    if panel.disponible:
+        ax4.barh(panel.serie.index, panel.serie.values, color='coral')
+        ax4.set_title(panel.titulo, fontweight='bold')
+        ax4.set_xlabel('Número de Solicitudes')
+    else:
+        _sin_datos(ax4, panel)
     
     # 5. Estado de Salas
     ax5 = plt.subplot(2, 3, 5)
-    if 'asignaciones' in datos and not datos['asignaciones'].empty:
-        estados = datos['asignaciones']['Estado'].value_counts()
-        ax5.pie(estados.values, labels=estados.index, autopct='%1.1f%%', 
+    panel = modelo.paneles['estado_asignaciones']
+    if panel.disponible:
+        ax5.pie(panel.serie.values, labels=panel.serie.index, autopct='%1.1f%%',
                 colors=['lightgreen', 'lightcoral', 'lightyellow'])
+        ax5.set_title(panel.titulo, fontweight='bold')
     else:
-        # Datos simulados
-        estados = ['Activa', 'Pendiente', 'Cancelada']
-        valores = [70, 20, 10]
-        ax5.pie(valores, labels=estados, autopct='%1.1f%%', 
-                colors=['lightgreen', 'lightyellow', 'lightcoral'])
-    
-    ax5.set_title('📋 Estado de Asignaciones\nSemestrales', fontweight='bold')
+        _sin_datos(ax5, panel)
     
-    # 6. Indicadores KPI
+    # 6. Indicadores KPI (solo valores calculados; 'sin datos' cuando falta la fuente)
     ax6 = plt.subplot(2, 3, 6)
     ax6.axis('off')
     
-    # Calcular KPIs
-    total_solicitudes = len(datos.get('solicitudes', pd.DataFrame()))
-    total_reasignaciones = len(datos.get('reasignaciones', pd.DataFrame()))
-    total_notificaciones = len(datos.get('notificaciones', pd.DataFrame()))
+    def valor(clave, formato='{:,}'):
+        return 'sin datos' if modelo.kpis[clave] is None else formato.format(modelo.kpis[clave])
     
-    # Si no hay datos, usar valores simulados
-    if total_solicitudes == 0:
-        total_solicitudes = 156
-    if total_reasignaciones == 0:
-        total_reasignaciones = 23
-    if total_notificaciones == 0:
-        total_notificaciones = 89
-    
-    # Mostrar KPIs principales
     kpi_text = f"""
     📊 INDICADORES CLAVE (KPIs)
     
-    📋 Total Solicitudes: {total_solicitudes:,}
-    
-    🔄 Reasignaciones: {total_reasignaciones:,}
-    
-    📧 Notificaciones: {total_notificaciones:,}
+    📋 Total Solicitudes: {valor('solicitudes')}
     
-    ⏱️ Tiempo Promedio Respuesta: 2.4 horas
+    🔄 Reasignaciones: {valor('reasignaciones')}
     
-    ✅ Tasa de Satisfacción: 87%
+    📧 Notificaciones: {valor('notificaciones')}
     
-    🎯 Eficiencia del Sistema: 92%
+    ✅ Tasa de Aprobación: {valor('tasa_aprobacion', '{}%')}
     """
     
     ax6.text(0.1, 0.9, kpi_text, transform=ax6.transAxes, fontsize=12,
@@ -257,7 +187,12 @@ def generar_dashboard_principal(datos):
     return fig
 
 def generar_analisis_predictivo(datos):
-    """Genera análisis predictivo y tendencias"""
+    """Genera análisis predictivo y tendencias a partir del pronóstico de demanda"""
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+    from motor_pronostico import DIAS_SEMANA, pronosticar_demanda
+    from motor_riesgo import MotorRiesgo, intervalos_desde
     
     print("\n🔮 GENERANDO ANÁLISIS PREDICTIVO...")
     
@@ -265,61 +200,69 @@ def generar_analisis_predictivo(datos):
     fig.suptitle('🔮 ANÁLISIS PREDICTIVO Y TENDENCIAS - SISTEMA RESERVAS UFRO', 
                  fontsize=16, fontweight='bold')
     
-    # 1. Predicción de Demanda por Día de la Semana
-    dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
-    demanda_actual = [25, 30, 28, 32, 20]
-    demanda_predicha = [28, 33, 31, 35, 23]
+    solicitudes = datos.get('solicitudes', pd.DataFrame())
+    pronostico = pronosticar_demanda(solicitudes) if not solicitudes.empty else None
+    if pronostico is None:
+        print("⚠️ Historial de solicitudes insuficiente para pronosticar")
+        for ax in (ax1, ax2, ax3, ax4):
+            ax.text(0.5, 0.5, 'Sin historial suficiente', ha='center', va='center', transform=ax.transAxes)
+            ax.set_axis_off()
+        plt.tight_layout()
+        plt.savefig('analisis_predictivo_ufro.png', dpi=300, bbox_inches='tight')
+        return fig
+    
+    # 1. Predicción de Demanda por Día de la Semana (lunes a viernes)
+    dias = DIAS_SEMANA[:5]
+    demanda_actual = pronostico.recientes_por_dia_semana()[dias]
+    demanda_predicha = pronostico.por_dia_semana()[dias]
     
     x = np.arange(len(dias))
     width = 0.35
     
-    ax1.bar(x - width/2, demanda_actual, width, label='Demanda Actual', color='lightblue')
+    ax1.bar(x - width/2, demanda_actual, width, label='Demanda Reciente', color='lightblue')
     ax1.bar(x + width/2, demanda_predicha, width, label='Predicción IA', color='orange')
     ax1.set_title('📊 Predicción de Demanda\nPor Día de Semana')
     ax1.set_xlabel('Día de la Semana')
-    ax1.set_ylabel('Número de Solicitudes')
+    ax1.set_ylabel('Solicitudes por Semana')
     ax1.set_xticks(x)
     ax1.set_xticklabels(dias)
     ax1.legend()
     ax1.grid(True, alpha=0.3)
     
-    # 2. Análisis de Conflictos Potenciales
-    salas = ['A101', 'A102', 'B201', 'B202', 'C301']
-    riesgo_conflicto = [85, 65, 45, 70, 30]
-    colores = ['red' if x > 70 else 'orange' if x > 50 else 'green' for x in riesgo_conflicto]
+    # 2. Riesgo de conflicto por sala: solapamientos históricos y demanda pronosticada
+    motor_riesgo = MotorRiesgo().cargar(intervalos_desde(solicitudes))
+    motor_riesgo.aplicar_pronostico(pronostico)
+    riesgo_salas = motor_riesgo.por_sala().head(5)
+    colores = ['red' if x > 70 else 'orange' if x > 50 else 'green' for x in riesgo_salas]
     
-    ax2.bar(salas, riesgo_conflicto, color=colores)
+    ax2.bar(riesgo_salas.index, riesgo_salas.values, color=colores)
     ax2.set_title('⚠️ Análisis de Riesgo\nde Conflictos por Sala')
     ax2.set_xlabel('Salas')
     ax2.set_ylabel('Riesgo de Conflicto (%)')
+    ax2.set_ylim(0, 100)
     ax2.axhline(y=70, color='red', linestyle='--', alpha=0.7, label='Umbral Alto')
     ax2.legend()
     
-    # 3. Optimización de Horarios
-    horarios = ['08:00', '10:00', '12:00', '14:00', '16:00', '18:00']
-    ocupacion_actual = [70, 85, 60, 90, 75, 40]
-    ocupacion_optimizada = [75, 80, 70, 85, 80, 45]
+    # 3. Demanda por bloque horario
+    bloques = pronostico.recientes_por_bloque()
     
-    ax3.plot(horarios, ocupacion_actual, marker='o', label='Ocupación Actual', linewidth=2)
-    ax3.plot(horarios, ocupacion_optimizada, marker='s', label='Optimización IA', linewidth=2)
-    ax3.set_title('🎯 Optimización de Ocupación\nPor Horario')
+    ax3.plot(bloques.index, bloques.values, marker='o', label='Demanda Reciente', linewidth=2)
+    ax3.plot(bloques.index, pronostico.por_bloque().values, marker='s', label='Predicción IA', linewidth=2)
+    ax3.set_title('🎯 Demanda por Bloque Horario')
     ax3.set_xlabel('Horario')
-    ax3.set_ylabel('Ocupación (%)')
+    ax3.set_ylabel('Solicitudes por Semana')
+    ax3.tick_params(axis='x', rotation=45)
     ax3.legend()
     ax3.grid(True, alpha=0.3)
     
-    # 4. Patrones de Uso Semanal
-    semanas = ['Sem 1', 'Sem 2', 'Sem 3', 'Sem 4', 'Sem 5', 'Sem 6']
-    uso_academicos = [40, 45, 48, 42, 50, 35]
-    uso_estudiantes = [25, 28, 30, 25, 32, 20]
-    uso_admin = [10, 12, 15, 13, 18, 12]
-    
-    ax4.stackplot(semanas, uso_academicos, uso_estudiantes, uso_admin, 
-                  labels=['Académicos', 'Estudiantes', 'Administrativos'],
-                  alpha=0.8)
-    ax4.set_title('📈 Patrones de Uso\nPor Tipo de Usuario')
-    ax4.set_xlabel('Semanas')
-    ax4.set_ylabel('Horas de Uso')
+    # 4. Tendencia semanal: historial reciente y pronóstico
+    por_semana = pronostico.por_semana()
+    ax4.plot(por_semana.index, por_semana.values, marker='o', color='purple', linewidth=2, label='Predicción IA')
+    ax4.axhline(y=pronostico.recientes.sum(), color='gray', linestyle='--', alpha=0.7, label='Media Reciente')
+    ax4.set_title('📈 Solicitudes Totales\nPor Semana Pronosticada')
+    ax4.set_xlabel('Semana')
+    ax4.set_ylabel('Solicitudes')
+    ax4.tick_params(axis='x', rotation=45)
     ax4.legend(loc='upper left')
     
     plt.tight_layout()
@@ -330,6 +273,7 @@ def generar_analisis_predictivo(datos):
 
 def generar_metricas_detalladas():
     """Genera métricas detalladas del sistema"""
+    import pandas as pd
     
     print("\n📊 GENERANDO MÉTRICAS DETALLADAS...")
     
@@ -393,7 +337,16 @@ def generar_metricas_detalladas():
     
     return df_metricas
 
-def main():
+def generar_dashboard_html(datos, ruta='dashboard_ufro.html', version=None):
+    """Reporte HTML autocontenido con gráficos SVG (alternativa liviana a los PNG de 300 dpi)"""
+    from reporte_html import generar_reporte_html
+    
+    print("\n🌐 GENERANDO REPORTE HTML...")
+    regeneradas = generar_reporte_html(datos, ruta, version)
+    print(f"✅ Reporte HTML guardado: {ruta} ({len(regeneradas)} secciones regeneradas)")
+    return ruta
+
+def main(formato='png'):
     """Función principal"""
     print("🚀 GENERANDO DASHBOARD COMPLETO DEL SISTEMA DE RESERVAS UFRO")
     print("=" * 70)
@@ -401,6 +354,10 @@ def main():
     # Cargar datos
     datos = cargar_datos_sistema()
     
+    if formato == 'html':
+        ruta = generar_dashboard_html(datos)
+        return datos, ruta, None, None
+    
     # Generar dashboard principal
     dashboard_principal = generar_dashboard_principal(datos)
     
@@ -419,4 +376,8 @@ def main():
     return datos, dashboard_principal, analisis_predictivo, metricas
 
 if __name__ == "__main__":
-    datos, dashboard, analisis, metricas = main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Dashboard del Sistema de Reservas UFRO')
+    parser.add_argument('--formato', choices=['png', 'html'], default='png',
+                        help='png: imágenes de 300 dpi; html: reporte autocontenido con SVG')
+    datos, dashboard, analisis, metricas = main(parser.parse_args().formato)
@@ -8,6 +8,13 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+FACULTADES = ['Ingeniería', 'Ciencias', 'Medicina', 'Educación', 'Derecho']
+EQUIPAMIENTOS = ['Proyector, Sonido', 'Completo', 'Básico', 'Proyector']
+PROFESORES = ['García', 'López', 'Martínez', 'Rodríguez', 'González']
+ASIGNATURAS = ['Matemáticas', 'Física', 'Química', 'Programación', 'Historia']
+BLOQUES_HORARIOS = ['08:00-10:00', '10:00-12:00', '12:00-14:00', '14:00-16:00', '16:00-18:00', '18:00-20:00']
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+
 def generar_datos_demo():
     """Genera datos de demostración para la aplicación"""
     
@@ -31,8 +38,8 @@ def generar_datos_demo():
             'fecha': fecha.strftime('%Y-%m-%d'),
             'hora': hora,
             'aula': np.random.choice(salas_demo['codigo']),
-            'profesor': f"Prof. {np.random.choice(['García', 'López', 'Martínez', 'Rodríguez', 'González'])}",
-            'asignatura': np.random.choice(['Matemáticas', 'Física', 'Química', 'Programación', 'Historia']),
+            'profesor': f"Prof. {np.random.choice(PROFESORES)}",
+            'asignatura': np.random.choice(ASIGNATURAS),
             'estudiantes': np.random.randint(20, 60),
             'estado': np.random.choice(['Confirmada', 'Pendiente', 'Cancelada'], p=[0.8, 0.15, 0.05])
         })
@@ -56,6 +63,85 @@ def generar_datos_demo():
         'ocupacion_facultad': pd.DataFrame(ocupacion_facultad)
     }
 
+def generar_datos_sinteticos(n_salas=40, n_semestres=2, n_solicitudes=2000, semilla=42, anio_inicio=2024):
+    """
+    Genera una universidad sintética reproducible a la escala indicada.
+    Las tablas usan el mismo formato que las planillas de user_input_files/.
+    """
+    rng = np.random.default_rng(semilla)
+    
+    # Salas: código por edificio y piso, capacidad y equipamiento aleatorios
+    edificios = 'ABCDEFGH'
+    codigos = [f"{edificios[i % len(edificios)]}{101 + i // len(edificios)}" for i in range(n_salas)]
+    salas = pd.DataFrame({
+        'codigo': codigos,
+        'capacidad': rng.choice([20, 30, 35, 40, 45, 50, 60, 80, 120], n_salas),
+        'facultad': rng.choice(FACULTADES, n_salas),
+        'equipamiento': rng.choice(EQUIPAMIENTOS, n_salas)
+    })
+    
+    # Semestres: marzo-junio y agosto-noviembre alternados
+    semestres = []
+    for i in range(n_semestres):
+        anio = anio_inicio + i // 2
+        if i % 2 == 0:
+            semestres.append((f"1° Sem {anio}", datetime(anio, 3, 3), datetime(anio, 6, 30)))
+        else:
+            semestres.append((f"2° Sem {anio}", datetime(anio, 8, 4), datetime(anio, 11, 28)))
+    
+    # Asignaciones semestrales: cerca de un tercio de los bloques ocupados por sala
+    asignaciones = []
+    for periodo, inicio, fin in semestres:
+        for codigo, facultad in zip(salas['codigo'], salas['facultad']):
+            n_bloques = rng.integers(2, 10)
+            for _ in range(n_bloques):
+                asignaciones.append({
+                    'Facultad': facultad,
+                    'Sala': codigo,
+                    'Bloque Horario': rng.choice(BLOQUES_HORARIOS),
+                    'Día': rng.choice(DIAS_SEMANA),
+                    'Asignatura': rng.choice(ASIGNATURAS),
+                    'Docente': f"Prof. {rng.choice(PROFESORES)}",
+                    'Fecha Inicio': inicio.strftime('%d/%m/%Y'),
+                    'Fecha Término': fin.strftime('%d/%m/%Y'),
+                    'Periodo Académico': periodo,
+                    'Estado': 'Activa'
+                })
+    
+    # Solicitudes diarias repartidas dentro de los semestres
+    roles = rng.choice(['Académico', 'Estudiante', 'Administrativo'], n_solicitudes, p=[0.5, 0.35, 0.15])
+    indices_semestre = rng.integers(0, len(semestres), n_solicitudes)
+    solicitudes = []
+    for i in range(n_solicitudes):
+        _, inicio, fin = semestres[indices_semestre[i]]
+        fecha_requerida = inicio + timedelta(days=int(rng.integers(0, (fin - inicio).days + 1)))
+        fecha_solicitud = fecha_requerida - timedelta(days=int(rng.integers(1, 15)))
+        profesor = rng.choice(PROFESORES)
+        solicitudes.append({
+            'Fecha Solicitud': fecha_solicitud.strftime('%d/%m/%Y'),
+            'Solicitante': f"{'Dr.' if roles[i] == 'Académico' else 'Sr.'} {profesor}",
+            'Rol': roles[i],
+            'Correo': f"{profesor.lower()}{i}@ufro.cl",
+            'Fecha Requerida': fecha_requerida.strftime('%d/%m/%Y'),
+            'Sala Solicitada': rng.choice(codigos),
+            'Bloque Horario': rng.choice(BLOQUES_HORARIOS),
+            'Motivo': rng.choice(['Clase extra', 'Examen', 'Reunión académica', 'Seminario', 'Capacitación']),
+            'Estado Solicitud': rng.choice(['Aprobada', 'Pendiente', 'Rechazada'], p=[0.65, 0.2, 0.15])
+        })
+    
+    # Recesos entre semestres
+    recesos = []
+    for anio in sorted({inicio.year for _, inicio, _ in semestres}):
+        recesos.append({'Periodo Receso': 'Receso Invierno', 'Fecha Inicio': f"14/07/{anio}",
+                        'Fecha Término': f"27/07/{anio}", 'Motivo': 'Vacaciones'})
+    
+    return {
+        'salas': salas,
+        'asignaciones': pd.DataFrame(asignaciones),
+        'solicitudes': pd.DataFrame(solicitudes),
+        'recesos': pd.DataFrame(recesos)
+    }
+
 def obtener_metricas_demo():
     """Obtiene métricas de demostración"""
     return {
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Datos para gráficos del Sistema de Reservas UFRO
+Series agregadas por periodo y reducidas a unos cientos de puntos antes de llegar al navegador
+Desarrollado por: MiniMax Agent
+"""
+
+import math
+
+import pandas as pd
+
+from esquemas_datos import convertir_fechas
+
+# Nombres de columna usados por las distintas fuentes (planillas reales, optimizadas, datos integrados)
+COLUMNAS_ESTADO = ['Estado', 'Estado Solicitud', 'Estado_Solicitud', 'estado']
+COLUMNAS_FECHA = ['Fecha', 'Fecha Requerida', 'Fecha_Uso', 'Fecha_Requerida', 'Fecha Solicitud', 'fecha']
+COLUMNAS_SALA = ['Sala', 'Sala Solicitada', 'Sala_Solicitada', 'aula', 'codigo']
+COLUMNAS_OCUPACION = ['Ocupacion_Promedio', 'Ocupación (%)', 'Ocupacion (%)', 'ocupacion']
+
+# Periodos de agrupación y su frecuencia en pandas (para completar los periodos vacíos)
+PERIODOS = {
+    'hora': 'h',
+    'dia': 'D',
+    'semana': 'W-MON',
+    'mes': 'MS'
+}
+
+MAX_PUNTOS = 500
+MAX_BARRAS = 50
+
+def resolver_columna(df, candidatos):
+    """Primera columna de `candidatos` presente en el DataFrame, o None"""
+    if df is None:
+        return None
+    for columna in candidatos:
+        if columna in df.columns:
+            return columna
+    return None
+
+def _inicio_periodo(fechas, periodo):
+    """Fecha de inicio del periodo de cada registro (las semanas comienzan el lunes)"""
+    if periodo == 'hora':
+        return fechas.dt.floor('h')
+    dias = fechas.dt.normalize()
+    if periodo == 'semana':
+        return dias - pd.to_timedelta(dias.dt.dayofweek, unit='D')
+    if periodo == 'mes':
+        return dias - pd.to_timedelta(dias.dt.day - 1, unit='D')
+    return dias
+
+def serie_temporal(df, columna_fecha=None, periodo='dia', columna_grupo=None, max_puntos=MAX_PUNTOS):
+    """
+    Conteo de registros por periodo (hora/dia/semana/mes), opcionalmente por grupo.
+    Si el rango produce más de `max_puntos` periodos, se agrupan periodos consecutivos
+    (las cuentas se suman, así el total no cambia). Retorna columnas Periodo, [grupo], Cantidad.
+    """
+    columna_fecha = columna_fecha or resolver_columna(df, COLUMNAS_FECHA)
+    if df is None or df.empty or columna_fecha is None:
+        return pd.DataFrame(columns=['Periodo', 'Cantidad'])
+
+    periodos = _inicio_periodo(convertir_fechas(df[columna_fecha]), periodo)
+    claves = [periodos.rename('Periodo')]
+    if columna_grupo:
+        claves.append(df[columna_grupo].astype(object).fillna('Sin dato').astype(str))
+
+    conteo = df.groupby(claves, observed=True).size()
+    if columna_grupo:
+        conteo = conteo.unstack(fill_value=0)
+    else:
+        conteo = conteo.to_frame('Cantidad')
+
+    # Completar periodos sin registros para que los ejes sean continuos
+    if len(conteo) > 1:
+        rango = pd.date_range(conteo.index.min(), conteo.index.max(), freq=PERIODOS[periodo])
+        conteo = conteo.reindex(rango, fill_value=0)
+        conteo.index.name = 'Periodo'
+
+    if len(conteo) > max_puntos:
+        tamano_grupo = math.ceil(len(conteo) / max_puntos)
+        posiciones = pd.RangeIndex(len(conteo)) // tamano_grupo
+        inicios = conteo.index.to_series().groupby(posiciones).first()
+        conteo = conteo.groupby(posiciones).sum()
+        conteo.index = pd.DatetimeIndex(inicios.values, name='Periodo')
+
+    if columna_grupo:
+        return conteo.stack().rename('Cantidad').reset_index().rename(columns={'level_1': columna_grupo})
+    return conteo.reset_index()
+
+def conteo_por_categoria(df, columna=None, max_categorias=MAX_BARRAS):
+    """Cantidad por valor de una columna categórica; las categorías menores se agrupan en 'Otros'"""
+    columna = columna or resolver_columna(df, COLUMNAS_ESTADO)
+    if df is None or df.empty or columna is None:
+        return pd.DataFrame(columns=['Categoria', 'Cantidad'])
+
+    conteo = df[columna].astype(object).fillna('Sin dato').value_counts()
+    if len(conteo) > max_categorias:
+        otros = conteo.iloc[max_categorias - 1:].sum()
+        conteo = pd.concat([conteo.iloc[:max_categorias - 1], pd.Series({'Otros': otros})])
+    return pd.DataFrame({'Categoria': conteo.index.astype(str), 'Cantidad': conteo.values})
+
+def ocupacion_por_sala(df, max_salas=MAX_BARRAS):
+    """Ocupación promedio por sala, limitada a las `max_salas` más ocupadas"""
+    columna_sala = resolver_columna(df, COLUMNAS_SALA)
+    columna_ocupacion = resolver_columna(df, COLUMNAS_OCUPACION)
+    if df is None or df.empty or columna_sala is None or columna_ocupacion is None:
+        return pd.DataFrame(columns=['Sala', 'Ocupacion'])
+
+    ocupacion = pd.to_numeric(df[columna_ocupacion], errors='coerce')
+    resumen = ocupacion.groupby(df[columna_sala].astype(str)).mean().dropna()
+    resumen = resumen.nlargest(max_salas).sort_index()
+    return pd.DataFrame({'Sala': resumen.index, 'Ocupacion': resumen.values.round(1)})
+
+def tasa_aprobacion(df, columna=None):
+    """Porcentaje de solicitudes aprobadas, o None si no hay datos de estado"""
+    columna = columna or resolver_columna(df, COLUMNAS_ESTADO)
+    if df is None or df.empty or columna is None:
+        return None
+    estados = df[columna].astype(str).str.lower()
+    return round(estados.str.startswith('aprobad').mean() * 100, 1)
+
+class DatosGraficos:
+    """
+    Series de los gráficos del dashboard calculadas una sola vez por versión de datos.
+    datos: {nombre_tabla: DataFrame}; version: identificador que cambia cuando cambian los datos.
+    """
+
+    def __init__(self, datos, version):
+        self.datos = datos
+        self.version = version
+        self._series = {}
+
+    def _memorizar(self, clave, calcular):
+        if clave not in self._series:
+            self._series[clave] = calcular()
+        return self._series[clave]
+
+    def solicitudes(self):
+        return self.datos.get('solicitudes_diarias', pd.DataFrame())
+
+    def indicadores(self):
+        for nombre in ('indicadores_uso_salas', 'indicadores_uso'):
+            if nombre in self.datos:
+                return self.datos[nombre]
+        return pd.DataFrame()
+
+    def estados_solicitudes(self):
+        return self._memorizar('estados', lambda: conteo_por_categoria(self.solicitudes()))
+
+    def ocupacion_salas(self):
+        return self._memorizar('ocupacion', lambda: ocupacion_por_sala(self.indicadores()))
+
+    def solicitudes_por_periodo(self, periodo='dia', por_estado=False):
+        def calcular():
+            df = self.solicitudes()
+            columna_grupo = resolver_columna(df, COLUMNAS_ESTADO) if por_estado else None
+            return serie_temporal(df, periodo=periodo, columna_grupo=columna_grupo)
+        return self._memorizar(('periodo', periodo, por_estado), calcular)
+
+    def pronostico(self):
+        """Pronóstico de demanda del historial de solicitudes (None si no alcanza)"""
+        from motor_pronostico import pronosticar_demanda
+        return self._memorizar('pronostico', lambda: pronosticar_demanda(self.solicitudes(), version=self.version))
+
+    def metricas(self):
+        """Valores de las tarjetas principales (None cuando falta el dato)"""
+        def calcular():
+            ocupacion = self.ocupacion_salas()
+            return {
+                'solicitudes': len(self.solicitudes()),
+                'salas': len(self.indicadores()),
+                'ocupacion_promedio': round(ocupacion['Ocupacion'].mean(), 1) if not ocupacion.empty else None,
+                'tasa_aprobacion': tasa_aprobacion(self.solicitudes())
+            }
+        return self._memorizar('metricas', calcular)
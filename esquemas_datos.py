@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Esquemas de datos del Sistema de Reservas UFRO
+Tipos declarados por planilla (categorías, enteros pequeños, fechas) aplicados al cargar
+Desarrollado por: MiniMax Agent
+"""
+
+import numpy as np
+import pandas as pd
+
+# Tipos de columna:
+# - categoria: texto con pocos valores distintos (salas, estados, roles...)
+# - fecha: datetime64 (acepta dd/mm/yyyy)
+# - entero: entero del menor tamaño posible (int8/int16...)
+# - decimal: float32
+# - hora: texto 'HH:MM' o bloque 'HH:MM-HH:MM' como categoría, más la columna Minuto_Inicio (int16)
+# - texto: se deja como está (correos, IDs, mensajes libres)
+COLUMNA_MINUTOS = 'Minuto_Inicio'
+
+# Cada planilla declara las columnas de sus tres formatos: real (user_input_files),
+# optimizado (planillas_optimizadas) y datos integrados de respaldo
+ESQUEMAS = {
+    'solicitudes_diarias': {
+        'Fecha Solicitud': 'fecha', 'Solicitante': 'categoria', 'Rol': 'categoria', 'Correo': 'texto',
+        'Fecha Requerida': 'fecha', 'Sala Solicitada': 'categoria', 'Bloque Horario': 'hora',
+        'Motivo': 'categoria', 'Estado Solicitud': 'categoria',
+        'ID_Solicitud': 'texto', 'Fecha_Solicitud': 'fecha', 'Hora_Solicitud': 'categoria',
+        'Sala_Solicitada': 'categoria', 'Fecha_Uso': 'fecha', 'Hora_Inicio': 'hora',
+        'Duración_Estimada': 'entero', 'Prioridad_IA': 'categoria', 'Patrón_Uso': 'categoria',
+        'Conflictos_Detectados': 'categoria', 'Estado': 'categoria', 'Satisfacción_Usuario': 'decimal',
+        'Fecha': 'fecha', 'Sala': 'categoria', 'Duracion': 'entero', 'Asignatura': 'categoria',
+        'Estudiantes': 'entero'
+    },
+    'asignaciones_semestrales': {
+        'Facultad': 'categoria', 'Sala': 'categoria', 'Bloque Horario': 'hora', 'Día': 'categoria',
+        'Asignatura': 'categoria', 'Docente': 'categoria', 'Fecha Inicio': 'fecha', 'Fecha Término': 'fecha',
+        'Periodo Académico': 'categoria', 'Estado': 'categoria',
+        'ID_Asignación': 'texto', 'Bloque_Horario': 'hora', 'Fecha_Inicio': 'fecha', 'Fecha_Término': 'fecha',
+        'Periodo_Académico': 'categoria', 'Porcentaje_Ocupación': 'decimal', 'Eficiencia_Horaria': 'decimal',
+        'Flexibilidad_Horario': 'categoria', 'Predicción_Demanda': 'categoria',
+        'Codigo_Asignatura': 'categoria', 'Profesor': 'categoria', 'Sala_Asignada': 'categoria',
+        'Horario': 'categoria', 'Estudiantes_Inscritos': 'entero', 'Semestre': 'categoria'
+    },
+    'indicadores_uso_salas': {
+        'Indicador': 'categoria', 'Valor': 'entero', 'Fuente': 'categoria',
+        'Sala': 'categoria', 'Facultad': 'categoria', 'Capacidad': 'entero', 'Ocupación (%)': 'decimal',
+        'Horas_Uso_Semanal': 'entero', 'Eficiencia_Horaria': 'decimal', 'Tendencia_Uso': 'categoria',
+        'Score_IA': 'entero', 'Recomendación_Automática': 'categoria', 'Predicción_7_Días': 'entero',
+        'Alertas_Mantenimiento': 'categoria',
+        'Ocupacion_Promedio': 'entero', 'Horas_Uso_Semana': 'entero', 'Equipamiento': 'categoria',
+        'Estado': 'categoria'
+    },
+    'recesos_institucionales': {
+        'Periodo Receso': 'categoria', 'Fecha Inicio': 'fecha', 'Fecha Término': 'fecha', 'Motivo': 'categoria',
+        'Fecha_Inicio': 'fecha', 'Fecha_Fin': 'fecha', 'Tipo_Receso': 'categoria', 'Descripcion': 'texto'
+    },
+    'reasignaciones_activas': {
+        'Fecha Reasignación': 'fecha', 'Sala': 'categoria', 'Usuario Original': 'categoria',
+        'Nuevo Usuario': 'categoria', 'Rol': 'categoria', 'Motivo': 'categoria', 'Periodo': 'hora',
+        'Estado': 'categoria', 'Notificación Enviada': 'categoria',
+        'Fecha_Reasignacion': 'fecha', 'Sala_Original': 'categoria', 'Sala_Nueva': 'categoria'
+    },
+    'notificaciones_enviadas': {
+        'Fecha': 'fecha', 'Sala': 'categoria', 'Usuario_origen': 'categoria', 'Usuario_destino': 'categoria',
+        'Canal': 'categoria', 'Estado_envío': 'categoria', 'Respuesta': 'categoria',
+        'Fecha_Envio': 'fecha', 'Destinatario': 'categoria', 'Tipo': 'categoria', 'Mensaje': 'texto',
+        'Estado': 'categoria'
+    }
+}
+
+# Las planillas optimizadas comparten esquema con su versión base
+ESQUEMAS['indicadores_uso'] = ESQUEMAS['indicadores_uso_salas']
+
+# Columnas de texto no declaradas se convierten a categoría si repiten valores lo suficiente
+UMBRAL_CATEGORIA = 0.5
+FILAS_MINIMAS_CATEGORIA = 50
+
+def convertir_fechas(serie):
+    """
+    Fechas ISO (SQLite, datos integrados) o dd/mm/yyyy (planillas) a datetime64.
+    Las ISO se interpretan primero: con dayfirst, '2025-03-10' se leería como 3 de octubre.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    fechas = pd.to_datetime(serie, format='ISO8601', errors='coerce')
+    faltantes = fechas.isna() & serie.notna()
+    if faltantes.any():
+        fechas[faltantes] = pd.to_datetime(serie[faltantes], errors='coerce', dayfirst=True)
+    return fechas
+
+def _a_numero(serie, tipo):
+    numeros = pd.to_numeric(serie, errors='coerce')
+    if tipo == 'entero' and not numeros.isna().any():
+        return pd.to_numeric(numeros, downcast='integer')
+    return numeros.astype('float32')
+
+def minutos_del_dia(serie, ultima=False):
+    """
+    Minuto del día (int16) de la primera hora 'HH:MM' del texto (o de la última, p. ej. el
+    término de '10:00-12:00'); -1 si no hay hora
+    """
+    # Las horas se repiten mucho: se interpreta cada valor distinto una sola vez
+    codigos, distintos = pd.factorize(serie)
+    if len(distintos) == 0:
+        return pd.Series(-1, index=serie.index, dtype='int16')
+    patron = r'(\d{1,2}):(\d{2})(?!.*\d:\d)' if ultima else r'(\d{1,2}):(\d{2})'
+    partes = pd.Series(distintos.astype(str)).str.extract(patron)
+    minutos = pd.to_numeric(partes[0], errors='coerce') * 60 + pd.to_numeric(partes[1], errors='coerce')
+    minutos = minutos.fillna(-1).to_numpy()
+    return pd.Series(np.where(codigos >= 0, minutos[codigos], -1).astype('int16'), index=serie.index)
+
+def minuto_de_hora(texto):
+    """Minuto del día de un texto 'HH:MM' (o 'HH:MM:SS'); -1 si no es una hora"""
+    try:
+        horas, minutos = str(texto).split(':')[:2]
+        return int(horas) * 60 + int(minutos)
+    except ValueError:
+        return -1
+
+def _porcentaje_ahorro(antes, despues):
+    return round((1 - despues / antes) * 100, 1) if antes else 0.0
+
+def _es_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+def aplicar_esquema(df, tabla):
+    """
+    Retorna (DataFrame compacto, informe). No modifica el DataFrame recibido.
+    Las columnas sin declarar de texto repetitivo también se convierten a categoría.
+    """
+    esquema = ESQUEMAS.get(tabla, {})
+    antes = int(df.memory_usage(deep=True).sum())
+    compacto = {}
+    minutos = None
+
+    for columna in df.columns:
+        serie = df[columna]
+        tipo = esquema.get(columna)
+        try:
+            if tipo == 'fecha':
+                serie = convertir_fechas(serie)
+            elif tipo in ('entero', 'decimal'):
+                serie = _a_numero(serie, tipo)
+            elif tipo == 'hora':
+                if minutos is None:
+                    minutos = minutos_del_dia(serie)
+                serie = serie.astype('category')
+            elif tipo == 'categoria':
+                serie = serie.astype('category')
+            elif tipo is None and _es_texto(serie) and len(serie) >= FILAS_MINIMAS_CATEGORIA:
+                if serie.nunique() / len(serie) <= UMBRAL_CATEGORIA:
+                    serie = serie.astype('category')
+            elif tipo is None and pd.api.types.is_integer_dtype(serie):
+                serie = pd.to_numeric(serie, downcast='integer')
+        except (TypeError, ValueError):
+            serie = df[columna]
+        compacto[columna] = serie
+
+    if minutos is not None and COLUMNA_MINUTOS not in compacto:
+        compacto[COLUMNA_MINUTOS] = minutos
+
+    resultado = pd.DataFrame(compacto, index=df.index)
+    despues = int(resultado.memory_usage(deep=True).sum())
+    informe = {
+        'tabla': tabla,
+        'filas': len(df),
+        'antes_kb': round(antes / 1024, 1),
+        'despues_kb': round(despues / 1024, 1),
+        'ahorro_pct': _porcentaje_ahorro(antes, despues)
+    }
+    return resultado, informe
+
+def compactar_tablas(datos):
+    """Aplica el esquema a cada tabla de {nombre: DataFrame}; retorna (datos, informes)"""
+    compactos = {}
+    informes = []
+    for nombre, df in datos.items():
+        if isinstance(df, pd.DataFrame):
+            compactos[nombre], informe = aplicar_esquema(df, nombre)
+            informes.append(informe)
+        else:
+            compactos[nombre] = df
+    return compactos, informes
+
+def resumir_informes(informes):
+    """Totales de memoria antes y después de compactar"""
+    antes = sum(informe['antes_kb'] for informe in informes)
+    despues = sum(informe['despues_kb'] for informe in informes)
+    return {
+        'antes_kb': round(antes, 1),
+        'despues_kb': round(despues, 1),
+        'ahorro_pct': _porcentaje_ahorro(antes, despues)
+    }
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Registro de eventos del Sistema de Reservas UFRO
+Bitácora de solo anexado en SQLite, instantáneas periódicas del estado y cursores por consumidor
+Desarrollado por: MiniMax Agent
+"""
+
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from bitacora import ID_CORRELACION, obtener_logger
+from metricas_sistema import contar, medir
+
+logger = obtener_logger('eventos_reservas')
+
+SOLICITUD_CREADA = 'SolicitudCreada'
+SOLICITUD_APROBADA = 'SolicitudAprobada'
+SOLICITUD_RECHAZADA = 'SolicitudRechazada'
+SOLICITUD_EN_REVISION = 'SolicitudEnRevision'
+SOLICITUD_REASIGNADA = 'SolicitudReasignada'
+SOLICITUD_CANCELADA = 'SolicitudCancelada'
+NOTIFICACION_ENVIADA = 'NotificacionEnviada'
+
+EVENTOS_DECISION = {
+    'aprobada': SOLICITUD_APROBADA,
+    'rechazada': SOLICITUD_RECHAZADA,
+    'requiere_revision': SOLICITUD_EN_REVISION
+}
+
+# Campos de la solicitud que viajan en SolicitudCreada
+CAMPOS_SOLICITUD = ['solicitante', 'tipo_usuario', 'sala_solicitada', 'fecha_requerida', 'hora_inicio',
+                    'hora_fin', 'motivo', 'estudiantes', 'correo', 'telefono', 'id_correlacion']
+
+INTERVALO_INSTANTANEA = 1000  # eventos de cola que justifican una nueva instantánea
+LOTE_LECTURA = 500
+
+def crear_tablas(cursor):
+    """Tablas de eventos, instantáneas y cursores (en la misma base que las solicitudes)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS eventos (
+            secuencia INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha DATETIME,
+            tipo TEXT,
+            solicitud_id INTEGER,
+            datos TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instantaneas_eventos (
+            secuencia INTEGER PRIMARY KEY,
+            fecha DATETIME,
+            estado BLOB
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cursores_eventos (
+            consumidor TEXT PRIMARY KEY,
+            secuencia INTEGER,
+            fecha DATETIME
+        )
+    ''')
+
+def _codificar(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=str)
+
+def anotar(cursor, tipo, datos=None, solicitud_id=None):
+    """Agrega un evento con el cursor de la transacción en curso (se confirma junto con la escritura)"""
+    return anotar_varios(cursor, [(tipo, solicitud_id, datos)])
+
+def anotar_varios(cursor, eventos):
+    """Agrega [(tipo, solicitud_id, datos)] en una sola sentencia; retorna la última secuencia"""
+    ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.executemany('INSERT INTO eventos (fecha, tipo, solicitud_id, datos) VALUES (?, ?, ?, ?)',
+                       [(ahora, tipo, solicitud_id, _codificar(datos or {})) for tipo, solicitud_id, datos in eventos])
+    for tipo, _, _ in eventos:
+        contar('ufro_eventos_total', tipo=tipo)
+    return cursor.lastrowid
+
+def eventos_solicitud(solicitud, decision, motivo='', prioridad=0, solicitud_id=None):
+    """SolicitudCreada y el evento de la decisión, listos para anotar_varios"""
+    creada = {campo: solicitud[campo] for campo in CAMPOS_SOLICITUD if solicitud.get(campo) not in (None, '')}
+    # Las aprobaciones se anotan dentro de la transacción, con el ID de correlación del contexto
+    if 'id_correlacion' not in creada and ID_CORRELACION.get() is not None:
+        creada['id_correlacion'] = ID_CORRELACION.get()
+    creada['prioridad'] = prioridad
+    eventos = [(SOLICITUD_CREADA, solicitud_id, creada)]
+    if decision in EVENTOS_DECISION:
+        eventos.append((EVENTOS_DECISION[decision], solicitud_id, {'motivo': motivo}))
+    return eventos
+
+def estado_inicial():
+    return {'secuencia': 0, 'reservas': {}, 'contadores': {}}
+
+def aplicar(estado, evento):
+    """
+    Reductor: reservas registradas por solicitud_id (las rechazadas sin fila en solicitudes
+    solo cuentan) y contadores por tipo de evento.
+    """
+    tipo, datos = evento['tipo'], evento['datos']
+    estado['contadores'][tipo] = estado['contadores'].get(tipo, 0) + 1
+    if tipo == SOLICITUD_CREADA and evento['solicitud_id'] is not None:
+        estado['reservas'][evento['solicitud_id']] = {
+            'sala': datos.get('sala_solicitada'),
+            'fecha': datos.get('fecha_requerida'),
+            'hora_inicio': datos.get('hora_inicio'),
+            'hora_fin': datos.get('hora_fin'),
+            'solicitante': datos.get('solicitante'),
+            'prioridad': datos.get('prioridad'),
+            'estado': 'pendiente'
+        }
+    elif tipo in (SOLICITUD_APROBADA, SOLICITUD_RECHAZADA) and evento['solicitud_id'] in estado['reservas']:
+        estado['reservas'][evento['solicitud_id']]['estado'] = 'aprobada' if tipo == SOLICITUD_APROBADA else 'rechazada'
+    elif tipo == SOLICITUD_REASIGNADA and evento['solicitud_id'] in estado['reservas']:
+        estado['reservas'][evento['solicitud_id']]['sala'] = datos.get('sala_nueva')
+    elif tipo == SOLICITUD_CANCELADA and evento['solicitud_id'] in estado['reservas']:
+        estado['reservas'][evento['solicitud_id']]['estado'] = 'cancelada'
+    estado['secuencia'] = evento['secuencia']
+    return estado
+
+class RegistroEventos:
+    """
+    Lectura de la bitácora por secuencia (clave primaria: leer la cola es un rango del índice),
+    reconstrucción del estado desde la última instantánea y escritura de instantáneas.
+    """
+
+    def __init__(self, db_path='sistema_reservas.db', intervalo_instantanea=INTERVALO_INSTANTANEA):
+        self.db_path = db_path
+        self.intervalo_instantanea = intervalo_instantanea
+        self._local = threading.local()
+        cursor = self._conexion().cursor()
+        crear_tablas(cursor)
+
+    def _conexion(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def leer(self, desde=0, limite=LOTE_LECTURA, tipos=None):
+        """Eventos con secuencia mayor que `desde`, en orden"""
+        consulta = 'SELECT secuencia, fecha, tipo, solicitud_id, datos FROM eventos WHERE secuencia > ?'
+        parametros = [desde]
+        if tipos:
+            consulta += f" AND tipo IN ({', '.join('?' * len(tipos))})"
+            parametros += list(tipos)
+        filas = self._conexion().execute(consulta + ' ORDER BY secuencia LIMIT ?', parametros + [limite]).fetchall()
+        return [{'secuencia': secuencia, 'fecha': fecha, 'tipo': tipo, 'solicitud_id': solicitud_id,
+                 'datos': json.loads(datos)} for secuencia, fecha, tipo, solicitud_id, datos in filas]
+
+    def ultima_secuencia(self):
+        return self._conexion().execute('SELECT COALESCE(MAX(secuencia), 0) FROM eventos').fetchone()[0]
+
+    def ultima_instantanea(self):
+        """Estado de la instantánea más reciente (o el inicial)"""
+        fila = self._conexion().execute(
+            'SELECT estado FROM instantaneas_eventos ORDER BY secuencia DESC LIMIT 1'
+        ).fetchone()
+        if fila is None:
+            return estado_inicial()
+        estado = json.loads(zlib.decompress(fila[0]))
+        estado['reservas'] = {int(clave): reserva for clave, reserva in estado['reservas'].items()}
+        return estado
+
+    def tomar_instantanea(self, estado):
+        """Guarda el estado comprimido (JSON + zlib) con la secuencia hasta la que llega"""
+        self._conexion().execute(
+            'INSERT OR REPLACE INTO instantaneas_eventos (secuencia, fecha, estado) VALUES (?, ?, ?)',
+            (estado['secuencia'], datetime.now().strftime('%Y-%m-%d %H:%M:%S'), zlib.compress(_codificar(estado).encode()))
+        )
+        logger.info("Instantánea de eventos en la secuencia %d", estado['secuencia'],
+                    extra={'evento': 'instantanea_eventos', 'secuencia': estado['secuencia']})
+
+    def reconstruir(self):
+        """Estado actual: última instantánea + eventos posteriores; si la cola es larga, deja una instantánea nueva"""
+        with medir('ufro_eventos_segundos', operacion='reconstruir'):
+            estado = self.ultima_instantanea()
+            inicial = estado['secuencia']
+            while True:
+                eventos = self.leer(estado['secuencia'])
+                for evento in eventos:
+                    aplicar(estado, evento)
+                if len(eventos) < LOTE_LECTURA:
+                    break
+        if estado['secuencia'] - inicial >= self.intervalo_instantanea:
+            self.tomar_instantanea(estado)
+        return estado
+
+class Suscriptor:
+    """
+    Consumidor con cursor persistente: procesar() entrega solo los eventos nuevos y avanza el
+    cursor cuando el manejador termina (entrega al menos una vez si el proceso cae a mitad de lote).
+    Un consumidor sin cursor parte del inicio, o del final de la bitácora con desde_el_final.
+    """
+
+    def __init__(self, registro, nombre, tipos=None, desde_el_final=False):
+        self.registro = registro
+        self.nombre = nombre
+        self.tipos = tipos
+        fila = registro._conexion().execute(
+            'SELECT secuencia FROM cursores_eventos WHERE consumidor = ?', (nombre,)
+        ).fetchone()
+        self.secuencia = fila[0] if fila else 0
+        if fila is None and desde_el_final:
+            self.confirmar(registro.ultima_secuencia())
+
+    def confirmar(self, secuencia):
+        self.registro._conexion().execute('''
+            INSERT INTO cursores_eventos (consumidor, secuencia, fecha) VALUES (?, ?, ?)
+            ON CONFLICT (consumidor) DO UPDATE SET secuencia = excluded.secuencia, fecha = excluded.fecha
+        ''', (self.nombre, secuencia, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        self.secuencia = secuencia
+
+    def procesar(self, manejador, limite=LOTE_LECTURA):
+        """Aplica manejador(evento) a los eventos nuevos; retorna cuántos procesó"""
+        eventos = self.registro.leer(self.secuencia, limite, self.tipos)
+        for evento in eventos:
+            manejador(evento)
+        if eventos:
+            self.confirmar(eventos[-1]['secuencia'])
+            contar('ufro_eventos_consumidos_total', len(eventos), consumidor=self.nombre)
+        return len(eventos)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Exportación de datos del Sistema de Reservas UFRO
+Consultas leídas por bloques y escritas en streaming a Excel, CSV o Parquet, con trabajos en segundo plano
+Desarrollado por: MiniMax Agent
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bitacora import obtener_logger
+from metricas_sistema import contar, medir
+
+logger = obtener_logger('exportador')
+
+TAMANO_BLOQUE = 5000
+FILAS_MAXIMAS_HOJA = 1048575  # límite de Excel por hoja, sin contar el encabezado
+CARPETA_EXPORTACIONES = os.path.join(tempfile.gettempdir(), 'ufro_exportaciones')
+
+# Tabla -> (consulta, columna de fecha para filtrar por periodo)
+CONSULTAS = {
+    'solicitudes': ('''
+        SELECT id, fecha_solicitud, solicitante, tipo_usuario, sala_solicitada, fecha_requerida,
+               hora_inicio, hora_fin, motivo, prioridad, estado, fecha_procesamiento, serie_id
+        FROM solicitudes
+    ''', 'fecha_requerida'),
+    'reasignaciones': ('''
+        SELECT r.id, r.solicitud_id, s.solicitante, s.fecha_requerida, s.hora_inicio, s.hora_fin,
+               r.sala_original, r.sala_nueva, r.fecha_reasignacion, r.motivo_reasignacion, r.aprobado_por
+        FROM reasignaciones r LEFT JOIN solicitudes s ON s.id = r.solicitud_id
+    ''', 'r.fecha_reasignacion'),
+    'notificaciones': ('''
+        SELECT id, destinatario, tipo_notificacion, mensaje, fecha_envio, canal, estado_entrega
+        FROM notificaciones
+    ''', 'fecha_envio'),
+    'eventos': ('''
+        SELECT secuencia, fecha, tipo, solicitud_id, datos FROM eventos
+    ''', 'fecha')
+}
+ORDEN = {'solicitudes': 'id', 'reasignaciones': 'r.id', 'notificaciones': 'id', 'eventos': 'secuencia'}
+
+EXTENSIONES = {'excel': 'xlsx', 'csv': 'csv', 'parquet': 'parquet'}
+
+def formatos_disponibles():
+    """Formatos con sus dependencias instaladas (Parquet requiere pyarrow)"""
+    formatos = ['excel', 'csv']
+    try:
+        import pyarrow  # noqa: F401
+        formatos.append('parquet')
+    except ImportError:
+        pass
+    return formatos
+
+class _EscritorCSV:
+    def __init__(self, ruta, columnas):
+        self._archivo = open(ruta, 'w', newline='', encoding='utf-8-sig')  # BOM: Excel reconoce los acentos
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(columnas)
+
+    def escribir(self, filas):
+        self._csv.writerows(filas)
+
+    def cerrar(self):
+        self._archivo.close()
+
+class _EscritorExcel:
+    """
+    xlsxwriter en modo constant_memory (cada fila se vuelca a disco al pasar a la siguiente);
+    sin xlsxwriter, openpyxl en modo write_only, que también escribe en streaming.
+    Al llenarse una hoja se continúa en otra.
+    """
+
+    def __init__(self, ruta, columnas):
+        self.columnas = columnas
+        self._filas_hoja = 0
+        try:
+            import xlsxwriter
+            self._libro = xlsxwriter.Workbook(ruta, {'constant_memory': True, 'strings_to_numbers': False})
+            self._xlsxwriter = True
+        except ImportError:
+            from openpyxl import Workbook
+            self._libro = Workbook(write_only=True)
+            self._xlsxwriter = False
+        self._ruta = ruta
+        self._hojas = 0
+        self._nueva_hoja()
+
+    def _nueva_hoja(self):
+        self._hojas += 1
+        nombre = 'datos' if self._hojas == 1 else f'datos_{self._hojas}'
+        if self._xlsxwriter:
+            self._hoja = self._libro.add_worksheet(nombre)
+            self._hoja.write_row(0, 0, self.columnas)
+        else:
+            self._hoja = self._libro.create_sheet(nombre)
+            self._hoja.append(self.columnas)
+        self._filas_hoja = 0
+
+    def escribir(self, filas):
+        for fila in filas:
+            if self._filas_hoja == FILAS_MAXIMAS_HOJA:
+                self._nueva_hoja()
+            self._filas_hoja += 1
+            if self._xlsxwriter:
+                self._hoja.write_row(self._filas_hoja, 0, fila)
+            else:
+                self._hoja.append(fila)
+
+    def cerrar(self):
+        if self._xlsxwriter:
+            self._libro.close()
+        else:
+            self._libro.save(self._ruta)
+
+class _EscritorParquet:
+    """Un row group por bloque; el esquema se fija con el primer bloque (columnas vacías como texto)"""
+
+    def __init__(self, ruta, columnas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self._ruta = ruta
+        self.columnas = columnas
+        self._escritor = None
+        self._esquema = None
+        self._texto = []
+
+    def escribir(self, filas):
+        pa = self._pa
+        columnas = {nombre: list(valores) for nombre, valores in zip(self.columnas, zip(*filas))}
+        if self._esquema is None:
+            tabla = pa.Table.from_pydict(columnas)
+            self._esquema = pa.schema([
+                campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo for campo in tabla.schema
+            ])
+            self._texto = [campo.name for campo in tabla.schema if pa.types.is_null(campo.type)]
+            self._escritor = self._pq.ParquetWriter(self._ruta, self._esquema)
+        # Una columna vacía en el primer bloque (p. ej. serie_id) puede traer valores en los siguientes
+        for nombre in self._texto:
+            columnas[nombre] = [None if valor is None else str(valor) for valor in columnas[nombre]]
+        self._escritor.write_table(pa.Table.from_pydict(columnas, schema=self._esquema))
+
+    def cerrar(self):
+        if self._escritor is None:
+            self._pq.write_table(self._pa.table({nombre: self._pa.array([], self._pa.string()) for nombre in self.columnas}),
+                                 self._ruta)
+        else:
+            self._escritor.close()
+
+ESCRITORES = {'excel': _EscritorExcel, 'csv': _EscritorCSV, 'parquet': _EscritorParquet}
+
+def _consulta(tabla, desde=None, hasta=None):
+    if tabla not in CONSULTAS:
+        raise ValueError(f"Tabla no exportable: {tabla}")
+    consulta, columna_fecha = CONSULTAS[tabla]
+    condiciones, parametros = [], []
+    if desde:
+        condiciones.append(f"{columna_fecha} >= ?")
+        parametros.append(str(desde))
+    if hasta:
+        # Las columnas DATETIME incluyen la hora: se compara contra el día siguiente
+        condiciones.append(f"{columna_fecha} < date(?, '+1 day')")
+        parametros.append(str(hasta))
+    if condiciones:
+        consulta += ' WHERE ' + ' AND '.join(condiciones)
+    return consulta, parametros
+
+def contar_filas(db_path, tabla, desde=None, hasta=None):
+    consulta, parametros = _consulta(tabla, desde, hasta)
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM ({consulta})', parametros).fetchone()[0]
+
+def exportar(db_path, tabla, formato, ruta, desde=None, hasta=None, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """
+    Escribe la tabla (opcionalmente filtrada por periodo) en la ruta, leyendo el cursor de a
+    `tamano_bloque` filas: la memoria no depende del total exportado. progreso(hechas, total)
+    se llama después de cada bloque. Retorna la cantidad de filas escritas.
+    """
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato no soportado: {formato}")
+    consulta, parametros = _consulta(tabla, desde, hasta)
+    total = contar_filas(db_path, tabla, desde, hasta)
+
+    inicio = time.perf_counter()
+    filas_escritas = 0
+    # Conexión propia de solo lectura: con WAL no bloquea a quienes registran reservas
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        cursor = conn.execute(f'{consulta} ORDER BY {ORDEN[tabla]}', parametros)
+        escritor = ESCRITORES[formato](ruta, [columna[0] for columna in cursor.description])
+        try:
+            while True:
+                with medir('ufro_exportacion_segundos', etapa='bloque', formato=formato):
+                    filas = cursor.fetchmany(tamano_bloque)
+                    if not filas:
+                        break
+                    escritor.escribir(filas)
+                filas_escritas += len(filas)
+                if progreso is not None:
+                    progreso(filas_escritas, total)
+        finally:
+            escritor.cerrar()
+    finally:
+        conn.close()
+
+    contar('ufro_exportaciones_total', tabla=tabla, formato=formato)
+    logger.info("Exportación de %s a %s: %d filas", tabla, formato, filas_escritas, extra={
+        'evento': 'exportacion_terminada', 'tabla': tabla, 'formato': formato, 'filas': filas_escritas,
+        'bytes': os.path.getsize(ruta), 'duracion_s': round(time.perf_counter() - inicio, 2)
+    })
+    return filas_escritas
+
+class TrabajoExportacion:
+    """Estado de una exportación en segundo plano (lo consulta la interfaz para mostrar el avance)"""
+
+    def __init__(self, tabla, formato, ruta, desde=None, hasta=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.tabla = tabla
+        self.formato = formato
+        self.ruta = ruta
+        self.desde = desde
+        self.hasta = hasta
+        self.estado = 'en_cola'
+        self.filas = 0
+        self.total = 0
+        self.error = None
+        self.creado = time.time()
+
+    @property
+    def avance(self):
+        if self.estado == 'terminado':
+            return 1.0
+        return self.filas / self.total if self.total else 0.0
+
+    @property
+    def nombre_archivo(self):
+        periodo = f"_{self.desde}_{self.hasta}" if self.desde or self.hasta else ''
+        return f"{self.tabla}{periodo}.{EXTENSIONES[self.formato]}"
+
+class GestorExportaciones:
+    """
+    Cola de exportaciones ejecutadas por un pool acotado de hilos; los archivos quedan en una
+    carpeta temporal y se borran al expirar el trabajo
+    """
+
+    def __init__(self, db_path='sistema_reservas.db', carpeta=CARPETA_EXPORTACIONES, max_trabajos=2, horas_retencion=24):
+        self.db_path = db_path
+        self.carpeta = carpeta
+        self.retencion = horas_retencion * 3600
+        self._pool = ThreadPoolExecutor(max_workers=max_trabajos, thread_name_prefix='exportacion')
+        self._candado = threading.Lock()
+        self._trabajos = {}
+        os.makedirs(carpeta, exist_ok=True)
+
+    def iniciar(self, tabla, formato, desde=None, hasta=None):
+        """Encola la exportación y retorna su trabajo"""
+        if formato not in formatos_disponibles():
+            raise ValueError(f"Formato no disponible: {formato}")
+        self.limpiar()
+        trabajo = TrabajoExportacion(tabla, formato, None, desde, hasta)
+        trabajo.ruta = os.path.join(self.carpeta, f"{trabajo.id}_{trabajo.nombre_archivo}")
+        with self._candado:
+            self._trabajos[trabajo.id] = trabajo
+        self._pool.submit(self._ejecutar, trabajo)
+        return trabajo
+
+    def _ejecutar(self, trabajo):
+        trabajo.estado = 'ejecutando'
+
+        def progreso(hechas, total):
+            trabajo.filas, trabajo.total = hechas, total
+
+        try:
+            exportar(self.db_path, trabajo.tabla, trabajo.formato, trabajo.ruta, trabajo.desde, trabajo.hasta,
+                     progreso=progreso)
+            trabajo.estado = 'terminado'
+        except Exception as e:
+            trabajo.estado = 'error'
+            trabajo.error = str(e)
+            logger.error("Exportación fallida: %s", e, extra={'evento': 'exportacion_fallida', 'tabla': trabajo.tabla,
+                                                               'formato': trabajo.formato})
+
+    def trabajo(self, trabajo_id):
+        with self._candado:
+            return self._trabajos.get(trabajo_id)
+
+    def trabajos(self):
+        """Trabajos vigentes, el más reciente primero"""
+        with self._candado:
+            return sorted(self._trabajos.values(), key=lambda trabajo: trabajo.creado, reverse=True)
+
+    def limpiar(self):
+        """Olvida los trabajos terminados más antiguos que la retención y borra sus archivos"""
+        limite = time.time() - self.retencion
+        with self._candado:
+            vencidos = [trabajo for trabajo in self._trabajos.values()
+                        if trabajo.creado < limite and trabajo.estado in ('terminado', 'error')]
+            for trabajo in vencidos:
+                del self._trabajos[trabajo.id]
+        for trabajo in vencidos:
+            try:
+                os.remove(trabajo.ruta)
+            except OSError:
+                pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportación de datos del Sistema de Reservas UFRO')
+    parser.add_argument('tabla', choices=sorted(CONSULTAS))
+    parser.add_argument('--formato', choices=sorted(ESCRITORES), default='csv')
+    parser.add_argument('--salida', help='Archivo de destino (por defecto <tabla>.<extensión>)')
+    parser.add_argument('--desde', help='Fecha inicial YYYY-MM-DD')
+    parser.add_argument('--hasta', help='Fecha final YYYY-MM-DD (incluida)')
+    parser.add_argument('--db', default='sistema_reservas.db')
+    parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE)
+    args = parser.parse_args()
+
+    if args.formato not in formatos_disponibles():
+        print(f"❌ El formato {args.formato} requiere pyarrow")
+        return 1
+    salida = args.salida or f"{args.tabla}.{EXTENSIONES[args.formato]}"
+
+    def progreso(hechas, total):
+        print(f"\r📤 {hechas:,}/{total:,} filas", end='', flush=True)
+
+    filas = exportar(args.db, args.tabla, args.formato, salida, args.desde, args.hasta, args.bloque, progreso)
+    print(f"\n✅ {filas:,} filas exportadas a {salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
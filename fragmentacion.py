@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Fragmentación del Sistema de Reservas UFRO
+Salas, solicitudes e índices repartidos por facultad (o por hash de sala) en bases SQLite separadas
+Desarrollado por: MiniMax Agent
+"""
+
+import os
+import re
+import sqlite3
+import unicodedata
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from bitacora import obtener_logger
+from metricas_sistema import contar, medir
+from sistema_ia_reservas import SistemaIAReservas
+
+logger = obtener_logger('fragmentacion')
+
+MODOS = ('facultad', 'hash')
+FRAGMENTOS_HASH = 8
+FRAGMENTO_SIN_FACULTAD = 'general'
+HILOS_MAXIMOS = 8
+
+def clave_facultad(facultad):
+    """'Facultad de Ingeniería' -> 'facultad_de_ingenieria' (nombre de archivo seguro)"""
+    texto = unicodedata.normalize('NFKD', str(facultad or '')).encode('ascii', 'ignore').decode().lower()
+    return re.sub(r'[^a-z0-9]+', '_', texto).strip('_') or FRAGMENTO_SIN_FACULTAD
+
+def clave_hash(sala, fragmentos=FRAGMENTOS_HASH):
+    """Fragmento estable de una sala (crc32: no cambia entre procesos, a diferencia de hash())"""
+    return f"h{zlib.crc32(str(sala).encode()) % fragmentos:02d}"
+
+class SistemaFragmentado:
+    """
+    Enrutador sobre varios SistemaIAReservas, uno por fragmento, cada uno con su propia base
+    SQLite (su propio bloqueo de escritura), su tabla salas y su índice de salas. Los conflictos
+    solo ocurren dentro de una sala y cada sala vive en un único fragmento, así que verificar,
+    confirmar y reasignar nunca cruza fragmentos. Las alternativas sí: se consultan todos los
+    fragmentos en paralelo.
+
+    El catálogo (una base más, sin reservas) guarda todas las salas: con él se entrenan el modelo
+    de aprobación y el motor de riesgo, que luego comparten todos los fragmentos.
+    Los id de solicitud son por fragmento: los resultados llevan la clave 'fragmento'.
+    """
+
+    def __init__(self, salas, carpeta='fragmentos', modo='facultad', fragmentos_hash=FRAGMENTOS_HASH):
+        """salas: DataFrame con código, capacidad, facultad y equipamiento (tabla salas o planillas)"""
+        from datos_graficos import resolver_columna
+
+        if modo not in MODOS:
+            raise ValueError(f"Modo de fragmentación inválido: {modo} (use {', '.join(MODOS)})")
+        self.carpeta = carpeta
+        self.modo = modo
+        self.fragmentos_hash = fragmentos_hash
+        os.makedirs(carpeta, exist_ok=True)
+
+        columnas = {campo: resolver_columna(salas, candidatos) for campo, candidatos in {
+            'codigo': ['codigo', 'Sala', 'Sala_Asignada'],
+            'capacidad': ['capacidad', 'Capacidad'],
+            'facultad': ['facultad', 'Facultad'],
+            'equipamiento': ['equipamiento', 'Equipamiento']
+        }.items()}
+        if salas is None or salas.empty or columnas['codigo'] is None:
+            raise ValueError("Se requiere la tabla de salas para fragmentar")
+        salas = salas.drop_duplicates(columnas['codigo'])
+
+        def columna(campo):
+            return salas[columnas[campo]].astype(object).where(salas[columnas[campo]].notna(), None).tolist() \
+                if columnas[campo] else [None] * len(salas)
+
+        capacidades = [None if capacidad is None else int(capacidad) for capacidad in columna('capacidad')]
+        filas = list(zip(salas[columnas['codigo']].astype(str), capacidades, columna('facultad'), columna('equipamiento')))
+
+        self.ruta_sala = {codigo: self._clave(codigo, facultad) for codigo, _, facultad, _ in filas}
+        self.claves = sorted(set(self.ruta_sala.values()))
+        self.fragmentos = {clave: SistemaIAReservas(os.path.join(carpeta, f'reservas_{clave}.db'))
+                           for clave in self.claves}
+        self.catalogo = SistemaIAReservas(os.path.join(carpeta, 'catalogo.db'))
+        # Tablas compartidas por todos los fragmentos (p. ej. resultados idempotentes de la API)
+        self.db_path = self.catalogo.db_path
+
+        self._registrar_salas(self.catalogo, filas)
+        for clave, sistema in self.fragmentos.items():
+            self._registrar_salas(sistema, [fila for fila in filas if self.ruta_sala[fila[0]] == clave])
+
+        self._ejecutor = ThreadPoolExecutor(max_workers=min(HILOS_MAXIMOS, len(self.fragmentos)),
+                                            thread_name_prefix='fragmento')
+        logger.info("Sistema fragmentado por %s: %d fragmentos, %d salas", modo, len(self.fragmentos), len(filas),
+                    extra={'evento': 'fragmentacion_inicializada', 'modo': modo,
+                           'fragmentos': len(self.fragmentos), 'salas': len(filas)})
+
+    @classmethod
+    def desde_base_datos(cls, db_path='sistema_reservas.db', carpeta='fragmentos', modo='facultad',
+                         fragmentos_hash=FRAGMENTOS_HASH):
+        """Fragmenta a partir de la tabla salas de una base sin fragmentar"""
+        import pandas as pd
+
+        with sqlite3.connect(db_path) as conn:
+            salas = pd.read_sql_query("SELECT codigo, capacidad, facultad, equipamiento FROM salas", conn)
+        return cls(salas, carpeta, modo, fragmentos_hash)
+
+    def _clave(self, sala, facultad=None):
+        if self.modo == 'hash':
+            return clave_hash(sala, self.fragmentos_hash)
+        return clave_facultad(facultad)
+
+    @staticmethod
+    def _registrar_salas(sistema, filas):
+        conn = sqlite3.connect(sistema.db_path)
+        with conn:
+            conn.executemany('''
+                INSERT INTO salas (codigo, capacidad, facultad, equipamiento) VALUES (?, ?, ?, ?)
+                ON CONFLICT (codigo) DO UPDATE SET capacidad = excluded.capacidad,
+                    facultad = excluded.facultad, equipamiento = excluded.equipamiento
+            ''', filas)
+        conn.close()
+
+    def clave_de(self, sala):
+        """
+        Fragmento de una sala. Una sala que no está en el catálogo se asigna por crc32 entre los
+        fragmentos existentes: siempre el mismo, así sus conflictos se siguen detectando.
+        """
+        clave = self.ruta_sala.get(sala)
+        if clave is None:
+            clave = self.claves[zlib.crc32(str(sala).encode()) % len(self.claves)]
+        return clave
+
+    def fragmento_de(self, sala):
+        return self.fragmentos[self.clave_de(sala)]
+
+    def inicializar(self, datos_historicos=None):
+        """Modelo y motor de riesgo entrenados una vez en el catálogo y compartidos; índice de salas por fragmento"""
+        if datos_historicos:
+            self.catalogo.entrenar_modelo_prediccion_demanda(datos_historicos)
+        self.catalogo.inicializar_motor_riesgo(datos_historicos)
+        for sistema in self.fragmentos.values():
+            # Almacén de características y motor de riesgo tienen su propio candado: se comparten entre hilos
+            sistema.modelos = self.catalogo.modelos
+            sistema.caracteristicas = self.catalogo.caracteristicas
+            sistema.motor_riesgo = self.catalogo.motor_riesgo
+        list(self._ejecutor.map(lambda sistema: sistema.inicializar_indice_salas(), self.fragmentos.values()))
+        return self
+
+    def _marcar(self, resultado, clave):
+        resultado['fragmento'] = clave
+        return resultado
+
+    @staticmethod
+    def _admite_alternativas(resultado):
+        """Rechazada por conflicto o capacidad (no por calendario): se buscan salas en los demás fragmentos"""
+        return resultado['decision'] == 'rechazada' and bool(
+            resultado['alternativas'] or resultado['conflictos'].get('hay_conflicto')
+            or resultado['motivo'].startswith('Capacidad insuficiente'))
+
+    def procesar_solicitud_inteligente(self, solicitud, probabilidad_aprobacion=None, verificacion_fecha=None):
+        clave = self.clave_de(solicitud['sala_solicitada'])
+        contar('ufro_fragmentos_solicitudes_total', fragmento=clave)
+        resultado = self.fragmentos[clave].procesar_solicitud_inteligente(solicitud, probabilidad_aprobacion,
+                                                                          verificacion_fecha)
+        if self._admite_alternativas(resultado):
+            resultado['alternativas'] = self._completar_alternativas(solicitud, clave, resultado['alternativas'])
+        return self._marcar(resultado, clave)
+
+    def procesar_lote(self, solicitudes, capturar_errores=False):
+        """
+        Reparte el lote por fragmento y procesa los sublotes en paralelo: cada fragmento escribe
+        en su base con un solo hilo, sin competir por el bloqueo de los demás.
+        capturar_errores como en SistemaIAReservas.procesar_lote.
+        """
+        sublotes = {}
+        for posicion, solicitud in enumerate(solicitudes):
+            sublotes.setdefault(self.clave_de(solicitud['sala_solicitada']), []).append(posicion)
+
+        def procesar(clave):
+            with medir('ufro_fragmentos_segundos', operacion='lote', fragmento=clave):
+                return self.fragmentos[clave].procesar_lote([solicitudes[posicion] for posicion in sublotes[clave]],
+                                                            capturar_errores)
+
+        resultados = [None] * len(solicitudes)
+        for clave, parciales in zip(sublotes, self._ejecutor.map(procesar, sublotes)):
+            contar('ufro_fragmentos_solicitudes_total', len(parciales), fragmento=clave)
+            for posicion, resultado in zip(sublotes[clave], parciales):
+                if isinstance(resultado, Exception):
+                    resultados[posicion] = resultado
+                    continue
+                try:
+                    if self._admite_alternativas(resultado):
+                        resultado['alternativas'] = self._completar_alternativas(
+                            solicitudes[posicion], clave, resultado['alternativas'])
+                except Exception as e:
+                    # La decisión ya está tomada: solo faltan las salas de los demás fragmentos
+                    if not capturar_errores:
+                        raise
+                    logger.warning("No se pudo completar las alternativas: %s", e, extra={
+                        'evento': 'error_alternativas', 'fragmento': clave})
+                resultados[posicion] = self._marcar(resultado, clave)
+        return resultados
+
+    def procesar_serie(self, solicitud, regla, aprobacion_parcial=True):
+        clave = self.clave_de(solicitud['sala_solicitada'])
+        return self._marcar(self.fragmentos[clave].procesar_serie(solicitud, regla, aprobacion_parcial), clave)
+
+    def detectar_conflictos_horario(self, sala, fecha, hora_inicio, hora_fin):
+        return self.fragmento_de(sala).detectar_conflictos_horario(sala, fecha, hora_inicio, hora_fin)
+
+    def cancelar_reserva(self, solicitud_id, motivo='', fragmento=None):
+        """Los id son por fragmento: se indica el 'fragmento' que vino en el resultado de la solicitud"""
+        if fragmento not in self.fragmentos:
+            return False
+        return self.fragmentos[fragmento].cancelar_reserva(solicitud_id, motivo)
+
+    def reserva_vigente(self, resultado):
+        fragmento = self.fragmentos.get(resultado.get('fragmento'))
+        return fragmento is not None and fragmento.reserva_vigente(resultado)
+
+    def _completar_alternativas(self, solicitud, clave, propias):
+        """Alternativas del fragmento propio (misma facultad) y de los demás, consultados en paralelo"""
+        otros = [otra for otra in self.claves if otra != clave]
+        if not otros:
+            return propias
+        with medir('ufro_fragmentos_segundos', operacion='alternativas'):
+            ajenas = self._ejecutor.map(lambda otra: self.fragmentos[otra].sugerir_alternativas(solicitud), otros)
+            candidatas = list(propias) + [alternativa for lista in ajenas for alternativa in lista]
+        # sort es estable: a igual riesgo quedan primero las del fragmento propio
+        if all('riesgo_conflicto' in alternativa for alternativa in candidatas):
+            candidatas.sort(key=lambda alternativa: alternativa['riesgo_conflicto'])
+        return candidatas[:3]
+
+    def sugerir_alternativas(self, solicitud):
+        clave = self.clave_de(solicitud['sala_solicitada'])
+        return self._completar_alternativas(solicitud, clave, self.fragmentos[clave].sugerir_alternativas(solicitud))
+
+    def generar_notificacion_automatica(self, resultado_procesamiento):
+        return self.fragmento_de(resultado_procesamiento['solicitud']['sala_solicitada']).generar_notificacion_automatica(
+            resultado_procesamiento)
+
+    def generar_notificacion_serie(self, resultado_serie):
+        return self.fragmento_de(resultado_serie['solicitud']['sala_solicitada']).generar_notificacion_serie(resultado_serie)
+
+    def estadisticas(self):
+        """Salas, solicitudes, tamaño de la base y aciertos de la caché de disponibilidad por fragmento"""
+        resumen = {}
+        for clave, sistema in self.fragmentos.items():
+            salas, solicitudes = sistema._conexion().execute(
+                "SELECT (SELECT COUNT(*) FROM salas), (SELECT COUNT(*) FROM solicitudes)"
+            ).fetchone()
+            resumen[clave] = {
+                'salas': salas,
+                'solicitudes': solicitudes,
+                'indice_salas': len(sistema.indice_salas.codigos) if sistema.indice_salas is not None else 0,
+                'bytes': os.path.getsize(sistema.db_path),
+                'cache_disponibilidad': sistema.cache_disponibilidad.estadisticas()
+            }
+        return resumen
+
+    def cerrar(self):
+        self._ejecutor.shutdown(wait=True)
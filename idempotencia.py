@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Idempotencia de solicitudes del Sistema de Reservas UFRO
+Huella de cada solicitud y resultado de su decisión en caché LRU + SQLite con vencimiento
+Desarrollado por: MiniMax Agent
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from bitacora import obtener_logger
+from metricas_sistema import contar
+
+logger = obtener_logger('idempotencia')
+
+# Campos que identifican una solicitud (regla solo en las series): un reintento del portal repite estos
+CAMPOS_HUELLA = ['solicitante', 'sala_solicitada', 'fecha_requerida', 'hora_inicio', 'hora_fin', 'motivo', 'regla']
+
+TTL_SEGUNDOS = 3600
+TTL_RECHAZO_SEGUNDOS = 120
+MAX_ENTRADAS = 2048
+ESCRITURAS_POR_PURGA = 500
+
+# Las decisiones que dejaron reservas se guardan por el TTL completo; los rechazos, por un plazo
+# corto que cubre los reintentos del portal sin reenviar el aviso (vigente() los descarta si el
+# horario se liberó). Un 'pendiente' por base ocupada o una revisión manual no se guardan
+DECISIONES_GUARDADAS = {'aprobada', 'aprobada_parcial'}
+DECISIONES_BREVES = {'rechazada'}
+
+class ConflictoIdempotencia(ValueError):
+    """La clave de idempotencia ya se usó con una solicitud distinta"""
+
+def reserva_de(resultado):
+    """Identificador de la reserva que dejó un resultado ('fragmento/id' con fragmentación); None si no hay"""
+    if resultado.get('solicitud_id') is None:
+        return None
+    fragmento = resultado.get('fragmento')
+    return f"{fragmento}/{resultado['solicitud_id']}" if fragmento else str(resultado['solicitud_id'])
+
+def huella_solicitud(solicitud):
+    """sha256 de los campos identificadores normalizados (espacios, mayúsculas, fecha sin hora)"""
+    valores = []
+    for campo in CAMPOS_HUELLA:
+        valor = solicitud.get(campo) or ''
+        valor = (valor if isinstance(valor, str) else json.dumps(valor, sort_keys=True, default=str)).strip().lower()
+        valores.append(valor[:10] if campo == 'fecha_requerida' else valor)
+    return hashlib.sha256('\x1f'.join(valores).encode()).hexdigest()
+
+class CacheIdempotencia:
+    """
+    Resultado de cada solicitud ya decidida, por clave (la enviada por el cliente o la huella):
+    - en memoria, LRU de max_entradas;
+    - en SQLite (tabla resultados_idempotentes), compartido entre procesos y reinicios.
+    Un duplicado que llega mientras la original se procesa espera ese mismo resultado.
+    Reusar una clave con otra huella es un conflicto (ConflictoIdempotencia).
+    Se guardan aprobaciones (ttl) y rechazos (ttl_rechazo). vigente(resultado), si se indica,
+    confirma antes de repetir que sus reservas siguen aprobadas o que el horario rechazado sigue
+    ocupado; olvidar_reserva() quita el resultado al cancelar la reserva.
+    """
+
+    def __init__(self, db_path='sistema_reservas.db', ttl=TTL_SEGUNDOS, max_entradas=MAX_ENTRADAS, vigente=None,
+                 ttl_rechazo=TTL_RECHAZO_SEGUNDOS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.ttl_rechazo = ttl_rechazo
+        self.max_entradas = max_entradas
+        self.vigente = vigente
+        self._lru = OrderedDict()  # clave -> (vence, huella, resultado)
+        self._en_curso = {}        # clave -> (huella, Future)
+        self._candado = threading.Lock()
+        self._local = threading.local()
+        self._escrituras = 0
+        conn = self._conexion()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS resultados_idempotentes (
+                clave TEXT PRIMARY KEY,
+                huella TEXT,
+                vence REAL,
+                resultado TEXT,
+                reserva TEXT
+            )
+        ''')
+        # Tablas creadas antes de que existiera la columna reserva
+        columnas = {fila[1] for fila in conn.execute('PRAGMA table_info(resultados_idempotentes)')}
+        if 'reserva' not in columnas:
+            conn.execute('ALTER TABLE resultados_idempotentes ADD COLUMN reserva TEXT')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_resultados_reserva ON resultados_idempotentes (reserva)')
+
+    def _conexion(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _leer(self, clave, ahora):
+        """(huella, resultado) vigente de memoria o SQLite; None si no hay"""
+        with self._candado:
+            entrada = self._lru.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self._lru.move_to_end(clave)
+                contar('ufro_idempotencia_total', resultado='memoria')
+                return entrada[1], entrada[2]
+        fila = self._conexion().execute(
+            'SELECT vence, huella, resultado FROM resultados_idempotentes WHERE clave = ? AND vence > ?', (clave, ahora)
+        ).fetchone()
+        if fila is None:
+            return None
+        resultado = json.loads(fila[2])
+        self._recordar(clave, fila[0], fila[1], resultado)
+        contar('ufro_idempotencia_total', resultado='sqlite')
+        return fila[1], resultado
+
+    def _recordar(self, clave, vence, huella, resultado):
+        with self._candado:
+            self._lru[clave] = (vence, huella, resultado)
+            self._lru.move_to_end(clave)
+            while len(self._lru) > self.max_entradas:
+                self._lru.popitem(last=False)
+
+    def _guardar(self, clave, huella, resultado, ttl):
+        vence = time.time() + ttl
+        self._recordar(clave, vence, huella, resultado)
+        conn = self._conexion()
+        conn.execute('INSERT OR REPLACE INTO resultados_idempotentes (clave, huella, vence, resultado, reserva) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     (clave, huella, vence, json.dumps(resultado, ensure_ascii=False), reserva_de(resultado)))
+        with self._candado:
+            self._escrituras += 1
+            purgar = self._escrituras % ESCRITURAS_POR_PURGA == 0
+        if purgar:
+            conn.execute('DELETE FROM resultados_idempotentes WHERE vence <= ?', (time.time(),))
+
+    def enviar(self, solicitud, iniciar, clave=None):
+        """
+        Retorna (Future del resultado, repetida). iniciar() retorna el Future del procesamiento
+        y solo se llama si la clave no tiene un resultado vigente ni está en curso. El resultado
+        queda en forma JSON (el mismo al repetir desde memoria o desde SQLite); se guardan las
+        aprobaciones y, por ttl_rechazo, los rechazos.
+        """
+        huella = huella_solicitud(solicitud)
+        clave = clave or huella
+        ahora = time.time()
+
+        guardado = self._leer(clave, ahora)
+        if guardado is not None and not self._sigue_vigente(clave, guardado[1]):
+            guardado = None
+        with self._candado:
+            if guardado is None:
+                # La original pudo terminar después de la lectura: se guarda antes de salir de en curso
+                entrada = self._lru.get(clave)
+                if entrada is not None and entrada[0] > ahora:
+                    guardado = entrada[1], entrada[2]
+            en_curso = None if guardado is not None else self._en_curso.get(clave)
+            if guardado is None and en_curso is None:
+                futuro = Future()
+                self._en_curso[clave] = (huella, futuro)
+        if guardado is not None:
+            self._verificar(clave, huella, guardado[0])
+            repetido = Future()
+            repetido.set_result(guardado[1])
+            return repetido, True
+        if en_curso is not None:
+            self._verificar(clave, huella, en_curso[0])
+            contar('ufro_idempotencia_total', resultado='en_curso')
+            return en_curso[1], True
+
+        contar('ufro_idempotencia_total', resultado='fallo')
+        try:
+            origen = iniciar()
+        except Exception as e:
+            self._terminar(clave, huella, futuro, error=e)
+            raise
+        origen.add_done_callback(lambda origen: self._terminar(clave, huella, futuro, origen))
+        return futuro, False
+
+    def _terminar(self, clave, huella, futuro, origen=None, error=None):
+        try:
+            if error is None:
+                error = origen.exception()
+            if error is None:
+                resultado = json.loads(json.dumps(origen.result(), ensure_ascii=False, default=str))
+                if resultado.get('decision') in DECISIONES_GUARDADAS:
+                    self._guardar(clave, huella, resultado, self.ttl)
+                elif resultado.get('decision') in DECISIONES_BREVES:
+                    self._guardar(clave, huella, resultado, self.ttl_rechazo)
+        except Exception as e:
+            error = e
+        finally:
+            with self._candado:
+                self._en_curso.pop(clave, None)
+        if error is not None:
+            futuro.set_exception(error)
+        else:
+            futuro.set_result(resultado)
+
+    def _sigue_vigente(self, clave, resultado):
+        """Con vigente(), un resultado que ya no refleja el estado de las reservas se olvida y se reprocesa"""
+        if self.vigente is None or self.vigente(resultado):
+            return True
+        self.olvidar(clave)
+        contar('ufro_idempotencia_total', resultado='invalidado')
+        return False
+
+    def olvidar(self, clave):
+        """Quita el resultado de la clave (memoria y SQLite)"""
+        with self._candado:
+            self._lru.pop(clave, None)
+        self._conexion().execute('DELETE FROM resultados_idempotentes WHERE clave = ?', (clave,))
+
+    def olvidar_reserva(self, solicitud_id, fragmento=None):
+        """Quita los resultados que aprobaron la reserva (al cancelarla): el reenvío vuelve a procesarse"""
+        reserva = reserva_de({'solicitud_id': solicitud_id, 'fragmento': fragmento})
+        with self._candado:
+            for clave in [clave for clave, (_, _, resultado) in self._lru.items() if reserva_de(resultado) == reserva]:
+                del self._lru[clave]
+        self._conexion().execute('DELETE FROM resultados_idempotentes WHERE reserva = ?', (reserva,))
+
+    def ejecutar(self, solicitud, calcular, clave=None, timeout=None):
+        """Versión síncrona de enviar(): calcular() se ejecuta en el hilo actual. Retorna (resultado, repetida)"""
+        def iniciar():
+            origen = Future()
+            try:
+                origen.set_result(calcular())
+            except Exception as e:
+                origen.set_exception(e)
+            return origen
+
+        futuro, repetida = self.enviar(solicitud, iniciar, clave)
+        return futuro.result(timeout=timeout), repetida
+
+    @staticmethod
+    def _verificar(clave, huella, huella_guardada):
+        if huella != huella_guardada:
+            contar('ufro_idempotencia_total', resultado='conflicto')
+            logger.warning("Clave de idempotencia reutilizada con otra solicitud", extra={
+                'evento': 'conflicto_idempotencia', 'clave': clave})
+            raise ConflictoIdempotencia(f"La clave {clave} ya se usó con una solicitud distinta")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Índice de salas del Sistema de Reservas UFRO
+Capacidad, facultad, equipamiento y ocupación como conjuntos de bits para buscar salas adecuadas
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from datetime import date
+
+from esquemas_datos import minuto_de_hora
+
+# Equipamiento como máscara de bits; los sinónimos agrupan varios equipos
+EQUIPOS = {'proyector': 1, 'sonido': 2, 'computador': 4, 'pizarra': 8, 'laboratorio': 16}
+SINONIMOS_EQUIPAMIENTO = {
+    'completo': EQUIPOS['proyector'] | EQUIPOS['sonido'] | EQUIPOS['computador'] | EQUIPOS['pizarra'],
+    'audiovisual': EQUIPOS['proyector'] | EQUIPOS['sonido']
+}
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+HORA_PRIMER_BLOQUE = 0
+CANTIDAD_BLOQUES = 24  # bloques de una hora de todo el día: una reserva nocturna también ocupa la sala
+
+# La ocupación de un día se relee de la base de datos pasado este tiempo (escrituras de
+# otros procesos); las del propio proceso se marcan al confirmarse
+VIGENCIA_OCUPACION = 2.0  # segundos
+
+def mascara_equipamiento(equipamiento):
+    """'Proyector, Sonido' (o ['proyector', 'sonido']) -> 3; 'Completo' -> todos salvo laboratorio; sin dato -> 0"""
+    if not equipamiento:
+        return 0
+    if isinstance(equipamiento, str):
+        equipamiento = equipamiento.split(',')
+    mascara = 0
+    for elemento in equipamiento:
+        elemento = str(elemento).strip().lower()
+        mascara |= SINONIMOS_EQUIPAMIENTO.get(elemento, 0)
+        mascara |= sum(bit for equipo, bit in EQUIPOS.items() if equipo in elemento)
+    return mascara
+
+def describir_equipamiento(mascara):
+    return ', '.join(equipo.capitalize() for equipo, bit in EQUIPOS.items() if mascara & bit) or 'Básico'
+
+def _bloques(hora_inicio, hora_fin):
+    """Bloques de una hora que toca el intervalo [hora_inicio, hora_fin)"""
+    inicio = minuto_de_hora(hora_inicio)
+    fin = minuto_de_hora(hora_fin) if hora_fin else inicio + 60
+    if inicio < 0:
+        return range(0)
+    if fin <= inicio:
+        fin = inicio + 60
+    primero = max(inicio // 60 - HORA_PRIMER_BLOQUE, 0)
+    ultimo = min((fin - 1) // 60 - HORA_PRIMER_BLOQUE, CANTIDAD_BLOQUES - 1)
+    return range(primero, ultimo + 1)
+
+class IndiceSalas:
+    """
+    Cada sala es un bit (su posición en self.codigos). Precalcula:
+    - por facultad (y para todas), las capacidades ordenadas y el conjunto de salas con
+      capacidad >= la de cada posición: un mínimo de asientos es una búsqueda binaria;
+    - por equipo, el conjunto de salas que lo tienen;
+    - por fecha, el conjunto de salas ocupadas en cada bloque horario.
+    buscar() es la intersección (&) de esos conjuntos.
+    """
+
+    def __init__(self, salas):
+        """salas: DataFrame con código, capacidad, facultad y equipamiento (tabla salas o planillas)"""
+        from datos_graficos import resolver_columna
+        import pandas as pd
+
+        columna_codigo = resolver_columna(salas, ['codigo', 'Sala', 'Sala_Asignada'])
+        if salas is None or salas.empty or columna_codigo is None:
+            salas = pd.DataFrame({'codigo': []})
+            columna_codigo = 'codigo'
+        salas = salas.drop_duplicates(columna_codigo)
+        columna_capacidad = resolver_columna(salas, ['capacidad', 'Capacidad'])
+        columna_facultad = resolver_columna(salas, ['facultad', 'Facultad'])
+        columna_equipamiento = resolver_columna(salas, ['equipamiento', 'Equipamiento'])
+
+        self.codigos = salas[columna_codigo].astype(str).tolist()
+        self.capacidades = (pd.to_numeric(salas[columna_capacidad], errors='coerce').fillna(0).astype(int).tolist()
+                            if columna_capacidad else [0] * len(self.codigos))
+        self.facultades = (salas[columna_facultad].astype(object).fillna('').astype(str).tolist()
+                           if columna_facultad else [''] * len(self.codigos))
+        self.mascaras = ([mascara_equipamiento(valor) for valor in salas[columna_equipamiento].astype(object).fillna('')]
+                         if columna_equipamiento else [0] * len(self.codigos))
+        self.posiciones = {codigo: posicion for posicion, codigo in enumerate(self.codigos)}
+        self.todas = (1 << len(self.codigos)) - 1
+
+        self._por_capacidad = {None: self._ordenar_por_capacidad(range(len(self.codigos)))}
+        for facultad in set(self.facultades):
+            miembros = [i for i, valor in enumerate(self.facultades) if valor == facultad]
+            self._por_capacidad[facultad] = self._ordenar_por_capacidad(miembros)
+
+        self._por_equipo = {bit: sum(1 << i for i, mascara in enumerate(self.mascaras) if mascara & bit)
+                            for bit in EQUIPOS.values()}
+
+        self._candado = threading.Lock()
+        self._ocupacion = {}  # fecha -> (instante de lectura, [conjunto ocupado por bloque])
+
+    def _ordenar_por_capacidad(self, miembros):
+        """(capacidades ascendentes, conjuntos de salas desde cada posición hasta el final)"""
+        ordenados = sorted(miembros, key=lambda i: self.capacidades[i])
+        sufijos = [0] * (len(ordenados) + 1)
+        for posicion in range(len(ordenados) - 1, -1, -1):
+            sufijos[posicion] = sufijos[posicion + 1] | (1 << ordenados[posicion])
+        return [self.capacidades[i] for i in ordenados], sufijos
+
+    def con_capacidad(self, minimo=0, facultad=None):
+        """Salas (de la facultad, si se indica) con al menos `minimo` asientos: O(log n)"""
+        capacidades, sufijos = self._por_capacidad.get(facultad, ([], [0]))
+        return sufijos[bisect_left(capacidades, minimo or 0)]
+
+    def con_equipamiento(self, mascara):
+        """Salas que tienen todos los equipos de la máscara"""
+        conjunto = self.todas
+        for bit, salas in self._por_equipo.items():
+            if mascara & bit:
+                conjunto &= salas
+        return conjunto
+
+    def _leer_ocupacion(self, conexion, fecha):
+        ocupacion = [0] * CANTIDAD_BLOQUES
+        dia_semana = DIAS_SEMANA[date.fromisoformat(fecha).weekday()]
+        filas = conexion.execute('''
+            SELECT sala_solicitada, hora_inicio, hora_fin FROM solicitudes
+            WHERE fecha_requerida = ? AND estado = 'aprobada'
+            UNION ALL
+            SELECT s.codigo, a.hora_inicio, a.hora_fin FROM asignaciones_semestrales a
+            JOIN salas s ON s.id = a.sala_id
+            WHERE ? BETWEEN a.fecha_inicio AND a.fecha_fin AND a.dia_semana = ?
+        ''', (fecha, fecha, dia_semana)).fetchall()
+        for sala, hora_inicio, hora_fin in filas:
+            posicion = self.posiciones.get(sala)
+            if posicion is not None:
+                for bloque in _bloques(hora_inicio, hora_fin):
+                    ocupacion[bloque] |= 1 << posicion
+        return ocupacion
+
+    def ocupadas(self, conexion, fecha, hora_inicio, hora_fin):
+        """Salas con alguna reserva aprobada o asignación en los bloques del horario"""
+        ahora = time.monotonic()
+        with self._candado:
+            cache = self._ocupacion.get(fecha)
+        if cache is None or ahora - cache[0] > VIGENCIA_OCUPACION:
+            cache = (ahora, self._leer_ocupacion(conexion, fecha))
+            with self._candado:
+                self._ocupacion[fecha] = cache
+        conjunto = 0
+        for bloque in _bloques(hora_inicio, hora_fin):
+            conjunto |= cache[1][bloque]
+        return conjunto
+
+    def marcar_ocupada(self, sala, fecha, hora_inicio, hora_fin):
+        """Incorpora una reserva recién confirmada a la ocupación en memoria"""
+        posicion = self.posiciones.get(sala)
+        with self._candado:
+            cache = self._ocupacion.get(fecha)
+            if posicion is None or cache is None:
+                return
+            for bloque in _bloques(hora_inicio, hora_fin):
+                cache[1][bloque] |= 1 << posicion
+
+    def olvidar_ocupacion(self, fecha):
+        """Descarta la ocupación en memoria de la fecha (una reserva se liberó): se relee al buscar"""
+        with self._candado:
+            self._ocupacion.pop(str(fecha)[:10], None)
+
+    def salas_de(self, conjunto):
+        """Códigos del conjunto de bits, de menor a mayor capacidad (el mejor ajuste primero)"""
+        posiciones = []
+        while conjunto:
+            bit = conjunto & -conjunto
+            posiciones.append(bit.bit_length() - 1)
+            conjunto ^= bit
+        return [self.codigos[i] for i in sorted(posiciones, key=lambda i: self.capacidades[i])]
+
+    def buscar(self, conexion, fecha, hora_inicio, hora_fin, capacidad_minima=0, equipamiento=0, facultad=None):
+        """
+        "Salas con >= N asientos, con el equipamiento pedido, de la facultad F, libres en el horario":
+        una intersección de conjuntos precalculados. Retorna los códigos, el mejor ajuste primero.
+        """
+        if isinstance(equipamiento, (str, list, tuple)):
+            equipamiento = mascara_equipamiento(equipamiento)
+        conjunto = (self.con_capacidad(capacidad_minima, facultad)
+                    & self.con_equipamiento(equipamiento)
+                    & ~self.ocupadas(conexion, fecha, hora_inicio, hora_fin))
+        return self.salas_de(conjunto)
+
+    def ficha(self, sala):
+        """Capacidad, facultad y equipamiento de una sala, o None si no está en el índice"""
+        posicion = self.posiciones.get(sala)
+        if posicion is None:
+            return None
+        return {
+            'sala': sala,
+            'capacidad': self.capacidades[posicion],
+            'facultad': self.facultades[posicion],
+            'equipamiento': describir_equipamiento(self.mascaras[posicion])
+        }
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Instrumentación liviana del Sistema de Reservas UFRO
+Temporizadores, contadores e histogramas con exportación en formato de texto Prometheus
+Desarrollado por: MiniMax Agent
+"""
+
+import bisect
+import os
+import threading
+import time
+
+from bitacora import obtener_logger
+
+logger = obtener_logger('metricas_sistema')
+
+# Límites de los histogramas en segundos (desde 100 µs hasta 10 s)
+LIMITES_SEGUNDOS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histograma:
+    """
+    Histograma acumulativo de latencias (cuentas por límite, suma y total)
+    """
+
+    def __init__(self, nombre, etiquetas, limites=LIMITES_SEGUNDOS):
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self._candado = threading.Lock()
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._candado:
+            self.cuentas[indice] += 1
+            self.suma += valor
+            self.total += 1
+
+    def percentil(self, p):
+        """Estimación del percentil p (0-100) a partir de los límites del histograma"""
+        if self.total == 0:
+            return None
+        objetivo = self.total * p / 100
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return limite
+        return float('inf')
+
+class Contador:
+    """
+    Contador monotónico
+    """
+
+    def __init__(self, nombre, etiquetas):
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+        self.valor = 0
+        self._candado = threading.Lock()
+
+    def incrementar(self, cantidad=1):
+        with self._candado:
+            self.valor += cantidad
+
+class RegistroMetricas:
+    """
+    Registro de métricas del proceso. Deshabilitado, medir() y contar() no registran nada.
+    """
+
+    def __init__(self, habilitado=False):
+        self.habilitado = habilitado
+        self.histogramas = {}
+        self.contadores = {}
+        self._candado = threading.Lock()
+
+    def histograma(self, nombre, etiquetas=()):
+        clave = (nombre, etiquetas)
+        histograma = self.histogramas.get(clave)
+        if histograma is None:
+            with self._candado:
+                histograma = self.histogramas.setdefault(clave, Histograma(nombre, etiquetas))
+        return histograma
+
+    def contador(self, nombre, etiquetas=()):
+        clave = (nombre, etiquetas)
+        contador = self.contadores.get(clave)
+        if contador is None:
+            with self._candado:
+                contador = self.contadores.setdefault(clave, Contador(nombre, etiquetas))
+        return contador
+
+    def reiniciar(self):
+        with self._candado:
+            self.histogramas = {}
+            self.contadores = {}
+
+    def exportar_prometheus(self):
+        """Serializa todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        nombres_vistos = set()
+
+        for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+            if nombre not in nombres_vistos:
+                lineas.append(f"# TYPE {nombre} histogram")
+                nombres_vistos.add(nombre)
+            acumulado = 0
+            for limite, cuenta in zip(h.limites, h.cuentas):
+                acumulado += cuenta
+                lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', repr(limite)))} {acumulado}")
+            lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', '+Inf'))} {h.total}")
+            lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {h.suma}")
+            lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {h.total}")
+
+        for (nombre, etiquetas), c in sorted(self.contadores.items()):
+            if nombre not in nombres_vistos:
+                lineas.append(f"# TYPE {nombre} counter")
+                nombres_vistos.add(nombre)
+            lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {c.valor}")
+
+        return '\n'.join(lineas) + '\n'
+
+    def resumen(self):
+        """Filas legibles (para tablas del dashboard) con conteo, media, p50 y p99 en ms"""
+        filas = []
+        for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+            if h.total == 0:
+                continue
+            filas.append({
+                'metrica': nombre,
+                'etiquetas': ', '.join(f"{k}={v}" for k, v in etiquetas),
+                'conteo': h.total,
+                'media_ms': round(h.suma / h.total * 1000, 3),
+                'p50_ms': round(h.percentil(50) * 1000, 3),
+                'p99_ms': round(h.percentil(99) * 1000, 3)
+            })
+        for (nombre, etiquetas), c in sorted(self.contadores.items()):
+            filas.append({
+                'metrica': nombre,
+                'etiquetas': ', '.join(f"{k}={v}" for k, v in etiquetas),
+                'conteo': c.valor,
+                'media_ms': None,
+                'p50_ms': None,
+                'p99_ms': None
+            })
+        return filas
+
+def _formatear_etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pares) + '}'
+
+class _Temporizador:
+    __slots__ = ('histograma', 'inicio')
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self.inicio)
+        return False
+
+class _TemporizadorNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_TEMPORIZADOR_NULO = _TemporizadorNulo()
+
+REGISTRO = RegistroMetricas(habilitado=os.environ.get('UFRO_METRICAS', '0') == '1')
+
+def medir(nombre, **etiquetas):
+    """Context manager que registra la duración del bloque en el histograma indicado"""
+    if not REGISTRO.habilitado:
+        return _TEMPORIZADOR_NULO
+    return _Temporizador(REGISTRO.histograma(nombre, tuple(sorted(etiquetas.items()))))
+
+def contar(nombre, cantidad=1, **etiquetas):
+    """Incrementa el contador indicado"""
+    if REGISTRO.habilitado:
+        REGISTRO.contador(nombre, tuple(sorted(etiquetas.items()))).incrementar(cantidad)
+
+def escribir_prometheus(ruta):
+    """Escribe las métricas en un archivo (reemplazo atómico, apto para el textfile collector)"""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(REGISTRO.exportar_prometheus())
+    os.replace(temporal, ruta)
+
+def iniciar_exportacion_periodica(ruta, intervalo=15):
+    """Escribe el archivo de métricas cada `intervalo` segundos en un hilo de fondo"""
+    def exportar():
+        while True:
+            time.sleep(intervalo)
+            try:
+                escribir_prometheus(ruta)
+            except OSError as e:
+                logger.warning("Error exportando métricas: %s", e, extra={'evento': 'error_exportacion_metricas'})
+
+    hilo = threading.Thread(target=exportar, daemon=True)
+    hilo.start()
+    return hilo
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Modelo de datos del dashboard principal del Sistema de Reservas UFRO
+Mapeo de columnas resuelto una vez por versión y agregados de los seis paneles en una pasada por tabla
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+
+import pandas as pd
+
+from datos_graficos import COLUMNAS_ESTADO, COLUMNAS_FECHA, COLUMNAS_SALA, resolver_columna
+from esquemas_datos import convertir_fechas
+
+# Rol -> nombres aceptados, por tabla (planillas reales, optimizadas y base de datos)
+MAPEO_COLUMNAS = {
+    'solicitudes': {
+        'tipo_usuario': ['Rol', 'Tipo Usuario', 'Tipo_Usuario', 'tipo_usuario'],
+        'horario': ['Bloque Horario', 'Bloque_Horario', 'Hora_Inicio', 'hora_inicio'],
+        'estado': COLUMNAS_ESTADO
+    },
+    'indicadores': {
+        'sala': COLUMNAS_SALA,
+        'uso': ['Frecuencia de Uso', 'Frecuencia_Uso', 'Horas_Uso_Semanal', 'Uso', 'Ocupación (%)', 'Ocupacion_Promedio']
+    },
+    'reasignaciones': {
+        'fecha': ['Fecha Reasignación', 'Fecha_Reasignación', 'fecha_reasignacion'] + COLUMNAS_FECHA
+    },
+    'asignaciones': {
+        'estado': COLUMNAS_ESTADO
+    }
+}
+
+TOP_SALAS = 8
+TOP_HORARIOS = 6
+
+def resolver_mapeo(datos):
+    """{tabla: {rol: columna o None}} para las tablas presentes"""
+    return {
+        tabla: {rol: resolver_columna(datos.get(tabla), candidatos) for rol, candidatos in roles.items()}
+        for tabla, roles in MAPEO_COLUMNAS.items()
+    }
+
+def _firma_columnas(datos):
+    return tuple((tabla, tuple(map(str, df.columns))) for tabla, df in sorted(datos.items()) if df is not None)
+
+class _CacheMapeos:
+    """Mapeos ya resueltos, por versión de datos (o por las columnas presentes si no hay versión)"""
+
+    def __init__(self, max_entradas=8):
+        self.max_entradas = max_entradas
+        self._cache = {}
+        self._candado = threading.Lock()
+
+    def obtener(self, datos, version=None):
+        clave = version if version is not None else _firma_columnas(datos)
+        with self._candado:
+            if clave in self._cache:
+                return self._cache[clave]
+        mapeo = resolver_mapeo(datos)
+        with self._candado:
+            while len(self._cache) >= self.max_entradas:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[clave] = mapeo
+        return mapeo
+
+MAPEOS = _CacheMapeos()
+
+class Panel:
+    """Serie de un panel, o el motivo por el que falta (nunca datos simulados)"""
+
+    def __init__(self, titulo, serie=None, faltante=None):
+        self.titulo = titulo
+        self.serie = serie
+        self.faltante = 'Sin registros' if faltante is None and serie is not None and serie.empty else faltante
+
+    @property
+    def disponible(self):
+        return self.faltante is None
+
+def _faltante(datos, tabla, mapeo, *roles):
+    """Motivo de la ausencia: tabla vacía o columnas no encontradas; None si está todo"""
+    df = datos.get(tabla)
+    if df is None or df.empty:
+        return f"Sin datos de {tabla}"
+    ausentes = [rol for rol in roles if mapeo[tabla][rol] is None]
+    if ausentes:
+        buscadas = '; '.join(f"{rol}: {', '.join(MAPEO_COLUMNAS[tabla][rol][:4])}" for rol in ausentes)
+        return f"Sin columnas en {tabla} ({buscadas})"
+    return None
+
+class ModeloDashboard:
+    """
+    Agregados de los paneles del dashboard principal. Cada tabla se recorre una vez:
+    solicitudes con un groupby por (tipo de usuario, horario, estado) del que salen los tres
+    paneles que la usan; las demás con un groupby o un conteo. No modifica los DataFrames recibidos.
+    """
+
+    def __init__(self, datos, version=None):
+        self.datos = {tabla: df for tabla, df in datos.items() if isinstance(df, pd.DataFrame)}
+        self.version = version
+        self.mapeo = MAPEOS.obtener(self.datos, version)
+        self.paneles = {}
+        self.kpis = {}
+        self._agregar_solicitudes()
+        self._agregar_indicadores()
+        self._agregar_reasignaciones()
+        self._agregar_asignaciones()
+        self._agregar_kpis()
+
+    def _agregar_solicitudes(self):
+        mapeo = self.mapeo['solicitudes']
+        roles = [rol for rol in ('tipo_usuario', 'horario', 'estado') if mapeo[rol] is not None]
+        df = self.datos.get('solicitudes')
+        conteo = None
+        if df is not None and not df.empty and roles:
+            claves = [df[mapeo[rol]].astype(object).fillna('Sin dato').astype(str).rename(rol) for rol in roles]
+            conteo = df.groupby(claves, observed=True).size()
+
+        def marginal(rol):
+            return conteo.groupby(level=rol).sum().sort_values(ascending=False)
+
+        faltante = _faltante(self.datos, 'solicitudes', self.mapeo, 'tipo_usuario')
+        self.paneles['tipo_usuario'] = Panel('📊 Distribución de Solicitudes\nPor Tipo de Usuario',
+                                             None if faltante else marginal('tipo_usuario'), faltante)
+        faltante = _faltante(self.datos, 'solicitudes', self.mapeo, 'horario')
+        self.paneles['horarios'] = Panel(f'🕐 Horarios de Mayor Demanda\n(Top {TOP_HORARIOS})',
+                                         None if faltante else marginal('horario').head(TOP_HORARIOS), faltante)
+        self._estados_solicitudes = None if mapeo['estado'] is None or conteo is None else marginal('estado')
+
+    def _agregar_indicadores(self):
+        faltante = _faltante(self.datos, 'indicadores', self.mapeo, 'sala', 'uso')
+        serie = None
+        if faltante is None:
+            df = self.datos['indicadores']
+            mapeo = self.mapeo['indicadores']
+            uso = pd.to_numeric(df[mapeo['uso']], errors='coerce')
+            serie = uso.groupby(df[mapeo['sala']].astype(str)).sum().nlargest(TOP_SALAS)
+        self.paneles['uso_salas'] = Panel(f'📈 Frecuencia de Uso por Sala\n(Top {TOP_SALAS} Salas)', serie, faltante)
+
+    def _agregar_reasignaciones(self):
+        faltante = _faltante(self.datos, 'reasignaciones', self.mapeo, 'fecha')
+        serie = None
+        if faltante is None:
+            fechas = convertir_fechas(self.datos['reasignaciones'][self.mapeo['reasignaciones']['fecha']]).dropna()
+            serie = fechas.dt.to_period('M').value_counts().sort_index()
+            serie.index = serie.index.strftime('%Y-%m')
+        self.paneles['reasignaciones'] = Panel('📅 Evolución de Reasignaciones\nPor Mes', serie, faltante)
+
+    def _agregar_asignaciones(self):
+        faltante = _faltante(self.datos, 'asignaciones', self.mapeo, 'estado')
+        serie = None
+        if faltante is None:
+            serie = self.datos['asignaciones'][self.mapeo['asignaciones']['estado']].astype(object).fillna('Sin dato').value_counts()
+        self.paneles['estado_asignaciones'] = Panel('📋 Estado de Asignaciones\nSemestrales', serie, faltante)
+
+    def _agregar_kpis(self):
+        """Totales reales; None cuando la tabla no está (no se reemplaza por un valor fijo)"""
+        def total(tabla):
+            df = self.datos.get(tabla)
+            return None if df is None else len(df)
+
+        tasa = None
+        if self._estados_solicitudes is not None and self._estados_solicitudes.sum():
+            aprobadas = self._estados_solicitudes[self._estados_solicitudes.index.str.lower().str.startswith('aprobad')].sum()
+            tasa = round(float(aprobadas / self._estados_solicitudes.sum() * 100), 1)
+        self.kpis = {
+            'solicitudes': total('solicitudes'),
+            'reasignaciones': total('reasignaciones'),
+            'notificaciones': total('notificaciones'),
+            'tasa_aprobacion': tasa
+        }
+
+    def faltantes(self):
+        """{panel: motivo} de los paneles sin datos reales"""
+        return {nombre: panel.faltante for nombre, panel in self.paneles.items() if not panel.disponible}
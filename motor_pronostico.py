@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Motor de pronóstico de demanda del Sistema de Reservas UFRO
+Pronóstico por sala, día y bloque horario ajustado para todas las salas a la vez con NumPy
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datos_graficos import resolver_columna
+from esquemas_datos import COLUMNA_MINUTOS, convertir_fechas, minutos_del_dia
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+HORA_PRIMER_BLOQUE = 8
+BLOQUES = [f"{hora:02d}:00" for hora in range(HORA_PRIMER_BLOQUE, 21)]  # 13 bloques de una hora
+
+# Columnas de las planillas (real, optimizada, integrada) y de la tabla solicitudes de SQLite
+COLUMNAS_SALA = ['Sala Solicitada', 'Sala_Solicitada', 'sala_solicitada', 'Sala']
+COLUMNAS_FECHA = ['Fecha Requerida', 'Fecha_Uso', 'Fecha_Requerida', 'fecha_requerida', 'Fecha']
+COLUMNAS_HORA = ['Hora_Inicio', 'Bloque Horario', 'Bloque_Horario', 'hora_inicio']
+
+# Periodos académicos por mes: 0 = receso de verano, 1 = primer semestre, 2 = segundo semestre
+PERIODO_POR_MES = np.array([0, 0, 0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2])  # índice = mes (1-12)
+
+# Suavizamiento exponencial con tendencia amortiguada (Holt); alfa se elige por serie
+ALFAS = (0.1, 0.2, 0.3, 0.5, 0.7)
+BETA = 0.1
+AMORTIGUACION = 0.9
+SEMANAS_RECIENTES = 8
+
+def periodo_academico(fechas):
+    """Código de periodo académico (0, 1, 2) de cada fecha"""
+    return PERIODO_POR_MES[pd.DatetimeIndex(fechas).month]
+
+def huella_solicitudes(solicitudes):
+    """Identificador del contenido relevante (sala, fecha, hora) de un historial"""
+    columnas = [resolver_columna(solicitudes, candidatos) for candidatos in (COLUMNAS_SALA, COLUMNAS_FECHA, COLUMNAS_HORA)]
+    columnas = [columna for columna in columnas if columna]
+    if not columnas:
+        return (len(solicitudes),)
+    return (len(solicitudes), int(pd.util.hash_pandas_object(solicitudes[columnas], index=False).sum()))
+
+def construir_tensor(solicitudes):
+    """
+    Conteos de solicitudes en un arreglo (sala, semana, día, bloque).
+    Retorna (conteos, salas, lunes de la primera semana) o None si no hay registros válidos.
+    """
+    columna_sala = resolver_columna(solicitudes, COLUMNAS_SALA)
+    columna_fecha = resolver_columna(solicitudes, COLUMNAS_FECHA)
+    if solicitudes is None or solicitudes.empty or columna_sala is None or columna_fecha is None:
+        return None
+
+    fechas = convertir_fechas(solicitudes[columna_fecha]).dt.normalize()
+    if COLUMNA_MINUTOS in solicitudes.columns:
+        minutos = solicitudes[COLUMNA_MINUTOS].to_numpy()
+    else:
+        columna_hora = resolver_columna(solicitudes, COLUMNAS_HORA)
+        if columna_hora is None:
+            return None
+        minutos = minutos_del_dia(solicitudes[columna_hora]).to_numpy()
+
+    bloques = minutos // 60 - HORA_PRIMER_BLOQUE
+    validos = (fechas.notna().to_numpy() & solicitudes[columna_sala].notna().to_numpy()
+               & (minutos >= 0) & (bloques >= 0) & (bloques < len(BLOQUES)))
+    if not validos.any():
+        return None
+
+    fechas = fechas[validos]
+    codigos_sala, salas = pd.factorize(solicitudes[columna_sala][validos].astype(str), sort=True)
+    lunes_inicial = (fechas - pd.to_timedelta(fechas.dt.dayofweek, unit='D')).min()
+    dias_transcurridos = (fechas - lunes_inicial).dt.days.to_numpy()
+    semanas = dias_transcurridos // 7
+    dias = dias_transcurridos % 7
+
+    forma = (len(salas), int(semanas.max()) + 1, 7, len(BLOQUES))
+    indice = np.ravel_multi_index((codigos_sala, semanas, dias, bloques[validos]), forma)
+    conteos = np.bincount(indice, minlength=int(np.prod(forma))).reshape(forma).astype(np.float32)
+    return conteos, list(salas), lunes_inicial
+
+def factores_periodo(totales_semanales, periodos):
+    """Demanda semanal media de cada periodo académico relativa a la media general"""
+    media = totales_semanales.mean()
+    factores = np.ones(3, dtype=np.float32)
+    if media <= 0:
+        return factores
+    for periodo in range(3):
+        semanas_periodo = periodos == periodo
+        if semanas_periodo.any():
+            factores[periodo] = totales_semanales[semanas_periodo].mean() / media
+    return np.clip(factores, 0.1, None)
+
+def suavizar(series, alfa, beta=BETA, amortiguacion=AMORTIGUACION):
+    """
+    Holt amortiguado sobre series de forma (semanas, n): el ciclo recorre las semanas,
+    cada paso opera sobre las n series a la vez. Retorna (nivel, tendencia, error cuadrático).
+    """
+    inicio = min(4, len(series))
+    nivel = series[:inicio].mean(axis=0)
+    tendencia = np.zeros_like(nivel)
+    error = np.zeros_like(nivel)
+    for valor in series:
+        prediccion = nivel + amortiguacion * tendencia
+        error += (valor - prediccion) ** 2
+        nuevo_nivel = alfa * valor + (1 - alfa) * prediccion
+        tendencia = beta * (nuevo_nivel - nivel) + (1 - beta) * amortiguacion * tendencia
+        nivel = nuevo_nivel
+    return nivel, tendencia, error
+
+class Pronostico:
+    """
+    Demanda esperada (solicitudes) por sala, semana futura, día y bloque horario
+    """
+
+    def __init__(self, salas, semanas, valores, recientes, factores):
+        self.salas = salas
+        self.semanas = semanas        # lunes de cada semana pronosticada
+        self.valores = valores        # (sala, semana, día, bloque)
+        self.recientes = recientes    # media semanal observada en las últimas semanas (sala, día, bloque)
+        self.factores = factores      # factor de cada periodo académico
+
+    def por_sala(self):
+        """Demanda total pronosticada por sala (de mayor a menor)"""
+        return pd.Series(self.valores.sum(axis=(1, 2, 3)), index=self.salas).sort_values(ascending=False)
+
+    def por_dia_semana(self):
+        """Demanda semanal media pronosticada por día"""
+        return pd.Series(self.valores.sum(axis=(0, 3)).mean(axis=0), index=DIAS_SEMANA)
+
+    def por_bloque(self):
+        """Demanda semanal media pronosticada por bloque horario"""
+        return pd.Series(self.valores.sum(axis=(0, 2)).mean(axis=0), index=BLOQUES)
+
+    def por_semana(self):
+        return pd.Series(self.valores.sum(axis=(0, 2, 3)), index=self.semanas)
+
+    def recientes_por_dia_semana(self):
+        """Demanda semanal media observada por día (mismas unidades que por_dia_semana)"""
+        return pd.Series(self.recientes.sum(axis=(0, 2)), index=DIAS_SEMANA)
+
+    def recientes_por_bloque(self):
+        return pd.Series(self.recientes.sum(axis=(0, 1)), index=BLOQUES)
+
+    def variacion_pct(self):
+        """Cambio porcentual de la demanda semanal pronosticada respecto de la reciente"""
+        reciente = self.recientes.sum()
+        if reciente <= 0:
+            return None
+        return round((self.valores.sum(axis=(0, 2, 3)).mean() / reciente - 1) * 100, 1)
+
+    def demanda(self, sala, fecha, hora_inicio):
+        """Demanda pronosticada para un bloque (0 si la sala o la fecha quedan fuera del pronóstico)"""
+        if sala not in self.salas:
+            return 0.0
+        fecha = pd.Timestamp(fecha)
+        semana = (fecha.normalize() - self.semanas[0]).days // 7
+        bloque = int(str(hora_inicio).split(':')[0]) - HORA_PRIMER_BLOQUE
+        if not (0 <= semana < len(self.semanas) and 0 <= bloque < len(BLOQUES)):
+            return 0.0
+        return float(self.valores[self.salas.index(sala), semana, fecha.dayofweek, bloque])
+
+    def a_dataframe(self):
+        """Formato largo: Sala, Semana, Dia, Bloque, Demanda"""
+        s, w, d, b = np.indices(self.valores.shape).reshape(4, -1)
+        return pd.DataFrame({
+            'Sala': np.asarray(self.salas)[s],
+            'Semana': self.semanas[w],
+            'Dia': np.asarray(DIAS_SEMANA)[d],
+            'Bloque': np.asarray(BLOQUES)[b],
+            'Demanda': self.valores.reshape(-1)
+        })
+
+def ajustar_pronostico(solicitudes, horizonte=8):
+    """Ajusta el modelo estacional para todas las salas y pronostica `horizonte` semanas"""
+    tensor = construir_tensor(solicitudes)
+    if tensor is None:
+        return None
+    conteos, salas, lunes_inicial = tensor
+    n_salas, n_semanas = conteos.shape[:2]
+
+    # Estacionalidad de periodo académico: factor global por periodo sobre el total semanal
+    inicio_semanas = lunes_inicial + pd.to_timedelta(np.arange(n_semanas) * 7, unit='D')
+    periodos = periodo_academico(inicio_semanas)
+    factores = factores_periodo(conteos.sum(axis=(0, 2, 3)), periodos)
+
+    # Cada (sala, día, bloque) es una serie semanal: la estacionalidad día × hora queda en la serie
+    series = (conteos / factores[periodos][None, :, None, None]).transpose(1, 0, 2, 3).reshape(n_semanas, -1)
+
+    mejor_nivel = mejor_tendencia = mejor_error = None
+    for alfa in ALFAS:
+        nivel, tendencia, error = suavizar(series, alfa)
+        if mejor_error is None:
+            mejor_nivel, mejor_tendencia, mejor_error = nivel, tendencia, error
+        else:
+            mejora = error < mejor_error
+            mejor_nivel = np.where(mejora, nivel, mejor_nivel)
+            mejor_tendencia = np.where(mejora, tendencia, mejor_tendencia)
+            mejor_error = np.where(mejora, error, mejor_error)
+
+    # Pronóstico h semanas adelante: nivel + (φ + φ² + ... + φ^h) · tendencia, por el factor del periodo
+    pasos = np.arange(1, horizonte + 1)
+    acumulado = np.cumsum(AMORTIGUACION ** pasos)
+    semanas_futuras = lunes_inicial + pd.to_timedelta((n_semanas + np.arange(horizonte)) * 7, unit='D')
+    factores_futuros = factores[periodo_academico(semanas_futuras)]
+    valores = (mejor_nivel[None, :] + acumulado[:, None] * mejor_tendencia[None, :]) * factores_futuros[:, None]
+    valores = np.clip(valores, 0, None).reshape(horizonte, n_salas, 7, len(BLOQUES)).transpose(1, 0, 2, 3)
+
+    recientes = conteos[:, -SEMANAS_RECIENTES:].mean(axis=1)
+    return Pronostico(salas, pd.DatetimeIndex(semanas_futuras), valores.astype(np.float32), recientes, factores)
+
+class MotorPronostico:
+    """
+    Mantiene los pronósticos ya calculados hasta que cambian los datos.
+    La clave es la versión indicada por quien llama o, si no hay, la huella del historial.
+    """
+
+    def __init__(self, horizonte=8, max_entradas=4):
+        self.horizonte = horizonte
+        self.max_entradas = max_entradas
+        self._cache = {}
+        self._candado = threading.Lock()
+
+    def pronosticar(self, solicitudes, horizonte=None, version=None):
+        """
+        solicitudes: DataFrame del historial, o función que lo retorna (requiere `version`;
+        solo se llama si el pronóstico no está en caché)
+        """
+        horizonte = horizonte or self.horizonte
+        clave = (version if version is not None else huella_solicitudes(solicitudes), horizonte)
+        with self._candado:
+            if clave in self._cache:
+                return self._cache[clave]
+
+        if callable(solicitudes):
+            solicitudes = solicitudes()
+        pronostico = ajustar_pronostico(solicitudes, horizonte)
+
+        with self._candado:
+            while len(self._cache) >= self.max_entradas:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[clave] = pronostico
+        return pronostico
+
+MOTOR = MotorPronostico()
+
+def pronosticar_demanda(solicitudes, horizonte=8, version=None):
+    """Pronóstico con el motor compartido del proceso"""
+    return MOTOR.pronosticar(solicitudes, horizonte, version)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Motor de reasignación del Sistema de Reservas UFRO
+Libera el horario de una solicitud prioritaria desplazando reservas de menor prioridad a salas equivalentes
+Desarrollado por: MiniMax Agent
+"""
+
+from collections import deque, namedtuple
+from datetime import date
+
+from esquemas_datos import minuto_de_hora
+from indice_salas import DIAS_SEMANA
+
+PROFUNDIDAD_MAXIMA = 3  # movimientos encadenados por reserva desplazada
+NODOS_MAXIMOS = 400     # tope de estados explorados por búsqueda
+
+Reserva = namedtuple('Reserva', 'id sala inicio fin prioridad solicitante hora_inicio hora_fin correo')
+
+def _solapan(inicio_a, fin_a, inicio_b, fin_b):
+    return inicio_a < fin_b and inicio_b < fin_a
+
+class MotorReasignacion:
+    """
+    Estado de un día: reservas aprobadas (movibles) y asignaciones semestrales (fijas) por sala,
+    leídas con una consulta cada una. resolver() busca, para cada reserva que bloquea el horario
+    pedido, la cadena más corta de movimientos (BFS con profundidad acotada) hacia salas
+    equivalentes según el índice de salas: capacidad y equipamiento al menos los de la sala
+    original. Una reserva solo desplaza a otra de prioridad estrictamente menor.
+    """
+
+    def __init__(self, indice, conexion, fecha, profundidad_maxima=PROFUNDIDAD_MAXIMA, nodos_maximos=NODOS_MAXIMOS):
+        self.indice = indice
+        self.fecha = fecha
+        self.profundidad_maxima = profundidad_maxima
+        self.nodos_maximos = nodos_maximos
+        self.nodos_explorados = 0
+        self.reservas = {}  # id -> Reserva
+        self.fijas = {}     # sala -> [(inicio, fin)]
+
+        for fila in conexion.execute('''
+            SELECT id, sala_solicitada, hora_inicio, hora_fin, prioridad, solicitante, correo FROM solicitudes
+            WHERE fecha_requerida = ? AND estado = 'aprobada'
+        ''', (fecha,)).fetchall():
+            self.reservas[fila[0]] = Reserva(fila[0], fila[1], minuto_de_hora(fila[2]), minuto_de_hora(fila[3]),
+                                             fila[4] or 0, fila[5], fila[2], fila[3], fila[6])
+
+        dia_semana = DIAS_SEMANA[date.fromisoformat(fecha).weekday()]
+        for sala, hora_inicio, hora_fin in conexion.execute('''
+            SELECT s.codigo, a.hora_inicio, a.hora_fin FROM asignaciones_semestrales a
+            JOIN salas s ON s.id = a.sala_id
+            WHERE ? BETWEEN a.fecha_inicio AND a.fecha_fin AND a.dia_semana = ?
+        ''', (fecha, dia_semana)).fetchall():
+            self.fijas.setdefault(sala, []).append((minuto_de_hora(hora_inicio), minuto_de_hora(hora_fin)))
+
+        self._por_sala = {}
+        for reserva in self.reservas.values():
+            self._por_sala.setdefault(reserva.sala, []).append(reserva)
+
+    def _ocupacion(self, sala, inicio, fin, plan, reservados):
+        """
+        (bloqueada, reservas que solapan) en la sala con el plan aplicado: plan es {id: sala nueva};
+        reservados son horarios ya comprometidos [(sala, inicio, fin)] que no se pueden mover
+        """
+        if any(_solapan(inicio, fin, a, b) for a, b in self.fijas.get(sala, [])):
+            return True, []
+        if any(s == sala and _solapan(inicio, fin, a, b) for s, a, b in reservados):
+            return True, []
+        ocupantes = [r for r in self._por_sala.get(sala, []) if plan.get(r.id, sala) == sala]
+        ocupantes += [self.reservas[i] for i, destino in plan.items()
+                      if destino == sala and self.reservas[i].sala != sala]
+        return False, [r for r in ocupantes if _solapan(inicio, fin, r.inicio, r.fin)]
+
+    def _equivalentes(self, reserva):
+        """Salas con capacidad y equipamiento al menos los de la sala original: misma facultad y mejor ajuste primero"""
+        ficha = self.indice.ficha(reserva.sala)
+        if ficha is None:
+            return []
+        posicion = self.indice.posiciones[reserva.sala]
+        conjunto = (self.indice.con_capacidad(ficha['capacidad'])
+                    & self.indice.con_equipamiento(self.indice.mascaras[posicion])
+                    & ~(1 << posicion))
+        salas = self.indice.salas_de(conjunto)
+        return sorted(salas, key=lambda sala: self.indice.ficha(sala)['facultad'] != ficha['facultad'])
+
+    def _colocar(self, reserva, plan, reservados):
+        """Cadena más corta de movimientos [(reserva, sala nueva)] que reubica la reserva, o None"""
+        cola = deque([((), reserva)])
+        while cola:
+            movimientos, pendiente = cola.popleft()
+            plan_local = dict(plan)
+            plan_local.update((r.id, sala) for r, sala in movimientos)
+            for sala in self._equivalentes(pendiente):
+                self.nodos_explorados += 1
+                if self.nodos_explorados > self.nodos_maximos:
+                    return None
+                bloqueada, ocupantes = self._ocupacion(sala, pendiente.inicio, pendiente.fin, plan_local, reservados)
+                if bloqueada:
+                    continue
+                cadena = movimientos + ((pendiente, sala),)
+                if not ocupantes:
+                    return list(cadena)
+                # Poda: se desplaza a lo sumo una reserva, de menor prioridad y aún no movida
+                desplazada = ocupantes[0]
+                if (len(cadena) < self.profundidad_maxima and len(ocupantes) == 1
+                        and desplazada.prioridad < pendiente.prioridad
+                        and desplazada.id not in plan_local):
+                    cola.append((cadena, desplazada))
+        return None
+
+    def resolver(self, sala, hora_inicio, hora_fin, prioridad):
+        """
+        Movimientos que dejan libre el horario en la sala, como diccionarios
+        {solicitud_id, solicitante, correo, sala_original, sala_nueva, hora_inicio, hora_fin, prioridad};
+        [] si ya está libre y None si no hay una cadena dentro de los límites.
+        """
+        inicio, fin = minuto_de_hora(hora_inicio), minuto_de_hora(hora_fin)
+        bloqueada, bloqueantes = self._ocupacion(sala, inicio, fin, {}, [])
+        if bloqueada or any(r.prioridad >= prioridad for r in bloqueantes):
+            return None
+
+        plan = {}
+        reservados = [(sala, inicio, fin)]
+        for reserva in bloqueantes:
+            if reserva.id in plan:
+                continue
+            cadena = self._colocar(reserva, plan, reservados)
+            if cadena is None:
+                return None
+            plan.update((r.id, nueva) for r, nueva in cadena)
+
+        return [{
+            'solicitud_id': reserva_id,
+            'solicitante': self.reservas[reserva_id].solicitante,
+            'correo': self.reservas[reserva_id].correo,
+            'sala_original': self.reservas[reserva_id].sala,
+            'sala_nueva': sala_nueva,
+            'hora_inicio': self.reservas[reserva_id].hora_inicio,
+            'hora_fin': self.reservas[reserva_id].hora_fin,
+            'prioridad': self.reservas[reserva_id].prioridad
+        } for reserva_id, sala_nueva in plan.items()]
+
+    def plan_valido(self, movimientos, sala, hora_inicio, hora_fin):
+        """Re-verificación: cada reserva sigue en su sala original y, con el plan aplicado, nada se solapa"""
+        for movimiento in movimientos:
+            reserva = self.reservas.get(movimiento['solicitud_id'])
+            if reserva is None or reserva.sala != movimiento['sala_original']:
+                return False
+        plan = {movimiento['solicitud_id']: movimiento['sala_nueva'] for movimiento in movimientos}
+        inicio, fin = minuto_de_hora(hora_inicio), minuto_de_hora(hora_fin)
+        bloqueada, ocupantes = self._ocupacion(sala, inicio, fin, plan, [])
+        if bloqueada or ocupantes:
+            return False
+        reservados = [(sala, inicio, fin)]
+        for reserva_id, sala_nueva in plan.items():
+            reserva = self.reservas[reserva_id]
+            bloqueada, ocupantes = self._ocupacion(sala_nueva, reserva.inicio, reserva.fin, plan, reservados)
+            if bloqueada or [r for r in ocupantes if r.id != reserva_id]:
+                return False
+        return True
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Motor de riesgo de conflictos del Sistema de Reservas UFRO
+Probabilidad de solapamiento por sala, día y bloque a partir del historial y del pronóstico
+Desarrollado por: MiniMax Agent
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datos_graficos import resolver_columna
+from esquemas_datos import COLUMNA_MINUTOS, convertir_fechas, minutos_del_dia, minuto_de_hora
+from motor_pronostico import (BLOQUES, COLUMNAS_FECHA, COLUMNAS_HORA, COLUMNAS_SALA,
+                              HORA_PRIMER_BLOQUE, DIAS_SEMANA)
+
+COLUMNA_MINUTOS_FIN = 'Minuto_Fin'
+DURACION_POR_DEFECTO = 60  # minutos, cuando la solicitud no indica término
+
+# Peso del historial frente al pronóstico en el riesgo combinado
+PESO_HISTORICO = 0.5
+
+def _minutos_fin(df, inicios):
+    """Minuto de término: hora_fin, duración o segunda hora del bloque ('10:00-12:00')"""
+    if 'hora_fin' in df.columns:
+        fines = minutos_del_dia(df['hora_fin']).to_numpy()
+    elif 'Duración_Estimada' in df.columns:
+        fines = inicios + pd.to_numeric(df['Duración_Estimada'], errors='coerce').fillna(DURACION_POR_DEFECTO).to_numpy()
+    elif 'Duracion' in df.columns:
+        fines = inicios + pd.to_numeric(df['Duracion'], errors='coerce').fillna(1).to_numpy() * 60
+    else:
+        columna_hora = resolver_columna(df, COLUMNAS_HORA)
+        fines = np.full(len(df), -1)
+        if columna_hora is not None:
+            fines = minutos_del_dia(df[columna_hora], ultima=True).to_numpy()
+    return np.where(fines > inicios, fines, inicios + DURACION_POR_DEFECTO)
+
+def intervalos_desde(df):
+    """
+    Normaliza solicitudes de cualquier formato (planillas o SQLite) a intervalos:
+    sala_solicitada, fecha_requerida, Minuto_Inicio, Minuto_Fin. Descarta filas sin sala, fecha u hora.
+    """
+    vacio = pd.DataFrame({
+        'sala_solicitada': pd.Series(dtype=object), 'fecha_requerida': pd.Series(dtype='datetime64[ns]'),
+        COLUMNA_MINUTOS: pd.Series(dtype=np.int32), COLUMNA_MINUTOS_FIN: pd.Series(dtype=np.int32)
+    })
+    columna_sala = resolver_columna(df, COLUMNAS_SALA)
+    columna_fecha = resolver_columna(df, COLUMNAS_FECHA)
+    columna_hora = resolver_columna(df, COLUMNAS_HORA)
+    if df is None or df.empty or columna_sala is None or columna_fecha is None:
+        return vacio
+    if COLUMNA_MINUTOS in df.columns:
+        inicios = df[COLUMNA_MINUTOS].to_numpy().astype(np.int32)
+    elif columna_hora is not None:
+        inicios = minutos_del_dia(df[columna_hora]).to_numpy().astype(np.int32)
+    else:
+        return vacio
+
+    intervalos = pd.DataFrame({
+        'sala_solicitada': df[columna_sala].astype(str).to_numpy(),
+        'fecha_requerida': convertir_fechas(df[columna_fecha]).dt.normalize().to_numpy(),
+        COLUMNA_MINUTOS: inicios,
+        COLUMNA_MINUTOS_FIN: _minutos_fin(df, inicios).astype(np.int32)
+    })
+    validos = intervalos['fecha_requerida'].notna() & (intervalos[COLUMNA_MINUTOS] >= 0) & df[columna_sala].notna().to_numpy()
+    return intervalos[validos].reset_index(drop=True)
+
+def barrer_solapes(grupos, inicios, fines):
+    """
+    Barrido de línea sobre los intervalos de todos los grupos (sala, fecha) a la vez.
+    Ordena los eventos de inicio y término (O(n log n)); dentro de un grupo, los tramos
+    entre eventos consecutivos con 2 o más solicitudes activas son solapamientos.
+    Retorna (grupo, bloque) únicos con algún solapamiento.
+    """
+    n = len(inicios)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    eventos_grupo = np.concatenate([grupos, grupos])
+    tiempos = np.concatenate([inicios, fines])
+    # Los términos (-1) se ordenan antes que los inicios (+1) del mismo minuto: 10-12 y 12-14 no se solapan
+    deltas = np.concatenate([np.ones(n, dtype=np.int32), -np.ones(n, dtype=np.int32)])
+    orden = np.lexsort((deltas, tiempos, eventos_grupo))
+    eventos_grupo, tiempos, deltas = eventos_grupo[orden], tiempos[orden], deltas[orden]
+
+    # Cada grupo termina con 0 activos, así que la suma acumulada global no necesita reiniciarse
+    activos = np.cumsum(deltas)
+    tramo = (activos[:-1] >= 2) & (eventos_grupo[:-1] == eventos_grupo[1:]) & (tiempos[1:] > tiempos[:-1])
+
+    primer_bloque = tiempos[:-1][tramo] // 60 - HORA_PRIMER_BLOQUE
+    ultimo_bloque = (tiempos[1:][tramo] - 1) // 60 - HORA_PRIMER_BLOQUE
+    primer_bloque = np.clip(primer_bloque, 0, len(BLOQUES) - 1)
+    ultimo_bloque = np.clip(ultimo_bloque, 0, len(BLOQUES) - 1)
+    grupo_tramo = eventos_grupo[:-1][tramo]
+
+    # Expandir cada tramo a los bloques que cubre
+    largos = ultimo_bloque - primer_bloque + 1
+    grupo_bloque = np.repeat(grupo_tramo, largos)
+    desplazamiento = np.arange(largos.sum()) - np.repeat(np.cumsum(largos) - largos, largos)
+    bloques = np.repeat(primer_bloque, largos) + desplazamiento
+
+    unicos = np.unique(grupo_bloque.astype(np.int64) * len(BLOQUES) + bloques)
+    return unicos // len(BLOQUES), unicos % len(BLOQUES)
+
+def _lunes(fecha):
+    return fecha - pd.Timedelta(days=fecha.dayofweek)
+
+def _dia_absoluto(fechas):
+    """Días desde 1970-01-01 (un jueves) de un arreglo de fechas"""
+    return np.asarray(fechas, dtype='datetime64[D]').astype(np.int64)
+
+def _dia_semana(dias_absolutos):
+    return (dias_absolutos + 3) % 7
+
+class MotorRiesgo:
+    """
+    Matriz de riesgo (sala, día, bloque) entre 0 y 1.
+    - Histórico: fracción de semanas en que ese bloque tuvo solicitudes solapadas.
+    - Pronóstico: probabilidad de que otra solicitud caiga en el bloque (Poisson con la demanda esperada).
+    Las solicitudes nuevas se incorporan con agregar(): solo se vuelve a barrer su día.
+    """
+
+    def __init__(self, peso_historico=PESO_HISTORICO):
+        self.peso_historico = peso_historico
+        self.salas = []
+        self._indice_salas = {}
+        self.solapes = np.zeros((0, 7, len(BLOQUES)), dtype=np.int32)
+        self.demanda = None  # demanda semanal esperada (sala, día, bloque) alineada con self.salas
+        self.primer_lunes = None
+        self.ultimo_lunes = None
+        self._matriz = None
+        self._candado = threading.RLock()
+
+        # Historial cargado, ordenado por clave de día (sala << 32 | día absoluto)
+        self._claves_base = np.empty(0, dtype=np.int64)
+        self._inicios_base = np.empty(0, dtype=np.int32)
+        self._fines_base = np.empty(0, dtype=np.int32)
+        self._solapes_base = np.empty(0, dtype=np.int64)  # clave de día * bloques + bloque
+        # Días modificados después de la carga
+        self._intervalos_agregados = {}  # clave de día -> [(inicio, fin)]
+        self._bloques_actualizados = {}  # clave de día -> bloques con solapamiento
+
+    def _indice_sala(self, sala):
+        indice = self._indice_salas.get(sala)
+        if indice is None:
+            indice = len(self.salas)
+            self.salas.append(sala)
+            self._indice_salas[sala] = indice
+            self.solapes = np.concatenate([self.solapes, np.zeros((1, 7, len(BLOQUES)), dtype=np.int32)])
+            if self.demanda is not None:
+                self.demanda = np.concatenate([self.demanda, np.zeros((1, 7, len(BLOQUES)), dtype=np.float32)])
+        return indice
+
+    def _extender_rango(self, fecha):
+        lunes = _lunes(fecha)
+        if self.primer_lunes is None or lunes < self.primer_lunes:
+            self.primer_lunes = lunes
+        if self.ultimo_lunes is None or lunes > self.ultimo_lunes:
+            self.ultimo_lunes = lunes
+
+    @property
+    def semanas_observadas(self):
+        if self.primer_lunes is None:
+            return 0
+        return (self.ultimo_lunes - self.primer_lunes).days // 7 + 1
+
+    def cargar(self, intervalos):
+        """Carga masiva desde intervalos_desde(): un solo barrido para todo el historial"""
+        with self._candado:
+            if intervalos.empty:
+                return self
+            salas_fila = intervalos['sala_solicitada'].astype(str)
+            for sala in sorted(salas_fila.unique()):
+                self._indice_sala(sala)
+            indices_sala = salas_fila.map(self._indice_salas).to_numpy().astype(np.int64)
+            dias = _dia_absoluto(intervalos['fecha_requerida'])
+            claves = (indices_sala << 32) | dias
+
+            orden = np.argsort(claves, kind='stable')
+            self._claves_base = claves[orden]
+            self._inicios_base = intervalos[COLUMNA_MINUTOS].to_numpy().astype(np.int32)[orden]
+            self._fines_base = intervalos[COLUMNA_MINUTOS_FIN].to_numpy().astype(np.int32)[orden]
+
+            self.solapes[:] = 0
+            claves_solape, bloques_solape = barrer_solapes(self._claves_base, self._inicios_base, self._fines_base)
+            self._solapes_base = claves_solape * len(BLOQUES) + bloques_solape
+            np.add.at(self.solapes, (claves_solape >> 32, _dia_semana(claves_solape & 0xFFFFFFFF), bloques_solape), 1)
+
+            self._extender_rango(intervalos['fecha_requerida'].min())
+            self._extender_rango(intervalos['fecha_requerida'].max())
+            self._intervalos_agregados = {}
+            self._bloques_actualizados = {}
+            self._matriz = None
+        return self
+
+    def _intervalos_dia(self, clave):
+        desde, hasta = np.searchsorted(self._claves_base, [clave, clave + 1])
+        base = list(zip(self._inicios_base[desde:hasta].tolist(), self._fines_base[desde:hasta].tolist()))
+        return base + self._intervalos_agregados.get(clave, [])
+
+    def _bloques_dia(self, clave):
+        if clave in self._bloques_actualizados:
+            return self._bloques_actualizados[clave]
+        desde, hasta = np.searchsorted(self._solapes_base, [clave * len(BLOQUES), (clave + 1) * len(BLOQUES)])
+        return set((self._solapes_base[desde:hasta] % len(BLOQUES)).tolist())
+
+    def agregar(self, sala, fecha, hora_inicio, hora_fin):
+        """
+        Incorpora una solicitud nueva (formato 'YYYY-MM-DD', 'HH:MM') volviendo a barrer solo su día.
+        Una fecha u hora ilegible no es demanda: se ignora (la solicitud ya quedó rechazada).
+        """
+        try:
+            fecha = pd.Timestamp(fecha)
+        except (ValueError, TypeError):
+            return
+        if pd.isna(fecha):
+            return
+        fecha = fecha.normalize()
+        inicio = minuto_de_hora(hora_inicio)
+        fin = minuto_de_hora(hora_fin)
+        if inicio < 0:
+            return
+        if fin <= inicio:
+            fin = inicio + DURACION_POR_DEFECTO
+
+        with self._candado:
+            indice = self._indice_sala(str(sala))
+            self._extender_rango(fecha)
+            clave = (indice << 32) | int(_dia_absoluto([fecha])[0])
+
+            intervalos = self._intervalos_dia(clave) + [(inicio, fin)]
+            self._intervalos_agregados.setdefault(clave, []).append((inicio, fin))
+            inicios, fines = np.array(intervalos).T
+            _, bloques = barrer_solapes(np.zeros(len(intervalos), dtype=np.int64), inicios, fines)
+
+            nuevos = set(bloques.tolist())
+            for bloque in nuevos - self._bloques_dia(clave):
+                self.solapes[indice, fecha.dayofweek, bloque] += 1
+            self._bloques_actualizados[clave] = nuevos
+            self._matriz = None
+
+    def aplicar_pronostico(self, pronostico):
+        """Demanda semanal media esperada de motor_pronostico, alineada con las salas del motor"""
+        with self._candado:
+            if pronostico is None:
+                self.demanda = None
+            else:
+                for sala in pronostico.salas:
+                    self._indice_sala(sala)
+                demanda = np.zeros((len(self.salas), 7, len(BLOQUES)), dtype=np.float32)
+                indices = [self._indice_salas[sala] for sala in pronostico.salas]
+                demanda[indices] = pronostico.valores.mean(axis=1)
+                self.demanda = demanda
+            self._matriz = None
+
+    def matriz(self):
+        """Riesgo combinado (sala, día, bloque) entre 0 y 1"""
+        with self._candado:
+            if self._matriz is None:
+                historico = np.clip(self.solapes / max(self.semanas_observadas, 1), 0, 1)
+                if self.demanda is None:
+                    self._matriz = historico
+                else:
+                    probabilidad_demanda = 1 - np.exp(-self.demanda)
+                    self._matriz = self.peso_historico * historico + (1 - self.peso_historico) * probabilidad_demanda
+            return self._matriz
+
+    def riesgo(self, sala, fecha, hora_inicio, hora_fin=None):
+        """Mayor riesgo entre los bloques que cubre la reserva (0 si la sala no tiene historial)"""
+        indice = self._indice_salas.get(sala)
+        if indice is None:
+            return 0.0
+        dia = pd.Timestamp(fecha).dayofweek
+        primero = minuto_de_hora(hora_inicio) // 60 - HORA_PRIMER_BLOQUE
+        ultimo = primero
+        if hora_fin:
+            ultimo = (minuto_de_hora(hora_fin) - 1) // 60 - HORA_PRIMER_BLOQUE
+        primero, ultimo = max(primero, 0), min(max(ultimo, primero), len(BLOQUES) - 1)
+        if primero > ultimo:
+            return 0.0
+        return float(self.matriz()[indice, dia, primero:ultimo + 1].max())
+
+    def por_sala(self):
+        """Riesgo máximo (%) de cada sala en su bloque más disputado, de mayor a menor"""
+        matriz = self.matriz()
+        if not len(self.salas):
+            return pd.Series(dtype=float)
+        return pd.Series(matriz.max(axis=(1, 2)) * 100, index=self.salas).round(1).sort_values(ascending=False)
+
+    def a_dataframe(self):
+        """Formato largo: Sala, Dia, Bloque, Riesgo (0-1)"""
+        matriz = self.matriz()
+        s, d, b = np.indices(matriz.shape).reshape(3, -1)
+        return pd.DataFrame({
+            'Sala': np.asarray(self.salas, dtype=object)[s] if len(self.salas) else [],
+            'Dia': np.asarray(DIAS_SEMANA)[d],
+            'Bloque': np.asarray(BLOQUES)[b],
+            'Riesgo': matriz.reshape(-1)
+        })
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Navegador de datos del Sistema de Reservas UFRO
+Paginación, filtros, orden y estadísticas resueltos en SQLite (lado del servidor)
+Desarrollado por: MiniMax Agent
+"""
+
+import os
+import sqlite3
+import threading
+
+ESQUEMA_BASE_DATOS = 'reservas'
+
+def _identificador(nombre):
+    """Cita un identificador SQL (tabla o columna)"""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+class NavegadorDatos:
+    """
+    Consulta páginas de tablas sin enviar la tabla completa al navegador.
+    - Las planillas cargadas (DataFrames) se publican una vez por versión en SQLite en memoria.
+    - La base de datos del sistema se adjunta en modo solo lectura; si aún no existe al crear
+      el navegador (recurso compartido del proceso), se adjunta en la primera consulta posterior.
+    """
+
+    def __init__(self, db_path='sistema_reservas.db'):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False, uri=True)
+        self._candado = threading.RLock()
+        self.versiones = {}       # tabla publicada -> versión de datos
+        self.estadisticas_cache = {}  # (tabla, versión) -> DataFrame
+        self.ruta_base_datos = os.path.abspath(db_path)
+        self.base_datos_adjunta = False
+        self._adjuntar()
+
+    def _adjuntar(self):
+        """Adjunta la base de datos del sistema si existe y aún no está adjunta; retorna si quedó adjunta"""
+        if self.base_datos_adjunta or not os.path.exists(self.ruta_base_datos):
+            return self.base_datos_adjunta
+        with self._candado:
+            if not self.base_datos_adjunta:
+                self.conn.execute(f"ATTACH DATABASE 'file:{self.ruta_base_datos}?mode=ro' AS {ESQUEMA_BASE_DATOS}")
+                self.base_datos_adjunta = True
+        return True
+
+    @property
+    def tablas_base_datos(self):
+        """Tablas de la base de datos del sistema (vacía mientras no exista)"""
+        if not self._adjuntar():
+            return []
+        with self._candado:
+            return [fila[0] for fila in self.conn.execute(
+                f"SELECT name FROM {ESQUEMA_BASE_DATOS}.sqlite_master WHERE type = 'table' ORDER BY name"
+            )]
+
+    def _tabla_sql(self, tabla):
+        if tabla in self.versiones:
+            return _identificador(tabla)
+        if tabla in self.tablas_base_datos:
+            return f"{ESQUEMA_BASE_DATOS}.{_identificador(tabla)}"
+        raise KeyError(f"Tabla desconocida: {tabla}")
+
+    def _version(self, tabla):
+        if tabla in self.versiones:
+            return self.versiones[tabla]
+        # Tablas vivas: data_version cambia cuando otra conexión confirma escrituras
+        self._tabla_sql(tabla)
+        with self._candado:
+            return self.conn.execute(f"PRAGMA {ESQUEMA_BASE_DATOS}.data_version").fetchone()[0]
+
+    def publicar_tabla(self, tabla, df, version):
+        """Copia un DataFrame a SQLite solo si su versión cambió"""
+        if self.versiones.get(tabla) == version:
+            return False
+
+        with self._candado:
+            df.to_sql(tabla, self.conn, if_exists='replace', index=False, chunksize=5000)
+            self.versiones[tabla] = version
+            self.estadisticas_cache = {
+                clave: valor for clave, valor in self.estadisticas_cache.items() if clave[0] != tabla
+            }
+        return True
+
+    def columnas(self, tabla):
+        """Lista de (columna, tipo SQLite)"""
+        if tabla in self.versiones:
+            consulta = f"PRAGMA table_info({_identificador(tabla)})"
+        else:
+            self._tabla_sql(tabla)  # adjunta la base de datos si apareció después; KeyError si no existe
+            consulta = f"PRAGMA {ESQUEMA_BASE_DATOS}.table_info({_identificador(tabla)})"
+        with self._candado:
+            return [(fila[1], fila[2]) for fila in self.conn.execute(consulta)]
+
+    def _condiciones(self, tabla, filtros):
+        """WHERE parametrizado; solo se aceptan columnas existentes"""
+        validas = {nombre for nombre, _ in self.columnas(tabla)}
+        condiciones = []
+        parametros = []
+        for columna, texto in (filtros or {}).items():
+            if columna in validas and texto not in (None, ''):
+                condiciones.append(f"CAST({_identificador(columna)} AS TEXT) LIKE ?")
+                parametros.append(f"%{texto}%")
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        return where, parametros
+
+    def contar(self, tabla, filtros=None):
+        where, parametros = self._condiciones(tabla, filtros)
+        with self._candado:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self._tabla_sql(tabla)}{where}", parametros).fetchone()[0]
+
+    def pagina(self, tabla, numero_pagina=1, tamano=50, filtros=None, orden=None, descendente=False):
+        """Retorna un DataFrame con la página pedida (numero_pagina desde 1)"""
+        import pandas as pd
+
+        where, parametros = self._condiciones(tabla, filtros)
+        validas = {nombre for nombre, _ in self.columnas(tabla)}
+
+        order_by = ' ORDER BY rowid'
+        if orden in validas:
+            direccion = 'DESC' if descendente else 'ASC'
+            order_by = f" ORDER BY {_identificador(orden)} {direccion}, rowid"
+            if tabla in self.versiones:
+                # El índice permite ORDER BY ... LIMIT sin ordenar la tabla completa
+                nombre_indice = _identificador(f"idx_{tabla}_{orden}")
+                with self._candado:
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre_indice} "
+                                      f"ON {_identificador(tabla)} ({_identificador(orden)})")
+
+        consulta = f"SELECT * FROM {self._tabla_sql(tabla)}{where}{order_by} LIMIT ? OFFSET ?"
+        parametros = parametros + [int(tamano), int(max(numero_pagina - 1, 0) * tamano)]
+        with self._candado:
+            return pd.read_sql_query(consulta, self.conn, params=parametros)
+
+    def estadisticas(self, tabla):
+        """Conteo, valores distintos, mínimo y máximo por columna (calculado una vez por versión)"""
+        import pandas as pd
+
+        clave = (tabla, self._version(tabla))
+        if clave in self.estadisticas_cache:
+            return self.estadisticas_cache[clave]
+
+        columnas = self.columnas(tabla)
+        expresiones = []
+        for nombre, _ in columnas:
+            col = _identificador(nombre)
+            expresiones.append(f"COUNT({col}), COUNT(DISTINCT {col}), MIN({col}), MAX({col})")
+
+        with self._candado:
+            fila = self.conn.execute(
+                f"SELECT COUNT(*), {', '.join(expresiones)} FROM {self._tabla_sql(tabla)}"
+            ).fetchone()
+
+        total = fila[0]
+        registros = []
+        for i, (nombre, tipo) in enumerate(columnas):
+            no_nulos, distintos, minimo, maximo = fila[1 + 4 * i: 5 + 4 * i]
+            registros.append({
+                'Columna': nombre,
+                'Tipo': tipo or 'TEXT',
+                'No nulos': no_nulos,
+                'Nulos': total - no_nulos,
+                'Distintos': distintos,
+                'Mínimo': None if minimo is None else str(minimo),
+                'Máximo': None if maximo is None else str(maximo)
+            })
+
+        estadisticas = pd.DataFrame(registros)
+        self.estadisticas_cache[clave] = estadisticas
+        return estadisticas
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Reporte HTML del Sistema de Reservas UFRO
+Página autocontenida con gráficos SVG; cada sección se regenera solo si cambia la huella de sus datos
+Desarrollado por: MiniMax Agent
+"""
+
+import hashlib
+import html
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from bitacora import obtener_logger
+from metricas_sistema import medir
+from modelo_dashboard import MAPEOS, ModeloDashboard
+
+logger = obtener_logger('reporte_html')
+
+# Cambia cuando cambia el marcado de las secciones: invalida las secciones guardadas
+VERSION_PLANTILLA = 1
+
+ANCHO = 420
+ALTO = 240
+MARGEN = 36
+COLORES = ['#4e79a7', '#f28e2b', '#59a14f', '#e15759', '#76b7b2', '#edc948', '#b07aa1', '#9c755f']
+
+ESTILO = '''
+body{font-family:system-ui,sans-serif;margin:24px;color:#222;background:#fafafa}
+h1{font-size:22px}main{display:grid;grid-template-columns:repeat(auto-fill,minmax(440px,1fr));gap:16px}
+section{background:#fff;border:1px solid #ddd;border-radius:6px;padding:12px}
+h2{font-size:15px;margin:0 0 8px}svg{width:100%;height:auto;font-size:10px}
+.faltante{color:#777;font-style:italic}table{border-collapse:collapse;width:100%}
+td{padding:6px;border-bottom:1px solid #eee}td:last-child{text-align:right;font-weight:bold}
+footer{margin-top:16px;color:#777;font-size:12px}
+'''
+
+# Sección del dashboard -> (tabla, roles del mapeo) de los que depende su contenido
+SECCIONES_PANEL = {
+    'tipo_usuario': ('solicitudes', ['tipo_usuario']),
+    'uso_salas': ('indicadores', ['sala', 'uso']),
+    'reasignaciones': ('reasignaciones', ['fecha']),
+    'horarios': ('solicitudes', ['horario']),
+    'estado_asignaciones': ('asignaciones', ['estado'])
+}
+GRAFICOS_PANEL = {
+    'tipo_usuario': 'torta',
+    'uso_salas': 'barras',
+    'reasignaciones': 'linea',
+    'horarios': 'barras_horizontales',
+    'estado_asignaciones': 'torta'
+}
+
+def _n(valor):
+    """Coordenada con un decimal: el SVG ocupa la mitad que con la precisión completa"""
+    return f"{valor:.1f}".rstrip('0').rstrip('.')
+
+def _texto(valor):
+    return html.escape(str(valor))
+
+def _svg(contenido, alto=ALTO):
+    return f'<svg viewBox="0 0 {ANCHO} {alto}" xmlns="http://www.w3.org/2000/svg">{contenido}</svg>'
+
+def svg_barras(serie, color=COLORES[0]):
+    """Barras verticales con la etiqueta bajo cada barra y el valor encima"""
+    maximo = float(serie.max()) or 1.0
+    ancho_barra = (ANCHO - 2 * MARGEN) / len(serie)
+    base = ALTO - MARGEN
+    partes = [f'<line x1="{MARGEN}" y1="{base}" x2="{ANCHO - MARGEN}" y2="{base}" stroke="#999"/>']
+    for i, (etiqueta, valor) in enumerate(serie.items()):
+        alto = (base - MARGEN / 2) * float(valor) / maximo
+        x = MARGEN + i * ancho_barra
+        centro = x + ancho_barra / 2
+        partes.append(f'<rect x="{_n(x + 2)}" y="{_n(base - alto)}" width="{_n(ancho_barra - 4)}" '
+                      f'height="{_n(alto)}" fill="{color}"><title>{_texto(etiqueta)}: {_texto(valor)}</title></rect>')
+        partes.append(f'<text x="{_n(centro)}" y="{_n(base - alto - 3)}" text-anchor="middle">{_texto(round(float(valor), 1))}</text>')
+        partes.append(f'<text x="{_n(centro)}" y="{base + 12}" text-anchor="middle">{_texto(str(etiqueta)[:12])}</text>')
+    return _svg(''.join(partes))
+
+def svg_barras_horizontales(serie, color=COLORES[1]):
+    """Barras horizontales, la mayor arriba"""
+    maximo = float(serie.max()) or 1.0
+    alto_barra = (ALTO - MARGEN) / len(serie)
+    inicio = MARGEN * 2.5
+    partes = []
+    for i, (etiqueta, valor) in enumerate(serie.items()):
+        largo = (ANCHO - inicio - MARGEN) * float(valor) / maximo
+        y = MARGEN / 2 + i * alto_barra
+        centro = y + alto_barra / 2 + 3
+        partes.append(f'<rect x="{_n(inicio)}" y="{_n(y + 2)}" width="{_n(largo)}" height="{_n(alto_barra - 4)}" '
+                      f'fill="{color}"><title>{_texto(etiqueta)}: {_texto(valor)}</title></rect>')
+        partes.append(f'<text x="{_n(inicio - 4)}" y="{_n(centro)}" text-anchor="end">{_texto(str(etiqueta)[:14])}</text>')
+        partes.append(f'<text x="{_n(inicio + largo + 3)}" y="{_n(centro)}">{_texto(round(float(valor), 1))}</text>')
+    return _svg(''.join(partes))
+
+def svg_torta(serie):
+    """Torta con leyenda y porcentajes; una sola categoría es un círculo completo"""
+    total = float(serie.sum()) or 1.0
+    cx, cy, r = ALTO / 2, ALTO / 2, ALTO / 2 - 12
+    partes = []
+    angulo = -math.pi / 2
+    for i, (etiqueta, valor) in enumerate(serie.items()):
+        color = COLORES[i % len(COLORES)]
+        fraccion = float(valor) / total
+        titulo = f'<title>{_texto(etiqueta)}: {_texto(valor)} ({fraccion:.1%})</title>'
+        if fraccion >= 0.9999:
+            partes.append(f'<circle cx="{_n(cx)}" cy="{_n(cy)}" r="{_n(r)}" fill="{color}">{titulo}</circle>')
+        elif fraccion > 0:
+            final = angulo + fraccion * 2 * math.pi
+            x1, y1 = cx + r * math.cos(angulo), cy + r * math.sin(angulo)
+            x2, y2 = cx + r * math.cos(final), cy + r * math.sin(final)
+            arco_mayor = 1 if fraccion > 0.5 else 0
+            partes.append(f'<path d="M{_n(cx)} {_n(cy)}L{_n(x1)} {_n(y1)}A{_n(r)} {_n(r)} 0 {arco_mayor} 1 '
+                          f'{_n(x2)} {_n(y2)}Z" fill="{color}">{titulo}</path>')
+            angulo = final
+        y = 20 + i * 18
+        partes.append(f'<rect x="{ALTO + 10}" y="{y - 9}" width="10" height="10" fill="{color}"/>')
+        partes.append(f'<text x="{ALTO + 26}" y="{y}">{_texto(str(etiqueta)[:18])} {fraccion:.1%}</text>')
+    return _svg(''.join(partes))
+
+def svg_lineas(series):
+    """Una o más series ({nombre: Serie}) sobre el mismo índice, con leyenda si hay más de una"""
+    indice = list(next(iter(series.values())).index)
+    maximo = max(float(serie.max()) for serie in series.values()) or 1.0
+    base = ALTO - MARGEN
+    paso = (ANCHO - 2 * MARGEN) / max(len(indice) - 1, 1)
+    partes = [f'<line x1="{MARGEN}" y1="{base}" x2="{ANCHO - MARGEN}" y2="{base}" stroke="#999"/>',
+              f'<text x="{MARGEN - 4}" y="{MARGEN / 2 + 3}" text-anchor="end">{_texto(round(maximo, 1))}</text>']
+    salto = max(len(indice) // 8, 1)
+    for i in range(0, len(indice), salto):
+        partes.append(f'<text x="{_n(MARGEN + i * paso)}" y="{base + 12}" text-anchor="middle">{_texto(str(indice[i])[:10])}</text>')
+    for j, (nombre, serie) in enumerate(series.items()):
+        color = COLORES[j % len(COLORES)]
+        puntos = ' '.join(f"{_n(MARGEN + i * paso)},{_n(base - (base - MARGEN / 2) * float(valor) / maximo)}"
+                          for i, valor in enumerate(serie.values))
+        partes.append(f'<polyline points="{puntos}" fill="none" stroke="{color}" stroke-width="2"/>')
+        if len(series) > 1:
+            partes.append(f'<text x="{ANCHO - MARGEN}" y="{12 + j * 12}" text-anchor="end" fill="{color}">{_texto(nombre)}</text>')
+    return _svg(''.join(partes))
+
+GRAFICOS = {
+    'barras': svg_barras,
+    'barras_horizontales': svg_barras_horizontales,
+    'torta': svg_torta,
+    'linea': lambda serie: svg_lineas({'': serie})
+}
+
+def _seccion(titulo, cuerpo):
+    titulo = titulo.replace('\n', ' ')
+    return f'<section><h2>{_texto(titulo)}</h2>{cuerpo}</section>'
+
+def _sin_datos(titulo, motivo):
+    return _seccion(titulo, f'<p class="faltante">Sin datos reales: {_texto(motivo)}</p>')
+
+def _huella(*partes):
+    """sha1 de tablas (solo las columnas indicadas) y valores simples"""
+    huella = hashlib.sha1(str(VERSION_PLANTILLA).encode())
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            huella.update(repr((list(parte.columns), len(parte))).encode())
+            if len(parte.columns):
+                huella.update(pd.util.hash_pandas_object(parte, index=False).values.tobytes())
+        else:
+            huella.update(repr(parte).encode())
+    return huella.hexdigest()[:16]
+
+class ReporteHTML:
+    """
+    Genera el reporte a partir de las series agregadas (modelo_dashboard y el pronóstico de
+    demanda). Cada sección guarda su HTML junto a la huella de los datos de los que depende en
+    `<ruta>.secciones.json`; al regenerar, solo se recalculan las secciones cuya huella cambió.
+    """
+
+    def __init__(self, ruta='dashboard_ufro.html'):
+        self.ruta = ruta
+        self.ruta_secciones = ruta + '.secciones.json'
+        self.regeneradas = []
+
+    def _cargar_secciones(self):
+        try:
+            with open(self.ruta_secciones, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _huellas(self, datos, mapeo):
+        """Huella por sección: las columnas de la tabla de origen que usa (o el tamaño si faltan)"""
+        huellas = {}
+        for nombre, (tabla, roles) in SECCIONES_PANEL.items():
+            df = datos.get(tabla)
+            columnas = [mapeo[tabla][rol] for rol in roles if mapeo[tabla][rol] is not None]
+            huellas[nombre] = _huella(tabla, roles, None if df is None else df[columnas])
+        solicitudes = datos.get('solicitudes')
+        columna_estado = mapeo['solicitudes']['estado']
+        huellas['kpis'] = _huella(
+            *[None if datos.get(tabla) is None else len(datos[tabla]) for tabla in ('solicitudes', 'reasignaciones', 'notificaciones')],
+            None if solicitudes is None or columna_estado is None else solicitudes[[columna_estado]]
+        )
+        if solicitudes is not None:
+            from motor_pronostico import huella_solicitudes
+            huellas['pronostico'] = _huella('pronostico', huella_solicitudes(solicitudes))
+        else:
+            huellas['pronostico'] = _huella('pronostico', None)
+        return huellas
+
+    def _panel(self, modelo, nombre):
+        panel = modelo.paneles[nombre]
+        if not panel.disponible:
+            return _sin_datos(panel.titulo, panel.faltante)
+        return _seccion(panel.titulo, GRAFICOS[GRAFICOS_PANEL[nombre]](panel.serie))
+
+    def _kpis(self, modelo):
+        def valor(clave, formato='{:,}'):
+            return 'sin datos' if modelo.kpis[clave] is None else formato.format(modelo.kpis[clave])
+
+        filas = [('📋 Total Solicitudes', valor('solicitudes')),
+                 ('🔄 Reasignaciones', valor('reasignaciones')),
+                 ('📧 Notificaciones', valor('notificaciones')),
+                 ('✅ Tasa de Aprobación', valor('tasa_aprobacion', '{}%'))]
+        tabla = ''.join(f'<tr><td>{_texto(nombre)}</td><td>{_texto(dato)}</td></tr>' for nombre, dato in filas)
+        return _seccion('📊 Indicadores Clave (KPIs)', f'<table>{tabla}</table>')
+
+    def _pronostico(self, datos):
+        from motor_pronostico import DIAS_SEMANA, pronosticar_demanda
+
+        titulo = '🔮 Demanda Reciente y Pronosticada'
+        solicitudes = datos.get('solicitudes')
+        pronostico = pronosticar_demanda(solicitudes) if solicitudes is not None and not solicitudes.empty else None
+        if pronostico is None:
+            return _sin_datos(titulo, 'historial de solicitudes insuficiente para pronosticar')
+        dias = DIAS_SEMANA[:5]
+        por_dia = svg_lineas({'Reciente': pronostico.recientes_por_dia_semana()[dias],
+                              'Pronóstico': pronostico.por_dia_semana()[dias]})
+        por_bloque = svg_lineas({'Reciente': pronostico.recientes_por_bloque(),
+                                 'Pronóstico': pronostico.por_bloque()})
+        return _seccion(titulo, por_dia + por_bloque)
+
+    def generar(self, datos, version=None):
+        """Escribe el reporte; retorna la ruta. self.regeneradas lista las secciones recalculadas."""
+        inicio = time.perf_counter()
+        with medir('ufro_reporte_segundos', formato='html'):
+            datos = {tabla: df for tabla, df in datos.items() if isinstance(df, pd.DataFrame)}
+            mapeo = MAPEOS.obtener(datos, version)
+            huellas = self._huellas(datos, mapeo)
+            guardadas = self._cargar_secciones()
+            self.regeneradas = [nombre for nombre, huella in huellas.items()
+                                if guardadas.get(nombre, {}).get('huella') != huella]
+
+            secciones = {nombre: guardadas[nombre] for nombre in huellas if nombre not in self.regeneradas}
+            paneles = [nombre for nombre in self.regeneradas if nombre in SECCIONES_PANEL or nombre == 'kpis']
+            modelo = ModeloDashboard(datos, version) if paneles else None
+            for nombre in self.regeneradas:
+                if nombre == 'kpis':
+                    contenido = self._kpis(modelo)
+                elif nombre == 'pronostico':
+                    contenido = self._pronostico(datos)
+                else:
+                    contenido = self._panel(modelo, nombre)
+                secciones[nombre] = {'huella': huellas[nombre], 'html': contenido}
+
+            orden = list(SECCIONES_PANEL) + ['kpis', 'pronostico']
+            pagina = (
+                '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+                '<title>Dashboard Sistema de Reservas UFRO</title>'
+                f'<style>{ESTILO}</style></head><body>'
+                '<h1>📊 Dashboard Sistema de Reservas UFRO</h1><main>'
+                + ''.join(secciones[nombre]['html'] for nombre in orden)
+                + f'</main><footer>Generado el {datetime.now():%Y-%m-%d %H:%M}</footer></body></html>'
+            )
+            self._escribir(self.ruta, pagina)
+            if self.regeneradas:
+                self._escribir(self.ruta_secciones, json.dumps(secciones, ensure_ascii=False))
+
+        logger.info("Reporte HTML generado en %.3f s (%d secciones regeneradas)", time.perf_counter() - inicio,
+                    len(self.regeneradas), extra={'evento': 'reporte_html', 'regeneradas': self.regeneradas})
+        return self.ruta
+
+    @staticmethod
+    def _escribir(ruta, contenido):
+        """Reemplazo atómico: un lector nunca ve el archivo a medio escribir"""
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+def generar_reporte_html(datos, ruta='dashboard_ufro.html', version=None):
+    """Genera (o actualiza) el reporte HTML; retorna las secciones regeneradas"""
+    reporte = ReporteHTML(ruta)
+    reporte.generar(datos, version)
+    return reporte.regeneradas
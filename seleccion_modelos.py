@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Selección del modelo de probabilidad de aprobación del Sistema de Reservas UFRO
+Validación cruzada temporal en paralelo de varios candidatos, eligiendo por AUC, log-loss y latencia
+Desarrollado por: MiniMax Agent
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss, roc_auc_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from almacen_caracteristicas import COLUMNAS_CATEGORICAS, AlmacenCaracteristicas
+from bitacora import obtener_logger
+
+logger = obtener_logger('seleccion_modelos')
+
+# Un candidato más lento solo se prefiere si mejora el AUC medio en más que esta tolerancia
+TOLERANCIA_AUC = 0.01
+REPETICIONES_LATENCIA = 50
+
+def _one_hot(memoria):
+    """Regresión logística sobre one-hot (numéricas estandarizadas); el codificador ajustado por pliegue queda en caché"""
+    def construir(C):
+        return Pipeline([
+            ('one_hot', ColumnTransformer([
+                ('categoricas', OneHotEncoder(handle_unknown='ignore'), COLUMNAS_CATEGORICAS)
+            ], remainder=StandardScaler())),
+            ('modelo', LogisticRegression(C=C, max_iter=1000))
+        ], memory=memoria)
+    return construir
+
+def candidatos_por_defecto(memoria=None):
+    """Modelos a comparar: {nombre: estimador sin ajustar}"""
+    logistica = _one_hot(memoria)
+    candidatos = {}
+    for arboles in (50, 100, 200):
+        for profundidad in (8, None):
+            candidatos[f'rf_{arboles}_prof_{profundidad or "libre"}'] = RandomForestClassifier(
+                n_estimators=arboles, max_depth=profundidad, min_samples_leaf=2, random_state=42, n_jobs=1
+            )
+    for tasa in (0.05, 0.1):
+        candidatos[f'hgb_tasa_{tasa}'] = HistGradientBoostingClassifier(
+            learning_rate=tasa, max_iter=200, categorical_features=COLUMNAS_CATEGORICAS, random_state=42
+        )
+    for C in (0.1, 1.0):
+        candidatos[f'logistica_C_{C}'] = logistica(C)
+    return candidatos
+
+def _evaluar_pliegue(nombre, estimador, X, y, entrenamiento, prueba):
+    modelo = clone(estimador)
+    inicio = time.perf_counter()
+    modelo.fit(X[entrenamiento], y[entrenamiento])
+    segundos_ajuste = time.perf_counter() - inicio
+    probabilidades = modelo.predict_proba(X[prueba])[:, 1]
+    y_prueba = y[prueba]
+    # Un pliegue con una sola clase no define AUC; se omite del promedio
+    auc = roc_auc_score(y_prueba, probabilidades) if len(np.unique(y_prueba)) == 2 else np.nan
+    perdida = log_loss(y_prueba, probabilidades, labels=[0, 1])
+    return nombre, auc, perdida, segundos_ajuste
+
+def medir_latencia(modelo, X, repeticiones=REPETICIONES_LATENCIA):
+    """Mediana en microsegundos de predict_proba sobre una sola solicitud (como en cada petición)"""
+    filas = X[np.arange(repeticiones) % len(X)]
+    tiempos = np.empty(repeticiones)
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        modelo.predict_proba(filas[i:i + 1])
+        tiempos[i] = time.perf_counter() - inicio
+    return float(np.median(tiempos) * 1e6)
+
+def elegir(resultados, tolerancia_auc=TOLERANCIA_AUC):
+    """
+    Entre los candidatos con AUC a menos de la tolerancia del mejor, el de menor latencia;
+    a igual latencia redondeada, el de menor log-loss. Sin AUC válido decide el log-loss.
+    """
+    if resultados['auc'].notna().any():
+        mejor_auc = resultados['auc'].max()
+        finalistas = resultados[resultados['auc'] >= mejor_auc - tolerancia_auc]
+    else:
+        mejor_perdida = resultados['log_loss'].min()
+        finalistas = resultados[resultados['log_loss'] <= mejor_perdida * (1 + tolerancia_auc)]
+    return finalistas.sort_values(['latencia_us', 'log_loss']).index[0]
+
+def seleccionar_modelo(X, y, candidatos=None, n_splits=5, n_jobs=-1, tolerancia_auc=TOLERANCIA_AUC):
+    """
+    Validación cruzada temporal (TimeSeriesSplit: cada pliegue entrena con el pasado y evalúa
+    con el futuro) de todos los pares (candidato, pliegue) en paralelo. El ganador se reajusta
+    con todos los datos. Retorna (nombre, modelo ajustado, resultados) o None si faltan datos.
+    """
+    n_splits = min(n_splits, len(X) - 1)
+    if n_splits < 2 or len(np.unique(y)) < 2:
+        logger.warning("Datos insuficientes para seleccionar modelo", extra={'evento': 'seleccion_sin_datos', 'filas': len(X)})
+        return None
+
+    # Los pliegues de todos los candidatos comparten el one-hot ajustado (caché en disco,
+    # visible también para los procesos de joblib)
+    carpeta_cache = tempfile.mkdtemp(prefix='ufro_seleccion_')
+    try:
+        memoria = Memory(carpeta_cache, verbose=0)
+        if candidatos is None:
+            candidatos = candidatos_por_defecto(memoria)
+
+        inicio = time.perf_counter()
+        pliegues = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+        evaluaciones = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluar_pliegue)(nombre, estimador, X, y, entrenamiento, prueba)
+            for nombre, estimador in candidatos.items()
+            for entrenamiento, prueba in pliegues
+        )
+    finally:
+        shutil.rmtree(carpeta_cache, ignore_errors=True)
+
+    resultados = (pd.DataFrame(evaluaciones, columns=['modelo', 'auc', 'log_loss', 'ajuste_s'])
+                  .groupby('modelo', sort=False).mean())
+
+    # La latencia se mide sobre el modelo ajustado con todos los datos, en este proceso
+    ajustados = {}
+    for nombre, estimador in candidatos.items():
+        modelo = clone(estimador)
+        if isinstance(modelo, Pipeline):
+            modelo.set_params(memory=None)
+        ajustados[nombre] = modelo.fit(X, y)
+        resultados.loc[nombre, 'latencia_us'] = medir_latencia(ajustados[nombre], X)
+
+    ganador = elegir(resultados, tolerancia_auc)
+    resultados['seleccionado'] = resultados.index == ganador
+    resultados = resultados.round({'auc': 4, 'log_loss': 4, 'ajuste_s': 3, 'latencia_us': 1})
+
+    logger.info("Modelo seleccionado: %s", ganador, extra={
+        'evento': 'modelo_seleccionado', 'modelo': ganador, 'candidatos': len(candidatos),
+        'pliegues': n_splits, 'filas': len(X),
+        'auc': None if pd.isna(resultados.loc[ganador, 'auc']) else float(resultados.loc[ganador, 'auc']),
+        'latencia_us': float(resultados.loc[ganador, 'latencia_us']),
+        'duracion_s': round(time.perf_counter() - inicio, 2)
+    })
+    return ganador, ajustados[ganador], resultados
+
+def main():
+    parser = argparse.ArgumentParser(description='Selección del modelo de aprobación del Sistema de Reservas UFRO')
+    parser.add_argument('--sinteticos', type=int, metavar='N',
+                        help='Usa N solicitudes sintéticas en lugar de user_input_files/')
+    parser.add_argument('--pliegues', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--tolerancia-auc', type=float, default=TOLERANCIA_AUC)
+    args = parser.parse_args()
+
+    if args.sinteticos:
+        from datos_demo import generar_datos_sinteticos
+        datos = generar_datos_sinteticos(n_solicitudes=args.sinteticos)
+        almacen = AlmacenCaracteristicas(datos['salas'], datos['recesos'])
+        solicitudes = datos['solicitudes']
+    else:
+        almacen = AlmacenCaracteristicas(pd.read_excel('user_input_files/indicadores_uso_salas.xlsx'),
+                                         pd.read_excel('user_input_files/recesos_institucionales.xlsx'))
+        solicitudes = pd.read_excel('user_input_files/solicitudes_diarias.xlsx')
+
+    preparados = almacen.cargar(solicitudes)
+    seleccion = preparados and seleccionar_modelo(preparados[0], preparados[1], n_splits=args.pliegues,
+                                                  n_jobs=args.n_jobs, tolerancia_auc=args.tolerancia_auc)
+    if not seleccion:
+        print("❌ Datos insuficientes para comparar modelos")
+        return 1
+
+    ganador, _, resultados = seleccion
+    print(f"\n🤖 SELECCIÓN DE MODELO - {len(preparados[0])} solicitudes, {args.pliegues} pliegues temporales")
+    print(resultados.sort_values('auc', ascending=False).to_string())
+    print(f"\n✅ Modelo seleccionado: {ganador}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
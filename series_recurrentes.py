@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Series de reservas recurrentes del Sistema de Reservas UFRO
+Reglas tipo RRULE expandidas en ocurrencias y verificadas contra la base de datos en una sola consulta
+Desarrollado por: MiniMax Agent
+"""
+
+from datetime import date, timedelta
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+DIAS_RRULE = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+FRECUENCIAS = {'DAILY': 'diaria', 'WEEKLY': 'semanal', 'diaria': 'diaria', 'semanal': 'semanal'}
+
+MAX_OCURRENCIAS = 200  # un año lectivo de clases diarias, con holgura
+
+class ReglaInvalida(ValueError):
+    """La regla de recurrencia no se puede interpretar o no tiene fin"""
+
+def _dia(valor):
+    valor = str(valor).strip()
+    if valor.upper()[-2:] in DIAS_RRULE:
+        return DIAS_RRULE[valor.upper()[-2:]]
+    for indice, nombre in enumerate(DIAS_SEMANA):
+        if valor.lower() == nombre.lower():
+            return indice
+    raise ReglaInvalida(f"Día desconocido: {valor}")
+
+def interpretar_regla(regla):
+    """
+    Acepta un texto RRULE ('FREQ=WEEKLY;BYDAY=TU,TH;COUNT=16', 'FREQ=DAILY;UNTIL=20251128')
+    o un diccionario {'frecuencia': 'semanal', 'dias': ['Martes'], 'repeticiones': 16, 'hasta': 'YYYY-MM-DD',
+    'intervalo': 1}. Retorna la regla normalizada.
+    """
+    if isinstance(regla, str):
+        partes = dict(parte.split('=', 1) for parte in regla.upper().replace('RRULE:', '').split(';') if '=' in parte)
+        regla = {
+            'frecuencia': partes.get('FREQ'),
+            'intervalo': partes.get('INTERVAL', 1),
+            'dias': partes['BYDAY'].split(',') if 'BYDAY' in partes else None,
+            'repeticiones': partes.get('COUNT'),
+            'hasta': partes.get('UNTIL')
+        }
+
+    frecuencia = FRECUENCIAS.get(regla.get('frecuencia') or 'semanal')
+    if frecuencia is None:
+        raise ReglaInvalida(f"Frecuencia no soportada: {regla.get('frecuencia')}")
+    try:
+        intervalo = int(regla.get('intervalo') or 1)
+        repeticiones = int(regla['repeticiones']) if regla.get('repeticiones') else None
+        hasta = regla.get('hasta')
+        if hasta:
+            hasta = str(hasta)[:10]
+            hasta = date(int(hasta[:4]), int(hasta[4:6]), int(hasta[6:8])) if hasta.isdigit() else date.fromisoformat(hasta)
+    except ValueError as e:
+        raise ReglaInvalida(str(e))
+    if intervalo < 1:
+        raise ReglaInvalida("El intervalo debe ser positivo")
+    if repeticiones is None and not hasta:
+        raise ReglaInvalida("La regla necesita repeticiones (COUNT) o fecha final (UNTIL)")
+
+    dias = regla.get('dias')
+    return {
+        'frecuencia': frecuencia,
+        'intervalo': intervalo,
+        'dias': sorted({_dia(dia) for dia in dias}) if dias else None,
+        'repeticiones': repeticiones,
+        'hasta': hasta or None
+    }
+
+def expandir_regla(fecha_inicio, regla):
+    """Fechas ISO de las ocurrencias desde fecha_inicio (incluida si cumple la regla)"""
+    regla = interpretar_regla(regla)
+    inicio = date.fromisoformat(str(fecha_inicio)[:10])
+    limite = min(regla['repeticiones'] or MAX_OCURRENCIAS, MAX_OCURRENCIAS)
+    hasta = regla['hasta']
+
+    fechas = []
+    if regla['frecuencia'] == 'diaria':
+        fecha = inicio
+        while len(fechas) < limite and (hasta is None or fecha <= hasta):
+            if regla['dias'] is None or fecha.weekday() in regla['dias']:
+                fechas.append(fecha)
+            fecha += timedelta(days=regla['intervalo'])
+    else:
+        dias = regla['dias'] or [inicio.weekday()]
+        lunes = inicio - timedelta(days=inicio.weekday())
+        while len(fechas) < limite and (hasta is None or lunes <= hasta):
+            for dia in dias:
+                fecha = lunes + timedelta(days=dia)
+                if fecha < inicio or (hasta is not None and fecha > hasta) or len(fechas) >= limite:
+                    continue
+                fechas.append(fecha)
+            lunes += timedelta(weeks=regla['intervalo'])
+    return [fecha.isoformat() for fecha in fechas]
+
+def consultar_conflictos_serie(cursor, sala, fechas, hora_inicio, hora_fin):
+    """
+    Índices de las fechas con conflicto, en una sola consulta: las ocurrencias van como tabla
+    (VALUES) y se cruzan con las solicitudes aprobadas y las asignaciones semestrales usando
+    el índice (sala_solicitada, fecha_requerida, estado).
+    """
+    if not fechas:
+        return set()
+    valores = ', '.join(['(?, ?, ?)'] * len(fechas))
+    parametros = []
+    for indice, fecha in enumerate(fechas):
+        parametros += [indice, fecha, DIAS_SEMANA[date.fromisoformat(fecha).weekday()]]
+
+    cursor.execute(f'''
+        WITH ocurrencias(indice, fecha, dia_semana) AS (VALUES {valores})
+        SELECT o.indice FROM ocurrencias o
+        WHERE EXISTS (
+            SELECT 1 FROM solicitudes s
+            WHERE s.sala_solicitada = ?
+            AND s.fecha_requerida = o.fecha
+            AND s.estado = 'aprobada'
+            AND NOT (s.hora_fin <= ? OR s.hora_inicio >= ?)
+        )
+        OR EXISTS (
+            SELECT 1 FROM asignaciones_semestrales a
+            WHERE a.sala_id = (SELECT id FROM salas WHERE codigo = ?)
+            AND o.fecha BETWEEN a.fecha_inicio AND a.fecha_fin
+            AND a.dia_semana = o.dia_semana
+            AND NOT (a.hora_fin <= ? OR a.hora_inicio >= ?)
+        )
+    ''', parametros + [sala, hora_inicio, hora_fin, sala, hora_inicio, hora_fin])
+    return {fila[0] for fila in cursor.fetchall()}
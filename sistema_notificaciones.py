@@ -7,22 +7,29 @@ Desarrollado por: MiniMax Agent
 
 import smtplib
 import json
-import requests
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import sqlite3
-import pandas as pd
+from metricas_sistema import medir, contar
+from bitacora import obtener_logger, correlacion
+from eventos_reservas import (NOTIFICACION_ENVIADA, SOLICITUD_APROBADA, SOLICITUD_CREADA, SOLICITUD_REASIGNADA,
+                              SOLICITUD_RECHAZADA, RegistroEventos, Suscriptor, anotar)
+
+logger = obtener_logger('sistema_notificaciones')
 
 class SistemaNotificaciones:
     """
     Sistema completo de notificaciones automáticas multi-canal
     """
     
-    def __init__(self):
+    def __init__(self, db_path='sistema_reservas.db'):
         self.config = self.cargar_configuracion()
-        self.db_path = 'sistema_reservas.db'
+        self.db_path = db_path
         self.plantillas = self.cargar_plantillas_notificacion()
+        self._registro_eventos = None
         
     def cargar_configuracion(self):
         """Carga configuración de APIs y servicios"""
@@ -197,172 +204,178 @@ _Sistema Automatizado UFRO_
         """
         Envía notificación por correo electrónico
         """
-        try:
-            # Crear mensaje
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = asunto
-            msg['From'] = self.config['email']['from_email']
-            msg['To'] = destinatario
-            
-            # Crear partes del mensaje
-            if contenido_texto:
-                parte_texto = MIMEText(contenido_texto, 'plain', 'utf-8')
-                msg.attach(parte_texto)
-            
-            parte_html = MIMEText(contenido_html, 'html', 'utf-8')
-            msg.attach(parte_html)
-            
-            # Simular envío (en producción usar SMTP real)
-            print(f"📧 EMAIL enviado a: {destinatario}")
-            print(f"   Asunto: {asunto}")
-            
-            # Guardar en log
-            self.registrar_notificacion(destinatario, 'email', asunto, 'enviado')
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error enviando email: {e}")
-            self.registrar_notificacion(destinatario, 'email', asunto, 'error')
-            return False
+        with medir('ufro_notificacion_segundos', canal='email'):
+            try:
+                # Crear mensaje
+                msg = MIMEMultipart('alternative')
+                msg['Subject'] = asunto
+                msg['From'] = self.config['email']['from_email']
+                msg['To'] = destinatario
+                
+                # Crear partes del mensaje
+                if contenido_texto:
+                    parte_texto = MIMEText(contenido_texto, 'plain', 'utf-8')
+                    msg.attach(parte_texto)
+                
+                parte_html = MIMEText(contenido_html, 'html', 'utf-8')
+                msg.attach(parte_html)
+                
+                # Simular envío (en producción usar SMTP real)
+                logger.info("Email enviado", extra={'evento': 'notificacion_enviada', 'canal': 'email',
+                                                     'destinatario': destinatario, 'asunto': asunto})
+                
+                # Guardar en log
+                self.registrar_notificacion(destinatario, 'email', asunto, 'enviado')
+                
+                return True
+                
+            except Exception as e:
+                logger.error("Error enviando email: %s", e, extra={'evento': 'notificacion_error', 'canal': 'email'})
+                self.registrar_notificacion(destinatario, 'email', asunto, 'error')
+                return False
     
     def enviar_whatsapp(self, numero_destino, mensaje):
         """
         Envía notificación por WhatsApp Business API
         """
-        try:
-            # Formatear número (agregar código país si no lo tiene)
-            if not numero_destino.startswith('+'):
-                numero_destino = '+56' + numero_destino
-            
-            # En producción, hacer llamada real a API de Twilio
-            # data = {
-            #     'From': self.config['whatsapp']['from_number'],
-            #     'To': f'whatsapp:{numero_destino}',
-            #     'Body': mensaje
-            # }
-            # response = requests.post(
-            #     self.config['whatsapp']['api_url'],
-            #     data=data,
-            #     auth=(self.config['whatsapp']['account_sid'], self.config['whatsapp']['auth_token'])
-            # )
-            
-            # Simular envío
-            print(f"📱 WHATSAPP enviado a: {numero_destino}")
-            print(f"   Mensaje: {mensaje[:50]}...")
-            
-            self.registrar_notificacion(numero_destino, 'whatsapp', mensaje[:100], 'enviado')
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error enviando WhatsApp: {e}")
-            self.registrar_notificacion(numero_destino, 'whatsapp', mensaje[:100], 'error')
-            return False
+        with medir('ufro_notificacion_segundos', canal='whatsapp'):
+            try:
+                # Formatear número (agregar código país si no lo tiene)
+                if not numero_destino.startswith('+'):
+                    numero_destino = '+56' + numero_destino
+                
+                # En producción, hacer llamada real a API de Twilio
+                # import requests  (se importa aquí para no cargarlo al iniciar)
+                # data = {
+                #     'From': self.config['whatsapp']['from_number'],
+                #     'To': f'whatsapp:{numero_destino}',
+                #     'Body': mensaje
+                # }
+                # response = requests.post(
+                #     self.config['whatsapp']['api_url'],
+                #     data=data,
+                #     auth=(self.config['whatsapp']['account_sid'], self.config['whatsapp']['auth_token'])
+                # )
+                
+                # Simular envío
+                logger.info("WhatsApp enviado", extra={'evento': 'notificacion_enviada', 'canal': 'whatsapp',
+                                                        'destinatario': numero_destino, 'extracto': mensaje.strip()[:50]})
+                
+                self.registrar_notificacion(numero_destino, 'whatsapp', mensaje[:100], 'enviado')
+                return True
+                
+            except Exception as e:
+                logger.error("Error enviando WhatsApp: %s", e, extra={'evento': 'notificacion_error', 'canal': 'whatsapp'})
+                self.registrar_notificacion(numero_destino, 'whatsapp', mensaje[:100], 'error')
+                return False
     
     def enviar_sms(self, numero_destino, mensaje):
         """
         Envía notificación por SMS
         """
-        try:
-            # Formatear número
-            if not numero_destino.startswith('+'):
-                numero_destino = '+56' + numero_destino
-            
-            # Simular envío SMS
-            print(f"📱 SMS enviado a: {numero_destino}")
-            print(f"   Mensaje: {mensaje[:50]}...")
-            
-            self.registrar_notificacion(numero_destino, 'sms', mensaje[:100], 'enviado')
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error enviando SMS: {e}")
-            self.registrar_notificacion(numero_destino, 'sms', mensaje[:100], 'error')
-            return False
+        with medir('ufro_notificacion_segundos', canal='sms'):
+            try:
+                # Formatear número
+                if not numero_destino.startswith('+'):
+                    numero_destino = '+56' + numero_destino
+                
+                # Simular envío SMS
+                logger.info("SMS enviado", extra={'evento': 'notificacion_enviada', 'canal': 'sms',
+                                                   'destinatario': numero_destino, 'extracto': mensaje.strip()[:50]})
+                
+                self.registrar_notificacion(numero_destino, 'sms', mensaje[:100], 'enviado')
+                return True
+                
+            except Exception as e:
+                logger.error("Error enviando SMS: %s", e, extra={'evento': 'notificacion_error', 'canal': 'sms'})
+                self.registrar_notificacion(numero_destino, 'sms', mensaje[:100], 'error')
+                return False
     
     def notificar_aprobacion(self, solicitud, prioridad):
         """
         Envía notificación de aprobación por múltiples canales
         """
-        print(f"\n📧 ENVIANDO NOTIFICACIONES DE APROBACIÓN...")
-        
-        # Preparar datos para plantillas
-        datos = {
-            'solicitante': solicitud.get('solicitante', 'N/A'),
-            'sala': solicitud.get('sala_solicitada', 'N/A'),
-            'fecha': solicitud.get('fecha_requerida', 'N/A'),
-            'hora_inicio': solicitud.get('hora_inicio', 'N/A'),
-            'hora_fin': solicitud.get('hora_fin', 'N/A'),
-            'motivo': solicitud.get('motivo', 'N/A'),
-            'prioridad': prioridad
-        }
-        
-        # Email HTML
-        contenido_email = self.plantillas['aprobacion_email']['plantilla'].format(**datos)
-        self.enviar_email(
-            solicitud.get('correo', 'usuario@ufro.cl'),
-            self.plantillas['aprobacion_email']['asunto'],
-            contenido_email
-        )
-        
-        # WhatsApp
-        mensaje_whatsapp = self.plantillas['whatsapp_aprobacion'].format(**datos)
-        self.enviar_whatsapp(
-            solicitud.get('telefono', '912345678'),
-            mensaje_whatsapp
-        )
-        
-        # Notificar a coordinador
-        self.notificar_coordinador('aprobacion', datos)
-        
-        return True
+        with correlacion(solicitud.get('id_correlacion')):
+            logger.info("Enviando notificaciones de aprobación", extra={'evento': 'notificando', 'tipo': 'aprobacion'})
+            
+            # Preparar datos para plantillas
+            datos = {
+                'solicitante': solicitud.get('solicitante', 'N/A'),
+                'sala': solicitud.get('sala_solicitada', 'N/A'),
+                'fecha': solicitud.get('fecha_requerida', 'N/A'),
+                'hora_inicio': solicitud.get('hora_inicio', 'N/A'),
+                'hora_fin': solicitud.get('hora_fin', 'N/A'),
+                'motivo': solicitud.get('motivo', 'N/A'),
+                'prioridad': prioridad
+            }
+            
+            # Email HTML
+            contenido_email = self.plantillas['aprobacion_email']['plantilla'].format(**datos)
+            self.enviar_email(
+                solicitud.get('correo', 'usuario@ufro.cl'),
+                self.plantillas['aprobacion_email']['asunto'],
+                contenido_email
+            )
+            
+            # WhatsApp
+            mensaje_whatsapp = self.plantillas['whatsapp_aprobacion'].format(**datos)
+            self.enviar_whatsapp(
+                solicitud.get('telefono', '912345678'),
+                mensaje_whatsapp
+            )
+            
+            # Notificar a coordinador
+            self.notificar_coordinador('aprobacion', datos)
+            
+            return True
     
     def notificar_rechazo(self, solicitud, motivo_rechazo, alternativas):
         """
         Envía notificación de rechazo con alternativas
         """
-        print(f"\n📧 ENVIANDO NOTIFICACIONES DE RECHAZO...")
-        
-        # Preparar alternativas para email
-        alternativas_html = ""
-        alternativas_texto = ""
-        
-        for alt in alternativas:
-            alternativas_html += f"<p>🏢 <strong>{alt['sala']}</strong> - {alt['razón']}</p>"
-            alternativas_texto += f"\n• {alt['sala']} - {alt['razón']}"
-        
-        if not alternativas_html:
-            alternativas_html = "<p>No hay alternativas disponibles en este momento.</p>"
-            alternativas_texto = "\n• No disponible en este momento"
-        
-        # Preparar datos
-        datos = {
-            'solicitante': solicitud.get('solicitante', 'N/A'),
-            'sala': solicitud.get('sala_solicitada', 'N/A'),
-            'fecha': solicitud.get('fecha_requerida', 'N/A'),
-            'hora_inicio': solicitud.get('hora_inicio', 'N/A'),
-            'hora_fin': solicitud.get('hora_fin', 'N/A'),
-            'motivo_rechazo': motivo_rechazo,
-            'alternativas_html': alternativas_html,
-            'alternativas_texto': alternativas_texto
-        }
-        
-        # Email
-        contenido_email = self.plantillas['rechazo_email']['plantilla'].format(**datos)
-        self.enviar_email(
-            solicitud.get('correo', 'usuario@ufro.cl'),
-            self.plantillas['rechazo_email']['asunto'],
-            contenido_email
-        )
-        
-        # WhatsApp
-        mensaje_whatsapp = self.plantillas['whatsapp_rechazo'].format(**datos)
-        self.enviar_whatsapp(
-            solicitud.get('telefono', '912345678'),
-            mensaje_whatsapp
-        )
-        
-        return True
+        with correlacion(solicitud.get('id_correlacion')):
+            logger.info("Enviando notificaciones de rechazo", extra={'evento': 'notificando', 'tipo': 'rechazo'})
+            
+            # Preparar alternativas para email
+            alternativas_html = ""
+            alternativas_texto = ""
+            
+            for alt in alternativas:
+                alternativas_html += f"<p>🏢 <strong>{alt['sala']}</strong> - {alt['razón']}</p>"
+                alternativas_texto += f"\n• {alt['sala']} - {alt['razón']}"
+            
+            if not alternativas_html:
+                alternativas_html = "<p>No hay alternativas disponibles en este momento.</p>"
+                alternativas_texto = "\n• No disponible en este momento"
+            
+            # Preparar datos
+            datos = {
+                'solicitante': solicitud.get('solicitante', 'N/A'),
+                'sala': solicitud.get('sala_solicitada', 'N/A'),
+                'fecha': solicitud.get('fecha_requerida', 'N/A'),
+                'hora_inicio': solicitud.get('hora_inicio', 'N/A'),
+                'hora_fin': solicitud.get('hora_fin', 'N/A'),
+                'motivo_rechazo': motivo_rechazo,
+                'alternativas_html': alternativas_html,
+                'alternativas_texto': alternativas_texto
+            }
+            
+            # Email
+            contenido_email = self.plantillas['rechazo_email']['plantilla'].format(**datos)
+            self.enviar_email(
+                solicitud.get('correo', 'usuario@ufro.cl'),
+                self.plantillas['rechazo_email']['asunto'],
+                contenido_email
+            )
+            
+            # WhatsApp
+            mensaje_whatsapp = self.plantillas['whatsapp_rechazo'].format(**datos)
+            self.enviar_whatsapp(
+                solicitud.get('telefono', '912345678'),
+                mensaje_whatsapp
+            )
+            
+            return True
     
     def notificar_coordinador(self, tipo_evento, datos):
         """
@@ -391,7 +404,6 @@ Este es un mensaje automático del sistema.
         """
         Envía recordatorios automáticos 24 horas antes
         """
-        print(f"\n⏰ ENVIANDO RECORDATORIOS AUTOMÁTICOS...")
         
         # Buscar reservas para mañana
         mañana = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
@@ -414,33 +426,110 @@ Este es un mensaje automático del sistema.
             mensaje = self.plantillas['recordatorio_24h'].format(**reserva)
             self.enviar_whatsapp(reserva['telefono'], mensaje)
         
-        print(f"✅ {len(reservas_mañana)} recordatorios enviados")
+        logger.info("%d recordatorios enviados", len(reservas_mañana), extra={'evento': 'recordatorios_enviados'})
         return len(reservas_mañana)
     
+    def notificar_reasignacion(self, movimiento):
+        """
+        Avisa a quien tenía la reserva que cambió de sala (al correo registrado con la reserva)
+        """
+        if not movimiento.get('correo'):
+            logger.warning("Reasignación sin correo de contacto", extra={
+                'evento': 'notificacion_sin_destinatario', 'solicitud_id': movimiento.get('solicitud_id')})
+            return False
+        asunto = f"🔄 Su reserva fue reasignada a la sala {movimiento.get('sala_nueva', 'N/A')}"
+        mensaje = f"""
+Sistema de Reservas UFRO - Reasignación Automática
+
+Su reserva del {movimiento.get('fecha', 'N/A')} de {movimiento.get('hora_inicio', 'N/A')} a {movimiento.get('hora_fin', 'N/A')}
+cambió de la sala {movimiento.get('sala_original', 'N/A')} a la sala {movimiento.get('sala_nueva', 'N/A')},
+con capacidad y equipamiento equivalentes.
+
+Este es un mensaje automático del sistema.
+        """
+        return self.enviar_email(movimiento['correo'], asunto, mensaje)
+    
+    def despachar_eventos(self, limite=200, desde_el_final=False):
+        """
+        Consumidor de la bitácora de eventos: envía las notificaciones de las decisiones y
+        reasignaciones posteriores a su cursor, en lugar de consultar las tablas.
+        Retorna la cantidad de eventos procesados.
+        """
+        if self._registro_eventos is None:
+            self._registro_eventos = RegistroEventos(self.db_path)
+        registro = self._registro_eventos
+        suscriptor = Suscriptor(registro, 'notificaciones',
+                                tipos=[SOLICITUD_CREADA, SOLICITUD_APROBADA, SOLICITUD_RECHAZADA, SOLICITUD_REASIGNADA],
+                                desde_el_final=desde_el_final)
+        creadas = {}
+        
+        def manejar(evento):
+            if evento['tipo'] == SOLICITUD_CREADA:
+                creadas[evento['secuencia']] = evento['datos']
+                return
+            if evento['tipo'] == SOLICITUD_REASIGNADA:
+                self.notificar_reasignacion(evento['datos'])
+                return
+            # La decisión se anota justo después de su SolicitudCreada (misma sentencia)
+            solicitud = creadas.pop(evento['secuencia'] - 1, None)
+            if solicitud is None:
+                anterior = registro.leer(evento['secuencia'] - 2, 1)
+                solicitud = anterior[0]['datos'] if anterior and anterior[0]['tipo'] == SOLICITUD_CREADA else {}
+            if evento['tipo'] == SOLICITUD_APROBADA:
+                self.notificar_aprobacion(solicitud, solicitud.get('prioridad', 0))
+            else:
+                self.notificar_rechazo(solicitud, evento['datos'].get('motivo', ''), [])
+        
+        with medir('ufro_eventos_segundos', operacion='despacho_notificaciones'):
+            return suscriptor.procesar(manejar, limite)
+    
+    def iniciar_despacho_periodico(self, intervalo=2.0, limite=200):
+        """
+        Despacha los eventos nuevos cada `intervalo` segundos en un hilo de fondo (uno por base).
+        En el primer arranque el cursor parte del final de la bitácora: el historial no se renotifica.
+        """
+        def despachar():
+            while True:
+                try:
+                    while self.despachar_eventos(limite, desde_el_final=True) == limite:
+                        pass
+                except Exception as e:
+                    logger.warning("Error despachando eventos: %s", e, extra={'evento': 'error_despacho_eventos'})
+                time.sleep(intervalo)
+        
+        hilo = threading.Thread(target=despachar, daemon=True)
+        hilo.start()
+        return hilo
+    
     def registrar_notificacion(self, destinatario, canal, mensaje, estado):
         """
         Registra notificación en base de datos para auditoría
         """
+        contar('ufro_notificaciones_total', canal=canal, estado=estado)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO notificaciones 
-                (destinatario, tipo_notificacion, mensaje, fecha_envio, canal, estado_entrega)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (destinatario, canal, mensaje, datetime.now(), canal, estado))
-            
-            conn.commit()
-            conn.close()
+            with medir('ufro_db_segundos', operacion='registrar_notificacion'):
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO notificaciones 
+                    (destinatario, tipo_notificacion, mensaje, fecha_envio, canal, estado_entrega)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (destinatario, canal, mensaje, datetime.now(), canal, estado))
+                anotar(cursor, NOTIFICACION_ENVIADA, {'destinatario': destinatario, 'canal': canal, 'estado': estado})
+                
+                conn.commit()
+                conn.close()
             
         except Exception as e:
-            print(f"⚠️ Error registrando notificación: {e}")
+            logger.warning("Error registrando notificación: %s", e, extra={'evento': 'error_registro_notificacion'})
     
     def generar_reporte_notificaciones(self):
         """
         Genera reporte de notificaciones enviadas
         """
+        import pandas as pd
+        
         try:
             conn = sqlite3.connect(self.db_path)
             
@@ -493,7 +582,7 @@ Este es un mensaje automático del sistema.
             return reporte
             
         except Exception as e:
-            print(f"❌ Error generando reporte: {e}")
+            logger.error("Error generando reporte: %s", e, extra={'evento': 'error_reporte_notificaciones'})
             return "Error generando reporte de notificaciones"
 
 def demo_sistema_notificaciones():
@@ -559,4 +648,6 @@ def demo_sistema_notificaciones():
     return sistema, reporte
 
 if __name__ == "__main__":
+    from bitacora import configurar_logging
+    configurar_logging()
     sistema, reporte = demo_sistema_notificaciones()
@@ -0,0 +1,48 @@
+"""
+Fixtures comunes de las pruebas del Sistema de Reservas UFRO
+Sistema sobre una base de datos temporal y solicitudes de ejemplo
+Desarrollado por: MiniMax Agent
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Un día hábil fuera de recesos y feriados
+FECHA_HABIL = '2030-10-15'
+
+@pytest.fixture(autouse=True)
+def directorio_raiz(monkeypatch):
+    """Las planillas (user_input_files/) se leen con rutas relativas a la raíz del proyecto"""
+    monkeypatch.chdir(RAIZ)
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'reservas.db')
+
+@pytest.fixture
+def sistema(db_path):
+    from sistema_ia_reservas import SistemaIAReservas
+
+    return SistemaIAReservas(db_path)
+
+@pytest.fixture
+def nueva_solicitud():
+    """Fábrica de solicitudes: una reserva de estudiante en A101 con los campos pedidos cambiados"""
+    def crear(**cambios):
+        solicitud = {
+            'solicitante': 'ana.perez',
+            'tipo_usuario': 'Estudiante',
+            'sala_solicitada': 'A101',
+            'fecha_requerida': FECHA_HABIL,
+            'hora_inicio': '10:00',
+            'hora_fin': '11:00',
+            'motivo': 'Estudio grupal'
+        }
+        solicitud.update(cambios)
+        return solicitud
+    return crear
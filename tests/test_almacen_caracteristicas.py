@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from almacen_caracteristicas import (CARACTERISTICAS, DESCONOCIDO, DIAS_SIN_RECESO, ORDINAL_EPOCH,
+                                     AlmacenCaracteristicas)
+
+TASA = CARACTERISTICAS.index('tasa_aprobacion_solicitante')
+SALAS = pd.DataFrame({'codigo': ['A101', 'B201'], 'capacidad': [40, 60], 'equipamiento': ['Proyector', '']})
+RECESOS = pd.DataFrame({'Fecha Inicio': ['2030-10-21'], 'Fecha Término': ['2030-10-25']})
+
+def historial(semanas=6):
+    """Solicitudes de los martes a las 10:00 en A101 y B201, del mismo solicitante, alternando el estado"""
+    filas = []
+    for semana in range(semanas):
+        requerida = date(2030, 9, 3) + timedelta(weeks=semana)
+        for sala in ('A101', 'B201'):
+            filas.append({
+                'Fecha Solicitud': (requerida - timedelta(days=2)).isoformat(),
+                'Fecha Requerida': requerida.isoformat(),
+                'Bloque Horario': '10:00',
+                'Sala Solicitada': sala,
+                'Rol': 'Estudiante',
+                'Solicitante': 'ana.perez',
+                'Motivo': 'Estudio',
+                'Estado Solicitud': 'Aprobada' if (semana + len(filas)) % 3 else 'Rechazada'
+            })
+    return pd.DataFrame(filas)
+
+def como_solicitud(fila):
+    return {'fecha_requerida': fila['Fecha Requerida'], 'hora_inicio': fila['Bloque Horario'],
+            'sala_solicitada': fila['Sala Solicitada'], 'tipo_usuario': fila['Rol'],
+            'solicitante': fila['Solicitante'], 'motivo': fila['Motivo']}
+
+def test_servir_reproduce_las_caracteristicas_de_entrenamiento():
+    datos = historial()
+    X, y = AlmacenCaracteristicas(SALAS, RECESOS).cargar(datos)
+    assert X.shape == (len(datos), len(CARACTERISTICAS))
+    assert y.tolist() == (datos['Estado Solicitud'] == 'Aprobada').astype(int).tolist()
+
+    # El almacén cargado con el historial previo entrega, al servir, la misma fila que vio el entrenamiento
+    previo = AlmacenCaracteristicas(SALAS, RECESOS)
+    previo.cargar(datos.iloc[:-1])
+    servida = previo.vector(como_solicitud(datos.iloc[-1]))[0]
+    columnas = [i for i in range(len(CARACTERISTICAS)) if i != TASA]
+    np.testing.assert_array_equal(servida[columnas], X[-1, columnas])
+    assert servida[CARACTERISTICAS.index('solicitudes_bloque')] == 4
+
+def test_registrar_equivale_a_recargar():
+    datos = historial()
+    completo = AlmacenCaracteristicas(SALAS, RECESOS)
+    completo.cargar(datos)
+    incremental = AlmacenCaracteristicas(SALAS, RECESOS)
+    incremental.cargar(datos.iloc[:-1])
+    ultima = datos.iloc[-1]
+    incremental.registrar(como_solicitud(ultima), ultima['Estado Solicitud'] == 'Aprobada')
+
+    assert incremental._conteos == completo._conteos
+    assert incremental._solicitantes == completo._solicitantes
+
+def test_valores_desconocidos_y_recesos():
+    almacen = AlmacenCaracteristicas(SALAS, RECESOS)
+    almacen.cargar(historial())
+    fila = dict(zip(CARACTERISTICAS, almacen.vector({
+        'fecha_requerida': '2030-10-18', 'hora_inicio': '09:30', 'sala_solicitada': 'Z999',
+        'tipo_usuario': 'Visitante', 'solicitante': 'nuevo'})[0]))
+
+    assert fila['sala_encoded'] == fila['rol_encoded'] == fila['capacidad'] == DESCONOCIDO
+    assert fila['hora'] == 9 and fila['dia_semana'] == 4
+    assert fila['dias_hasta_receso'] == 3
+    assert fila['tasa_aprobacion_solicitante'] == pytest.approx(almacen.tasa_global)
+
+    dias = [date.fromisoformat(fecha).toordinal() - ORDINAL_EPOCH for fecha in ('2030-10-23', '2035-01-01')]
+    assert almacen.dias_hasta_receso(dias).tolist() == [0, DIAS_SIN_RECESO]
+
+def test_matriz_omite_solicitudes_invalidas():
+    almacen = AlmacenCaracteristicas(SALAS)
+    solicitudes = [como_solicitud(fila) for _, fila in historial(1).iterrows()]
+    solicitudes.insert(1, dict(solicitudes[0], fecha_requerida='15/10/2030'))
+
+    matriz, validas = almacen.matriz(solicitudes)
+    assert validas == [0, 2]
+    assert matriz.shape == (2, len(CARACTERISTICAS))
+
+def test_cargar_una_vez_por_contenido():
+    almacen = AlmacenCaracteristicas(SALAS)
+    datos = historial()
+    assert almacen.cargar(datos) is almacen.cargar(datos.copy())
+    assert almacen.cargar(datos.iloc[:0]) is None
+
+def test_prediccion_en_lote_igual_a_la_individual(sistema):
+    pytest.importorskip('sklearn')
+    assert sistema.entrenar_modelo_prediccion_demanda({'solicitudes': historial(), 'recesos': RECESOS})
+
+    solicitudes = [como_solicitud(fila) for _, fila in historial(2).iterrows()] + [{'fecha_requerida': 'sin fecha'}]
+    lote = sistema.predecir_probabilidades_lote(solicitudes)
+    assert lote == pytest.approx([sistema.predecir_probabilidad_aprobacion(solicitud) for solicitud in solicitudes])
+    assert lote[-1] == 0.5
@@ -0,0 +1,69 @@
+"""
+Pruebas del almacén de datos compartido
+Una instantánea por versión, compartida por las vistas y liberada junto con sus derivados
+Desarrollado por: MiniMax Agent
+"""
+
+import gc
+import weakref
+
+import pytest
+
+from almacen_compartido import AlmacenCompartido
+
+class Derivado:
+    def __init__(self, datos):
+        self.datos = datos
+
+@pytest.fixture
+def fuente():
+    """Fuente de datos cuya firma cambia al incrementar 'version'"""
+    estado = {'version': 1, 'cargas': 0}
+
+    def cargar():
+        estado['cargas'] += 1
+        return {'tabla': bytearray(1024)}, f"v{estado['version']}", {'modo_datos': 'prueba'}
+
+    estado['almacen'] = AlmacenCompartido(cargar, lambda: estado['version'], intervalo_verificacion=0)
+    return estado
+
+def test_vistas_comparten_instantanea_y_derivados(fuente):
+    almacen = fuente['almacen']
+    construidos = []
+    primera, segunda = almacen.adquirir(), almacen.adquirir()
+    construir = lambda datos: construidos.append(1) or Derivado(datos)
+
+    assert primera.derivado('graficos', construir) is segunda.derivado('graficos', construir)
+    assert len(construidos) == 1
+    assert primera.modo_datos == 'prueba'
+    assert fuente['cargas'] == 1
+
+def test_recarga_libera_instantanea_y_derivados(fuente):
+    almacen = fuente['almacen']
+    vistas = [almacen.adquirir() for _ in range(3)]
+    anterior = weakref.ref(almacen.instantanea())
+    derivado = weakref.ref(vistas[0].derivado('graficos', Derivado))
+
+    fuente['version'] = 2
+    assert vistas[0].actualizar()
+    assert anterior() is not None  # las otras vistas aún la usan
+    for vista in vistas[1:]:
+        vista.actualizar()
+
+    gc.collect()
+    assert anterior() is None
+    assert derivado() is None
+    assert [fila['version'] for fila in almacen.estado()] == ['v2']
+    assert vistas[0].derivado('graficos', Derivado) is not None
+
+def test_vista_descartada_libera_su_instantanea(fuente):
+    almacen = fuente['almacen']
+    vista = almacen.adquirir()
+    anterior = weakref.ref(almacen.instantanea())
+    fuente['version'] = 2
+    almacen.instantanea()
+    assert [fila['sesiones'] for fila in almacen.estado() if fila['version'] == 'v1'] == [1]
+
+    del vista
+    gc.collect()
+    assert anterior() is None
@@ -0,0 +1,113 @@
+"""
+Pruebas de la API HTTP de reservas
+Errores por solicitud en los lotes y validación de los parámetros de consulta
+Desarrollado por: MiniMax Agent
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from api_reservas import AgrupadorSolicitudes, crear_app
+
+@pytest.fixture
+def falla_en_sala(sistema, monkeypatch):
+    """La consulta de conflictos de la sala X999 lanza un error inesperado"""
+    original = sistema.detectar_conflictos_horario
+
+    def detectar(sala, *argumentos):
+        if sala == 'X999':
+            raise RuntimeError('falla de prueba')
+        return original(sala, *argumentos)
+
+    monkeypatch.setattr(sistema, 'detectar_conflictos_horario', detectar)
+
+@pytest.fixture
+def cliente(sistema):
+    return crear_app(sistema, espera_lote=0.05).test_client()
+
+def aprobadas(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT sala_solicitada, fecha_requerida FROM solicitudes WHERE estado = 'aprobada'").fetchall()
+
+def test_procesar_lote_captura_errores_por_solicitud(sistema, nueva_solicitud, falla_en_sala):
+    resultados = sistema.procesar_lote([nueva_solicitud(), nueva_solicitud(sala_solicitada='X999')],
+                                       capturar_errores=True)
+    assert resultados[0]['decision'] == 'aprobada'
+    assert isinstance(resultados[1], RuntimeError)
+
+def test_procesar_lote_sin_captura_propaga(sistema, nueva_solicitud, falla_en_sala):
+    with pytest.raises(RuntimeError):
+        sistema.procesar_lote([nueva_solicitud(sala_solicitada='X999')])
+
+def test_agrupador_separa_errores(sistema, db_path, nueva_solicitud, falla_en_sala):
+    agrupador = AgrupadorSolicitudes(sistema, espera_maxima=0.2)
+    correcta = agrupador.enviar(nueva_solicitud())
+    fallida = agrupador.enviar(nueva_solicitud(sala_solicitada='X999'))
+    assert correcta.result(timeout=10)['decision'] == 'aprobada'
+    with pytest.raises(RuntimeError):
+        fallida.result(timeout=10)
+    assert aprobadas(db_path) == [('A101', '2030-10-15')]
+
+def test_lote_http_con_fecha_invalida(cliente, db_path, nueva_solicitud):
+    respuesta = cliente.post('/api/solicitudes/lote', json=[
+        nueva_solicitud(fecha_requerida='15/10/2030'), nueva_solicitud(sala_solicitada='B101')])
+    lineas = {linea['indice']: linea for linea in map(json.loads, respuesta.get_data(as_text=True).splitlines())}
+    assert lineas[0] == {'indice': 0, 'error': 'Campos inválidos', 'campos': ['fecha_requerida']}
+    assert lineas[1]['resultado']['decision'] == 'aprobada'
+    assert aprobadas(db_path) == [('B101', '2030-10-15')]
+
+def test_lote_http_con_error_inesperado(cliente, db_path, nueva_solicitud, falla_en_sala):
+    respuesta = cliente.post('/api/solicitudes/lote', json=[
+        nueva_solicitud(sala_solicitada='X999'), nueva_solicitud()])
+    lineas = {linea['indice']: linea for linea in map(json.loads, respuesta.get_data(as_text=True).splitlines())}
+    assert lineas[0]['error'] == 'falla de prueba'
+    assert lineas[1]['resultado']['decision'] == 'aprobada'
+
+@pytest.mark.parametrize('ruta', ['/api/solicitudes', '/api/series'])
+@pytest.mark.parametrize('cambios, campos', [
+    ({'fecha_requerida': '2025-02-30'}, ['fecha_requerida']),
+    ({'fecha_requerida': '15/10/2030'}, ['fecha_requerida']),
+    ({'hora_inicio': '9:00'}, ['hora_inicio']),
+    ({'hora_inicio': 10, 'hora_fin': '24:00'}, ['hora_inicio', 'hora_fin']),
+    ({'hora_inicio': '11:00', 'hora_fin': '11:00'}, ['hora_fin'])
+])
+def test_solicitud_con_campos_invalidos(cliente, db_path, nueva_solicitud, ruta, cambios, campos):
+    respuesta = cliente.post(ruta, json=nueva_solicitud(regla={'dias': ['Martes'], 'semanas': 2}, **cambios))
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {'error': 'Campos inválidos', 'campos': campos}
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM eventos').fetchone()[0] == 0
+
+def test_cancelar_con_fragmento_sin_fragmentacion(cliente, nueva_solicitud):
+    solicitud_id = cliente.post('/api/solicitudes', json=nueva_solicitud()).get_json()['solicitud_id']
+    respuesta = cliente.delete(f'/api/solicitudes/{solicitud_id}', query_string={'fragmento': 'ingenieria'})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['campos'] == ['fragmento']
+    assert cliente.delete(f'/api/solicitudes/{solicitud_id}').status_code == 200
+
+@pytest.mark.parametrize('ruta', ['/api/disponibilidad', '/api/alternativas'])
+@pytest.mark.parametrize('parametros, campos', [
+    ({'fecha': 'abc'}, ['fecha']),
+    ({'fecha': '15/10/2030'}, ['fecha']),
+    ({'hora_inicio': '25:00'}, ['hora_inicio']),
+    ({'hora_inicio': '9:00', 'hora_fin': 'x'}, ['hora_inicio', 'hora_fin']),
+    ({'hora_inicio': '12:00', 'hora_fin': '11:00'}, ['hora_fin'])
+])
+def test_consulta_con_parametros_invalidos(cliente, ruta, parametros, campos):
+    argumentos = dict({'sala': 'A101', 'fecha': '2030-10-15', 'hora_inicio': '10:00', 'hora_fin': '11:00'}, **parametros)
+    respuesta = cliente.get(ruta, query_string=argumentos)
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {'error': 'Parámetros inválidos', 'campos': campos}
+
+def test_consulta_con_parametros_faltantes(cliente):
+    respuesta = cliente.get('/api/disponibilidad', query_string={'sala': 'A101'})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['campos'] == ['fecha', 'hora_inicio', 'hora_fin']
+
+def test_disponibilidad(cliente, nueva_solicitud):
+    consulta = {'sala': 'A101', 'fecha': '2030-10-15', 'hora_inicio': '10:30', 'hora_fin': '11:30'}
+    assert cliente.get('/api/disponibilidad', query_string=consulta).get_json()['disponible'] is True
+    cliente.post('/api/solicitudes', json=nueva_solicitud())
+    assert cliente.get('/api/disponibilidad', query_string=consulta).get_json()['disponible'] is False
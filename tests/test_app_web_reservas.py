@@ -0,0 +1,64 @@
+"""
+Pruebas de la aplicación web (Streamlit AppTest)
+Las opciones de una sesión no cambian el estado compartido del proceso
+Desarrollado por: MiniMax Agent
+"""
+
+import os
+
+import pytest
+
+from conftest import RAIZ
+from metricas_sistema import REGISTRO
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest
+
+ESTADO_DEL_SISTEMA = "🔍 Estado del Sistema"
+
+@pytest.fixture(autouse=True)
+def directorio_aplicacion(tmp_path, monkeypatch):
+    """Las planillas de la raíz, pero la base de datos (sistema_reservas.db) en un directorio temporal"""
+    for carpeta in ('user_input_files', 'planillas_optimizadas'):
+        os.symlink(os.path.join(RAIZ, carpeta), tmp_path / carpeta)
+    monkeypatch.chdir(tmp_path)
+
+def abrir(pagina):
+    sesion = AppTest.from_file(os.path.join(RAIZ, 'app_web_reservas.py'), default_timeout=120).run()
+    sesion.sidebar.selectbox[0].select(pagina).run()
+    assert not sesion.exception
+    return sesion
+
+@pytest.mark.parametrize('habilitado', [False, True])
+def test_casilla_de_metricas_no_cambia_el_registro(monkeypatch, habilitado):
+    monkeypatch.setattr(REGISTRO, 'habilitado', habilitado)
+    sesion = abrir(ESTADO_DEL_SISTEMA)
+    otra = abrir(ESTADO_DEL_SISTEMA)
+
+    casilla = sesion.checkbox(key='mostrar_metricas')
+    assert casilla.value is habilitado
+    (casilla.uncheck() if habilitado else casilla.check()).run()
+
+    assert REGISTRO.habilitado is habilitado
+    assert otra.run().checkbox(key='mostrar_metricas').value is habilitado
+
+@pytest.mark.parametrize('pagina', ["🏠 Dashboard Principal", "📊 Análisis de Datos", "📋 Gestión de Reservas",
+                                    ESTADO_DEL_SISTEMA, "⚙️ Configuración"])
+def test_paginas_sin_errores(pagina):
+    abrir(pagina)
+
+def test_reserva_usa_el_motor_de_la_instantanea():
+    sesion = abrir("📋 Gestión de Reservas")
+    sesion.button[0].click().run()
+    assert not sesion.exception
+    assert sesion.success[0].value.startswith('Reserva creada')
+
+def test_dashboard_sin_metricas_muestra_nd(monkeypatch):
+    from datos_graficos import DatosGraficos
+
+    original = DatosGraficos.metricas
+    monkeypatch.setattr(DatosGraficos, 'metricas',
+                        lambda self: dict(original(self), ocupacion_promedio=None, tasa_aprobacion=None))
+    sesion = abrir("🏠 Dashboard Principal")
+    valores = {metrica.label: metrica.value for metrica in sesion.metric}
+    assert valores["📈 Ocupación"] == valores["✅ Aprobación"] == "N/D"
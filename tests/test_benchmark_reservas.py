@@ -0,0 +1,70 @@
+"""
+Pruebas de la suite de benchmarks
+Los casos sin caché no miden aciertos y la memoria se mide por caso
+Desarrollado por: MiniMax Agent
+"""
+
+import importlib.util
+import sys
+import tracemalloc
+
+import pytest
+
+import benchmark_reservas
+from benchmark_reservas import (construir_casos, ejecutar_suite, generar_solicitudes_consulta, medir,
+                                medir_memoria, poblar_base_datos)
+from datos_demo import generar_datos_sinteticos
+
+@pytest.fixture(scope='module')
+def datos():
+    return generar_datos_sinteticos(n_salas=10, n_semestres=1, n_solicitudes=200, semilla=1)
+
+def test_conflictos_sin_cache_no_acierta(sistema, datos):
+    poblar_base_datos(sistema, datos)
+    casos = construir_casos(sistema, datos, generar_solicitudes_consulta(datos, 5, 1))
+
+    funcion, preparar = casos['detectar_conflictos_horario']
+    medir(funcion, 20, calentamiento=2, preparar=preparar)
+    assert sistema.cache_disponibilidad.estadisticas()['conflictos']['aciertos'] == 0
+
+    sistema.cache_disponibilidad.limpiar()
+    funcion, preparar = casos['detectar_conflictos_horario_cache']
+    medir(funcion, 20, calentamiento=0, preparar=preparar)
+    assert sistema.cache_disponibilidad.estadisticas()['conflictos']['aciertos'] >= 10
+
+def test_memoria_por_caso():
+    retenidos = []
+    grande = medir_memoria(lambda i: retenidos.append(bytearray(20 * 1024 * 1024)), 1)
+    pequeno = medir_memoria(lambda i: bytearray(1024 * 1024), 3)
+    assert grande >= 19
+    assert pequeno < 5
+
+def test_reporte(datos):
+    reporte = ejecutar_suite(10, 1, 200, 1, 5, casos_filtro=['detectar_conflictos_horario', 'sugerir_alternativas'])
+    assert set(reporte['casos']) == {'detectar_conflictos_horario', 'sugerir_alternativas'}
+    for caso in reporte['casos'].values():
+        assert caso['repeticiones'] == 5
+        assert caso['memoria_pico_mb'] >= 0
+    assert reporte['rss_pico_mb'] > 0
+
+def test_importa_sin_resource(monkeypatch):
+    """En Windows no existe el módulo resource"""
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    especificacion = importlib.util.spec_from_file_location('benchmark_sin_resource', benchmark_reservas.__file__)
+    modulo = importlib.util.module_from_spec(especificacion)
+    especificacion.loader.exec_module(modulo)
+    assert modulo.resource is None
+    assert modulo.memoria_pico_mb() is None
+
+    tracemalloc.start()
+    try:
+        datos = bytearray(2 * 1024 * 1024)
+        assert modulo.memoria_pico_mb() >= 1.9
+    finally:
+        del datos
+        tracemalloc.stop()
+
+def test_reporte_sin_resource(monkeypatch):
+    monkeypatch.setattr(benchmark_reservas, 'resource', None)
+    reporte = ejecutar_suite(10, 1, 200, 1, 3, casos_filtro=['detectar_conflictos_horario'])
+    assert reporte['rss_pico_mb'] == round(reporte['casos']['detectar_conflictos_horario']['memoria_pico_mb'], 1)
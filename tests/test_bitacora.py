@@ -0,0 +1,74 @@
+import atexit
+import io
+import json
+import logging
+
+import pytest
+
+import bitacora
+from bitacora import FiltroCorrelacion, FiltroMuestreo, FormateadorJSON, configurar_logging, correlacion, obtener_logger
+
+def registro(nivel=logging.INFO, mensaje='Solicitud procesada: %s', argumentos=('aprobada',), **extra):
+    record = logging.LogRecord('ufro.prueba', nivel, __file__, 1, mensaje, argumentos, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_formato_json_con_datos_estructurados():
+    record = registro(evento='solicitud_procesada', sala='A101', prioridad=60)
+    with correlacion('abc123'):
+        FiltroCorrelacion().filter(record)
+
+    linea = json.loads(FormateadorJSON().format(record))
+    assert linea['nivel'] == 'INFO' and linea['modulo'] == 'ufro.prueba'
+    assert linea['mensaje'] == 'Solicitud procesada: aprobada'
+    assert linea['evento'] == 'solicitud_procesada'
+    assert linea['id_correlacion'] == 'abc123'
+    assert linea['datos'] == {'sala': 'A101', 'prioridad': 60}
+
+def test_muestreo_nunca_descarta_advertencias():
+    filtro = FiltroMuestreo({'notificacion_enviada': 0.0})
+    assert not filtro.filter(registro(evento='notificacion_enviada'))
+    assert filtro.filter(registro(logging.WARNING, evento='notificacion_enviada'))
+    assert filtro.filter(registro(evento='otro_evento'))
+
+def test_correlacion_anidada_reutiliza_el_id():
+    assert bitacora.ID_CORRELACION.get() is None
+    with correlacion() as externo:
+        with correlacion() as interno:
+            assert interno == externo
+        with correlacion('explicito') as explicito:
+            assert explicito == 'explicito'
+        assert bitacora.ID_CORRELACION.get() == externo
+    assert bitacora.ID_CORRELACION.get() is None
+
+@pytest.fixture
+def bitacora_aislada(monkeypatch):
+    """configurar_logging sobre un estado limpio; al terminar se quita el manejador y se restauran los niveles"""
+    monkeypatch.setattr(bitacora, '_estado', {'listener': None, 'handler': None})
+    raiz = logging.getLogger(bitacora.RAIZ)
+    silenciado = obtener_logger('prueba_silenciada')
+    niveles = raiz.level, raiz.propagate, silenciado.level
+    yield
+    listener = bitacora._estado['listener']
+    if listener is not None:
+        if listener._thread is not None:
+            listener.stop()
+        atexit.unregister(listener.stop)
+        raiz.removeHandler(bitacora._estado['handler'])
+    raiz.setLevel(niveles[0])
+    raiz.propagate = niveles[1]
+    silenciado.setLevel(niveles[2])
+
+def test_configuracion_por_modulo_y_una_vez_por_proceso(bitacora_aislada):
+    salida = io.StringIO()
+    configurar_logging('INFO', {'prueba_silenciada': 'WARNING'}, {'ruido': 0.0}, destino=salida)
+    configurar_logging('DEBUG', destino=io.StringIO())  # la segunda llamada no cambia nada
+
+    obtener_logger('prueba').info("visible", extra={'evento': 'visible'})
+    obtener_logger('prueba').debug("debug")
+    obtener_logger('prueba').info("ruido", extra={'evento': 'ruido'})
+    obtener_logger('prueba_silenciada').info("silenciado")
+    obtener_logger('prueba_silenciada').warning("advertencia")
+    bitacora._estado['listener'].stop()  # vacía la cola
+
+    assert [json.loads(linea)['mensaje'] for linea in salida.getvalue().splitlines()] == ['visible', 'advertencia']
@@ -0,0 +1,129 @@
+import threading
+
+from cache_disponibilidad import CacheDisponibilidad
+
+FECHA = '2030-10-15'
+
+def conflictos(sala, hora_inicio='10:00', hora_fin='11:00', fecha=FECHA):
+    return ('conflictos', sala, fecha, hora_inicio, hora_fin)
+
+def alternativas(sala, fecha=FECHA):
+    return ('alternativas', sala, fecha, '10:00', '11:00', 1, '')
+
+class Contador:
+    """calcular() que cuenta sus llamadas"""
+
+    def __init__(self, valor='libre'):
+        self.valor = valor
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.valor
+
+def test_aciertos_y_fallos_por_tipo():
+    cache = CacheDisponibilidad()
+    calcular = Contador()
+    for _ in range(3):
+        assert cache.obtener(conflictos('A101'), calcular) == 'libre'
+    cache.obtener(alternativas('A101'), calcular)
+
+    assert calcular.llamadas == 2
+    estadisticas = cache.estadisticas()
+    assert estadisticas['entradas'] == 2
+    assert estadisticas['conflictos'] == {'aciertos': 2, 'fallos': 1, 'tasa_aciertos': 0.6667}
+    assert estadisticas['alternativas']['tasa_aciertos'] == 0.0
+
+def test_invalidar_afecta_solo_la_sala_y_fecha():
+    cache = CacheDisponibilidad()
+    claves = [conflictos('A101'), conflictos('A101', '12:00', '13:00'), conflictos('B201'),
+              conflictos('A101', fecha='2030-10-16'), alternativas('B201'), alternativas('B201', '2030-10-16')]
+    for clave in claves:
+        cache.obtener(clave, Contador())
+
+    # Las fechas pueden llegar con hora (p. ej. Timestamp de pandas)
+    cache.invalidar('A101', FECHA + ' 00:00:00')
+
+    calcular = Contador()
+    for clave in claves:
+        cache.obtener(clave, calcular)
+    # Conflictos de A101 ese día y todas las alternativas de ese día; el resto sigue en caché
+    assert calcular.llamadas == 3
+    assert cache._por_sala_fecha.keys() == {('A101', FECHA), ('B201', FECHA), ('A101', '2030-10-16')}
+
+def test_valor_calculado_durante_una_invalidacion_no_se_guarda():
+    cache = CacheDisponibilidad()
+
+    def calcular_mientras_cambia():
+        # Otra confirmación invalida mientras se consulta: el valor leído puede estar obsoleto
+        cache.invalidar('A101', FECHA)
+        return 'libre'
+
+    assert cache.obtener(conflictos('A101'), calcular_mientras_cambia) == 'libre'
+    calcular = Contador('ocupada')
+    assert cache.obtener(conflictos('A101'), calcular) == 'ocupada'
+    assert cache.obtener(conflictos('A101'), calcular) == 'ocupada'
+    assert calcular.llamadas == 1
+
+def test_limpiar_durante_el_calculo_tampoco_guarda():
+    cache = CacheDisponibilidad()
+    cache.obtener(conflictos('A101'), lambda: cache.limpiar() or 'libre')
+    assert cache.estadisticas()['entradas'] == 0
+
+def test_vigencia_vencida_vuelve_a_calcular(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr('cache_disponibilidad.time.monotonic', lambda: reloj[0])
+    cache = CacheDisponibilidad(vigencia=5.0)
+    calcular = Contador()
+
+    cache.obtener(conflictos('A101'), calcular)
+    reloj[0] += 5.0
+    cache.obtener(conflictos('A101'), calcular)
+    assert calcular.llamadas == 1
+    reloj[0] += 0.1
+    cache.obtener(conflictos('A101'), calcular)
+    assert calcular.llamadas == 2
+
+def test_lru_acotado_limpia_los_indices():
+    cache = CacheDisponibilidad(max_entradas=2)
+    for sala in ('A101', 'A102', 'A103'):
+        cache.obtener(conflictos(sala), Contador())
+
+    assert list(cache._lru) == [conflictos('A102'), conflictos('A103')]
+    assert ('A101', FECHA) not in cache._por_sala_fecha
+
+def test_lecturas_concurrentes_consistentes():
+    cache = CacheDisponibilidad(max_entradas=16)
+    errores = []
+
+    def leer(hilo):
+        try:
+            for i in range(300):
+                sala = f'S{i % 20}'
+                assert cache.obtener(conflictos(sala), lambda: sala) == sala
+                if i % 37 == hilo:
+                    cache.invalidar(sala, FECHA)
+        except AssertionError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=leer, args=(hilo,)) for hilo in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not errores
+    assert len(cache._lru) <= 16
+    assert sum(len(claves) for claves in cache._por_sala_fecha.values()) == len(cache._lru)
+
+def test_sistema_invalida_al_aprobar_y_cancelar(sistema, nueva_solicitud):
+    solicitud = nueva_solicitud()
+    fecha = solicitud['fecha_requerida']
+    assert not sistema.detectar_conflictos_horario('A101', fecha, '10:00', '11:00')['hay_conflicto']
+
+    resultado = sistema.procesar_solicitud_inteligente(solicitud, 0.5)
+    assert resultado['decision'] == 'aprobada'
+    assert sistema.detectar_conflictos_horario('A101', fecha, '10:00', '11:00')['hay_conflicto']
+
+    assert sistema.cancelar_reserva(resultado['solicitud_id'])
+    assert not sistema.detectar_conflictos_horario('A101', fecha, '10:00', '11:00')['hay_conflicto']
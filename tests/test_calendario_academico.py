@@ -0,0 +1,44 @@
+"""
+Pruebas del calendario académico
+La validación de fechas es la misma para una solicitud y para un lote
+Desarrollado por: MiniMax Agent
+"""
+
+from datetime import date
+
+import pytest
+
+from calendario_academico import CalendarioAcademico, fecha_iso
+
+FECHAS = ['2030-10-15', '15/10/2025', '2025-02-30', 'bad', '', None, '20251015', '2025-W42-3',
+          '2025-10-15T10:00', '2025-1-5', '2025-10-31', date(2030, 10, 15)]
+
+@pytest.fixture
+def calendario():
+    return CalendarioAcademico(recesos=[(date(2030, 7, 1), date(2030, 7, 19), 'Invierno')])
+
+def verificar_una(calendario, fecha):
+    try:
+        return calendario.es_reservable(fecha)
+    except ValueError:
+        return False, 'Fecha inválida'
+
+def test_lote_y_solicitud_coinciden(calendario):
+    assert calendario.verificar_fechas(FECHAS) == [verificar_una(calendario, fecha) for fecha in FECHAS]
+
+@pytest.mark.parametrize('fecha', ['15/10/2025', '20251015', '2025-10-15T10:00', '2025-02-30', None])
+def test_fecha_iso_estricta(fecha):
+    with pytest.raises(ValueError):
+        fecha_iso(fecha)
+
+def test_motivos(calendario):
+    assert calendario.verificar_fechas(['2030-07-10', '2030-09-18', '2030-10-15']) == [
+        (False, 'Fecha no disponible (receso institucional: Invierno)'),
+        (False, 'Fecha no disponible (feriado: Independencia Nacional)'),
+        (True, '')
+    ]
+
+def test_lote_rechaza_formato_no_iso(sistema, nueva_solicitud):
+    resultados = sistema.procesar_lote([nueva_solicitud(fecha_requerida='15/10/2030'), nueva_solicitud()])
+    assert [resultado['decision'] for resultado in resultados] == ['rechazada', 'aprobada']
+    assert resultados[0]['motivo'] == 'Fecha inválida'
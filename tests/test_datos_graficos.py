@@ -0,0 +1,53 @@
+import pandas as pd
+
+from datos_graficos import (DatosGraficos, conteo_por_categoria, ocupacion_por_sala, serie_temporal,
+                            tasa_aprobacion)
+
+def solicitudes(fechas, estados=None):
+    return pd.DataFrame({'Fecha Requerida': fechas, 'Estado Solicitud': estados or ['Aprobada'] * len(fechas)})
+
+def test_serie_completa_los_periodos_sin_registros():
+    df = solicitudes(['2030-10-14', '2030-10-14', '2030-10-17', '17/10/2030'])
+    serie = serie_temporal(df)
+
+    assert serie['Periodo'].dt.strftime('%m-%d').tolist() == ['10-14', '10-15', '10-16', '10-17']
+    assert serie['Cantidad'].tolist() == [2, 0, 0, 2]
+
+def test_semanas_desde_el_lunes_y_por_estado():
+    df = solicitudes(['2030-10-16', '2030-10-20', '2030-10-21'], ['Aprobada', 'Rechazada', 'Aprobada'])
+    serie = serie_temporal(df, periodo='semana', columna_grupo='Estado Solicitud')
+
+    assert set(serie['Periodo'].dt.strftime('%Y-%m-%d')) == {'2030-10-14', '2030-10-21'}
+    por_estado = serie.groupby('Estado Solicitud')['Cantidad'].sum().to_dict()
+    assert por_estado == {'Aprobada': 2, 'Rechazada': 1}
+
+def test_reducir_puntos_conserva_el_total():
+    fechas = pd.date_range('2030-01-01', periods=1000, freq='D').strftime('%Y-%m-%d').tolist()
+    serie = serie_temporal(solicitudes(fechas + fechas[:10]), max_puntos=100)
+
+    assert len(serie) <= 100
+    assert serie['Cantidad'].sum() == 1010
+    assert serie['Periodo'].is_monotonic_increasing
+
+def test_categorias_menores_en_otros():
+    df = pd.DataFrame({'Estado': list('aaaabbbcc') + ['d', None]})
+    conteo = conteo_por_categoria(df, max_categorias=3)
+
+    assert conteo.set_index('Categoria')['Cantidad'].to_dict() == {'a': 4, 'b': 3, 'Otros': 4}
+    assert conteo_por_categoria(pd.DataFrame()).empty
+
+def test_ocupacion_y_tasa():
+    indicadores = pd.DataFrame({'Sala': ['A101', 'A101', 'B201', 'C301'], 'Ocupacion_Promedio': [80, 60, 'x', 30]})
+    assert ocupacion_por_sala(indicadores, max_salas=2).to_dict('list') == {'Sala': ['A101', 'C301'], 'Ocupacion': [70.0, 30.0]}
+    assert tasa_aprobacion(solicitudes(['2030-10-14'] * 4, ['Aprobada', 'Aprobado', 'Rechazada', 'Pendiente'])) == 50.0
+    assert tasa_aprobacion(pd.DataFrame({'Otra': [1]})) is None
+
+def test_series_calculadas_una_vez_por_version():
+    datos = {'solicitudes_diarias': solicitudes(['2030-10-14', '2030-10-15']),
+             'indicadores_uso': pd.DataFrame({'Sala': ['A101'], 'Ocupacion_Promedio': [75]})}
+    graficos = DatosGraficos(datos, 'v1')
+
+    assert graficos.solicitudes_por_periodo('dia') is graficos.solicitudes_por_periodo('dia')
+    assert graficos.solicitudes_por_periodo('dia') is not graficos.solicitudes_por_periodo('dia', por_estado=True)
+    assert graficos.metricas() == {'solicitudes': 2, 'salas': 1, 'ocupacion_promedio': 75.0, 'tasa_aprobacion': 100.0}
+    assert graficos.metricas() is graficos.metricas()
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from esquemas_datos import (COLUMNA_MINUTOS, FILAS_MINIMAS_CATEGORIA, aplicar_esquema, compactar_tablas,
+                            convertir_fechas, minuto_de_hora, minutos_del_dia, resumir_informes)
+
+def test_fechas_iso_antes_que_dia_primero():
+    fechas = convertir_fechas(pd.Series(['2025-03-10', '10/03/2025', '2025-03-10 14:30:00', 'sin fecha', None]))
+    assert fechas.dt.strftime('%Y-%m-%d').tolist()[:3] == ['2025-03-10'] * 3
+    assert fechas.isna().tolist() == [False, False, False, True, True]
+
+def test_minutos_del_dia():
+    horas = pd.Series(['08:30', '10:00-12:15', 'sin hora', None, '08:30'])
+    assert minutos_del_dia(horas).tolist() == [510, 600, -1, -1, 510]
+    assert minutos_del_dia(horas, ultima=True).tolist() == [510, 735, -1, -1, 510]
+    assert str(minutos_del_dia(horas).dtype) == 'int16'
+    assert minuto_de_hora('14:45:00') == 885 and minuto_de_hora('x') == -1
+
+def test_esquema_declarado_compacta_sin_modificar_el_original():
+    n = FILAS_MINIMAS_CATEGORIA * 2
+    df = pd.DataFrame({
+        'Fecha Solicitud': ['01/03/2025'] * n,
+        'Sala Solicitada': ['A101', 'B201'] * (n // 2),
+        'Bloque Horario': ['08:00', '10:00'] * (n // 2),
+        'Estudiantes': ['30'] * n,
+        'Duración_Estimada': ['60'] * (n - 1) + ['sin dato'],
+        'Observacion': ['igual'] * n,
+        'Correo': [f'persona{i}@ufromail.cl' for i in range(n)]
+    })
+    original = df.copy()
+
+    compacto, informe = aplicar_esquema(df, 'solicitudes_diarias')
+
+    pd.testing.assert_frame_equal(df, original)
+    tipos = compacto.dtypes.astype(str).to_dict()
+    assert tipos['Fecha Solicitud'].startswith('datetime64')
+    assert tipos['Sala Solicitada'] == tipos['Bloque Horario'] == tipos['Observacion'] == 'category'
+    assert tipos['Estudiantes'] == 'int8'
+    assert tipos['Duración_Estimada'] == 'float32'
+    assert compacto['Correo'].dtype == df['Correo'].dtype
+    assert compacto[COLUMNA_MINUTOS].tolist()[:2] == [480, 600]
+    assert informe['filas'] == n and informe['ahorro_pct'] > 50
+
+def test_tablas_pequenas_sin_esquema_no_cambian_de_tipo():
+    df = pd.DataFrame({'Texto': ['a', 'a', 'a'], 'Entero': [1, 2, 3]})
+    compacto, _ = aplicar_esquema(df, 'no_declarada')
+    assert compacto['Texto'].dtype == df['Texto'].dtype
+    assert str(compacto['Entero'].dtype) == 'int8'
+
+def test_compactar_varias_tablas():
+    datos = {'recesos_institucionales': pd.DataFrame({'Fecha Inicio': ['2025-07-14']}), 'otra': 'no es tabla'}
+    compactos, informes = compactar_tablas(datos)
+    assert compactos['otra'] == 'no es tabla'
+    assert [informe['tabla'] for informe in informes] == ['recesos_institucionales']
+    assert set(resumir_informes(informes)) == {'antes_kb', 'despues_kb', 'ahorro_pct'}
@@ -0,0 +1,80 @@
+import pytest
+
+from eventos_reservas import (SOLICITUD_APROBADA, SOLICITUD_CANCELADA, SOLICITUD_CREADA, SOLICITUD_RECHAZADA,
+                              RegistroEventos, Suscriptor, aplicar, anotar, estado_inicial)
+
+def reproducir(registro):
+    """Estado aplicando toda la bitácora desde el inicio, sin instantáneas"""
+    estado = estado_inicial()
+    for evento in registro.leer(0, limite=10 ** 6):
+        aplicar(estado, evento)
+    return estado
+
+def test_decisiones_y_cancelacion_quedan_en_la_bitacora(sistema, db_path, nueva_solicitud):
+    aprobada = sistema.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra'), 0.5)
+    sistema.cancelar_reserva(aprobada['solicitud_id'], 'Ya no se usa')
+
+    registro = RegistroEventos(db_path)
+    eventos = registro.leer()
+    assert [evento['tipo'] for evento in eventos] == [
+        SOLICITUD_CREADA, SOLICITUD_APROBADA, SOLICITUD_CREADA, SOLICITUD_RECHAZADA, SOLICITUD_CANCELADA]
+    assert eventos[0]['datos']['sala_solicitada'] == 'A101'
+    assert eventos[0]['datos']['id_correlacion'] == aprobada['id_correlacion']
+    assert eventos[-1]['datos'] == {'motivo': 'Ya no se usa'}
+
+    estado = registro.reconstruir()
+    assert estado['reservas'] == {aprobada['solicitud_id']: {
+        'sala': 'A101', 'fecha': '2030-10-15', 'hora_inicio': '10:00', 'hora_fin': '11:00',
+        'solicitante': 'ana.perez', 'prioridad': aprobada['prioridad'], 'estado': 'cancelada'}}
+    assert estado['contadores'][SOLICITUD_CREADA] == 2
+    assert registro.leer(tipos=[SOLICITUD_CANCELADA])[0]['solicitud_id'] == aprobada['solicitud_id']
+
+def test_instantanea_mas_cola_equivale_a_reproducir_todo(sistema, db_path, nueva_solicitud):
+    registro = RegistroEventos(db_path, intervalo_instantanea=4)
+    for hora in range(8, 11):
+        sistema.procesar_solicitud_inteligente(nueva_solicitud(hora_inicio=f'{hora:02d}:00', hora_fin=f'{hora + 1:02d}:00'), 0.5)
+    estado = registro.reconstruir()
+    assert registro.ultima_instantanea()['secuencia'] == estado['secuencia'] == registro.ultima_secuencia()
+
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(hora_inicio='14:00', hora_fin='15:00'), 0.5)
+    sistema.cancelar_reserva(1)
+
+    assert registro.reconstruir() == reproducir(registro)
+    assert registro.ultima_instantanea()['secuencia'] == estado['secuencia']
+
+def test_eventos_se_descartan_con_la_transaccion(sistema, db_path):
+    def operacion(cursor):
+        anotar(cursor, SOLICITUD_CREADA, {'sala_solicitada': 'A101'})
+        raise RuntimeError('falla antes de confirmar')
+
+    with pytest.raises(RuntimeError):
+        sistema.ejecutar_transaccion_inmediata(operacion)
+    assert RegistroEventos(db_path).ultima_secuencia() == 0
+
+def test_suscriptor_avanza_su_cursor_persistente(sistema, db_path, nueva_solicitud):
+    registro = RegistroEventos(db_path)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+
+    recibidos = []
+    suscriptor = Suscriptor(registro, 'notificaciones', tipos=[SOLICITUD_APROBADA])
+    assert suscriptor.procesar(recibidos.append) == 1
+    assert suscriptor.procesar(recibidos.append) == 0
+
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(hora_inicio='12:00', hora_fin='13:00'), 0.5)
+    # Otro proceso (o un reinicio) retoma desde el cursor guardado
+    assert Suscriptor(RegistroEventos(db_path), 'notificaciones', tipos=[SOLICITUD_APROBADA]).procesar(recibidos.append) == 1
+    assert [evento['tipo'] for evento in recibidos] == [SOLICITUD_APROBADA, SOLICITUD_APROBADA]
+
+def test_suscriptor_no_confirma_si_el_manejador_falla(sistema, db_path, nueva_solicitud):
+    registro = RegistroEventos(db_path)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    suscriptor = Suscriptor(registro, 'auditoria')
+
+    def fallar(evento):
+        raise RuntimeError('destino no disponible')
+
+    with pytest.raises(RuntimeError):
+        suscriptor.procesar(fallar)
+    assert Suscriptor(registro, 'auditoria').secuencia == 0
+    assert suscriptor.procesar(lambda evento: None) == 2
@@ -0,0 +1,96 @@
+import csv
+import os
+import time
+
+import pytest
+
+import exportador
+from exportador import GestorExportaciones, contar_filas, exportar, formatos_disponibles
+
+@pytest.fixture
+def reservas(sistema, db_path, nueva_solicitud):
+    """Cinco reservas sueltas en dos fechas y, al final, una serie de dos ocurrencias"""
+    for hora in range(8, 13):
+        fecha = '2030-10-15' if hora < 11 else '2030-10-16'
+        sistema.procesar_solicitud_inteligente(
+            nueva_solicitud(fecha_requerida=fecha, hora_inicio=f'{hora:02d}:00', hora_fin=f'{hora + 1:02d}:00'), 0.5)
+    sistema.procesar_serie(nueva_solicitud(sala_solicitada='B201'), {'repeticiones': 2})
+    return db_path
+
+def leer_csv(ruta):
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+        return list(csv.reader(archivo))
+
+def test_csv_por_bloques_con_avance(reservas, tmp_path):
+    avance = []
+    ruta = tmp_path / 'solicitudes.csv'
+
+    assert exportar(reservas, 'solicitudes', 'csv', str(ruta), tamano_bloque=2,
+                    progreso=lambda hechas, total: avance.append((hechas, total))) == 7
+
+    assert avance == [(2, 7), (4, 7), (6, 7), (7, 7)]
+    filas = leer_csv(ruta)
+    assert filas[0][:3] == ['id', 'fecha_solicitud', 'solicitante']
+    assert [fila[0] for fila in filas[1:]] == [str(i) for i in range(1, 8)]
+
+def test_filtro_por_periodo(reservas, tmp_path):
+    assert contar_filas(reservas, 'solicitudes', desde='2030-10-16', hasta='2030-10-16') == 2
+    assert contar_filas(reservas, 'solicitudes', hasta='2030-10-15') == 4
+    assert contar_filas(reservas, 'eventos') == 14
+    with pytest.raises(ValueError):
+        contar_filas(reservas, 'usuarios')
+    with pytest.raises(ValueError):
+        exportar(reservas, 'solicitudes', 'pdf', str(tmp_path / 'x.pdf'))
+
+def test_excel_continua_en_otra_hoja(reservas, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip('openpyxl')
+    monkeypatch.setattr(exportador, 'FILAS_MAXIMAS_HOJA', 4)
+    ruta = tmp_path / 'solicitudes.xlsx'
+
+    exportar(reservas, 'solicitudes', 'excel', str(ruta), tamano_bloque=3)
+
+    libro = openpyxl.load_workbook(ruta, read_only=True)
+    assert libro.sheetnames == ['datos', 'datos_2']
+    assert [len(list(libro[hoja].iter_rows())) for hoja in libro.sheetnames] == [5, 4]
+
+def test_parquet_columna_vacia_en_el_primer_bloque(reservas, tmp_path):
+    if 'parquet' not in formatos_disponibles():
+        pytest.skip('pyarrow no instalado')
+    import pyarrow.parquet as pq
+
+    ruta = tmp_path / 'solicitudes.parquet'
+    # serie_id está vacío en el primer bloque y tiene valor en el último
+    exportar(reservas, 'solicitudes', 'parquet', str(ruta), tamano_bloque=5)
+
+    tabla = pq.read_table(ruta)
+    assert tabla.num_rows == 7
+    assert tabla.column('serie_id').to_pylist() == [None] * 5 + ['1', '1']
+    assert tabla.column('id').to_pylist() == list(range(1, 8))
+
+def test_parquet_sin_filas(db_path, sistema, tmp_path):
+    if 'parquet' not in formatos_disponibles():
+        pytest.skip('pyarrow no instalado')
+    import pyarrow.parquet as pq
+
+    ruta = tmp_path / 'vacio.parquet'
+    assert exportar(db_path, 'reasignaciones', 'parquet', str(ruta)) == 0
+    assert pq.read_table(ruta).num_rows == 0
+
+def test_gestor_ejecuta_en_segundo_plano_y_limpia(reservas, tmp_path):
+    gestor = GestorExportaciones(reservas, carpeta=str(tmp_path / 'exportaciones'), horas_retencion=0)
+    trabajo = gestor.iniciar('solicitudes', 'csv', desde='2030-10-15', hasta='2030-10-15')
+    sin_filas = gestor.iniciar('reasignaciones', 'csv', desde='no es fecha')
+    gestor._pool.shutdown(wait=True)
+
+    assert trabajo.estado == 'terminado' and trabajo.avance == 1.0
+    assert trabajo.nombre_archivo == 'solicitudes_2030-10-15_2030-10-15.csv'
+    assert len(leer_csv(trabajo.ruta)) == 5
+    assert sin_filas.estado == 'terminado' and sin_filas.filas == 0
+    assert gestor.trabajos()[0] is sin_filas
+
+    time.sleep(0.01)
+    gestor.limpiar()
+    assert gestor.trabajos() == []
+    assert not os.path.exists(trabajo.ruta)
+    with pytest.raises(ValueError):
+        gestor.iniciar('solicitudes', 'pdf')
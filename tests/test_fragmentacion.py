@@ -0,0 +1,117 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from fragmentacion import SistemaFragmentado, clave_facultad, clave_hash
+
+INGENIERIA = 'facultad_de_ingenieria'
+EDUCACION = 'facultad_de_educacion'
+
+@pytest.fixture
+def salas():
+    return pd.DataFrame({
+        'codigo': ['A101', 'A102', 'B201'],
+        'capacidad': [40, 30, 25],
+        'facultad': ['Facultad de Ingeniería', 'Facultad de Ingeniería', 'Facultad de Educación'],
+        'equipamiento': ['Proyector', 'Proyector', None]
+    })
+
+@pytest.fixture
+def fragmentado(salas, tmp_path):
+    sistema = SistemaFragmentado(salas, carpeta=str(tmp_path / 'fragmentos'))
+    yield sistema
+    sistema.cerrar()
+
+def solicitudes_en(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT sala_solicitada, estado FROM solicitudes ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def test_claves_estables():
+    assert clave_facultad('Facultad de Ingeniería') == INGENIERIA
+    assert clave_facultad(None) == 'general'
+    assert clave_hash('A101') == clave_hash('A101')
+    assert clave_hash('A101', 4) in {'h00', 'h01', 'h02', 'h03'}
+
+def test_enrutamiento_por_facultad(fragmentado):
+    assert fragmentado.claves == [EDUCACION, INGENIERIA]
+    assert fragmentado.clave_de('A101') == fragmentado.clave_de('A102') == INGENIERIA
+    assert fragmentado.clave_de('B201') == EDUCACION
+    # Una sala fuera del catálogo siempre cae en el mismo fragmento existente
+    assert fragmentado.clave_de('Z999') in fragmentado.claves
+    assert fragmentado.clave_de('Z999') == fragmentado.clave_de('Z999')
+
+def test_modo_hash_y_modo_invalido(salas, tmp_path):
+    fragmentado = SistemaFragmentado(salas, carpeta=str(tmp_path / 'hash'), modo='hash', fragmentos_hash=4)
+    try:
+        assert fragmentado.clave_de('A101') == clave_hash('A101', 4)
+    finally:
+        fragmentado.cerrar()
+    with pytest.raises(ValueError):
+        SistemaFragmentado(salas, carpeta=str(tmp_path / 'otro'), modo='sala')
+
+def test_reserva_queda_solo_en_su_fragmento(fragmentado, nueva_solicitud):
+    resultado = fragmentado.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+
+    assert resultado['decision'] == 'aprobada'
+    assert resultado['fragmento'] == INGENIERIA
+    assert solicitudes_en(fragmentado.fragmentos[INGENIERIA].db_path) == [('A101', 'aprobada')]
+    assert solicitudes_en(fragmentado.fragmentos[EDUCACION].db_path) == []
+    assert fragmentado.detectar_conflictos_horario('A101', resultado['solicitud']['fecha_requerida'],
+                                                   '10:30', '11:30')['hay_conflicto']
+
+def test_cancelar_y_vigencia_usan_el_fragmento_del_resultado(fragmentado, nueva_solicitud):
+    ingenieria = fragmentado.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    educacion = fragmentado.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='B201'), 0.5)
+    # Los id son por fragmento: ambas reservas tienen el mismo
+    assert ingenieria['solicitud_id'] == educacion['solicitud_id']
+
+    assert fragmentado.reserva_vigente(ingenieria)
+    assert not fragmentado.cancelar_reserva(ingenieria['solicitud_id'], fragmento='inexistente')
+    assert fragmentado.cancelar_reserva(ingenieria['solicitud_id'], fragmento=INGENIERIA)
+
+    assert not fragmentado.reserva_vigente(ingenieria)
+    assert fragmentado.reserva_vigente(educacion)
+    assert not fragmentado.reserva_vigente(dict(ingenieria, fragmento=None))
+    assert fragmentado.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)['decision'] == 'aprobada'
+
+def test_lote_conserva_el_orden_entre_fragmentos(fragmentado, nueva_solicitud):
+    salas = ['B201', 'A101', 'A102', 'B201']
+    resultados = fragmentado.procesar_lote([nueva_solicitud(sala_solicitada=sala) for sala in salas])
+
+    assert [resultado['solicitud']['sala_solicitada'] for resultado in resultados] == salas
+    assert [resultado['fragmento'] for resultado in resultados] == [EDUCACION, INGENIERIA, INGENIERIA, EDUCACION]
+    assert [resultado['decision'] for resultado in resultados] == ['aprobada', 'aprobada', 'aprobada', 'rechazada']
+
+def test_lote_con_errores_por_solicitud(fragmentado, nueva_solicitud, monkeypatch):
+    educacion = fragmentado.fragmentos[EDUCACION]
+    original = educacion.detectar_conflictos_horario
+
+    def detectar(sala, *argumentos):
+        if sala == 'B201':
+            raise RuntimeError('fragmento no disponible')
+        return original(sala, *argumentos)
+
+    monkeypatch.setattr(educacion, 'detectar_conflictos_horario', detectar)
+    lote = [nueva_solicitud(), nueva_solicitud(sala_solicitada='B201'), nueva_solicitud(sala_solicitada='A102')]
+
+    with pytest.raises(RuntimeError):
+        fragmentado.procesar_lote(lote)
+
+    resultados = fragmentado.procesar_lote([dict(solicitud, hora_inicio='12:00', hora_fin='13:00') for solicitud in lote],
+                                           capturar_errores=True)
+    assert isinstance(resultados[1], RuntimeError)
+    assert [resultados[0]['decision'], resultados[2]['decision']] == ['aprobada', 'aprobada']
+
+def test_serie_en_su_fragmento(fragmentado, nueva_solicitud):
+    resultado = fragmentado.procesar_serie(nueva_solicitud(sala_solicitada='B201'),
+                                           {'frecuencia': 'semanal', 'repeticiones': 3})
+
+    assert resultado['fragmento'] == EDUCACION
+    assert resultado['serie_id'] is not None
+    assert fragmentado.reserva_vigente(resultado)
+    assert len(solicitudes_en(fragmentado.fragmentos[EDUCACION].db_path)) == 3
+    assert fragmentado.estadisticas()[EDUCACION]['solicitudes'] == 3
@@ -0,0 +1,186 @@
+"""
+Pruebas de la idempotencia de solicitudes
+Duplicados en curso, conflictos de clave, vigencia de los resultados guardados y cancelaciones
+Desarrollado por: MiniMax Agent
+"""
+
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from api_reservas import CABECERA_IDEMPOTENCIA, CABECERA_REPETIDA, crear_app
+from idempotencia import CacheIdempotencia, ConflictoIdempotencia, huella_solicitud
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheIdempotencia(str(tmp_path / 'idempotencia.db'))
+
+def aprobada(solicitud_id=1, **campos):
+    return dict({'decision': 'aprobada', 'solicitud_id': solicitud_id}, **campos)
+
+def test_huella_normaliza(nueva_solicitud):
+    assert huella_solicitud(nueva_solicitud(motivo=' Estudio GRUPAL ', fecha_requerida='2030-10-15 08:00')) == \
+        huella_solicitud(nueva_solicitud())
+
+def test_duplicados_en_curso_esperan_el_original(cache, nueva_solicitud):
+    llamadas = []
+    origen = Future()
+
+    def iniciar():
+        llamadas.append(1)
+        return origen
+
+    futuros = [cache.enviar(nueva_solicitud(), iniciar) for _ in range(5)]
+    assert len(llamadas) == 1
+    assert [repetida for _, repetida in futuros] == [False, True, True, True, True]
+    origen.set_result(aprobada())
+    assert all(futuro.result(timeout=1) == aprobada() for futuro, _ in futuros)
+
+def test_reintento_repite_aprobacion(cache, nueva_solicitud):
+    llamadas = []
+    calcular = lambda: llamadas.append(1) or aprobada()
+    assert cache.ejecutar(nueva_solicitud(), calcular) == (aprobada(), False)
+    assert cache.ejecutar(nueva_solicitud(), calcular) == (aprobada(), True)
+    assert len(llamadas) == 1
+
+@pytest.mark.parametrize('decision', ['requiere_revision', 'pendiente'])
+def test_no_se_guardan_revisiones_ni_pendientes(cache, nueva_solicitud, decision):
+    llamadas = []
+    calcular = lambda: llamadas.append(1) or {'decision': decision}
+    cache.ejecutar(nueva_solicitud(), calcular)
+    assert cache.ejecutar(nueva_solicitud(), calcular) == ({'decision': decision}, False)
+    assert len(llamadas) == 2
+
+def test_rechazo_se_guarda_por_plazo_breve(tmp_path, nueva_solicitud):
+    cache = CacheIdempotencia(str(tmp_path / 'idempotencia.db'), ttl_rechazo=0.05)
+    llamadas = []
+    calcular = lambda: llamadas.append(1) or {'decision': 'rechazada'}
+    cache.ejecutar(nueva_solicitud(), calcular)
+    assert cache.ejecutar(nueva_solicitud(), calcular) == ({'decision': 'rechazada'}, True)
+    time.sleep(0.1)
+    assert cache.ejecutar(nueva_solicitud(), calcular)[1] is False
+    assert len(llamadas) == 2
+
+def test_clave_reutilizada_con_otra_solicitud(cache, nueva_solicitud):
+    cache.ejecutar(nueva_solicitud(), aprobada, clave='k1')
+    with pytest.raises(ConflictoIdempotencia):
+        cache.ejecutar(nueva_solicitud(sala_solicitada='B101'), aprobada, clave='k1')
+
+def test_persiste_entre_instancias(tmp_path, nueva_solicitud):
+    ruta = str(tmp_path / 'idempotencia.db')
+    CacheIdempotencia(ruta).ejecutar(nueva_solicitud(), aprobada)
+    assert CacheIdempotencia(ruta).ejecutar(nueva_solicitud(), lambda: pytest.fail('reprocesada')) == (aprobada(), True)
+
+def test_vencimiento(tmp_path, nueva_solicitud):
+    cache = CacheIdempotencia(str(tmp_path / 'idempotencia.db'), ttl=0.05)
+    cache.ejecutar(nueva_solicitud(), aprobada)
+    time.sleep(0.1)
+    assert cache.ejecutar(nueva_solicitud(), aprobada)[1] is False
+
+def test_resultado_no_vigente_se_reprocesa(tmp_path, nueva_solicitud):
+    vigentes = {1}
+    cache = CacheIdempotencia(str(tmp_path / 'idempotencia.db'),
+                              vigente=lambda resultado: resultado['solicitud_id'] in vigentes)
+    cache.ejecutar(nueva_solicitud(), aprobada)
+    vigentes.clear()
+    assert cache.ejecutar(nueva_solicitud(), lambda: aprobada(2)) == (aprobada(2), False)
+
+def test_olvidar_reserva(tmp_path, nueva_solicitud):
+    ruta = str(tmp_path / 'idempotencia.db')
+    cache = CacheIdempotencia(ruta)
+    cache.ejecutar(nueva_solicitud(), lambda: aprobada(7, fragmento='ingenieria'))
+    cache.olvidar_reserva(7, 'ingenieria')
+    for instancia in (cache, CacheIdempotencia(ruta)):
+        assert instancia.ejecutar(nueva_solicitud(), lambda: aprobada(8))[1] is False
+        instancia.olvidar_reserva(8)
+
+def test_migra_tabla_sin_columna_reserva(tmp_path, nueva_solicitud):
+    ruta = str(tmp_path / 'idempotencia.db')
+    with sqlite3.connect(ruta) as conn:
+        conn.execute('CREATE TABLE resultados_idempotentes (clave TEXT PRIMARY KEY, huella TEXT, vence REAL, resultado TEXT)')
+    cache = CacheIdempotencia(ruta)
+    cache.ejecutar(nueva_solicitud(), aprobada)
+    cache.olvidar_reserva(1)
+    assert cache.ejecutar(nueva_solicitud(), aprobada)[1] is False
+
+@pytest.fixture
+def cliente(sistema):
+    return crear_app(sistema).test_client()
+
+def test_api_usa_la_base_del_sistema(sistema, db_path, tmp_path, monkeypatch, nueva_solicitud):
+    monkeypatch.chdir(tmp_path)
+    crear_app(sistema).test_client().post('/api/solicitudes', json=nueva_solicitud())
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM resultados_idempotentes').fetchone()[0] == 1
+    assert not os.path.exists(tmp_path / 'sistema_reservas.db')
+
+def test_api_reenvio_tras_cancelar(cliente, nueva_solicitud):
+    primera = cliente.post('/api/solicitudes', json=nueva_solicitud())
+    repetida = cliente.post('/api/solicitudes', json=nueva_solicitud())
+    assert repetida.headers[CABECERA_REPETIDA] == 'true'
+    solicitud_id = primera.get_json()['solicitud_id']
+    assert repetida.get_json()['solicitud_id'] == solicitud_id
+
+    assert cliente.delete(f'/api/solicitudes/{solicitud_id}').status_code == 200
+    nueva = cliente.post('/api/solicitudes', json=nueva_solicitud())
+    assert nueva.headers[CABECERA_REPETIDA] == 'false'
+    assert nueva.get_json()['decision'] == 'aprobada'
+    assert nueva.get_json()['solicitud_id'] != solicitud_id
+
+def test_api_cancelacion_en_otro_proceso(cliente, sistema, nueva_solicitud):
+    """La cancelación hecha fuera de esta API se detecta al repetir: la reserva ya no está aprobada"""
+    solicitud_id = cliente.post('/api/solicitudes', json=nueva_solicitud(),
+                                headers={CABECERA_IDEMPOTENCIA: 'k1'}).get_json()['solicitud_id']
+    with sqlite3.connect(sistema.db_path) as conn:
+        conn.execute("UPDATE solicitudes SET estado = 'cancelada' WHERE id = ?", (solicitud_id,))
+    sistema.cache_disponibilidad.limpiar()
+    nueva = cliente.post('/api/solicitudes', json=nueva_solicitud(), headers={CABECERA_IDEMPOTENCIA: 'k1'})
+    assert nueva.headers[CABECERA_REPETIDA] == 'false'
+    assert nueva.get_json()['decision'] == 'aprobada'
+
+def test_api_rechazo_se_puede_reintentar(cliente, nueva_solicitud):
+    ocupante = cliente.post('/api/solicitudes', json=nueva_solicitud(solicitante='otro')).get_json()['solicitud_id']
+    assert cliente.post('/api/solicitudes', json=nueva_solicitud()).get_json()['decision'] == 'rechazada'
+    cliente.delete(f'/api/solicitudes/{ocupante}')
+    assert cliente.post('/api/solicitudes', json=nueva_solicitud()).get_json()['decision'] == 'aprobada'
+
+def test_api_lote_con_elementos_repetidos(cliente, db_path, nueva_solicitud):
+    respuesta = cliente.post('/api/solicitudes/lote', json=[
+        nueva_solicitud(), nueva_solicitud(), nueva_solicitud(sala_solicitada='B101')])
+    lineas = {linea['indice']: linea for linea in map(json.loads, respuesta.get_data(as_text=True).splitlines())}
+    assert sorted(lineas) == [0, 1, 2]
+    assert [lineas[indice]['repetida'] for indice in (0, 1)] == [False, True]
+    assert lineas[0]['resultado'] == lineas[1]['resultado']
+    assert lineas[0]['resultado']['decision'] == lineas[2]['resultado']['decision'] == 'aprobada'
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM solicitudes WHERE estado = 'aprobada'").fetchone()[0] == 2
+
+def test_api_reintento_de_rechazo_no_reenvia_el_aviso(cliente, db_path, nueva_solicitud):
+    from sistema_notificaciones import SistemaNotificaciones
+
+    cliente.post('/api/solicitudes', json=nueva_solicitud(solicitante='otro'))
+    rechazo = cliente.post('/api/solicitudes', json=nueva_solicitud(correo='ana@ufro.cl'))
+    reintento = cliente.post('/api/solicitudes', json=nueva_solicitud(correo='ana@ufro.cl'))
+    assert rechazo.get_json()['decision'] == reintento.get_json()['decision'] == 'rechazada'
+    assert reintento.headers[CABECERA_REPETIDA] == 'true'
+
+    SistemaNotificaciones(db_path).despachar_eventos()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM notificaciones WHERE destinatario = 'ana@ufro.cl'").fetchone()[0] == 1
+
+def test_api_rechazo_de_serie_se_repite_mientras_siga_ocupada(cliente, nueva_solicitud):
+    regla = {'repeticiones': 2}
+    ocupante = cliente.post('/api/solicitudes', json=nueva_solicitud(solicitante='otro')).get_json()['solicitud_id']
+    serie = nueva_solicitud(regla=regla)
+    primera = cliente.post('/api/series', json=dict(serie, aprobacion_parcial=False))
+    assert primera.get_json()['decision'] == 'rechazada'
+    assert cliente.post('/api/series', json=dict(serie, aprobacion_parcial=False)).headers[CABECERA_REPETIDA] == 'true'
+
+    cliente.delete(f'/api/solicitudes/{ocupante}')
+    nueva = cliente.post('/api/series', json=dict(serie, aprobacion_parcial=False))
+    assert nueva.headers[CABECERA_REPETIDA] == 'false'
+    assert nueva.get_json()['decision'] == 'aprobada'
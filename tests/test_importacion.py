@@ -0,0 +1,18 @@
+"""
+Pruebas del arranque en frío
+Los módulos de entrada no cargan pandas, numpy ni scikit-learn al importarse y respetan su presupuesto
+Desarrollado por: MiniMax Agent
+"""
+
+import pytest
+
+from benchmark_reservas import PRESUPUESTOS_IMPORTACION_MS, medir_tiempo_importacion, modulos_diferidos_cargados
+
+@pytest.mark.parametrize('modulo', sorted(PRESUPUESTOS_IMPORTACION_MS))
+def test_no_carga_bibliotecas_diferidas(modulo):
+    assert modulos_diferidos_cargados(modulo) == []
+
+@pytest.mark.parametrize('modulo', sorted(PRESUPUESTOS_IMPORTACION_MS))
+def test_presupuesto_de_importacion(modulo):
+    medir_tiempo_importacion(modulo)  # el primero compila los .pyc y calienta el caché del sistema de archivos
+    assert medir_tiempo_importacion(modulo) <= PRESUPUESTOS_IMPORTACION_MS[modulo]
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from indice_salas import IndiceSalas, _bloques, describir_equipamiento, mascara_equipamiento
+
+FECHA = '2030-10-15'
+
+SALAS = pd.DataFrame({
+    'codigo': ['A101', 'A102', 'A103', 'B201'],
+    'capacidad': [40, 45, 20, 60],
+    'facultad': ['Ingeniería', 'Ingeniería', 'Ingeniería', 'Educación'],
+    'equipamiento': ['Proyector, Sonido', 'Completo', None, 'Proyector']
+})
+
+def registrar_salas(db_path, salas=SALAS):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany('INSERT INTO salas (codigo, capacidad, facultad, equipamiento) VALUES (?, ?, ?, ?)',
+                         salas.astype(object).where(salas.notna(), None).values.tolist())
+    conn.close()
+
+@pytest.fixture
+def sistema_con_salas(sistema, db_path):
+    registrar_salas(db_path)
+    sistema.inicializar_indice_salas()
+    return sistema
+
+@pytest.fixture
+def indice():
+    return IndiceSalas(SALAS)
+
+def test_mascaras_de_equipamiento():
+    assert mascara_equipamiento('Proyector, Sonido') == 3
+    assert mascara_equipamiento(['proyector', 'laboratorio de química']) == 17
+    assert mascara_equipamiento('Completo') == 15
+    assert mascara_equipamiento(None) == 0
+    assert describir_equipamiento(0) == 'Básico'
+
+def test_bloques_del_horario():
+    assert list(_bloques('10:00', '11:00')) == [10]
+    assert list(_bloques('10:30', '12:15')) == [10, 11, 12]
+    assert list(_bloques('07:00', '08:30')) == [7, 8]
+    assert list(_bloques('21:30', '23:00')) == [21, 22]
+    assert list(_bloques('23:00', '24:00')) == [23]
+
+def test_capacidad_y_equipamiento(indice):
+    assert indice.salas_de(indice.con_capacidad(40)) == ['A101', 'A102', 'B201']
+    assert indice.salas_de(indice.con_capacidad(40, 'Ingeniería')) == ['A101', 'A102']
+    assert indice.salas_de(indice.con_capacidad(100)) == []
+    assert indice.salas_de(indice.con_equipamiento(mascara_equipamiento('proyector'))) == ['A101', 'A102', 'B201']
+    assert indice.ficha('A102') == {'sala': 'A102', 'capacidad': 45, 'facultad': 'Ingeniería',
+                                    'equipamiento': 'Proyector, Sonido, Computador, Pizarra'}
+    assert indice.ficha('Z999') is None
+
+def test_buscar_descarta_las_ocupadas(sistema_con_salas, nueva_solicitud):
+    assert sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='A102'), 0.5)['decision'] == 'aprobada'
+    indice = sistema_con_salas.indice_salas
+    conexion = sistema_con_salas._conexion()
+
+    assert indice.buscar(conexion, FECHA, '10:30', '11:30', capacidad_minima=30, equipamiento='proyector') == ['A101', 'B201']
+    assert indice.buscar(conexion, FECHA, '11:00', '12:00', 30, 'proyector', 'Ingeniería') == ['A101', 'A102']
+
+    # Las reservas confirmadas por el proceso se ven sin releer la base de datos
+    indice.marcar_ocupada('A101', FECHA, '11:00', '12:00')
+    assert indice.buscar(conexion, FECHA, '11:00', '12:00', 30, 'proyector', 'Ingeniería') == ['A102']
+
+def test_alternativas_misma_facultad_y_mejor_ajuste_primero(sistema_con_salas, nueva_solicitud):
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='otra', estudiantes=30, equipamiento='proyector'), 0.5)
+
+    assert resultado['decision'] == 'rechazada'
+    assert [alternativa['sala'] for alternativa in resultado['alternativas']] == ['A102', 'B201']
+
+def test_capacidad_insuficiente_ofrece_salas_mayores(sistema_con_salas, nueva_solicitud):
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(estudiantes=50), 0.5)
+
+    assert resultado['decision'] == 'rechazada'
+    assert resultado['motivo'] == 'Capacidad insuficiente (40 asientos para 50 estudiantes)'
+    assert [alternativa['sala'] for alternativa in resultado['alternativas']] == ['B201']
+
+def test_reserva_nocturna_ocupa_la_sala(sistema_con_salas, nueva_solicitud):
+    nocturna = {'hora_inicio': '22:00', 'hora_fin': '23:00'}
+    for sala in ('A101', 'A102'):
+        assert sistema_con_salas.procesar_solicitud_inteligente(
+            nueva_solicitud(sala_solicitada=sala, **nocturna), 0.5)['decision'] == 'aprobada'
+    assert 'A101' not in sistema_con_salas.indice_salas.buscar(sistema_con_salas._conexion(), FECHA, '22:00', '23:00')
+
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='otra', sala_solicitada='A102', **nocturna), 0.5)
+    assert resultado['decision'] == 'rechazada'
+    assert [alternativa['sala'] for alternativa in resultado['alternativas']] == ['A103', 'B201']
+
+def test_alternativas_se_confirman_en_la_base(sistema_con_salas, db_path, nueva_solicitud):
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    assert 'A102' in sistema_con_salas.indice_salas.buscar(sistema_con_salas._conexion(), FECHA, '10:00', '11:00')
+    # Otro proceso ocupa A102 después de que el índice leyó la ocupación del día
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO solicitudes (sala_solicitada, fecha_requerida, hora_inicio, hora_fin, estado) "
+                     "VALUES ('A102', ?, '10:00', '11:00', 'aprobada')", (FECHA,))
+
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra'), 0.5)
+    assert resultado['decision'] == 'rechazada'
+    assert [alternativa['sala'] for alternativa in resultado['alternativas']] == ['A103', 'B201']
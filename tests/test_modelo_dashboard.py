@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from modelo_dashboard import MAPEOS, ModeloDashboard
+
+@pytest.fixture
+def datos():
+    return {
+        'solicitudes': pd.DataFrame({
+            'Rol': ['Estudiante', 'Docente', 'Estudiante', None],
+            'Bloque Horario': ['08:00', '10:00', '10:00', '10:00'],
+            'Estado': ['Aprobada', 'Aprobada', 'Rechazada', 'Aprobado']
+        }),
+        'indicadores': pd.DataFrame({'Sala': ['A101', 'A102', 'A101'], 'Frecuencia de Uso': [5, 7, '3']}),
+        'reasignaciones': pd.DataFrame({'Fecha Reasignación': ['2025-03-04', '2025-03-20', '2025-04-01', 'sin fecha']}),
+        'asignaciones': pd.DataFrame({'estado': ['Activa', 'Activa', None]})
+    }
+
+def test_paneles_desde_una_pasada_por_tabla(datos):
+    modelo = ModeloDashboard(datos)
+
+    assert modelo.paneles['tipo_usuario'].serie.to_dict() == {'Estudiante': 2, 'Docente': 1, 'Sin dato': 1}
+    assert modelo.paneles['horarios'].serie.to_dict() == {'10:00': 3, '08:00': 1}
+    assert modelo.paneles['uso_salas'].serie.to_dict() == {'A101': 8, 'A102': 7}
+    assert modelo.paneles['reasignaciones'].serie.to_dict() == {'2025-03': 2, '2025-04': 1}
+    assert modelo.paneles['estado_asignaciones'].serie.to_dict() == {'Activa': 2, 'Sin dato': 1}
+    assert modelo.kpis == {'solicitudes': 4, 'reasignaciones': 4, 'notificaciones': None, 'tasa_aprobacion': 75.0}
+    assert modelo.faltantes() == {}
+
+def test_no_modifica_los_dataframes(datos):
+    copias = {tabla: df.copy() for tabla, df in datos.items()}
+    ModeloDashboard(datos)
+    for tabla, df in datos.items():
+        pd.testing.assert_frame_equal(df, copias[tabla])
+
+def test_paneles_sin_datos_explican_el_motivo(datos):
+    datos['indicadores'] = datos['indicadores'].rename(columns={'Frecuencia de Uso': 'Otra'})
+    datos['asignaciones'] = datos['asignaciones'].iloc[0:0]
+    del datos['reasignaciones']
+
+    modelo = ModeloDashboard(datos)
+
+    faltantes = modelo.faltantes()
+    assert faltantes['uso_salas'].startswith('Sin columnas en indicadores (uso: Frecuencia de Uso')
+    assert faltantes['reasignaciones'] == 'Sin datos de reasignaciones'
+    assert faltantes['estado_asignaciones'] == 'Sin datos de asignaciones'
+    assert modelo.paneles['uso_salas'].serie is None
+    assert modelo.kpis['reasignaciones'] is None
+
+def test_sin_registros_validos_no_es_un_panel_disponible(datos):
+    datos['reasignaciones'] = pd.DataFrame({'Fecha Reasignación': ['sin fecha']})
+    assert ModeloDashboard(datos).faltantes() == {'reasignaciones': 'Sin registros'}
+
+def test_mapeo_resuelto_una_vez_por_version(datos):
+    primero = ModeloDashboard(datos, version='v-prueba').mapeo
+    assert ModeloDashboard(datos, version='v-prueba').mapeo is primero
+    assert primero['solicitudes'] == {'tipo_usuario': 'Rol', 'horario': 'Bloque Horario', 'estado': 'Estado'}
+    # Sin versión, la clave son las columnas presentes
+    assert MAPEOS.obtener(datos) is MAPEOS.obtener({tabla: df.head(1) for tabla, df in datos.items()})
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from motor_pronostico import BLOQUES, MotorPronostico, ajustar_pronostico, construir_tensor
+
+# Martes 2 de abril de 2030: todo el historial y el horizonte quedan en el primer semestre
+INICIO = date(2030, 4, 2)
+
+def semanal(sala='A101', hora='10:00', semanas=8, por_semana=lambda semana: 1):
+    filas = []
+    for semana in range(semanas):
+        fecha = (INICIO + timedelta(weeks=semana)).isoformat()
+        filas += [{'Sala Solicitada': sala, 'Fecha Requerida': fecha, 'Bloque Horario': hora}] * por_semana(semana)
+    return pd.DataFrame(filas)
+
+def test_tensor_por_sala_semana_dia_y_bloque():
+    datos = pd.concat([
+        semanal(semanas=2),
+        pd.DataFrame({'Sala Solicitada': ['B201', 'B201', 'B201', None],
+                      'Fecha Requerida': ['2030-04-05', '2030-04-05', 'sin fecha', '2030-04-05'],
+                      'Bloque Horario': ['20:30', '07:00', '10:00', '10:00']})
+    ])
+    conteos, salas, lunes = construir_tensor(datos)
+
+    assert salas == ['A101', 'B201']
+    assert lunes == pd.Timestamp('2030-04-01')
+    assert conteos.shape == (2, 2, 7, len(BLOQUES))
+    assert conteos.sum() == 3  # fuera de horario, sin fecha y sin sala quedan fuera
+    assert conteos[0, :, 1, BLOQUES.index('10:00')].tolist() == [1, 1]
+    assert conteos[1, 0, 4, BLOQUES.index('20:00')] == 1
+    assert construir_tensor(pd.DataFrame({'Otra': [1]})) is None
+
+def test_demanda_constante_se_mantiene():
+    pronostico = ajustar_pronostico(semanal(), horizonte=4)
+
+    martes = pronostico.semanas[0] + pd.Timedelta(days=1)
+    assert pronostico.demanda('A101', martes, '10:00') == pytest.approx(1.0, abs=1e-3)
+    assert pronostico.demanda('A101', martes, '11:00') == 0
+    assert pronostico.demanda('Z999', martes, '10:00') == 0
+    assert pronostico.demanda('A101', martes + pd.Timedelta(weeks=4), '10:00') == 0
+    assert pronostico.por_semana().tolist() == pytest.approx([1.0] * 4, abs=1e-3)
+    assert pronostico.variacion_pct() == pytest.approx(0.0, abs=0.1)
+    assert len(pronostico.a_dataframe()) == 1 * 4 * 7 * len(BLOQUES)
+
+def test_tendencia_creciente_pronostica_mas_que_lo_reciente():
+    pronostico = ajustar_pronostico(semanal(semanas=10, por_semana=lambda semana: 1 + semana), horizonte=2)
+    assert pronostico.variacion_pct() > 0
+    assert pronostico.por_dia_semana().idxmax() == 'Martes'
+    assert pronostico.por_bloque().idxmax() == '10:00'
+
+def test_motor_reutiliza_el_pronostico_mientras_no_cambian_los_datos():
+    motor = MotorPronostico(horizonte=2)
+    datos = semanal()
+    assert motor.pronosticar(datos) is motor.pronosticar(datos.copy())
+    assert motor.pronosticar(semanal(semanas=9)) is not motor.pronosticar(datos)
+
+    llamadas = []
+
+    def leer():
+        llamadas.append(1)
+        return datos
+
+    assert motor.pronosticar(leer, version='v1') is motor.pronosticar(leer, version='v1')
+    assert len(llamadas) == 1
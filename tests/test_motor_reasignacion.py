@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from motor_reasignacion import MotorReasignacion
+
+FECHA = '2030-10-15'
+
+SALAS = [
+    ('A101', 40, 'Ingeniería', 'Proyector, Sonido'),
+    ('A102', 45, 'Ingeniería', 'Completo'),
+    ('B201', 60, 'Educación', 'Proyector')
+]
+
+@pytest.fixture
+def sistema_con_salas(sistema, db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany('INSERT INTO salas (codigo, capacidad, facultad, equipamiento) VALUES (?, ?, ?, ?)', SALAS)
+    conn.close()
+    sistema.inicializar_indice_salas()
+    return sistema
+
+def consultar(db_path, consulta, parametros=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(consulta, parametros).fetchall()
+    finally:
+        conn.close()
+
+def test_docente_desplaza_a_estudiante_a_sala_equivalente(sistema_con_salas, db_path, nueva_solicitud):
+    estudiante = sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    assert not sistema_con_salas.detectar_conflictos_horario('A102', FECHA, '10:00', '11:00')['hay_conflicto']
+
+    docente = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='prof.soto', tipo_usuario='Docente', motivo='Clase'), 0.5)
+
+    assert docente['decision'] == 'aprobada'
+    assert [(movimiento['solicitud_id'], movimiento['sala_original'], movimiento['sala_nueva'])
+            for movimiento in docente['reasignaciones']] == [(estudiante['solicitud_id'], 'A101', 'A102')]
+    assert consultar(db_path, "SELECT id, sala_solicitada FROM solicitudes WHERE estado = 'aprobada' ORDER BY id") == [
+        (estudiante['solicitud_id'], 'A102'), (docente['solicitud_id'], 'A101')]
+    assert consultar(db_path, 'SELECT solicitud_id, sala_original, sala_nueva, aprobado_por FROM reasignaciones') == [
+        (estudiante['solicitud_id'], 'A101', 'A102', 'motor_reasignacion')]
+    # La caché de la sala destino quedó invalidada
+    assert sistema_con_salas.detectar_conflictos_horario('A102', FECHA, '10:00', '11:00')['hay_conflicto']
+
+def test_igual_prioridad_no_desplaza(sistema_con_salas, db_path, nueva_solicitud):
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(tipo_usuario='Docente'), 0.5)
+
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='prof.soto', tipo_usuario='Docente'), 0.5)
+
+    assert resultado['decision'] == 'requiere_revision'
+    assert consultar(db_path, 'SELECT COUNT(*) FROM reasignaciones') == [(0,)]
+
+def test_sin_sala_equivalente_libre_requiere_revision(sistema_con_salas, db_path, nueva_solicitud):
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='A102', tipo_usuario='Docente'), 0.5)
+
+    resultado = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='prof.soto', tipo_usuario='Docente'), 0.5)
+
+    assert resultado['decision'] == 'requiere_revision'
+    assert consultar(db_path, "SELECT sala_solicitada FROM solicitudes ORDER BY id") == [('A101',), ('A102',)]
+
+def test_plan_invalido_si_la_reserva_cambio_antes_de_confirmar(sistema_con_salas, db_path, nueva_solicitud):
+    estudiante = sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    conexion = sistema_con_salas._conexion()
+    movimientos = MotorReasignacion(sistema_con_salas.indice_salas, conexion, FECHA).resolver('A101', '10:00', '11:00', 100)
+    assert [movimiento['sala_nueva'] for movimiento in movimientos] == ['A102']
+
+    # Otra escritura ocupa la sala destino entre la búsqueda y la confirmación
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='A102', solicitante='otra'), 0.5)
+    assert not MotorReasignacion(sistema_con_salas.indice_salas, conexion, FECHA).plan_valido(
+        movimientos, 'A101', '10:00', '11:00')
+
+    assert sistema_con_salas.cancelar_reserva(estudiante['solicitud_id'])
+    assert not MotorReasignacion(sistema_con_salas.indice_salas, conexion, FECHA).plan_valido(
+        movimientos, 'A101', '10:00', '11:00')
+
+def test_horario_libre_no_requiere_movimientos(sistema_con_salas):
+    motor = MotorReasignacion(sistema_con_salas.indice_salas, sistema_con_salas._conexion(), FECHA)
+    assert motor.resolver('A101', '10:00', '11:00', 100) == []
+
+def test_aviso_de_reasignacion_va_al_correo_de_la_reserva(sistema_con_salas, db_path, nueva_solicitud):
+    from sistema_notificaciones import SistemaNotificaciones
+
+    sistema_con_salas.procesar_solicitud_inteligente(nueva_solicitud(correo='ana.perez@ufro.cl'), 0.5)
+    docente = sistema_con_salas.procesar_solicitud_inteligente(
+        nueva_solicitud(solicitante='prof.soto', tipo_usuario='Docente', correo='soto@ufro.cl'), 0.5)
+
+    assert [movimiento['correo'] for movimiento in docente['reasignaciones']] == ['ana.perez@ufro.cl']
+    avisos = [notificacion for notificacion in sistema_con_salas.generar_notificacion_automatica(docente)
+              if notificacion['tipo'] == 'reasignacion']
+    assert [aviso['destinatario'] for aviso in avisos] == ['ana.perez@ufro.cl']
+
+    notificaciones = SistemaNotificaciones(db_path)
+    assert notificaciones.notificar_reasignacion(docente['reasignaciones'][0]) is True
+    # Sin correo registrado no se envía al nombre del solicitante
+    assert notificaciones.notificar_reasignacion(dict(docente['reasignaciones'][0], correo=None)) is False
+    assert consultar(db_path, 'SELECT destinatario FROM notificaciones') == [('ana.perez@ufro.cl',)]
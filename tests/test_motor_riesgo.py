@@ -0,0 +1,35 @@
+"""
+Pruebas del motor de riesgo de conflicto
+Solicitudes con fechas u horas ilegibles no rompen el procesamiento
+Desarrollado por: MiniMax Agent
+"""
+
+import pytest
+
+from motor_riesgo import MotorRiesgo
+
+@pytest.mark.parametrize('fecha', ['bad', '2025-02-30', '', None])
+def test_agregar_ignora_fecha_invalida(fecha):
+    motor = MotorRiesgo()
+    motor.agregar('A101', fecha, '10:00', '11:00')
+    assert motor.salas == []
+
+def test_agregar_registra_fecha_valida():
+    motor = MotorRiesgo()
+    motor.agregar('A101', '2030-10-15', '10:00', '11:00')
+    motor.agregar('A101', '2030-10-15', '10:30', '11:30')
+    assert motor.salas == ['A101']
+    assert motor.solapes.sum() > 0
+
+@pytest.mark.parametrize('fecha', ['bad', '2025-02-30'])
+def test_solicitud_con_fecha_invalida_se_rechaza(sistema, nueva_solicitud, fecha):
+    sistema.motor_riesgo = MotorRiesgo()
+    resultado = sistema.procesar_solicitud_inteligente(nueva_solicitud(fecha_requerida=fecha))
+    assert resultado['decision'] == 'rechazada'
+    assert resultado['motivo'] == 'Fecha inválida'
+
+def test_serie_con_motor_de_riesgo(sistema, nueva_solicitud):
+    sistema.motor_riesgo = MotorRiesgo()
+    resultado = sistema.procesar_serie(nueva_solicitud(), {'frecuencia': 'semanal', 'repeticiones': 3})
+    assert resultado['decision'] == 'aprobada'
+    assert sistema.motor_riesgo.salas == ['A101']
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from navegador_datos import NavegadorDatos
+
+def crear_base(ruta):
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE solicitudes (id INTEGER PRIMARY KEY, sala TEXT)")
+    conn.executemany("INSERT INTO solicitudes (sala) VALUES (?)", [('A101',), ('B202',), ('A103',)])
+    conn.commit()
+    conn.close()
+
+def test_base_creada_despues_se_adjunta_en_la_primera_consulta(tmp_path):
+    ruta = tmp_path / 'sistema_reservas.db'
+    navegador = NavegadorDatos(str(ruta))
+    assert navegador.tablas_base_datos == []
+    with pytest.raises(KeyError):
+        navegador.contar('solicitudes')
+
+    crear_base(ruta)
+
+    assert navegador.tablas_base_datos == ['solicitudes']
+    assert navegador.contar('solicitudes') == 3
+    assert navegador.contar('solicitudes', {'sala': 'A1'}) == 2
+    assert list(navegador.pagina('solicitudes', tamano=2, orden='sala')['sala']) == ['A101', 'A103']
+
+def test_tablas_creadas_despues_de_adjuntar_quedan_visibles(tmp_path):
+    ruta = tmp_path / 'sistema_reservas.db'
+    sqlite3.connect(ruta).close()
+    navegador = NavegadorDatos(str(ruta))
+    assert navegador.tablas_base_datos == []
+
+    crear_base(ruta)
+
+    assert [nombre for nombre, _ in navegador.columnas('solicitudes')] == ['id', 'sala']
+    assert navegador.estadisticas('solicitudes').set_index('Columna').loc['sala', 'Distintos'] == 3
+
+def test_tablas_publicadas_sin_base_de_datos(tmp_path):
+    navegador = NavegadorDatos(str(tmp_path / 'no_existe.db'))
+    df = pd.DataFrame({'sala': ['A101', 'B202']})
+    assert navegador.publicar_tabla('salas', df, 1)
+    assert not navegador.publicar_tabla('salas', df, 1)
+    assert navegador.contar('salas') == 2
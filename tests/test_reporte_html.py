@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+import pytest
+
+from reporte_html import ReporteHTML, generar_reporte_html
+
+TODAS = ['tipo_usuario', 'uso_salas', 'reasignaciones', 'horarios', 'estado_asignaciones', 'kpis', 'pronostico']
+
+@pytest.fixture
+def datos():
+    return {
+        'solicitudes': pd.DataFrame({
+            'Rol': ['Estudiante', 'Docente', 'Estudiante'],
+            'Bloque Horario': ['08:00', '10:00', '10:00'],
+            'Estado': ['Aprobada', 'Aprobada', 'Rechazada']
+        }),
+        'indicadores': pd.DataFrame({'Sala': ['A101', '<b>A102</b>'], 'Frecuencia de Uso': [5, 7]}),
+        'asignaciones': pd.DataFrame({'Estado': ['Activa', 'Finalizada']})
+    }
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / 'dashboard.html')
+
+def leer(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return archivo.read()
+
+def test_reporte_autocontenido(datos, ruta):
+    assert generar_reporte_html(datos, ruta) == TODAS
+
+    pagina = leer(ruta)
+    assert pagina.startswith('<!DOCTYPE html>')
+    assert pagina.count('<svg') >= 4
+    assert '<script' not in pagina and 'http://' not in pagina.replace('http://www.w3.org/2000/svg', '')
+    # Los datos se escapan y los paneles sin datos lo dicen en lugar de inventarlos
+    assert '&lt;b&gt;A102&lt;/b&gt;' in pagina and '<b>A102</b>' not in pagina
+    assert 'Sin datos reales: Sin datos de reasignaciones' in pagina
+    assert '66.7%' in pagina
+
+def test_solo_se_regeneran_las_secciones_que_cambiaron(datos, ruta):
+    generar_reporte_html(datos, ruta)
+    assert generar_reporte_html(datos, ruta) == []
+
+    datos['indicadores'].loc[0, 'Frecuencia de Uso'] = 9
+    assert generar_reporte_html(datos, ruta) == ['uso_salas']
+
+    datos['solicitudes'].loc[2, 'Estado'] = 'Aprobada'
+    assert generar_reporte_html(datos, ruta) == ['kpis']
+    assert '100.0%' in leer(ruta)
+
+    # Una columna que ninguna sección usa no regenera nada
+    datos['solicitudes']['Comentario'] = 'x'
+    assert generar_reporte_html(datos, ruta) == []
+
+def test_secciones_guardadas_ilegibles_regeneran_todo(datos, ruta):
+    reporte = ReporteHTML(ruta)
+    reporte.generar(datos)
+    with open(reporte.ruta_secciones, 'w', encoding='utf-8') as archivo:
+        archivo.write('{no es json')
+
+    reporte.generar(datos)
+    assert reporte.regeneradas == TODAS
+    with open(reporte.ruta_secciones, encoding='utf-8') as archivo:
+        assert set(json.load(archivo)) == set(TODAS)
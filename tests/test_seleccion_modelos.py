@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('sklearn')
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from seleccion_modelos import elegir, seleccionar_modelo
+
+def resultados(**modelos):
+    return pd.DataFrame.from_dict(modelos, orient='index', columns=['auc', 'log_loss', 'latencia_us'])
+
+def test_elegir_el_mas_rapido_dentro_de_la_tolerancia():
+    tabla = resultados(lento=(0.80, 0.50, 900.0), rapido=(0.795, 0.52, 60.0), malo=(0.70, 0.60, 10.0))
+    assert elegir(tabla) == 'rapido'
+    assert elegir(tabla, tolerancia_auc=0.001) == 'lento'
+
+def test_a_igual_latencia_decide_el_log_loss():
+    assert elegir(resultados(a=(0.8, 0.55, 100.0), b=(0.8, 0.45, 100.0))) == 'b'
+
+def test_sin_auc_decide_el_log_loss():
+    tabla = resultados(a=(np.nan, 0.40, 500.0), b=(np.nan, 0.401, 50.0), c=(np.nan, 0.9, 1.0))
+    assert elegir(tabla) == 'b'
+
+def datos_sinteticos(filas=240, semilla=0):
+    generador = np.random.default_rng(semilla)
+    X = generador.normal(size=(filas, 3))
+    y = (X[:, 0] + 0.3 * generador.normal(size=filas) > 0).astype(int)
+    return X, y
+
+def test_seleccion_con_validacion_temporal():
+    X, y = datos_sinteticos()
+    candidatos = {'logistica': LogisticRegression(),
+                  'rf_5': RandomForestClassifier(n_estimators=5, max_depth=2, random_state=0)}
+
+    ganador, modelo, tabla = seleccionar_modelo(X, y, candidatos, n_splits=3, n_jobs=1)
+
+    assert ganador in candidatos
+    assert tabla['seleccionado'].sum() == 1 and tabla.loc[ganador, 'seleccionado']
+    assert set(tabla.columns) >= {'auc', 'log_loss', 'ajuste_s', 'latencia_us'}
+    assert (tabla['auc'] > 0.8).all()
+    assert modelo.predict_proba(X[:2]).shape == (2, 2)
+
+def test_datos_insuficientes():
+    X, y = datos_sinteticos(20)
+    assert seleccionar_modelo(X, np.zeros_like(y), {'logistica': LogisticRegression()}, n_jobs=1) is None
+    assert seleccionar_modelo(X[:2], y[:2], {'logistica': LogisticRegression()}, n_jobs=1) is None
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from series_recurrentes import ReglaInvalida, expandir_regla, interpretar_regla
+
+# 2030-10-15 es martes
+MARTES = '2030-10-15'
+
+def test_regla_rrule_y_diccionario_equivalentes():
+    rrule = interpretar_regla('RRULE:FREQ=WEEKLY;BYDAY=TU,TH;COUNT=4')
+    diccionario = interpretar_regla({'frecuencia': 'semanal', 'dias': ['Martes', 'jueves'], 'repeticiones': 4})
+    assert rrule == diccionario == {'frecuencia': 'semanal', 'intervalo': 1, 'dias': [1, 3], 'repeticiones': 4, 'hasta': None}
+
+def test_expandir_semanal_desde_la_fecha_de_inicio():
+    assert expandir_regla(MARTES, 'FREQ=WEEKLY;BYDAY=MO,TU,TH;COUNT=4') == [
+        '2030-10-15', '2030-10-17', '2030-10-21', '2030-10-22']
+    assert expandir_regla(MARTES, {'repeticiones': 3, 'intervalo': 2}) == ['2030-10-15', '2030-10-29', '2030-11-12']
+
+def test_expandir_diaria_hasta_fecha():
+    assert expandir_regla(MARTES, 'FREQ=DAILY;UNTIL=20301018') == ['2030-10-15', '2030-10-16', '2030-10-17', '2030-10-18']
+    assert expandir_regla(MARTES, {'frecuencia': 'diaria', 'dias': ['Lunes', 'Viernes'], 'hasta': '2030-10-21'}) == [
+        '2030-10-18', '2030-10-21']
+
+@pytest.mark.parametrize('regla', [
+    'FREQ=MONTHLY;COUNT=3', 'FREQ=WEEKLY', {'repeticiones': 3, 'intervalo': -1},
+    {'repeticiones': 3, 'dias': ['Feriado']}, {'hasta': '2030-13-01'}
+])
+def test_reglas_invalidas(regla):
+    with pytest.raises(ReglaInvalida):
+        expandir_regla(MARTES, regla)
+
+def test_serie_aprobada_parcial_con_una_sola_transaccion(sistema, db_path, nueva_solicitud):
+    ocupada = sistema.procesar_solicitud_inteligente(nueva_solicitud(fecha_requerida='2030-10-22'), 0.5)
+    assert ocupada['decision'] == 'aprobada'
+
+    resultado = sistema.procesar_serie(nueva_solicitud(solicitante='curso'), {'repeticiones': 3})
+
+    assert resultado['decision'] == 'aprobada_parcial'
+    assert [ocurrencia['estado'] for ocurrencia in resultado['ocurrencias']] == ['aprobada', 'rechazada', 'aprobada']
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute('SELECT ocurrencias, aprobadas, estado FROM series WHERE id = ?',
+                            (resultado['serie_id'],)).fetchone() == (3, 2, 'aprobada_parcial')
+        assert conn.execute('SELECT fecha_requerida FROM solicitudes WHERE serie_id = ? ORDER BY fecha_requerida',
+                            (resultado['serie_id'],)).fetchall() == [('2030-10-15',), ('2030-10-29',)]
+    finally:
+        conn.close()
+    assert sistema.reserva_vigente(resultado)
+
+def test_serie_sin_aprobacion_parcial_no_registra_nada(sistema, db_path, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(fecha_requerida='2030-10-22'), 0.5)
+
+    resultado = sistema.procesar_serie(nueva_solicitud(solicitante='curso'), {'repeticiones': 3}, aprobacion_parcial=False)
+
+    assert resultado['decision'] == 'rechazada'
+    assert resultado['serie_id'] is None
+    assert {ocurrencia['motivo'] for ocurrencia in resultado['ocurrencias']} == {
+        'Conflicto detectado', 'Serie rechazada completa por conflictos'}
+
+def test_cancelar_una_ocurrencia_deja_la_serie_no_vigente(sistema, db_path, nueva_solicitud):
+    resultado = sistema.procesar_serie(nueva_solicitud(), 'FREQ=WEEKLY;COUNT=2')
+    assert resultado['decision'] == 'aprobada'
+
+    conn = sqlite3.connect(db_path)
+    solicitud_id = conn.execute('SELECT MIN(id) FROM solicitudes WHERE serie_id = ?', (resultado['serie_id'],)).fetchone()[0]
+    conn.close()
+    assert sistema.cancelar_reserva(solicitud_id)
+    assert not sistema.reserva_vigente(resultado)
+
+def test_regla_invalida_rechaza_la_serie(sistema, nueva_solicitud):
+    resultado = sistema.procesar_serie(nueva_solicitud(), 'FREQ=HOURLY;COUNT=2')
+    assert resultado['decision'] == 'rechazada'
+    assert resultado['motivo'].startswith('Regla de recurrencia inválida')
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sistema_ia_reservas import SistemaIAReservas
+
+HILOS = 8
+
+def en_paralelo(funciones):
+    """Ejecuta las funciones a la vez (todas parten juntas tras una barrera) y retorna sus resultados"""
+    barrera = threading.Barrier(len(funciones))
+
+    def ejecutar(funcion):
+        barrera.wait()
+        return funcion()
+
+    with ThreadPoolExecutor(len(funciones)) as ejecutor:
+        return list(ejecutor.map(ejecutar, funciones))
+
+def aprobadas(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM solicitudes WHERE estado = 'aprobada'").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_registro_atomico_concurrente_aprueba_una_sola_vez(sistema, db_path, nueva_solicitud):
+    solicitud = nueva_solicitud()
+    ids = en_paralelo([lambda: sistema.registrar_reserva_atomica(solicitud, 10)] * HILOS)
+
+    assert sum(solicitud_id is not None for solicitud_id in ids) == 1
+    assert aprobadas(db_path) == 1
+
+def test_horarios_superpuestos_desde_varios_procesos(db_path, nueva_solicitud):
+    # Un sistema por "proceso": cada uno con su propia caché, todas leen el horario libre antes de escribir
+    sistemas = [SistemaIAReservas(db_path) for _ in range(HILOS)]
+    solicitudes = [nueva_solicitud(solicitante=f'estudiante{i}', hora_inicio=f'10:{i * 5:02d}', hora_fin='11:30')
+                   for i in range(HILOS)]
+    resultados = en_paralelo([
+        lambda sistema=sistema, solicitud=solicitud: sistema.procesar_solicitud_inteligente(solicitud, 0.5)
+        for sistema, solicitud in zip(sistemas, solicitudes)
+    ])
+
+    decisiones = [resultado['decision'] for resultado in resultados]
+    assert decisiones.count('aprobada') == 1
+    assert decisiones.count('rechazada') == HILOS - 1
+    assert aprobadas(db_path) == 1
+
+def test_horarios_contiguos_no_entran_en_conflicto(sistema, db_path, nueva_solicitud):
+    solicitudes = [nueva_solicitud(hora_inicio=f'{8 + i:02d}:00', hora_fin=f'{9 + i:02d}:00') for i in range(4)]
+    ids = en_paralelo([lambda solicitud=solicitud: sistema.registrar_reserva_atomica(solicitud, 10)
+                       for solicitud in solicitudes])
+
+    assert all(solicitud_id is not None for solicitud_id in ids)
+    assert aprobadas(db_path) == 4
+
+def test_reintenta_mientras_otro_escritor_tiene_el_bloqueo(sistema, db_path, nueva_solicitud):
+    bloqueo = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    bloqueo.execute('BEGIN IMMEDIATE')
+    liberar = threading.Timer(0.1, lambda: bloqueo.execute('COMMIT'))
+    liberar.start()
+    try:
+        assert sistema.registrar_reserva_atomica(nueva_solicitud(), 10) is not None
+    finally:
+        liberar.join()
+        bloqueo.close()
+    assert aprobadas(db_path) == 1
+
+def test_conflicto_confirmado_en_la_transaccion_invalida_la_cache(db_path, nueva_solicitud):
+    lector, otro = SistemaIAReservas(db_path), SistemaIAReservas(db_path)
+    solicitud = nueva_solicitud()
+    assert not lector.detectar_conflictos_horario('A101', solicitud['fecha_requerida'], '10:00', '11:00')['hay_conflicto']
+
+    assert otro.registrar_reserva_atomica(solicitud, 10) is not None
+    resultado = lector.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra.persona'), 0.5)
+
+    assert resultado['decision'] == 'rechazada'
+    assert resultado['conflictos']['hay_conflicto']
+    assert aprobadas(db_path) == 1
+
+def test_reporte_ia_con_cifras_calculadas(sistema, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(), 0.5)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra'), 0.5)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='B101', tipo_usuario='Docente'), 0.5)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(sala_solicitada='B101', tipo_usuario='Docente'), 0.5)
+
+    reporte = sistema.generar_reporte_ia()
+
+    for inventada in ('85%', '75%', '98%'):
+        assert inventada not in reporte
+    assert 'Aprobación de usuarios académicos: 50.0% (2 decisiones) frente a 50.0% del resto (2 decisiones)' in reporte
+    assert '75.0% de las solicitudes (3 de 4) se decidieron sin revisión manual' in reporte
+    assert 'Conflictos resueltos con reasignación automática: 0' in reporte
@@ -0,0 +1,65 @@
+"""
+Pruebas del despacho de notificaciones desde la bitácora de eventos
+Cursor del consumidor, reproducción desde otro proceso y despacho en segundo plano de la API
+Desarrollado por: MiniMax Agent
+"""
+
+import sqlite3
+import time
+
+from api_reservas import crear_app
+from eventos_reservas import RegistroEventos
+from sistema_notificaciones import SistemaNotificaciones
+
+def correos(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return [fila[0] for fila in conn.execute("SELECT destinatario FROM notificaciones WHERE canal = 'email' ORDER BY id")]
+
+def test_despacho_avanza_el_cursor(sistema, db_path, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(correo='ana@ufro.cl'), 0.5)
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra', correo='otra@ufro.cl'), 0.5)
+
+    notificaciones = SistemaNotificaciones(db_path)
+    assert notificaciones.despachar_eventos() == 4
+    assert correos(db_path) == ['ana@ufro.cl', 'coordinador@ufro.cl', 'otra@ufro.cl']
+    # Las notificaciones enviadas no se vuelven a despachar
+    assert notificaciones.despachar_eventos() == 0
+    assert len(correos(db_path)) == 3
+
+def test_otro_proceso_retoma_desde_el_cursor(sistema, db_path, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(correo='ana@ufro.cl'), 0.5)
+    SistemaNotificaciones(db_path).despachar_eventos()
+
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(hora_inicio='12:00', hora_fin='13:00', correo='ana@ufro.cl'), 0.5)
+    assert SistemaNotificaciones(db_path).despachar_eventos() == 2
+    assert correos(db_path) == ['ana@ufro.cl', 'coordinador@ufro.cl'] * 2
+
+def test_reproduccion_desde_el_inicio(sistema, db_path, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(correo='ana@ufro.cl'), 0.5)
+    SistemaNotificaciones(db_path).despachar_eventos()
+    # Sin cursor, el consumidor reproduce toda la bitácora
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM cursores_eventos WHERE consumidor = 'notificaciones'")
+    assert SistemaNotificaciones(db_path).despachar_eventos() == 2
+    assert correos(db_path) == ['ana@ufro.cl', 'coordinador@ufro.cl'] * 2
+
+def test_primer_arranque_desde_el_final(sistema, db_path, nueva_solicitud):
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(correo='ana@ufro.cl'), 0.5)
+    notificaciones = SistemaNotificaciones(db_path)
+    assert notificaciones.despachar_eventos(desde_el_final=True) == 0
+    assert correos(db_path) == []
+
+    sistema.procesar_solicitud_inteligente(nueva_solicitud(solicitante='otra', correo='otra@ufro.cl'), 0.5)
+    assert notificaciones.despachar_eventos(desde_el_final=True) == 2
+    assert correos(db_path) == ['otra@ufro.cl']
+
+def test_api_despacha_en_segundo_plano(sistema, db_path, nueva_solicitud):
+    cliente = crear_app(sistema, intervalo_notificaciones=0.02).test_client()
+    assert cliente.post('/api/solicitudes', json=nueva_solicitud(correo='ana@ufro.cl')).get_json()['decision'] == 'aprobada'
+
+    limite = time.monotonic() + 5
+    while 'ana@ufro.cl' not in correos(db_path) and time.monotonic() < limite:
+        time.sleep(0.02)
+    assert correos(db_path)[:2] == ['ana@ufro.cl', 'coordinador@ufro.cl']
+    assert RegistroEventos(db_path)._conexion().execute(
+        "SELECT secuencia FROM cursores_eventos WHERE consumidor = 'notificaciones'").fetchone()[0] >= 2